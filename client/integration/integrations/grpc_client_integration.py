@@ -34,6 +34,8 @@ class GrpcClientIntegrationConfig:
     retry_delay_sec: float = 1.0
     server: str = "production"  # local|production|fallback (по умолчанию production для Azure)
     use_network_gate: bool = True
+    # bytes screenshot_data вместо base64 строки; включать, когда все серверы принимают screenshot_data
+    send_raw_screenshot: bool = False
 
 
 class GrpcClientIntegration:
@@ -62,6 +64,7 @@ class GrpcClientIntegration:
                     retry_delay_sec=float(cfg.get('retry_delay', 1.0)),
                     server=str(cfg.get('server', 'production')),
                     use_network_gate=bool(cfg.get('use_network_gate', True)),
+                    send_raw_screenshot=bool(cfg.get('send_raw_screenshot', False)),
                 )
             except Exception as e:
                 logger.warning(f"⚠️ Ошибка загрузки конфигурации gRPC, используем defaults: {e}")
@@ -316,8 +319,9 @@ class GrpcClientIntegration:
         
         logger.info(f"Using Hardware ID: {hwid[:8]}... for session {session_id}")
 
-        # Кодируем скриншот (если есть)
+        # Скриншот (если есть): сырые байты или base64 для старых серверов
         screenshot_b64 = None
+        screenshot_bytes = None
         width = sess.get('width')
         height = sess.get('height')
         path = sess.get('screenshot_path')
@@ -326,12 +330,15 @@ class GrpcClientIntegration:
                 p = Path(path)
                 if p.exists():
                     data = p.read_bytes()
-                    screenshot_b64 = base64.b64encode(data).decode('ascii')
+                    if self.config.send_raw_screenshot:
+                        screenshot_bytes = data
+                    else:
+                        screenshot_b64 = base64.b64encode(data).decode('ascii')
             except Exception as e:
                 logger.debug(f"Failed to read screenshot: {e}")
 
         # Публикуем старт
-        await self.event_bus.publish("grpc.request_started", {"session_id": session_id, "has_screenshot": bool(screenshot_b64)})
+        await self.event_bus.publish("grpc.request_started", {"session_id": session_id, "has_screenshot": bool(screenshot_bytes or screenshot_b64)})
 
         # Ленивая коннекция к серверу
         try:
@@ -361,6 +368,7 @@ class GrpcClientIntegration:
             async for resp in self._client.stream_audio(
                 prompt=text,
                 screenshot_base64=screenshot_b64 or "",
+                screenshot_bytes=screenshot_bytes,
                 screen_info={"width": width, "height": height},
                 hardware_id=hwid,
             ):
@@ -188,8 +188,9 @@ class GrpcClient:
         """Проверяет, подключен ли клиент"""
         return self.connection_manager.is_connected()
     
-    async def stream_audio(self, prompt: str, screenshot_base64: str, screen_info: dict, hardware_id: str) -> AsyncGenerator[Any, None]:
-        """Стриминг аудио и текста на сервер"""
+    async def stream_audio(self, prompt: str, screenshot_base64: str, screen_info: dict, hardware_id: str,
+                           screenshot_bytes: Optional[bytes] = None) -> AsyncGenerator[Any, None]:
+        """Стриминг аудио и текста на сервер (screenshot_bytes - сырые байты, без base64)"""
         try:
             logger.info(f"🔍 screen_info type: {type(screen_info)}")
             logger.info(f"🔍 screen_info content: {screen_info}")
@@ -223,6 +224,8 @@ class GrpcClient:
                 hardware_id=hardware_id,
                 session_id=None
             )
+            if screenshot_bytes:
+                request.screenshot_data = screenshot_bytes
             
             # Выполняем стриминг
             async for response in streaming_pb2_grpc.StreamingServiceStub(
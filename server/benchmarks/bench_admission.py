@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк и офлайн проверка AdmissionController (admission control StreamAudio)
+
+- перегрузка: одновременно запросов больше, чем слотов + очередь;
+  активных никогда не больше max_concurrent, лишние отклоняются сразу
+- дедлайн: запрос с коротким дедлайном при занятых слотах отклоняется
+  до истечения дедлайна, а не после
+- token bucket: серия запросов от одного hardware_id сверх burst отклоняется
+- отмена ожидающего запроса не теряет слот
+
+Запуск (из каталога server):
+    python benchmarks/bench_admission.py --clients 40 --max-concurrent 4 --queue 8
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from modules.grpc_service.core.admission_controller import (
+    AdmissionController,
+    AdmissionRejectedError,
+    REJECT_DEADLINE,
+    REJECT_QUEUE_FULL,
+    REJECT_RATE_LIMITED,
+)
+
+
+def _p95(values: list) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000 if ordered else 0.0
+
+
+async def _overload(args, failures: list):
+    controller = AdmissionController(
+        max_concurrent=args.max_concurrent, max_queue=args.queue, max_wait=args.max_wait, user_requests_per_minute=0
+    )
+    peak = 0
+    admitted_latency, rejected_latency = [], []
+
+    async def client(index: int):
+        nonlocal peak
+        start = time.perf_counter()
+        try:
+            ticket = await controller.acquire(f"hw-{index}", args.deadline)
+        except AdmissionRejectedError:
+            rejected_latency.append(time.perf_counter() - start)
+            return
+        try:
+            peak = max(peak, controller.active)
+            await asyncio.sleep(args.service_ms / 1000)
+        finally:
+            controller.release(ticket)
+        admitted_latency.append(time.perf_counter() - start)
+
+    # Прогрев оценки времени обработки
+    await asyncio.gather(*(client(i) for i in range(args.max_concurrent)))
+    admitted_latency.clear()
+    await asyncio.gather(*(client(i) for i in range(args.clients)))
+
+    metrics = controller.get_metrics()
+    print(
+        f"overload: clients={args.clients} admitted={len(admitted_latency)} rejected={len(rejected_latency)} "
+        f"peak_active={peak} max_queue_depth={metrics['max_queue_depth']} "
+        f"p95_admitted={_p95(admitted_latency):.0f}ms p95_reject={_p95(rejected_latency):.1f}ms "
+        f"wait_p95={metrics['wait_time_ms']['p95_ms']:.0f}ms rejected={metrics['rejected']}"
+    )
+    if peak > args.max_concurrent:
+        failures.append(f"overload: {peak} active > max_concurrent {args.max_concurrent}")
+    if not rejected_latency:
+        failures.append("overload: nothing was rejected")
+    if _p95(rejected_latency) > args.max_wait * 1000:
+        failures.append("overload: rejections were slower than max_wait")
+    if _p95(admitted_latency) > args.deadline * 1000:
+        failures.append("overload: admitted requests missed the client deadline")
+    if controller.active != 0:
+        failures.append(f"overload: {controller.active} slots leaked")
+
+
+async def _deadline(args, failures: list):
+    controller = AdmissionController(max_concurrent=1, max_queue=10, max_wait=5.0, user_requests_per_minute=0)
+    # Оценка времени обработки ~100ms
+    ticket = await controller.acquire("warm")
+    await asyncio.sleep(0.1)
+    controller.release(ticket)
+
+    busy = await controller.acquire("busy")
+    start = time.perf_counter()
+    try:
+        await controller.acquire("short-deadline", 0.02)
+        failures.append("deadline: request with a 20ms deadline was admitted while busy")
+    except AdmissionRejectedError as e:
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"deadline: rejected in {elapsed:.2f}ms ({e.reason}, retry_after={e.retry_after:.2f}s)")
+        if e.reason != REJECT_DEADLINE or elapsed > 10:
+            failures.append(f"deadline: expected immediate '{REJECT_DEADLINE}', got '{e.reason}' after {elapsed:.1f}ms")
+
+    # Отменённый ожидающий не должен забрать слот с собой
+    waiter = asyncio.create_task(controller.acquire("cancelled", 1.0))
+    await asyncio.sleep(0.01)
+    waiter.cancel()
+    await asyncio.gather(waiter, return_exceptions=True)
+    controller.release(busy)
+    try:
+        ticket = await controller.acquire("after-cancel", 0.5)
+        controller.release(ticket)
+    except AdmissionRejectedError as e:
+        failures.append(f"cancel: slot lost after cancelled waiter ({e})")
+    if controller.active != 0 or controller.queue_depth != 0:
+        failures.append(f"cancel: active={controller.active} queued={controller.queue_depth} after all released")
+
+
+async def _rate_limit(args, failures: list):
+    burst = 5
+    controller = AdmissionController(max_concurrent=100, user_burst=burst, user_requests_per_minute=60)
+    results = {}
+    for _ in range(burst + 3):
+        try:
+            controller.release(await controller.acquire("spammer"))
+            results['ok'] = results.get('ok', 0) + 1
+        except AdmissionRejectedError as e:
+            results[e.reason] = results.get(e.reason, 0) + 1
+    controller.release(await controller.acquire("other-user"))
+    print(f"rate limit: burst={burst} results={results}")
+    if results.get('ok') != burst or results.get(REJECT_RATE_LIMITED) != 3:
+        failures.append(f"rate limit: expected {burst} admitted and 3 rate_limited, got {results}")
+    if controller.rejected[REJECT_QUEUE_FULL]:
+        failures.append("rate limit: unexpected queue_full")
+
+
+async def main(args) -> int:
+    failures = []
+    await _overload(args, failures)
+    await _deadline(args, failures)
+    await _rate_limit(args, failures)
+
+    for failure in failures:
+        print(f"  ❌ {failure}")
+    print("✅ PASS" if not failures else "❌ FAIL")
+    return 0 if not failures else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="StreamAudio admission control benchmark")
+    parser.add_argument('--clients', type=int, default=40)
+    parser.add_argument('--max-concurrent', type=int, default=4)
+    parser.add_argument('--queue', type=int, default=8)
+    parser.add_argument('--max-wait', type=float, default=1.0)
+    parser.add_argument('--deadline', type=float, default=1.0)
+    parser.add_argument('--service-ms', type=float, default=100.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    sys.exit(asyncio.run(main(args)))
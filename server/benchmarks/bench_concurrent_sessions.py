@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Стресс-бенчмарк параллельных StreamAudio сессий через StreamingWorkflowIntegration
+
+Запускает N одновременных фейковых сессий через ОДИН экземпляр workflow
+(как это делает GrpcServiceManager) и проверяет, что текст и аудио одной
+сессии не протекают в другую.
+
+Запуск (из каталога server):
+    python benchmarks/bench_concurrent_sessions.py --sessions 100
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from integrations.workflow_integrations.streaming_workflow_integration import StreamingWorkflowIntegration
+from modules.text_filtering import TextFilterManager
+
+
+class FakeTextProcessor:
+    """Фейковый TextProcessor: отдаёт фрагменты ответа с маркером сессии"""
+
+    is_initialized = True
+
+    def __init__(self, sentences_per_session: int):
+        self.sentences_per_session = sentences_per_session
+
+    async def process_text_streaming(self, text: str, image_data: bytes = None, hardware_id: str = None, memory_context=None):
+        tag = text.strip()
+        for i in range(self.sentences_per_session):
+            # Дробим предложение на куски, чтобы сессии перемешивались внутри буферизации
+            yield f"Session {tag} step {i} says"
+            await asyncio.sleep(0)
+            yield f"part {i} of the answer."
+            await asyncio.sleep(0)
+
+
+class FakeAudioProcessor:
+    """Фейковый AudioProcessor: аудио чанк содержит исходный текст предложения"""
+
+    is_initialized = True
+
+    async def generate_speech_streaming(self, text: str):
+        await asyncio.sleep(0)
+        yield text.encode('utf-8')
+
+
+async def _run_session(workflow: StreamingWorkflowIntegration, tag: str) -> dict:
+    request_data = {
+        'session_id': f"bench_{tag}",
+        'hardware_id': f"hw_{tag}",
+        'text': tag,
+    }
+    texts: list[str] = []
+    audio: list[bytes] = []
+    final = None
+    async for item in workflow.process_request_streaming(request_data):
+        if not item.get('success'):
+            raise RuntimeError(item.get('error'))
+        if item.get('text_response'):
+            texts.append(item['text_response'])
+        if item.get('audio_chunk'):
+            audio.append(item['audio_chunk'])
+        if item.get('is_final'):
+            final = item
+    return {'tag': tag, 'texts': texts, 'audio': audio, 'final': final}
+
+
+def _find_leaks(result: dict) -> list[str]:
+    """Возвращает фрагменты, принадлежащие чужим сессиям"""
+    marker = f"Session {result['tag']} "
+    leaks = []
+    pieces = list(result['texts']) + [chunk.decode('utf-8') for chunk in result['audio']]
+    if result['final']:
+        pieces.append(result['final'].get('text_full_response', ''))
+    for piece in pieces:
+        for part in piece.split("Session ")[1:]:
+            if not f"Session {part}".startswith(marker):
+                leaks.append(piece)
+                break
+    return leaks
+
+
+async def main(sessions: int, sentences: int) -> int:
+    text_filter_manager = TextFilterManager()
+    await text_filter_manager.initialize()
+
+    workflow = StreamingWorkflowIntegration(
+        text_processor=FakeTextProcessor(sentences),
+        audio_processor=FakeAudioProcessor(),
+        memory_workflow=None,
+        text_filter_manager=text_filter_manager,
+    )
+    await workflow.initialize()
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(_run_session(workflow, str(i)) for i in range(sessions)))
+    elapsed = time.perf_counter() - start
+
+    leaked_sessions = 0
+    wrong_counts = 0
+    for result in results:
+        if _find_leaks(result):
+            leaked_sessions += 1
+        if result['final'] is None or result['final'].get('sentences_processed') != len(result['texts']) \
+                or len(result['texts']) != sentences:
+            wrong_counts += 1
+
+    total_segments = sum(len(r['texts']) for r in results)
+    print(f"sessions={sessions} sentences/session={sentences}")
+    print(f"elapsed={elapsed * 1000:.1f}ms segments={total_segments} ({total_segments / elapsed:.0f} seg/s)")
+    print(f"leaked_sessions={leaked_sessions} inconsistent_counters={wrong_counts}")
+
+    ok = leaked_sessions == 0 and wrong_counts == 0
+    print("✅ PASS" if ok else "❌ FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent StreamAudio sessions stress benchmark")
+    parser.add_argument('--sessions', type=int, default=100)
+    parser.add_argument('--sentences', type=int, default=5)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    sys.exit(asyncio.run(main(args.sessions, args.sentences)))
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк блокировки event loop драйвером БД
+
+100 одновременных DatabaseManager.get_user_memory на фейковом PostgreSQL
+(FakeDatabase, latency на запрос): psycopg2 провайдер (блокирующие вызовы
+внутри async def) против asyncpg провайдера. Параллельно тикер раз в 1ms
+меряет, насколько event loop не успевал - это задержка всех остальных
+gRPC потоков на время запросов к БД.
+
+Проверяется, что asyncpg провайдер возвращает ту же память, не держит loop
+и переиспользует подготовленные запросы. Для psycopg2 нужен установленный
+psycopg2 (иначе сравнение пропускается).
+
+Запуск (из каталога server):
+    python benchmarks/bench_db_loop_stall.py --calls 100 --latency-ms 2
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from modules.database import DatabaseManager
+from modules.database.providers.fake_postgres_backend import FakeAsyncpgPool, FakeDatabase, FakePsycopgPool
+
+
+def _seed(latency: float, users: int) -> FakeDatabase:
+    db = FakeDatabase(latency=latency)
+    for i in range(users):
+        db.insert('users', {
+            'hardware_id_hash': f"hw-{i}",
+            'short_term_memory': f"short memory of user {i}",
+            'long_term_memory': f"long memory of user {i}",
+            'metadata': {}
+        })
+    return db
+
+
+async def _measure(manager: DatabaseManager, calls: int) -> dict:
+    """Одновременные get_user_memory + тикер задержки loop"""
+    lags = []
+    done = False
+
+    async def ticker():
+        while not done:
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(max(0.0, time.perf_counter() - started - 0.001))
+
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(0.005)
+    started = time.perf_counter()
+    results = await asyncio.gather(*(manager.get_user_memory(f"hw-{i}") for i in range(calls)))
+    wall = time.perf_counter() - started
+    done = True
+    await tick
+
+    ordered = sorted(lags)
+    wrong = sum(
+        1 for i, memory in enumerate(results)
+        if memory != {'short': f"short memory of user {i}", 'long': f"long memory of user {i}"}
+    )
+    return {
+        'wall_ms': wall * 1000,
+        'max_stall_ms': ordered[-1] * 1000 if ordered else 0.0,
+        'p95_stall_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000 if ordered else 0.0,
+        'total_stall_ms': sum(lags) * 1000,
+        'wrong': wrong,
+    }
+
+
+def _print(name: str, res: dict):
+    print(
+        f"  {name:>8}: wall={res['wall_ms']:7.1f}ms loop stall max={res['max_stall_ms']:7.1f}ms "
+        f"p95={res['p95_stall_ms']:6.2f}ms total={res['total_stall_ms']:7.1f}ms wrong={res['wrong']}"
+    )
+
+
+async def main(args) -> int:
+    failures = []
+    latency = args.latency_ms / 1000
+    print(f"calls={args.calls} latency={args.latency_ms}ms pool={args.pool_size}")
+
+    sync_result = None
+    if importlib.util.find_spec('psycopg2') is not None:
+        db = _seed(latency, args.calls)
+        manager = DatabaseManager({'driver': 'psycopg2', 'pool': FakePsycopgPool(db)})
+        if await manager.initialize():
+            sync_result = await _measure(manager, args.calls)
+            _print('psycopg2', sync_result)
+            await manager.cleanup()
+        else:
+            failures.append("psycopg2 provider failed to initialize")
+    else:
+        print("  psycopg2: не установлен - сравнение пропущено")
+
+    db = _seed(latency, args.calls)
+    pool = FakeAsyncpgPool(db, max_size=args.pool_size, statement_cache_size=100)
+    manager = DatabaseManager({'driver': 'asyncpg', 'pool': pool, 'max_connections': args.pool_size})
+    if not await manager.initialize():
+        print("❌ asyncpg provider failed to initialize")
+        return 1
+    # Второй прогон - на прогретом кэше подготовленных запросов
+    await _measure(manager, args.calls)
+    parses_before = db.parses
+    async_result = await _measure(manager, args.calls)
+    _print('asyncpg', async_result)
+    metrics = manager.get_metrics()['postgresql_provider']
+    print(
+        f"  prepared: parses on warm run={db.parses - parses_before} pool_size={metrics['pool_size']} "
+        f"avg_query={metrics['avg_query_time_ms']:.2f}ms"
+    )
+    await manager.cleanup()
+
+    if async_result['wrong']:
+        failures.append(f"asyncpg: {async_result['wrong']} wrong memory results")
+    if async_result['max_stall_ms'] > args.max_stall_ms:
+        failures.append(f"asyncpg: loop stalled for {async_result['max_stall_ms']:.1f}ms > {args.max_stall_ms}ms")
+    if db.parses - parses_before:
+        failures.append("asyncpg: statements were re-prepared on a warm pool")
+    if sync_result is not None:
+        if sync_result['wrong']:
+            failures.append(f"psycopg2: {sync_result['wrong']} wrong memory results")
+        if async_result['max_stall_ms'] >= sync_result['max_stall_ms']:
+            failures.append("asyncpg did not reduce loop stall")
+
+    for failure in failures:
+        print(f"  ❌ {failure}")
+    print("✅ PASS" if not failures else "❌ FAIL")
+    return 0 if not failures else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Database driver event loop stall benchmark")
+    parser.add_argument('--calls', type=int, default=100)
+    parser.add_argument('--latency-ms', type=float, default=2.0)
+    parser.add_argument('--pool-size', type=int, default=10)
+    parser.add_argument('--max-stall-ms', type=float, default=10.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    sys.exit(asyncio.run(main(args)))
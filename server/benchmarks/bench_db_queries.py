@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк горячих запросов из QUERY_REGISTRY
+
+На фейковом PostgreSQL (FakeDatabase) с пользователями, у которых большой
+metadata, прогоняется цикл одного запроса: чтение памяти, создание сессии,
+команды и ответа LLM, обновление памяти, завершение сессии.
+
+Проверяется:
+- чтение памяти через user_memory_read возвращает только две колонки, а не
+  всю строку users (как SELECT * в _read_records);
+- на прогретых соединениях запросы не подготавливаются заново (parses);
+- пачки фоновой очистки (short_memory_expire_batch, session_expire_batch)
+  проходят всех пользователей и оставляют повторный проход пустым;
+- get_metrics()['queries'] содержит задержку и размер строк по каждому запросу.
+
+psycopg2 провайдер проверяется, если установлен psycopg2.
+
+Запуск (из каталога server):
+    python benchmarks/bench_db_queries.py --users 50 --metadata-kb 16
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import logging
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from modules.database.core.query_registry import QUERY_REGISTRY, row_size
+from modules.database.providers.fake_postgres_backend import FakeAsyncpgPool, FakeDatabase, FakePsycopgPool
+
+
+def _seed(users: int, metadata_kb: int) -> FakeDatabase:
+    db = FakeDatabase(latency=0.0)
+    blob = "x" * (metadata_kb * 1024)
+    for i in range(users):
+        db.insert('users', {
+            'hardware_id_hash': f"hw-{i}",
+            'short_term_memory': f"short memory of user {i}",
+            'long_term_memory': f"long memory of user {i}",
+            'metadata': {'device': f"device-{i}", 'blob': blob}
+        })
+    return db
+
+
+async def _turn(provider, i: int) -> bool:
+    """Один запрос пользователя: все горячие запросы по разу"""
+    hw = f"hw-{i}"
+    memory = await provider.get_user_memory(hw)
+    session_id = await provider.create_session(f"user-{i}", {'source': 'bench'})
+    command_id = await provider.create_command(session_id, "what is on my screen?", {'turn': i})
+    answer_id = await provider.create_llm_answer(command_id, "what is on my screen?", "a browser window",
+                                                 {'model': 'fake'}, {'latency_ms': 1})
+    updated = await provider.update_user_memory(hw, memory['short'] + "!", memory['long'])
+    ended = await provider.end_session(session_id)
+    return all([session_id, command_id, answer_id, updated, ended])
+
+
+async def _expire(provider, users: int) -> bool:
+    """Фоновая очистка пачками: вся краткосрочная память старше cutoff, потом пустой проход"""
+    cutoff = datetime.now(timezone.utc) + timedelta(seconds=1)
+    batch = max(1, users // 4)
+    expired = []
+    while True:
+        hardware_ids = await provider.expire_short_term_memory_batch(cutoff, batch)
+        expired.extend(hardware_ids)
+        if len(hardware_ids) < batch:
+            break
+    # Все сессии завершены в _turn - зависших нет
+    stale = await provider.expire_stale_sessions_batch(cutoff, batch)
+    return sorted(expired) == sorted(f"hw-{i}" for i in range(users)) and stale == 0
+
+
+async def _run(name: str, provider, db: FakeDatabase, users: int, failures: list):
+    if not await provider.initialize():
+        failures.append(f"{name}: provider failed to initialize")
+        return
+
+    full = await provider._read_records('users', {'hardware_id_hash': 'hw-0'})
+    full_bytes = row_size(full['data'][0]) if full.get('success') and full['data'] else 0
+
+    # Первый проход готовит statements на соединениях, второй - на прогретых
+    ok = all([await _turn(provider, i) for i in range(users)])
+    parses_before = db.parses
+    ok = all([await _turn(provider, i) for i in range(users)]) and ok
+    warm_parses = db.parses - parses_before
+    expired_ok = await _expire(provider, users)
+
+    queries = provider.get_metrics()['queries']
+    read = queries.get('user_memory_read', {})
+    print(f"  {name}: SELECT * row={full_bytes}B projected row={read.get('max_row_bytes', 0)}B "
+          f"parses on warm run={warm_parses}")
+    for query, stats in sorted(queries.items()):
+        print(f"    {query:>25}: calls={stats['calls']:4d} errors={stats['errors']} "
+              f"p50={stats['p50_ms']:.3f}ms p95={stats['p95_ms']:.3f}ms avg_row={stats['avg_row_bytes']:.0f}B")
+    await provider.cleanup()
+
+    if not ok:
+        failures.append(f"{name}: some hot queries failed")
+    if not expired_ok:
+        failures.append(f"{name}: expire batches did not clear every user once")
+    if warm_parses:
+        failures.append(f"{name}: {warm_parses} statements re-prepared on warm connections")
+    if not read or read['max_row_bytes'] * 10 > full_bytes:
+        failures.append(f"{name}: user_memory_read is not narrower than SELECT *")
+    missing = set(QUERY_REGISTRY) - set(queries)
+    if missing:
+        failures.append(f"{name}: no metrics for {sorted(missing)}")
+    if any(stats['errors'] for stats in queries.values()):
+        failures.append(f"{name}: query errors in metrics")
+
+
+async def main(args) -> int:
+    failures = []
+    print(f"users={args.users} metadata={args.metadata_kb}KB")
+
+    from modules.database.providers.asyncpg_provider import AsyncPostgreSQLProvider
+    db = _seed(args.users, args.metadata_kb)
+    pool = FakeAsyncpgPool(db, max_size=4, statement_cache_size=100)
+    await _run('asyncpg', AsyncPostgreSQLProvider({'pool': pool}), db, args.users, failures)
+
+    if importlib.util.find_spec('psycopg2') is not None:
+        from modules.database.providers.postgresql_provider import PostgreSQLProvider
+        db = _seed(args.users, args.metadata_kb)
+        await _run('psycopg2', PostgreSQLProvider({'pool': FakePsycopgPool(db)}), db, args.users, failures)
+    else:
+        print("  psycopg2: не установлен - проверка пропущена")
+
+    for failure in failures:
+        print(f"  ❌ {failure}")
+    print("✅ PASS" if not failures else "❌ FAIL")
+    return 0 if not failures else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prepared hot query registry benchmark")
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--metadata-kb', type=int, default=16)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    sys.exit(asyncio.run(main(args)))
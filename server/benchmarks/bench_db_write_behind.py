@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк write-behind записи журнальных таблиц
+
+N строк (команда + ответ LLM + метрика на каждый запрос) пишутся через
+DatabaseManager на фейковом PostgreSQL (FakeDatabase, latency на round-trip):
+- per-row: write_behind_enabled=False, отдельный INSERT на строку;
+- batched: WriteBehindQueue, COPY (asyncpg) / многострочный INSERT (psycopg2).
+Пропускная способность - строки/сек до момента, когда все строки в БД.
+
+Дополнительно проверяется недоступность БД: строки уходят в spill файл и
+после восстановления дописываются ровно один раз; cleanup() сбрасывает остаток.
+
+Запуск (из каталога server):
+    python benchmarks/bench_db_write_behind.py --requests 2000 --latency-ms 1
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from modules.database import DatabaseManager
+from modules.database.providers.asyncpg_provider import AsyncPostgreSQLProvider
+from modules.database.providers.fake_postgres_backend import FakeAsyncpgPool, FakeDatabase, FakePsycopgPool
+
+TABLES = ('commands', 'llm_answers', 'performance_metrics')
+
+
+def _pool(driver: str, db: FakeDatabase):
+    if driver == 'asyncpg':
+        # init как у asyncpg.create_pool: COPY идёт через те же кодеки json/jsonb
+        return FakeAsyncpgPool(db, max_size=10, statement_cache_size=100,
+                               init=AsyncPostgreSQLProvider._init_connection)
+    return FakePsycopgPool(db)
+
+
+def _rows(db: FakeDatabase) -> int:
+    return sum(len(db.tables.get(table, [])) for table in TABLES)
+
+
+async def _ingest(manager: DatabaseManager, requests: int, concurrency: int):
+    """Журнал requests запросов от concurrency одновременных клиентов"""
+    async def client(offset: int):
+        for i in range(offset, requests, concurrency):
+            command_id = await manager.create_command("session-1", f"prompt {i}", {'i': i})
+            await manager.create_llm_answer(command_id, f"prompt {i}", f"answer {i}", {'model': 'fake'}, {'ms': i})
+            await manager.create_performance_metric("session-1", "latency", {'ms': i})
+
+    await asyncio.gather(*(client(offset) for offset in range(concurrency)))
+
+
+async def _throughput(driver: str, write_behind: bool, args, spill_path: str) -> dict:
+    db = FakeDatabase(latency=args.latency_ms / 1000)
+    manager = DatabaseManager({
+        'driver': driver,
+        'pool': _pool(driver, db),
+        'write_behind_enabled': write_behind,
+        'write_behind_batch_size': args.batch_size,
+        'write_behind_spill_path': spill_path,
+    })
+    if not await manager.initialize():
+        raise RuntimeError(f"{driver}: manager failed to initialize")
+
+    started = time.perf_counter()
+    await _ingest(manager, args.requests, args.concurrency)
+    enqueued = time.perf_counter() - started
+    await manager.flush_pending_writes()
+    total = time.perf_counter() - started
+    await manager.cleanup()
+
+    rows = _rows(db)
+    return {
+        'rows': rows,
+        'rows_per_sec': rows / total if total else 0.0,
+        'enqueue_ms': enqueued * 1000,
+        'total_ms': total * 1000,
+        'round_trips': db.queries,
+    }
+
+
+async def _outage(driver: str, args, spill_path: str, failures: list):
+    """Недоступная БД -> spill -> восстановление -> каждая строка ровно один раз"""
+    db = FakeDatabase(latency=0.0)
+    manager = DatabaseManager({
+        'driver': driver,
+        'pool': _pool(driver, db),
+        'write_behind_batch_size': args.batch_size,
+        'write_behind_spill_path': spill_path,
+    })
+    if not await manager.initialize():
+        failures.append(f"{driver}: manager failed to initialize (outage)")
+        return
+
+    db.available = False
+    await _ingest(manager, 100, 4)
+    await manager.flush_pending_writes()
+    spilled = manager.get_metrics()['write_behind']['spilled']
+    db.available = True
+
+    await _ingest(manager, 50, 2)
+    await manager.flush_pending_writes()
+    await _ingest(manager, 10, 1)
+    await manager.cleanup()  # остаток - при остановке
+
+    ids = [row['id'] for table in TABLES for row in db.tables.get(table, [])]
+    print(f"  {driver:>8} outage: spilled={spilled} rows in db={len(ids)} unique={len(set(ids))} "
+          f"spill file left={os.path.exists(spill_path)}")
+    if spilled != 300:
+        failures.append(f"{driver}: expected 300 spilled rows, got {spilled}")
+    if len(ids) != 480 or len(set(ids)) != len(ids):
+        failures.append(f"{driver}: expected 480 unique rows after recovery, got {len(ids)} ({len(set(ids))} unique)")
+    if os.path.exists(spill_path):
+        failures.append(f"{driver}: spill file was not drained")
+
+
+async def main(args) -> int:
+    failures = []
+    drivers = ['asyncpg']
+    if importlib.util.find_spec('psycopg2') is not None:
+        drivers.append('psycopg2')
+    else:
+        print("psycopg2: не установлен - проверяется только asyncpg")
+    print(f"requests={args.requests} (x3 rows) concurrency={args.concurrency} "
+          f"latency={args.latency_ms}ms batch={args.batch_size}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for driver in drivers:
+            spill_path = os.path.join(tmp, f"{driver}_spill.jsonl")
+            per_row = await _throughput(driver, False, args, spill_path)
+            batched = await _throughput(driver, True, args, spill_path)
+            speedup = batched['rows_per_sec'] / per_row['rows_per_sec'] if per_row['rows_per_sec'] else 0.0
+            for name, res in (('per-row', per_row), ('batched', batched)):
+                print(f"  {driver:>8} {name}: {res['rows_per_sec']:9.0f} rows/s rows={res['rows']} "
+                      f"total={res['total_ms']:7.1f}ms enqueue={res['enqueue_ms']:7.1f}ms "
+                      f"round-trips={res['round_trips']}")
+            print(f"  {driver:>8} speedup: x{speedup:.1f}")
+
+            expected = args.requests * 3
+            if per_row['rows'] != expected or batched['rows'] != expected:
+                failures.append(f"{driver}: expected {expected} rows, got {per_row['rows']}/{batched['rows']}")
+            if speedup < args.min_speedup:
+                failures.append(f"{driver}: batched speedup x{speedup:.1f} < x{args.min_speedup}")
+
+            await _outage(driver, args, spill_path, failures)
+
+    for failure in failures:
+        print(f"  ❌ {failure}")
+    print("✅ PASS" if not failures else "❌ FAIL")
+    return 0 if not failures else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write-behind batching throughput benchmark")
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--latency-ms', type=float, default=1.0)
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--min-speedup', type=float, default=5.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    sys.exit(asyncio.run(main(args)))
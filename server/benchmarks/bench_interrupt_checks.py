@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк проверки прерывания на каждый отдаваемый элемент потока
+
+N одновременных потоков (100 и 1000) отдают элементы через
+InterruptWorkflowIntegration.process_with_interrupts; в карте эпох столько же
+hardware_id. Печатается стоимость проверки на элемент:
+- legacy: await check_interrupts(hardware_id) на каждый элемент (как раньше)
+- epoch: сравнение с эпохой, запомненной на старте потока
+
+Офлайн проверки:
+- прерывания разных пользователей не затеняют друг друга
+- поток, начатый после прерывания, им не прерывается
+- TTL GC удерживает карту эпох ограниченной
+
+Запуск (из каталога server):
+    python benchmarks/bench_interrupt_checks.py --chunks 200
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from integrations.workflow_integrations.interrupt_workflow_integration import InterruptException, InterruptWorkflowIntegration
+from modules.interrupt_handling.core.interrupt_manager import InterruptManager
+
+
+async def _source(chunks: int):
+    for i in range(chunks):
+        if i % 16 == 0:
+            await asyncio.sleep(0)  # переключение между потоками, как при отправке клиенту
+        yield i
+
+
+async def _bare(hardware_id: str, chunks: int):
+    async for _ in _source(chunks):
+        pass
+
+
+async def _legacy_wrapper(integration: InterruptWorkflowIntegration, hardware_id: str, chunks: int):
+    """Прежний process_with_interrupts: await check_interrupts перед каждым yield"""
+    async for item in _source(chunks):
+        if await integration.check_interrupts(hardware_id):
+            raise InterruptException(hardware_id)
+        yield item
+
+
+async def _legacy(integration: InterruptWorkflowIntegration, hardware_id: str, chunks: int):
+    async for _ in _legacy_wrapper(integration, hardware_id, chunks):
+        pass
+
+
+async def _epoch(integration: InterruptWorkflowIntegration, hardware_id: str, chunks: int):
+    async for _ in integration.process_with_interrupts(lambda: _source(chunks), hardware_id):
+        pass
+
+
+async def _timed(factory, sessions: int, rounds: int) -> float:
+    best = float('inf')
+    for _ in range(rounds):
+        started = time.perf_counter()
+        await asyncio.gather(*(factory(f"hw-{i}") for i in range(sessions)))
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+async def _bench(args, sessions: int) -> dict:
+    manager = InterruptManager()
+    await manager.initialize()
+    integration = InterruptWorkflowIntegration(interrupt_manager=manager)
+    await integration.initialize()
+
+    # Карта эпох заполнена давними прерываниями других пользователей
+    for i in range(sessions):
+        await manager._set_global_interrupt_flags(f"old-{i}")
+    manager.interrupted_at.update({hw: 0.0 for hw in manager.interrupted_at})
+
+    total = sessions * args.chunks
+    bare = await _timed(lambda hw: _bare(hw, args.chunks), sessions, args.rounds)
+    legacy = await _timed(lambda hw: _legacy(integration, hw, args.chunks), sessions, args.rounds)
+    epoch = await _timed(lambda hw: _epoch(integration, hw, args.chunks), sessions, args.rounds)
+
+    started = time.perf_counter()
+    for _ in range(total):
+        manager.is_interrupted("hw-1", 0)
+    raw_check = time.perf_counter() - started
+
+    return {
+        'legacy_ns': max(0.0, legacy - bare) / total * 1e9,
+        'epoch_ns': max(0.0, epoch - bare) / total * 1e9,
+        'raw_check_ns': raw_check / total * 1e9,
+        'tracked': len(manager.interrupt_epochs),
+    }
+
+
+async def _isolation(failures: list):
+    manager = InterruptManager()
+    await manager.initialize()
+    integration = InterruptWorkflowIntegration(interrupt_manager=manager)
+    await integration.initialize()
+    stopped = {}
+
+    async def stream(hardware_id: str):
+        async def source():
+            while True:
+                await asyncio.sleep(0.001)
+                yield b"x"
+        try:
+            async for _ in integration.process_with_interrupts(source, hardware_id):
+                pass
+        except InterruptException:
+            stopped[hardware_id] = True
+
+    tasks = {hw: asyncio.create_task(stream(hw)) for hw in ("A", "B", "C")}
+    await asyncio.sleep(0.01)
+    # Раньше второе прерывание перезаписывало interrupt_hardware_id и A продолжал работать
+    await manager._set_global_interrupt_flags("A")
+    await manager._set_global_interrupt_flags("B")
+    await asyncio.sleep(0.02)
+    if set(stopped) != {"A", "B"}:
+        failures.append(f"isolation: stopped={sorted(stopped)}, expected A and B")
+    tasks["C"].cancel()
+    await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+    epoch = manager.interrupt_epoch("A")
+    if manager.is_interrupted("A", epoch):
+        failures.append("isolation: stream started after the interrupt sees it")
+    print(f"isolation: interrupted A,B → stopped {sorted(stopped)}, C kept streaming")
+
+
+async def _gc(failures: list, entries: int):
+    manager = InterruptManager()
+    await manager.initialize()
+    manager.interrupt_epoch_ttl = 0.05
+    for i in range(entries):
+        await manager._set_global_interrupt_flags(f"hw-{i}")
+    before = len(manager.interrupt_epochs)
+    captured = manager.interrupt_epoch("hw-0")
+    await asyncio.sleep(0.06)
+    await manager._set_global_interrupt_flags("fresh")
+    after = len(manager.interrupt_epochs)
+    print(f"gc: tracked {before} → {after} after ttl")
+    if after != 1:
+        failures.append(f"gc: {after} epochs left after ttl, expected 1")
+    if manager.is_interrupted("hw-0", captured):
+        failures.append("gc: evicted epoch caused a false interrupt")
+
+
+async def main(args) -> int:
+    failures = []
+    print(f"chunks per session={args.chunks} rounds={args.rounds}")
+    raw = []
+    for sessions in args.sessions:
+        res = await _bench(args, sessions)
+        raw.append(res['raw_check_ns'])
+        print(
+            f"  sessions={sessions:5d}: legacy={res['legacy_ns']:7.1f}ns/chunk epoch={res['epoch_ns']:7.1f}ns/chunk "
+            f"raw is_interrupted={res['raw_check_ns']:5.1f}ns tracked={res['tracked']}"
+        )
+    # O(1): стоимость проверки не растёт с числом сессий (с запасом на шум)
+    if max(raw) > 3 * min(raw):
+        failures.append(f"is_interrupted cost grows with sessions: {', '.join(f'{ns:.0f}ns' for ns in raw)}")
+    await _isolation(failures)
+    await _gc(failures, 1000)
+
+    for failure in failures:
+        print(f"  ❌ {failure}")
+    print("✅ PASS" if not failures else "❌ FAIL")
+    return 0 if not failures else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-chunk interrupt check benchmark")
+    parser.add_argument('--sessions', type=int, nargs='+', default=[100, 1000])
+    parser.add_argument('--chunks', type=int, default=200)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    sys.exit(asyncio.run(main(args)))
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Стенд задержки прерывания: InterruptSession → последний байт клиенту
+
+Полный конвейер на фейках: GeminiLiveProvider (FakeLiveClient, пул сессий)
+→ StreamingWorkflowIntegration → SynthesizerPool (StubSynthesizer).
+Обработчик запроса повторяет StreamAudio: открывает cancel scope в
+InterruptManager и отдаёт элементы «клиенту». Посреди ответа вызывается
+interrupt_session и измеряется:
+
+- last_byte: сколько после InterruptSession клиенту ещё уходили данные
+- stream_end: когда обработчик запроса завершился
+- tts_busy: сколько после прерывания синтезатор ещё был занят
+
+Прерывание приходит в случайный момент, в том числе пока Live ещё «думает»
+над первым токеном. Для сравнения тот же сценарий прогоняется со старым
+путём - только флагом, который InterruptWorkflowIntegration проверяет между
+элементами (пока элементов нет, запрос продолжает работать).
+
+Запуск (из каталога server):
+    python benchmarks/bench_interrupt_latency.py --trials 20 --target-ms 50
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from integrations.workflow_integrations.interrupt_workflow_integration import InterruptException, InterruptWorkflowIntegration
+from integrations.workflow_integrations.streaming_workflow_integration import StreamingWorkflowIntegration
+from modules.audio_generation.providers.synthesizer_pool import StubSynthesizer, SynthesizerPool
+from modules.interrupt_handling.core.interrupt_manager import InterruptManager
+from modules.text_processing.providers.fake_live_backend import FakeLiveClient
+from modules.text_processing.providers.gemini_live_provider import GeminiLiveProvider
+
+RESPONSE = [f"This is sentence number {i} of a fairly long spoken answer. " for i in range(40)]
+
+
+class LiveTextProcessor:
+    """TextProcessor поверх GeminiLiveProvider"""
+
+    is_initialized = True
+
+    def __init__(self, provider: GeminiLiveProvider):
+        self.provider = provider
+
+    async def process_text_streaming(self, text: str, image_data: bytes = None, hardware_id: str = None, memory_context=None):
+        async for chunk in self.provider.process(text):
+            yield chunk
+
+
+class PoolAudioProcessor:
+    """AudioProcessor поверх SynthesizerPool.stream_text"""
+
+    is_initialized = True
+
+    def __init__(self, pool: SynthesizerPool):
+        self.pool = pool
+
+    async def generate_speech_streaming(self, text: str):
+        async for piece in self.pool.stream_text(text):
+            yield piece
+
+
+class Probe:
+    """Отметки времени одного запроса"""
+
+    def __init__(self):
+        self.last_sent = 0.0
+        self.ended = 0.0
+        self.items = 0
+
+
+async def _stream_with_scope(workflow, manager: InterruptManager, hardware_id: str, probe: Probe):
+    """Как StreamAudio: cancel scope + штатное завершение при отмене от InterruptSession"""
+    scope = manager.open_cancel_scope(hardware_id, "bench")
+    token = scope.activate()
+    try:
+        async for _ in workflow.process_request_streaming({'session_id': 'bench', 'hardware_id': hardware_id, 'text': 'q'}):
+            await asyncio.sleep(0)  # отправка клиенту
+            probe.last_sent = time.perf_counter()
+            probe.items += 1
+    except asyncio.CancelledError:
+        if not scope.cancelled:
+            raise
+        asyncio.current_task().uncancel()
+    finally:
+        manager.close_cancel_scope(scope)
+        scope.deactivate(token)
+        probe.ended = time.perf_counter()
+
+
+async def _stream_flag_only(workflow, interrupt_workflow, hardware_id: str, probe: Probe):
+    """Старый путь: флаг прерывания проверяется только между элементами"""
+    async def _work():
+        async for item in workflow.process_request_streaming({'session_id': 'bench', 'hardware_id': hardware_id, 'text': 'q'}):
+            yield item
+    try:
+        async for _ in interrupt_workflow.process_with_interrupts(_work, hardware_id, 'bench'):
+            await asyncio.sleep(0)
+            probe.last_sent = time.perf_counter()
+            probe.items += 1
+    except InterruptException:
+        pass
+    finally:
+        probe.ended = time.perf_counter()
+
+
+async def _wait_idle(pool: SynthesizerPool, started: float, limit: float = 5.0) -> float:
+    """Через сколько после started синтезатор освободился"""
+    while pool._active_jobs and time.perf_counter() - started < limit:
+        await asyncio.sleep(0.001)
+    return time.perf_counter() - started
+
+
+async def _run(args, mode: str) -> dict:
+    client = FakeLiveClient(
+        connect_delay=0.05, first_token_delay=args.first_token_ms / 1000,
+        token_delay=args.token_ms / 1000, response_pieces=RESPONSE
+    )
+    provider = GeminiLiveProvider({
+        'model': 'fake-live', 'system_prompt': 'bench', 'tools': [], 'live_client': client,
+        'pool_enabled': True, 'pool_min_size': 1, 'pool_max_size': 2, 'pool_health_interval': 0,
+    })
+    assert await provider.initialize()
+    stub = {'synthesis_delay': 0.03, 'per_char_delay': args.per_char_ms / 1000, 'chunk_ms': 20.0}
+    pool = SynthesizerPool(lambda: StubSynthesizer(**stub), size=2, name="bench")
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, pool.start)
+
+    manager = InterruptManager()
+    await manager.initialize()
+    interrupt_workflow = InterruptWorkflowIntegration(interrupt_manager=manager)
+    await interrupt_workflow.initialize()
+    workflow = StreamingWorkflowIntegration(text_processor=LiveTextProcessor(provider), audio_processor=PoolAudioProcessor(pool))
+    await workflow.initialize()
+
+    last_byte, stream_end, tts_busy, items = [], [], [], []
+    rng = random.Random(7)
+    try:
+        for trial in range(args.trials):
+            hardware_id = f"hw-{trial}"
+            probe = Probe()
+            if mode == "cancel":
+                task = asyncio.create_task(_stream_with_scope(workflow, manager, hardware_id, probe))
+            else:
+                task = asyncio.create_task(_stream_flag_only(workflow, interrupt_workflow, hardware_id, probe))
+            await asyncio.sleep(rng.uniform(args.min_delay_ms, args.max_delay_ms) / 1000)
+
+            started = time.perf_counter()
+            await manager.interrupt_session(hardware_id)
+            await task
+            busy = await _wait_idle(pool, started)
+
+            last_byte.append(max(0.0, probe.last_sent - started))
+            stream_end.append(probe.ended - started)
+            tts_busy.append(busy)
+            items.append(probe.items)
+            # Сборка брошенных генераторов старого пути, чтобы они не мешали следующему прогону
+            await asyncio.sleep(0.05)
+    finally:
+        open_sessions = sum(1 for session in client.open_sessions if session._ws.closed)
+        await provider.cleanup()
+        await loop.run_in_executor(None, pool.shutdown)
+
+    def p(values, q):
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000
+
+    return {
+        'last_byte_p50': p(last_byte, 0.5), 'last_byte_p95': p(last_byte, 0.95),
+        'stream_end_p50': p(stream_end, 0.5), 'stream_end_p95': p(stream_end, 0.95),
+        'tts_busy_p95': p(tts_busy, 0.95),
+        'items_before': sum(items) / len(items),
+        'aborted': pool.aborted,
+        'live_aborted': provider.aborted_turns,
+        'closed_but_open': open_sessions,
+    }
+
+
+async def main(args) -> int:
+    print(
+        f"trials={args.trials} interrupt after {args.min_delay_ms:.0f}-{args.max_delay_ms:.0f}ms "
+        f"token={args.token_ms}ms per_char={args.per_char_ms}ms target={args.target_ms}ms"
+    )
+    results = {}
+    for mode in ("flag", "cancel"):
+        res = results[mode] = await _run(args, mode)
+        print(
+            f"  {mode:>6}: last_byte p50={res['last_byte_p50']:6.1f}ms p95={res['last_byte_p95']:6.1f}ms "
+            f"stream_end p95={res['stream_end_p95']:6.1f}ms tts_busy p95={res['tts_busy_p95']:6.1f}ms "
+            f"synth_aborted={res['aborted']} live_aborted={res['live_aborted']} items_before={res['items_before']:.1f}"
+        )
+
+    cancel = results["cancel"]
+    failures = []
+    if cancel['stream_end_p95'] > args.target_ms:
+        failures.append(f"stream_end p95 {cancel['stream_end_p95']:.1f}ms > {args.target_ms}ms")
+    if cancel['tts_busy_p95'] > args.target_ms:
+        failures.append(f"synthesizer busy p95 {cancel['tts_busy_p95']:.1f}ms > {args.target_ms}ms")
+    if cancel['live_aborted'] < args.trials:
+        failures.append(f"only {cancel['live_aborted']}/{args.trials} Live turns were aborted by interrupt")
+    if cancel['items_before'] == 0:
+        failures.append("interrupt fired before any data was streamed - increase --min-delay-ms")
+
+    for failure in failures:
+        print(f"  ❌ {failure}")
+    print("✅ PASS" if not failures else "❌ FAIL")
+    return 0 if not failures else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="InterruptSession → last byte latency harness")
+    parser.add_argument('--trials', type=int, default=20)
+    parser.add_argument('--min-delay-ms', type=float, default=20.0)
+    parser.add_argument('--max-delay-ms', type=float, default=700.0)
+    parser.add_argument('--first-token-ms', type=float, default=300.0)
+    parser.add_argument('--token-ms', type=float, default=40.0)
+    parser.add_argument('--per-char-ms', type=float, default=8.0)
+    parser.add_argument('--target-ms', type=float, default=50.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    sys.exit(asyncio.run(main(args)))
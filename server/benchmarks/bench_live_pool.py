@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк и офлайн проверка пула Live сессий GeminiLiveProvider (на FakeLiveClient)
+
+- time-to-first-token: новое соединение на запрос vs тёплый пул
+- параллельные запросы больше max_size (ожидание свободной сессии)
+- сессия, упавшая посреди хода, выбрасывается, следующий запрос успешен
+- разорванные свободные сессии отсеиваются health probe и пополняются
+- при max_turns=1 ни одна сессия не обслуживает больше одного хода
+
+Запуск (из каталога server):
+    python benchmarks/bench_live_pool.py --requests 20 --connect-ms 150
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from modules.text_processing.providers.gemini_live_provider import GeminiLiveProvider
+from modules.text_processing.providers.fake_live_backend import FakeLiveClient
+
+
+def _provider(client: FakeLiveClient, pool_enabled: bool, **pool) -> GeminiLiveProvider:
+    config = {
+        'model': 'fake-live',
+        'system_prompt': 'You are a test assistant.',
+        'tools': [],
+        'live_client': client,
+        'pool_enabled': pool_enabled,
+        'pool_min_size': pool.get('min_size', 2),
+        'pool_max_size': pool.get('max_size', 4),
+        'pool_max_turns': pool.get('max_turns', 1),
+        'pool_acquire_timeout': pool.get('acquire_timeout', 5.0),
+        'pool_health_interval': pool.get('health_interval', 30.0),
+    }
+    return GeminiLiveProvider(config)
+
+
+async def _one(provider: GeminiLiveProvider, text: str = "hi") -> float:
+    """Возвращает time-to-first-token (сек)"""
+    start = time.perf_counter()
+    first = None
+    async for _ in provider.process(text):
+        if first is None:
+            first = time.perf_counter() - start
+    return first if first is not None else time.perf_counter() - start
+
+
+def _p50(values: list) -> float:
+    ordered = sorted(values)
+    return ordered[len(ordered) // 2] * 1000 if ordered else 0.0
+
+
+async def _sequential(args, pool_enabled: bool) -> dict:
+    client = FakeLiveClient(connect_delay=args.connect_ms / 1000, first_token_delay=args.first_token_ms / 1000)
+    provider = _provider(client, pool_enabled)
+    assert await provider.initialize()
+    ttft = []
+    for _ in range(args.requests):
+        ttft.append(await _one(provider))
+        # Пауза между командами пользователя - пул успевает пополниться
+        await asyncio.sleep(args.gap_ms / 1000)
+    await provider.cleanup()
+    return {'p50_ttft_ms': _p50(ttft), 'connects': client.connects}
+
+
+async def _checks(args) -> list:
+    failures = []
+    client = FakeLiveClient(connect_delay=args.connect_ms / 1000, first_token_delay=args.first_token_ms / 1000)
+    provider = _provider(client, True, min_size=2, max_size=4, health_interval=0.05)
+    assert await provider.initialize()
+    pool = provider.session_pool
+
+    # Параллельно больше max_size: все завершаются, лишние ждут свободную сессию
+    results = await asyncio.gather(*(_one(provider) for _ in range(10)), return_exceptions=True)
+    errors = [r for r in results if isinstance(r, Exception)]
+    if errors:
+        failures.append(f"concurrent: {len(errors)} errors ({errors[0]})")
+    if pool.get_metrics()['total'] > pool.max_size:
+        failures.append("concurrent: pool exceeded max_size")
+
+    # Ошибка посреди хода: сессия выбрасывается, следующий запрос успешен
+    discarded_before = pool.discarded
+    client.fail_next_turns = 1
+    try:
+        await _one(provider)
+        failures.append("mid-turn failure: error was not raised")
+    except ConnectionError:
+        pass
+    if pool.discarded != discarded_before + 1:
+        failures.append("mid-turn failure: session was not discarded")
+    try:
+        await _one(provider)
+    except Exception as e:
+        failures.append(f"after failure: request failed ({e})")
+
+    # Разрыв свободных сессий: health probe отсеивает, пул пополняется
+    await asyncio.sleep(0.2)
+    probe_failures_before = pool.probe_failures
+    client.drop_open_sessions()
+    await asyncio.sleep(0.3)
+    if pool.probe_failures <= probe_failures_before:
+        failures.append("health probe: dropped sessions were not detected")
+    if pool.get_metrics()['idle'] < pool.min_size:
+        failures.append("health probe: pool was not refilled")
+    try:
+        await _one(provider)
+    except Exception as e:
+        failures.append(f"after probe: request failed ({e})")
+
+    # Чистый контекст: max_turns=1
+    await provider.cleanup()
+    await asyncio.sleep(0.05)
+    if client.open_sessions:
+        failures.append(f"cleanup: {len(client.open_sessions)} sessions left open")
+
+    metrics = pool.get_metrics()
+    print(
+        f"checks: opened={metrics['opened']} hits={metrics['hits']} misses={metrics['misses']} "
+        f"discarded={metrics['discarded']} retired={metrics['retired']} probe_failures={metrics['probe_failures']}"
+    )
+    return failures
+
+
+async def main(args) -> int:
+    direct = await _sequential(args, pool_enabled=False)
+    pooled = await _sequential(args, pool_enabled=True)
+
+    print(f"requests={args.requests} connect={args.connect_ms}ms first_token={args.first_token_ms}ms")
+    print(f"  direct: p50 ttft={direct['p50_ttft_ms']:7.1f}ms connects={direct['connects']}")
+    print(f"  pooled: p50 ttft={pooled['p50_ttft_ms']:7.1f}ms connects={pooled['connects']}")
+
+    failures = await _checks(args)
+    for failure in failures:
+        print(f"  ❌ {failure}")
+    ok = not failures and pooled['p50_ttft_ms'] < direct['p50_ttft_ms']
+    print("✅ PASS" if ok else "❌ FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gemini Live session pool benchmark (offline)")
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--connect-ms', type=float, default=150.0)
+    parser.add_argument('--first-token-ms', type=float, default=50.0)
+    parser.add_argument('--gap-ms', type=float, default=200.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    sys.exit(asyncio.run(main(args)))
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк фонового обслуживания БД пачками
+
+Фейковый PostgreSQL (FakeDatabase, asyncpg провайдер): устаревшая
+краткосрочная память и зависшие активные сессии вперемешку со свежими.
+MaintenanceScheduler вычищает их проходами по batch_size строк:
+- ни один UPDATE не затрагивает больше batch_size строк (короткие блокировки);
+- проход ограничен max_batches, остаток дочищает следующий проход;
+- свежие записи не трогаются;
+- очищенные пользователи вычищаются из кэша памяти MemoryManager;
+- время прохода, строки и lag попадают в recorder (мониторинг).
+
+Запуск (из каталога server):
+    python benchmarks/bench_maintenance_batches.py --users 2000 --sessions 1500 --batch-size 200
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from modules.database import DatabaseManager
+from modules.database.providers.fake_postgres_backend import FakeAsyncpgPool, FakeDatabase
+from modules.grpc_service.core.maintenance_scheduler import MaintenanceJob, MaintenanceScheduler
+from modules.memory_management import MemoryManager
+
+
+class RecordingDatabase(FakeDatabase):
+    """FakeDatabase, запоминающий число строк каждого UPDATE обслуживания"""
+
+    def __init__(self, latency: float):
+        super().__init__(latency=latency)
+        self.batch_rows = {'users': [], 'sessions': []}
+
+    def _execute(self, sql, args):
+        rows, status = super()._execute(sql, args)
+        if sql.startswith("UPDATE users SET short_term_memory = NULL"):
+            self.batch_rows['users'].append(len(rows))
+        elif sql.startswith("UPDATE sessions SET status"):
+            self.batch_rows['sessions'].append(len(rows))
+        return rows, status
+
+
+def _seed(db: FakeDatabase, users: int, sessions: int):
+    now = datetime.now(timezone.utc)
+    old, fresh = now - timedelta(hours=48), now - timedelta(minutes=5)
+    for i in range(users):
+        db.insert('users', {
+            'hardware_id_hash': f"hw-{i}",
+            'short_term_memory': f"short memory {i}",
+            'long_term_memory': f"long memory {i}",
+            # Каждый четвёртый пользователь - свежий
+            'memory_updated_at': fresh if i % 4 == 0 else old,
+            'metadata': {}
+        })
+    for i in range(sessions):
+        db.insert('sessions', {
+            'user_id': f"user-{i}",
+            'status': 'active',
+            'start_time': fresh if i % 3 == 0 else old,
+            'metadata': {}
+        })
+
+
+async def main(args) -> int:
+    failures = []
+    db = RecordingDatabase(latency=args.latency_ms / 1000)
+    _seed(db, args.users, args.sessions)
+    expired_users = sum(1 for i in range(args.users) if i % 4)
+    expired_sessions = sum(1 for i in range(args.sessions) if i % 3)
+    print(f"users={args.users} (expired {expired_users}) sessions={args.sessions} (stale {expired_sessions}) "
+          f"batch_size={args.batch_size} max_batches={args.max_batches}")
+
+    manager = DatabaseManager({'driver': 'asyncpg', 'pool': FakeAsyncpgPool(db, max_size=4)})
+    if not await manager.initialize():
+        print("❌ asyncpg provider failed to initialize")
+        return 1
+    memory_manager = MemoryManager(db_manager=manager)
+
+    # Прогреваем кэш памяти для части устаревших пользователей
+    cached = [f"hw-{i}" for i in range(1, args.users, 4)][:100]
+    for hardware_id in cached:
+        await memory_manager.get_user_memory(hardware_id)
+
+    recorded = []
+
+    def recorder(job, runtime, rows, lag, error=False):
+        recorded.append((job, runtime, rows, lag, error))
+
+    options = {'batch_size': args.batch_size, 'max_batches': args.max_batches, 'batch_pause': 0.001, 'jitter': 0.1}
+    scheduler = MaintenanceScheduler([
+        MaintenanceJob('expired_short_term_memory', lambda limit: memory_manager.expire_memory_batch(limit, 24),
+                       interval=args.interval, **options),
+        MaintenanceJob('expired_sessions', lambda limit: manager.expire_stale_sessions_batch(24, limit),
+                       interval=args.interval, **options),
+    ], recorder=recorder)
+
+    # Первый проход вручную: ограничен max_batches
+    first = await scheduler.run_now('expired_short_term_memory')
+    print(f"  run_now memory: rows={first['rows']} batches={first['batches']} runtime={first['runtime'] * 1000:.1f}ms")
+    if first['batches'] > args.max_batches:
+        failures.append(f"run_now made {first['batches']} batches > max_batches {args.max_batches}")
+
+    # Остальное - по расписанию
+    started = time.perf_counter()
+    scheduler.start()
+    deadline = started + args.timeout
+    while time.perf_counter() < deadline:
+        users_left = sum(1 for row in db.tables['users'] if row.get('short_term_memory') and row['memory_updated_at'] < datetime.now(timezone.utc) - timedelta(hours=24))
+        sessions_left = sum(1 for row in db.tables['sessions'] if row['status'] == 'active' and row['start_time'] < datetime.now(timezone.utc) - timedelta(hours=24))
+        if not users_left and not sessions_left:
+            break
+        await asyncio.sleep(0.01)
+    await scheduler.stop()
+    elapsed = time.perf_counter() - started
+
+    users_cleared = sum(1 for row in db.tables['users'] if row.get('short_term_memory') is None)
+    fresh_touched = sum(1 for i, row in enumerate(db.tables['users']) if i % 4 == 0 and row.get('short_term_memory') is None)
+    sessions_closed = sum(1 for row in db.tables['sessions'] if row['status'] == 'expired')
+    fresh_sessions_closed = sum(1 for i, row in enumerate(db.tables['sessions']) if i % 3 == 0 and row['status'] != 'active')
+    still_cached = sum(1 for hardware_id in cached if memory_manager.context_cache.peek(hardware_id) is not None)
+    max_rows = max(db.batch_rows['users'] + db.batch_rows['sessions'] or [0])
+
+    status = scheduler.get_status()['jobs']
+    for name, job in status.items():
+        print(f"  {name:>26}: runs={job['runs']} rows={job['rows']} batches={job['batches']} "
+              f"runtime p95={job['runtime_ms']['p95_ms']}ms lag max={job['lag_ms']['max_ms']:.1f}ms errors={job['errors']}")
+    print(f"  cleared users={users_cleared}/{expired_users} closed sessions={sessions_closed}/{expired_sessions} "
+          f"in {elapsed * 1000:.0f}ms, max rows per UPDATE={max_rows}, recorded passes={len(recorded)}")
+    print(f"  cache entries left for cleared users={still_cached}/{len(cached)}")
+
+    if users_cleared != expired_users or fresh_touched:
+        failures.append(f"memory: cleared {users_cleared}/{expired_users}, fresh touched {fresh_touched}")
+    if sessions_closed != expired_sessions or fresh_sessions_closed:
+        failures.append(f"sessions: closed {sessions_closed}/{expired_sessions}, fresh touched {fresh_sessions_closed}")
+    if max_rows > args.batch_size:
+        failures.append(f"UPDATE touched {max_rows} rows > batch_size {args.batch_size}")
+    if still_cached:
+        failures.append(f"{still_cached} cleared users still cached")
+    if not recorded or any(error for *_, error in recorded):
+        failures.append("maintenance passes not recorded or failed")
+    if {job for job, *_ in recorded} != set(scheduler.jobs):
+        failures.append("not every job was recorded")
+    if scheduler.is_running:
+        failures.append("scheduler still running after stop()")
+
+    await memory_manager.cleanup()
+    await manager.cleanup()
+
+    for failure in failures:
+        print(f"  ❌ {failure}")
+    print("✅ PASS" if not failures else "❌ FAIL")
+    return 0 if not failures else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintenance scheduler batch cleanup benchmark")
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--sessions', type=int, default=1500)
+    parser.add_argument('--batch-size', type=int, default=200)
+    parser.add_argument('--max-batches', type=int, default=3)
+    parser.add_argument('--interval', type=float, default=0.05)
+    parser.add_argument('--latency-ms', type=float, default=1.0)
+    parser.add_argument('--timeout', type=float, default=10.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    sys.exit(asyncio.run(main(args)))
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк очереди фонового анализа памяти
+
+users пользователей отправляют пачки из burst команд с паузой think-ms между
+ними; после каждой команды MemoryManager.update_memory_background ставит ход
+в MemoryAnalysisQueue. Анализатор и БД - фейковые, с задержкой (analysis-ms).
+Сравнивается число вызовов анализа с числом ходов (без очереди: один вызов на
+ход), проверяются лимит одновременных анализов и то, что каждый ход попал в
+анализ; печатается распределение задержки в очереди.
+
+Запуск (из каталога server):
+    python benchmarks/bench_memory_analysis_queue.py --users 50 --burst 5
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from modules.memory_management import MemoryManager
+
+
+class FakeAnalyzer:
+    """Один вызов = один запрос к Gemini"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+        self.turns = 0
+        self.active = 0
+        self.max_active = 0
+
+    async def analyze_turns(self, turns):
+        self.calls += 1
+        self.turns += len(turns)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.active -= 1
+        return f"recent: {turns[-1][0]}", ""
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.writes = 0
+
+    async def update_user_memory(self, hardware_id, short_memory, long_memory):
+        self.writes += 1
+        return True
+
+    async def get_user_memory(self, hardware_id):
+        return {'short': '', 'long': ''}
+
+
+async def main(args) -> int:
+    failures = []
+    manager = MemoryManager()
+    analyzer = FakeAnalyzer(args.analysis_ms / 1000)
+    database = FakeDatabase()
+    manager.memory_analyzer = analyzer
+    manager.set_database_manager(database)
+    queue = manager.analysis_queue
+    queue.debounce = args.debounce_ms / 1000
+    queue.max_delay = args.max_delay_ms / 1000
+
+    async def user(index: int):
+        hardware_id = f"hw-{index}"
+        for burst in range(args.bursts):
+            for turn in range(args.burst):
+                await manager.update_memory_background(hardware_id, f"command {burst}.{turn}", "ok")
+                await asyncio.sleep(args.think_ms / 1000)
+            # Пауза между пачками длиннее debounce - пачка уходит в анализ
+            await asyncio.sleep(args.debounce_ms * 2 / 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user(i) for i in range(args.users)))
+    await manager.cleanup()
+    elapsed = time.perf_counter() - started
+
+    stats = (await manager.get_status())['analysis_queue']
+    turns = args.users * args.bursts * args.burst
+    lag = stats['queue_lag_ms']
+    print(f"users={args.users} bursts={args.bursts}x{args.burst} debounce={args.debounce_ms}ms "
+          f"analysis={args.analysis_ms}ms max_concurrent={queue.max_concurrent}")
+    print(f"  turns={turns} analysis calls={analyzer.calls} db writes={database.writes} "
+          f"calls saved={stats['calls_saved']} ({stats['calls_saved'] / turns:.0%}) elapsed={elapsed:.2f}s")
+    print(f"  max concurrent analyses={analyzer.max_active} errors={stats['analysis_errors']} "
+          f"dropped turns={stats['turns_dropped']}")
+    print(f"  queue lag: avg={lag['avg_ms']:.0f}ms p50={lag['p50_ms']:.0f}ms p95={lag['p95_ms']:.0f}ms "
+          f"p99={lag['p99_ms']:.0f}ms max={lag['max_ms']:.0f}ms")
+
+    if analyzer.turns + stats['turns_dropped'] != turns:
+        failures.append(f"analyzed {analyzer.turns} + dropped {stats['turns_dropped']} != {turns} turns")
+    if analyzer.calls + stats['calls_saved'] != turns:
+        failures.append(f"calls {analyzer.calls} + saved {stats['calls_saved']} != {turns} turns")
+    if analyzer.max_active > queue.max_concurrent:
+        failures.append(f"{analyzer.max_active} concurrent analyses > limit {queue.max_concurrent}")
+    if analyzer.calls > turns / args.min_merge:
+        failures.append(f"{analyzer.calls} calls for {turns} turns: less than x{args.min_merge} merge")
+    if stats['pending_jobs'] or stats['running_jobs']:
+        failures.append("jobs left in queue after cleanup()")
+
+    for failure in failures:
+        print(f"  ❌ {failure}")
+    print("✅ PASS" if not failures else "❌ FAIL")
+    return 0 if not failures else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory analysis queue coalescing benchmark")
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--bursts', type=int, default=3)
+    parser.add_argument('--burst', type=int, default=5)
+    parser.add_argument('--think-ms', type=float, default=20.0)
+    parser.add_argument('--debounce-ms', type=float, default=100.0)
+    parser.add_argument('--max-delay-ms', type=float, default=1000.0)
+    parser.add_argument('--analysis-ms', type=float, default=50.0)
+    parser.add_argument('--min-merge', type=float, default=3.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    sys.exit(asyncio.run(main(args)))
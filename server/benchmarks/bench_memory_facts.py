@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк памяти в виде фактов: размер хранения и токены промпта
+
+Один пользователь, turns анализов подряд; каждый анализ возвращает несколько
+фактов, часть из них - повторы уже известных (переформулированные регистром
+и пунктуацией). Сравниваются:
+- append: память дописывается текстом без ограничений и целиком идёт в промпт;
+- facts: MemoryManager (дедупликация, ужатие до MAX_*_MEMORY_SIZE, top-K в промпт).
+Токены оцениваются как символы / 4.
+
+Запуск (из каталога server):
+    python benchmarks/bench_memory_facts.py --turns 200
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from modules.memory_management import MemoryManager
+from modules.memory_management.core.fact_store import load_facts
+
+TOPICS = ('weather', 'music', 'calendar', 'email', 'photos', 'travel', 'coding', 'recipes', 'news', 'sports')
+PROFILE = (
+    'User name is Alex', 'User lives in Berlin', 'User prefers short answers', 'User works as a designer',
+    'User has a dog named Rex', 'User speaks Russian and English', 'User uses a MacBook Air',
+    'User likes jazz music', 'User is learning Spanish', 'User drinks coffee without sugar',
+)
+
+
+def _tokens(text: str) -> int:
+    return len(text) // 4
+
+
+class ScriptedAnalyzer:
+    """Ответы анализатора по сценарию: новые факты + повторы известных"""
+
+    def __init__(self, seed: int):
+        self.seed = seed
+        self.turn = 0
+
+    def output(self, turn: int):
+        rnd = random.Random(self.seed * 100003 + turn)
+        topic = rnd.choice(TOPICS)
+        short = [f"User asked about {topic} (request {turn})", f"Current topic is {topic}"]
+        long = [rnd.choice(PROFILE)]
+        if rnd.random() < 0.3:
+            long.append(f"User mentioned a {topic} preference #{turn}")
+        if rnd.random() < 0.5:
+            # Повтор известного факта в другом регистре/пунктуации
+            long.append(rnd.choice(PROFILE).upper() + ".")
+        return "\n".join(f"- {fact}" for fact in short), "\n".join(f"- {fact}" for fact in long)
+
+    async def analyze_turns(self, turns):
+        self.turn += 1
+        return self.output(self.turn - 1)
+
+
+class MemoryDatabase:
+    def __init__(self):
+        self.memory = {}
+
+    async def get_user_memory(self, hardware_id):
+        return dict(self.memory.get(hardware_id, {'short': '', 'long': ''}))
+
+    async def update_user_memory(self, hardware_id, short_memory, long_memory):
+        self.memory[hardware_id] = {'short': short_memory, 'long': long_memory}
+        return True
+
+
+async def main(args) -> int:
+    failures = []
+    manager = MemoryManager()
+    analyzer = ScriptedAnalyzer(args.seed)
+    database = MemoryDatabase()
+    manager.memory_analyzer = analyzer
+    manager.set_database_manager(database)
+    config = manager.config
+
+    append_short, append_long = [], []
+    append_tokens, facts_tokens = [], []
+    update_ms, render_ms = [], []
+    hardware_id = "hw-bench"
+
+    queries = random.Random(args.seed)
+    for turn in range(args.turns):
+        prompt = f"question about {queries.choice(TOPICS)}"
+        # append: тот же ответ анализатора, что получит MemoryManager
+        short_text, long_text = analyzer.output(turn)
+        append_short.append(short_text)
+        append_long.append(long_text)
+
+        started = time.perf_counter()
+        await manager._apply_analysis(hardware_id, [(prompt, "ok")])
+        update_ms.append((time.perf_counter() - started) * 1000)
+
+        legacy = "\n".join(append_short) + "\n" + "\n".join(append_long)
+        started = time.perf_counter()
+        context = await manager.get_memory_context(hardware_id, query=prompt)
+        render_ms.append((time.perf_counter() - started) * 1000)
+        append_tokens.append(_tokens(legacy))
+        facts_tokens.append(_tokens(context))
+
+    stored = database.memory[hardware_id]
+    stats = (await manager.get_status())['facts']
+    short_facts, long_facts = load_facts(stored['short']), load_facts(stored['long'])
+    saved = 1 - facts_tokens[-1] / append_tokens[-1] if append_tokens[-1] else 0.0
+    avg_saved = 1 - sum(facts_tokens) / sum(append_tokens) if sum(append_tokens) else 0.0
+
+    print(f"turns={args.turns} budget short={config.max_short_term_memory_size}B long={config.max_long_term_memory_size}B "
+          f"top-K short={config.memory_context_short_facts} long={config.memory_context_long_facts}")
+    print(f"  stored: short {len(stored['short'])}B ({len(short_facts)} facts), "
+          f"long {len(stored['long'])}B ({len(long_facts)} facts)")
+    print(f"  facts added={stats['facts_added']} duplicates={stats['facts_duplicate']} compacted={stats['facts_compacted']}")
+    print(f"  prompt tokens (last turn): append={append_tokens[-1]} facts={facts_tokens[-1]} saved={saved:.0%}")
+    print(f"  prompt tokens (all turns): append={sum(append_tokens)} facts={sum(facts_tokens)} saved={avg_saved:.0%}")
+    print(f"  update avg={sum(update_ms) / len(update_ms):.3f}ms render avg={sum(render_ms) / len(render_ms):.3f}ms")
+
+    if len(stored['short'].encode('utf-8')) > config.max_short_term_memory_size:
+        failures.append("short-term memory exceeds its byte budget")
+    if len(stored['long'].encode('utf-8')) > config.max_long_term_memory_size:
+        failures.append("long-term memory exceeds its byte budget")
+    if stats['facts_duplicate'] == 0:
+        failures.append("no duplicate facts detected")
+    keys = {fact.text.lower().rstrip('.') for fact in long_facts}
+    if len(keys) != len(long_facts):
+        failures.append("duplicate long-term facts stored")
+    if args.turns >= 50 and saved < args.min_saved:
+        failures.append(f"prompt token savings {saved:.0%} < {args.min_saved:.0%}")
+
+    for failure in failures:
+        print(f"  ❌ {failure}")
+    print("✅ PASS" if not failures else "❌ FAIL")
+    return 0 if not failures else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fact memory storage and prompt size benchmark")
+    parser.add_argument('--turns', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--min-saved', type=float, default=0.5)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    sys.exit(asyncio.run(main(args)))
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк записи метрик запроса (monitoring.record_request)
+
+record_request вызывается в finally каждого StreamAudio. Прежний путь на
+каждый запрос: sum() по deque последних 1000 времён ответа, два вызова
+psutil (memory_percent, cpu_percent - чтение /proc), проверка лимитов с
+форматированием строк. Новый путь - счётчики и LatencyHistogram (индекс корзины
+через math.frexp), а CPU/RSS, RPM, перцентили и лимиты пересчитывает
+фоновый ProcessSampler.
+
+Проверяется:
+- стоимость record_request (мкс) прежним и новым путём;
+- точность p50/p95/p99 LatencyHistogram против точных перцентилей;
+- get_metrics() при работающем сэмплере не вызывает psutil, а RPM и
+  среднее время ответа совпадают с фактическими.
+
+Запуск (из каталога server):
+    python benchmarks/bench_metrics_record.py --requests 200000
+"""
+
+import argparse
+import asyncio
+import logging
+import math
+import os
+import random
+import sys
+import time
+from collections import deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import psutil
+
+from monitoring import GrpcMonitor, LatencyHistogram, PerformanceLimits
+
+
+class LegacyMonitor:
+    """Прежний GrpcMonitor.record_request (эталон стоимости)"""
+
+    def __init__(self):
+        self.limits = PerformanceLimits()
+        self.request_times = deque(maxlen=1000)
+        self.requests_in_minute = deque(maxlen=60)
+        self.last_minute_check = time.time()
+        self.total_requests = 0
+        self.error_count = 0
+        self.requests_per_minute = 0
+        self.avg_response_time = 0.0
+        self.error_rate = 0.0
+        self.memory_usage = 0.0
+        self.cpu_usage = 0.0
+        self.active_connections = 0
+        self.process = psutil.Process(os.getpid())
+
+    def record_request(self, response_time: float, is_error: bool = False):
+        current_time = time.time()
+        self.total_requests += 1
+        self.request_times.append(response_time)
+        if is_error:
+            self.error_count += 1
+        self.requests_in_minute.append(current_time)
+        if current_time - self.last_minute_check >= 60:
+            self.requests_per_minute = len(self.requests_in_minute)
+            self.last_minute_check = current_time
+        self.avg_response_time = sum(self.request_times) / len(self.request_times)
+        self.error_rate = self.error_count / self.total_requests
+        self.memory_usage = self.process.memory_percent()
+        self.cpu_usage = self.process.cpu_percent()
+        self._check_limits()
+
+    def _check_limits(self):
+        warnings = []
+        if self.active_connections >= self.limits.max_connections * 0.8:
+            warnings.append(f"⚠️ Высокая нагрузка: {self.active_connections}/{self.limits.max_connections} соединений (80%+)")
+        if self.requests_per_minute >= self.limits.max_requests_per_minute * 0.8:
+            warnings.append(f"⚠️ Высокая нагрузка: {self.requests_per_minute}/{self.limits.max_requests_per_minute} RPS (80%+)")
+        if self.error_rate >= self.limits.max_error_rate:
+            warnings.append(f"❌ Высокая ошибка: {self.error_rate:.1%} ошибок (лимит: {self.limits.max_error_rate:.1%})")
+        if self.memory_usage >= self.limits.max_memory_usage:
+            warnings.append(f"⚠️ Высокая память: {self.memory_usage:.1f}%")
+        if self.cpu_usage >= self.limits.max_cpu_usage:
+            warnings.append(f"⚠️ Высокий CPU: {self.cpu_usage:.1f}%")
+        if self.avg_response_time >= self.limits.max_response_time:
+            warnings.append(f"⚠️ Медленный ответ: {self.avg_response_time:.2f}s")
+        for warning in warnings:
+            logging.getLogger(__name__).warning(warning)
+        return warnings
+
+
+class CountingProcess:
+    """Обёртка psutil.Process со счётчиком вызовов"""
+
+    def __init__(self, process):
+        self._process = process
+        self.calls = 0
+
+    def __getattr__(self, name):
+        method = getattr(self._process, name)
+
+        def counted(*args, **kwargs):
+            self.calls += 1
+            return method(*args, **kwargs)
+        return counted
+
+
+def make_latencies(rng: random.Random, count: int) -> list:
+    """Время ответа (секунды): логнормальное ядро ~300 мс и 2% долгих ответов"""
+    return [
+        rng.lognormvariate(math.log(0.3), 0.6) if rng.random() > 0.02 else rng.uniform(2.0, 20.0)
+        for _ in range(count)
+    ]
+
+
+def per_call_us(record, latencies: list, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for index, latency in enumerate(latencies):
+            record(latency, index % 50 == 0)
+        best = min(best, time.perf_counter() - started)
+    return best / len(latencies) * 1e6
+
+
+def check_accuracy(latencies: list, failures: list):
+    histogram = LatencyHistogram()
+    for latency in latencies:
+        histogram.observe(latency * 1000.0)
+    ordered = sorted(latency * 1000.0 for latency in latencies)
+    # Граница корзины не больше значения на 1/sub_buckets
+    tolerance = 1.0 / histogram.sub_buckets + 1e-9
+    estimates = histogram.percentiles((0.50, 0.95, 0.99))
+    for q, estimate in zip((0.50, 0.95, 0.99), estimates):
+        exact = ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+        error = (estimate - exact) / exact
+        print(f"  p{int(q * 100)}: exact {exact:9.2f}ms, histogram {estimate:9.2f}ms (error {error:+.2%})")
+        if not 0 <= error <= tolerance:
+            failures.append(f"p{int(q * 100)} error {error:+.2%} outside [0, {tolerance:.2%}]")
+    cumulative = list(histogram.buckets())
+    if cumulative[-1][1] != len(latencies):
+        failures.append(f"buckets() total {cumulative[-1][1]} != {len(latencies)}")
+
+
+async def check_sampler(latencies: list, failures: list):
+    monitor = GrpcMonitor(sample_interval=0.05)
+    process = monitor.process = CountingProcess(monitor.process)
+    monitor.start_sampler()
+    for index, latency in enumerate(latencies):
+        monitor.record_request(latency, index % 50 == 0)
+    await asyncio.sleep(0.2)
+
+    calls_before = process.calls
+    started = time.perf_counter()
+    for _ in range(10000):
+        metrics = monitor.get_metrics()
+    get_metrics_us = (time.perf_counter() - started) / 10000 * 1e6
+    calls_during = process.calls - calls_before
+    await monitor.stop_sampler()
+
+    samples = monitor.sampler.samples
+    expected_avg = sum(latencies) / len(latencies)
+    print(f"  sampler: {samples} samples, psutil calls {process.calls}, get_metrics {get_metrics_us:.2f}us/call")
+    print(f"  requests_per_minute={metrics['requests_per_minute']} avg_response_time={metrics['avg_response_time']:.4f}s "
+          f"(exact {expected_avg:.4f}s) p99={metrics['response_time_ms']['p99_ms']:.1f}ms")
+    # Сэмплер мог успеть снять показания во время цикла get_metrics - допускаем его вызовы, но не 10000
+    if calls_during > 3 * (samples + 1):
+        failures.append(f"get_metrics triggered {calls_during} psutil calls")
+    if metrics["requests_per_minute"] != len(latencies):
+        failures.append(f"requests_per_minute {metrics['requests_per_minute']} != {len(latencies)}")
+    if abs(metrics["avg_response_time"] - expected_avg) > 1e-6 * expected_avg:
+        failures.append(f"avg_response_time {metrics['avg_response_time']} != {expected_avg}")
+    if monitor.sampler.is_running:
+        failures.append("sampler still running after stop_sampler()")
+
+
+def main(args) -> int:
+    failures = []
+    rng = random.Random(args.seed)
+    latencies = make_latencies(rng, args.requests)
+    print(f"requests={args.requests}, best of {args.repeat}")
+
+    legacy_us = per_call_us(LegacyMonitor().record_request, latencies, args.repeat)
+    monitor = GrpcMonitor()
+    new_us = per_call_us(monitor.record_request, latencies, args.repeat)
+    speedup = legacy_us / new_us if new_us else float('inf')
+    print(f"  record_request: legacy {legacy_us:6.2f}us/call, new {new_us:5.2f}us/call (x{speedup:.1f})")
+    if speedup < args.min_speedup:
+        failures.append(f"record_request speedup x{speedup:.1f} < x{args.min_speedup}")
+
+    check_accuracy(latencies, failures)
+    asyncio.run(check_sampler(latencies[:args.sampler_requests], failures))
+
+    for failure in failures:
+        print(f"  ❌ {failure}")
+    print("✅ PASS" if not failures else "❌ FAIL")
+    return 0 if not failures else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monitoring record_request cost benchmark")
+    parser.add_argument('--requests', type=int, default=200000)
+    parser.add_argument('--sampler-requests', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--min-speedup', type=float, default=10.0)
+    parser.add_argument('--seed', type=int, default=17)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    sys.exit(main(args))
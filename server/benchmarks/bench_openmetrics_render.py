@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк экспорта /metrics (OpenMetrics)
+
+Prometheus опрашивает /metrics каждые 5 с на том же event loop, что и
+gRPC. Проверяется:
+- формат: у каждого семейства один TYPE, имена отсчётов соответствуют
+  типу (counter - _total, histogram - _bucket/_count/_sum), корзины
+  возрастают и не убывают по значению, le="+Inf" равен _count, в конце # EOF;
+- стоимость сборки без кэша (монитор после N запросов + коллекторы
+  модулей) и ответа из кэша;
+- ошибка коллектора не ломает ответ, а учитывается в счётчике.
+
+Запуск (из каталога server):
+    python benchmarks/bench_openmetrics_render.py --requests 100000
+"""
+
+import argparse
+import logging
+import math
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from monitoring import GrpcMonitor, OpenMetricsExporter
+from modules.text_filtering.core.text_filter_cache import TextFilterCache
+
+SAMPLE_LINE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{[^}]*\})? (\S+)$')
+SUFFIXES = {
+    "counter": ("_total",),
+    "gauge": ("",),
+    "histogram": ("_bucket", "_count", "_sum"),
+}
+
+
+def module_metrics(rng: random.Random) -> dict:
+    """Словари в форме get_metrics() модулей"""
+    return {
+        "text_processing": lambda: {
+            "is_initialized": True,
+            "live_provider": {"name": "gemini_live", "total_requests": rng.randint(0, 10 ** 6),
+                              "success_rate": rng.random(), "session_pool": {"size": 4, "in_use": 2}},
+            "screenshot_normalizer": {"normalized": 120, "avg_ms": 3.4},
+            "prompt_sizes": {"count": 5000, "p95_chars": 8123, "truncated": 12},
+        },
+        "audio_generation": lambda: {
+            "is_initialized": True,
+            "provider": {"provider_type": "azure_tts", "total_requests": 4200, "is_available": True,
+                         "synthesizer_pool": {"size": 8, "idle": 5, "created": 9, "avg_acquire_ms": 0.4}},
+        },
+        "database": lambda: {
+            "is_initialized": True,
+            "postgresql_provider": {"pool_size": 20, "pool_in_use": 3, "queries": 10 ** 6, "avg_query_ms": 1.7},
+            "write_behind": {"queued": 3, "flushed": 90211, "batches": 812, "dropped": 0, "last_flush_ms": 4.2},
+        },
+    }
+
+
+def parse(text: str, failures: list):
+    """Проверка формата OpenMetrics; возвращает {семейство: тип}"""
+    lines = text.split("\n")
+    if lines[-2:] != ["# EOF", ""]:
+        failures.append("exposition does not end with '# EOF\\n'")
+    families = {}
+    histograms = {}
+    for line in lines[:-2]:
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ")
+            if name in families:
+                failures.append(f"duplicate family {name}")
+            families[name] = kind
+            continue
+        if line.startswith("# HELP "):
+            continue
+        match = SAMPLE_LINE.match(line)
+        if not match:
+            failures.append(f"bad line: {line!r}")
+            continue
+        sample, labels, value = match.groups()
+        float(value.replace("+Inf", "inf"))
+        family = next((name for name in families if sample.startswith(name)
+                       and sample[len(name):] in SUFFIXES[families[name]]), None)
+        if family is None:
+            failures.append(f"sample {sample} has no matching TYPE")
+            continue
+        if families[family] == "histogram":
+            entry = histograms.setdefault(family, {"bounds": [], "count": None})
+            if sample.endswith("_bucket"):
+                bound = float(re.search(r'le="([^"]+)"', labels).group(1).replace("+Inf", "inf"))
+                entry["bounds"].append((bound, float(value)))
+            elif sample.endswith("_count"):
+                entry["count"] = float(value)
+    for family, entry in histograms.items():
+        bounds = entry["bounds"]
+        if [bound for bound, _ in bounds] != sorted(bound for bound, _ in bounds) or len(set(bounds)) != len(bounds):
+            failures.append(f"{family}: bucket bounds not increasing")
+        if any(left[1] > right[1] for left, right in zip(bounds, bounds[1:])):
+            failures.append(f"{family}: cumulative counts decrease")
+        if not bounds or not math.isinf(bounds[-1][0]) or bounds[-1][1] != entry["count"]:
+            failures.append(f"{family}: +Inf bucket missing or != _count")
+    return families
+
+
+def main(args) -> int:
+    failures = []
+    rng = random.Random(args.seed)
+
+    monitor = GrpcMonitor(sample_interval=3600)
+    for index in range(args.requests):
+        monitor.record_request(rng.lognormvariate(math.log(0.3), 0.8), index % 40 == 0)
+        monitor.record_admission(rng.expovariate(200.0), rng.randint(0, 5),
+                                 "rate_limited" if index % 500 == 0 else None)
+    monitor.record_maintenance("memory_sweep", 0.12, 40, 0.5)
+    monitor.add_active_connections(7)
+
+    cache = TextFilterCache()
+    for index in range(2000):
+        text = f"fragment {rng.randint(0, 300)}"
+        if cache.get("clean", text) is None:
+            cache.put("clean", text, None, {"success": True, "cleaned_text": text})
+
+    exporter = OpenMetricsExporter(monitor, cache_ttl=args.cache_ttl)
+    for name, collect in module_metrics(rng).items():
+        exporter.register(name, collect)
+    exporter.register("text_filter_cache", cache.get_stats)
+    exporter.register("broken", lambda: 1 / 0)
+
+    text = exporter.render().decode("utf-8")
+    families = parse(text, failures)
+    samples = sum(1 for line in text.split("\n") if line and not line.startswith("#"))
+    print(f"requests={args.requests}: {len(families)} families, {samples} samples, {len(text) / 1024:.1f}KB")
+    for required in ("nexy_grpc_requests", "nexy_grpc_response_time_seconds", "nexy_admission_wait_seconds",
+                     "nexy_text_filter_cache_hits", "nexy_database_write_behind_flushed",
+                     "nexy_audio_generation_provider_synthesizer_pool_idle"):
+        if required not in families:
+            failures.append(f"family {required} missing")
+    if f"nexy_grpc_requests_total {args.requests}" not in text:
+        failures.append("nexy_grpc_requests_total does not match recorded requests")
+    if 'nexy_metrics_collector_errors_total{collector="broken"} 1' not in text:
+        failures.append("failing collector not counted")
+
+    # Сборка без кэша: лучшее из repeat
+    best = float('inf')
+    for _ in range(args.repeat):
+        exporter.invalidate()
+        started = time.perf_counter()
+        exporter.render()
+        best = min(best, time.perf_counter() - started)
+    render_ms = best * 1000
+    started = time.perf_counter()
+    for _ in range(args.cached_calls):
+        exporter.render()
+    cached_us = (time.perf_counter() - started) / args.cached_calls * 1e6
+    print(f"  render: {render_ms:.2f}ms uncached, {cached_us:.2f}us cached "
+          f"(scrape every 5s -> {render_ms / 5000:.4%} of one core)")
+    if render_ms > args.max_render_ms:
+        failures.append(f"uncached render {render_ms:.2f}ms > {args.max_render_ms}ms")
+    if cached_us > args.max_cached_us:
+        failures.append(f"cached render {cached_us:.2f}us > {args.max_cached_us}us")
+
+    for failure in failures[:20]:
+        print(f"  ❌ {failure}")
+    print("✅ PASS" if not failures else "❌ FAIL")
+    return 0 if not failures else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OpenMetrics /metrics rendering benchmark")
+    parser.add_argument('--requests', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--cached-calls', type=int, default=100000)
+    parser.add_argument('--cache-ttl', type=float, default=60.0)
+    parser.add_argument('--max-render-ms', type=float, default=5.0)
+    parser.add_argument('--max-cached-us', type=float, default=5.0)
+    parser.add_argument('--seed', type=int, default=19)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    sys.exit(main(args))
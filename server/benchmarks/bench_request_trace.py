@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк трассировки запросов по стадиям (utils.request_trace)
+
+Проверяется:
+- стоимость вызова span API без активной трассы (весь код вне
+  StreamAudio) и с активной трассой;
+- параллельные запросы через StreamingWorkflowIntegration (фейковые LLM
+  и TTS, задачи сегментации и TTS наследуют ContextVar) - каждая трасса
+  содержит только свои спаны: по одному tts.segment на предложение,
+  отметку первого фрагмента LLM, буферизацию сегментов;
+- TraceRecorder пишет JSONL, monitoring/trace_report.py читает его и
+  строит waterfall и сводку по стадиям.
+
+Запуск (из каталога server):
+    python benchmarks/bench_request_trace.py --requests 20
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from integrations.workflow_integrations.streaming_workflow_integration import StreamingWorkflowIntegration
+from monitoring.trace_report import load_traces, render_summary, render_waterfall
+from monitoring.tracing import TraceRecorder
+from utils.request_trace import RequestTrace, record_span, trace_mark, trace_span
+
+EXPECTED_STAGES = ("memory.context", "llm.first_fragment", "llm.stream", "segment.buffer",
+                   "tts.queue_wait", "tts.segment")
+
+
+class FakeTextProcessor:
+    """LLM: короткий фрагмент (копится до порога слов) и продолжение, каждые llm_delay секунд"""
+
+    is_initialized = True
+
+    def __init__(self, sentences: int, llm_delay: float):
+        self.sentences = sentences
+        self.llm_delay = llm_delay
+
+    async def process_text_streaming(self, text: str, image_data: bytes = None, hardware_id: str = None, memory_context=None):
+        for i in range(self.sentences):
+            await asyncio.sleep(self.llm_delay)
+            yield f"Part {i}."
+            await asyncio.sleep(self.llm_delay)
+            yield f"Here is answer sentence number {i} for {hardware_id}."
+
+
+class FakeAudioProcessor:
+    """TTS: первый байт через first_byte, далее chunks чанков"""
+
+    is_initialized = True
+
+    def __init__(self, first_byte: float, chunks: int):
+        self.first_byte = first_byte
+        self.chunks = chunks
+
+    async def generate_speech_streaming(self, text: str):
+        started = time.perf_counter()
+        await asyncio.sleep(self.first_byte)
+        for i in range(self.chunks):
+            if i:
+                await asyncio.sleep(0.002)
+            yield f"{text}|{i}".encode('utf-8')
+        record_span("azure_tts.synthesize", started, chars=len(text))
+
+
+def span_api_cost(calls: int) -> dict:
+    """Стоимость вызова (нс): без трассы и с активной трассой"""
+    results = {}
+    for label in ("inactive", "active"):
+        trace = RequestTrace("bench", "hw") if label == "active" else None
+        token = trace.activate() if trace is not None else None
+        started = time.perf_counter()
+        for _ in range(calls):
+            with trace_span("stage"):
+                pass
+            record_span("stage", started)
+            trace_mark("mark")
+            if trace is not None and len(trace.spans) > 1500:
+                trace.spans.clear()
+        results[label] = (time.perf_counter() - started) / (calls * 3) * 1e9
+        if trace is not None:
+            trace.deactivate(token)
+    return results
+
+
+async def run_request(workflow: StreamingWorkflowIntegration, recorder: TraceRecorder, index: int):
+    """Один запрос как в StreamAudio: трасса активна на время обработки; возвращает (трасса, число сегментов)"""
+    trace = recorder.start(f"session_{index}", f"hw_{index}")
+    token = trace.activate()
+    segments = 0
+    try:
+        async for item in workflow.process_request_streaming(
+            {'session_id': f"session_{index}", 'hardware_id': f"hw_{index}", 'text': 'q'}
+        ):
+            if not item.get('success'):
+                raise RuntimeError(item.get('error'))
+            if item.get('audio_chunk') and item.get('audio_chunk_index') == 1 and item.get('sentence_index') == 1:
+                trace_mark("grpc.first_audio")
+            if item.get('is_final'):
+                segments = item['sentences_processed']
+    finally:
+        recorder.finish(trace, 'ok')
+        trace.deactivate(token)
+    return trace, segments
+
+
+async def check_pipeline(args, failures: list):
+    os.environ["STREAM_TTS_CONCURRENCY"] = "2"
+    workflow = StreamingWorkflowIntegration(
+        text_processor=FakeTextProcessor(args.sentences, args.llm_ms / 1000),
+        audio_processor=FakeAudioProcessor(args.tts_first_byte_ms / 1000, args.chunks),
+    )
+    await workflow.initialize()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "traces.jsonl")
+        recorder = TraceRecorder(enabled=True, jsonl_path=path)
+        traces = await asyncio.gather(*(run_request(workflow, recorder, index) for index in range(args.requests)))
+        recorder.close()
+
+        total_segments = sum(segments for _, segments in traces)
+        for trace, segments in traces:
+            names = [span[0] for span in trace.spans]
+            missing = [stage for stage in EXPECTED_STAGES if stage not in names]
+            if missing:
+                failures.append(f"{trace.session_id}: stages missing {missing}")
+            if not segments or names.count("tts.segment") != segments:
+                failures.append(f"{trace.session_id}: {names.count('tts.segment')} tts.segment spans "
+                                f"for {segments} segments (spans leaked between requests?)")
+            if names.count("llm.first_fragment") != 1:
+                failures.append(f"{trace.session_id}: {names.count('llm.first_fragment')} llm.first_fragment marks")
+            outside = [span[0] for span in trace.spans if span[1] < trace.started_at or span[2] > trace.finished_at]
+            if outside:
+                failures.append(f"{trace.session_id}: spans outside the request {outside[:3]}")
+
+        records = load_traces(path)
+        if len(records) != args.requests:
+            failures.append(f"JSONL has {len(records)} traces, expected {args.requests}")
+        print(render_waterfall(max(records, key=lambda record: record['duration_ms'])))
+        print()
+        summary = render_summary(records)
+        print(summary)
+        for stage in EXPECTED_STAGES:
+            if stage not in summary:
+                failures.append(f"summary has no {stage}")
+
+    stats = recorder.get_stats()
+    if stats["traces"] != args.requests or stats["stages_ms"]["tts.segment"]["count"] != total_segments:
+        failures.append(f"recorder aggregated {stats['traces']} traces, "
+                        f"{stats['stages_ms']['tts.segment']['count']} tts.segment spans")
+
+
+def main(args) -> int:
+    failures = []
+    costs = span_api_cost(args.calls)
+    print(f"span API: inactive {costs['inactive']:.0f}ns/call, active {costs['active']:.0f}ns/call")
+    if costs["inactive"] > args.max_inactive_ns:
+        failures.append(f"inactive span call {costs['inactive']:.0f}ns > {args.max_inactive_ns}ns")
+    if costs["active"] > args.max_active_ns:
+        failures.append(f"active span call {costs['active']:.0f}ns > {args.max_active_ns}ns")
+
+    print(f"requests={args.requests} in parallel, sentences={args.sentences}")
+    asyncio.run(check_pipeline(args, failures))
+
+    for failure in failures[:20]:
+        print(f"  ❌ {failure}")
+    print("✅ PASS" if not failures else "❌ FAIL")
+    return 0 if not failures else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Request tracing benchmark")
+    parser.add_argument('--calls', type=int, default=200000)
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--sentences', type=int, default=4)
+    parser.add_argument('--chunks', type=int, default=3)
+    parser.add_argument('--llm-ms', type=float, default=10.0)
+    parser.add_argument('--tts-first-byte-ms', type=float, default=30.0)
+    parser.add_argument('--max-inactive-ns', type=float, default=1000.0)
+    parser.add_argument('--max-active-ns', type=float, default=3000.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    sys.exit(main(args))
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк ScreenshotNormalizer
+
+Синтетический скриншот (Retina 2880x1800) в PNG, WebP и JPEG q95 проходит
+нормализацию; печатаются размеры до/после, время кодирования и максимальная
+задержка event loop во время обработки. Проверяется, что:
+- результат - JPEG не больше max_edge и меньше исходника
+- повтор того же скриншота от того же hardware_id берётся из кэша
+- тот же скриншот от другого hardware_id обрабатывается заново
+
+Требует Pillow.
+
+Запуск (из каталога server):
+    python benchmarks/bench_screenshot_normalizer.py --max-edge 1568 --workers 2
+"""
+
+import argparse
+import asyncio
+import io
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from modules.text_processing.core.screenshot_normalizer import PIL_AVAILABLE, ScreenshotNormalizer, detect_image_format
+
+if PIL_AVAILABLE:
+    from PIL import Image, ImageDraw
+
+
+def _screenshot(width: int, height: int, image_format: str) -> bytes:
+    """Похожее на рабочий стол изображение: фото-обои (шум), окна, строки «текста»"""
+    noise = Image.effect_noise((width // 4, height // 4), 48).resize((width, height), Image.BILINEAR)
+    image = Image.merge('RGB', (noise, noise.point(lambda v: v * 0.8), noise.point(lambda v: 255 - v)))
+    draw = ImageDraw.Draw(image)
+    for i in range(6):
+        x, y = 80 + i * 380, 60 + i * 200
+        draw.rectangle((x, y, x + 1200, y + 800), fill=(245, 245, 245), outline=(90, 90, 90), width=3)
+        draw.rectangle((x, y, x + 1200, y + 40), fill=(210, 210, 215))
+        for line in range(30):
+            length = 300 + (line * 137 + i * 53) % 800
+            draw.rectangle((x + 30, y + 70 + line * 24, x + 30 + length, y + 82 + line * 24), fill=(40, 40, 40))
+    out = io.BytesIO()
+    if image_format == 'jpeg':
+        image.save(out, format='JPEG', quality=95)
+    else:
+        image.save(out, format=image_format.upper())
+    return out.getvalue()
+
+
+async def _with_loop_lag(coro):
+    """Результат корутины и максимальная задержка event loop за время её выполнения"""
+    lag = 0.0
+    done = False
+
+    async def ticker():
+        nonlocal lag
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lag = max(lag, time.perf_counter() - start - 0.001)
+
+    task = asyncio.create_task(ticker())
+    try:
+        result = await coro
+    finally:
+        done = True
+        await task
+    return result, lag * 1000
+
+
+async def main(args) -> int:
+    if not PIL_AVAILABLE:
+        print("Pillow не установлен - бенчмарк пропущен")
+        return 1
+
+    failures = []
+    normalizer = ScreenshotNormalizer(max_edge=args.max_edge, quality=args.quality, workers=args.workers)
+    print(f"max_edge={args.max_edge} quality={args.quality} workers={args.workers}")
+
+    for image_format in ('png', 'webp', 'jpeg'):
+        data = _screenshot(2880, 1800, image_format)
+        hardware_id = f"hw-{image_format}"
+
+        started = time.perf_counter()
+        result, lag_ms = await _with_loop_lag(normalizer.normalize(data, hardware_id))
+        first_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        repeat = await normalizer.normalize(data, hardware_id)
+        repeat_ms = (time.perf_counter() - started) * 1000
+
+        with Image.open(io.BytesIO(result)) as image:
+            size = image.size
+        print(
+            f"  {image_format:>4}: {len(data) / 1024:7.1f}KB → {len(result) / 1024:6.1f}KB {size[0]}x{size[1]} "
+            f"first={first_ms:6.1f}ms repeat={repeat_ms:5.2f}ms loop_lag={lag_ms:5.1f}ms"
+        )
+        if detect_image_format(result) != 'jpeg' or max(size) > args.max_edge:
+            failures.append(f"{image_format}: output is not a downscaled JPEG")
+        if len(result) >= len(data):
+            failures.append(f"{image_format}: output is not smaller than input")
+        if repeat is not result:
+            failures.append(f"{image_format}: repeat was not served from cache")
+
+    hits_before = normalizer.cache_hits
+    await normalizer.normalize(_screenshot(2880, 1800, 'png'), "hw-other")
+    if normalizer.cache_hits != hits_before:
+        failures.append("cache hit across different hardware_id")
+
+    metrics = normalizer.get_metrics()
+    normalizer.close()
+    print(
+        f"metrics: requests={metrics['requests']} processed={metrics['processed']} cache_hits={metrics['cache_hits']} "
+        f"bytes_saved={metrics['bytes_saved'] / 1024:.1f}KB avg_encode={metrics['avg_encode_ms']:.1f}ms"
+    )
+
+    for failure in failures:
+        print(f"  ❌ {failure}")
+    print("✅ PASS" if not failures else "❌ FAIL")
+    return 0 if not failures else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Screenshot normalizer benchmark")
+    parser.add_argument('--max-edge', type=int, default=1568)
+    parser.add_argument('--quality', type=int, default=80)
+    parser.add_argument('--workers', type=int, default=2)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    sys.exit(asyncio.run(main(args)))
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Микро-бенчмарк пути скриншота клиент → сервер → Gemini
+
+Сравнивает:
+- legacy: base64 строка (client b64encode → server b64decode → provider b64encode)
+- bytes:  сырые байты в screenshot_data, без преобразований в нашем коде
+
+Считаются байты, скопированные нашим кодом на запрос (каждый новый буфер),
+размер полезной нагрузки на проводе и CPU время на запрос. Серверная часть
+использует настоящие StreamingWorkflowIntegration._resolve_screenshot и
+GeminiLiveProvider._image_part. Если установлен protobuf, в замер входит
+сериализация/разбор StreamRequest.
+
+Запуск (из каталога server):
+    python benchmarks/bench_screenshot_path.py --sizes 200 500 1000 --iterations 200
+"""
+
+import argparse
+import base64
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from integrations.workflow_integrations.streaming_workflow_integration import StreamingWorkflowIntegration
+from modules.text_processing.providers.gemini_live_provider import GeminiLiveProvider
+
+try:
+    from modules.grpc_service import streaming_pb2
+    PROTOBUF_AVAILABLE = True
+except Exception:
+    streaming_pb2 = None
+    PROTOBUF_AVAILABLE = False
+
+
+def _fake_jpeg(size: int) -> bytes:
+    """JPEG-подобные данные заданного размера (маркер + псевдослучайное тело)"""
+    body = os.urandom(size - 4)
+    return b'\xff\xd8\xff\xe0' + body
+
+
+def _legacy(workflow, provider, image: bytes) -> tuple:
+    copied = 0
+    # Клиент: base64 строка
+    b64 = base64.b64encode(image).decode('ascii')
+    copied += len(b64) * 2
+    if PROTOBUF_AVAILABLE:
+        wire = streaming_pb2.StreamRequest(prompt="describe", screenshot=b64, hardware_id="hw").SerializeToString()
+        request = streaming_pb2.StreamRequest.FromString(wire)
+        screenshot = request.screenshot
+        copied += len(wire) + len(screenshot)
+    else:
+        wire_len = len(b64)
+        screenshot = b64
+    # Сервер: декодирование в workflow
+    data = workflow._resolve_screenshot({'screenshot': screenshot})
+    copied += len(data)
+    # Провайдер: прежний повторный base64 перед отправкой
+    part = {"inline_data": {"mime_type": "image/jpeg", "data": base64.b64encode(data).decode('utf-8')}}
+    copied += len(part["inline_data"]["data"]) * 2
+    return copied, (len(wire) if PROTOBUF_AVAILABLE else wire_len)
+
+
+def _raw(workflow, provider, image: bytes) -> tuple:
+    copied = 0
+    if PROTOBUF_AVAILABLE:
+        wire = streaming_pb2.StreamRequest(prompt="describe", screenshot_data=image, hardware_id="hw").SerializeToString()
+        request = streaming_pb2.StreamRequest.FromString(wire)
+        screenshot_data = request.screenshot_data
+        copied += len(wire) + len(screenshot_data)
+    else:
+        screenshot_data = image
+    data = workflow._resolve_screenshot({'screenshot_data': screenshot_data})
+    provider._validate_jpeg(data)
+    part = provider._image_part(data)
+    if part["inline_data"]["data"] is not data:
+        copied += len(part["inline_data"]["data"])
+    return copied, (len(wire) if PROTOBUF_AVAILABLE else len(image))
+
+
+def _measure(fn, workflow, provider, image: bytes, iterations: int) -> dict:
+    copied, wire = fn(workflow, provider, image)
+    start = time.process_time()
+    for _ in range(iterations):
+        fn(workflow, provider, image)
+    cpu = (time.process_time() - start) / iterations
+    return {'copied': copied, 'wire': wire, 'cpu_ms': cpu * 1000}
+
+
+def main(args) -> int:
+    workflow = StreamingWorkflowIntegration()
+    provider = GeminiLiveProvider({'model': 'bench', 'image_max_size': 20 * 1024 * 1024})
+
+    ok = True
+    print(f"protobuf={'yes' if PROTOBUF_AVAILABLE else 'no (wire size estimated)'} iterations={args.iterations}")
+    for size_kb in args.sizes:
+        image = _fake_jpeg(size_kb * 1024)
+        legacy = _measure(_legacy, workflow, provider, image, args.iterations)
+        raw = _measure(_raw, workflow, provider, image, args.iterations)
+        print(f"screenshot={size_kb}KB")
+        for name, res in (("legacy", legacy), ("bytes", raw)):
+            print(
+                f"  {name:>6}: copied={res['copied'] / 1024:8.1f}KB wire={res['wire'] / 1024:8.1f}KB "
+                f"cpu={res['cpu_ms']:6.3f}ms/request"
+            )
+        ok &= raw['copied'] < legacy['copied'] and raw['wire'] < legacy['wire']
+
+    print("✅ PASS" if ok else "❌ FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Screenshot ingestion path micro-benchmark")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[200, 500, 1000])
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    sys.exit(main(args))
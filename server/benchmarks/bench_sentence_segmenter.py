@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк разбиения потокового ответа LLM на предложения
+
+Длинные ответы (10k+ символов) приходят фрагментами. Прежний путь:
+фрагмент дописывается в буфер, и весь незавершённый остаток заново проходит
+защиту технических фраз (четыре re.sub) и re.split - квадратично от длины
+предложения. SentenceSegmenter сканирует каждый символ один раз.
+
+Сценарии: обычная проза с техническими фразами (main.py, v1.2.3,
+192.168.1.1:8080) и ответ с очень длинными предложениями (перечисления,
+код без точек). Проверяется, что предложения и остаток совпадают с прежним
+путём, объём сканирования линеен и сегментатор быстрее.
+
+Запуск (из каталога server):
+    python benchmarks/bench_sentence_segmenter.py --answers 20 --chars 12000
+"""
+
+import argparse
+import logging
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from modules.text_filtering import SentenceSegmenter
+
+WORDS = (
+    "the", "server", "returns", "a", "response", "with", "config", "value", "and", "then",
+    "open", "main.py", "v1.2.3", "192.168.1.1:8080", "12.10", "file.json", "port", ":8080",
+    "version", "3.14159", "request", "user", "memory", "stream", "audio", "text", "Привет", "мир",
+)
+ENDINGS = (".", ".", ".", "!", "?", "...", "!?")
+
+
+def legacy_split(text: str):
+    """Прежний SentenceProcessingProvider.split_sentences (эталон)"""
+    text = ' '.join(text.split())
+    protected = re.sub(r'(\w+)\.(\w{1,4})\b', r'\1__DOT__\2', text)
+    protected = re.sub(r'(\d+)\.(\d+)(?:\.(\d+))?', r'\1__DOT__\2\3', protected)
+    protected = re.sub(r'(\d+)\.(\d+)\.(\d+)\.(\d+)', r'\1__DOT__\2__DOT__\3__DOT__\4', protected)
+    protected = re.sub(r':(\d+)', r'__COLON__\1', protected)
+    sentences = []
+    current = ""
+    for part in re.split(r'([.!?]+)', protected):
+        if part in '.!?':
+            current += part
+            if current.strip():
+                sentences.append(current.replace('__DOT__', '.').replace('__COLON__', ':').strip())
+            current = ""
+        else:
+            current += part
+    return sentences, current.replace('__DOT__', '.').replace('__COLON__', ':').strip()
+
+
+def make_answer(rng: random.Random, chars: int, sentence_words: tuple) -> list:
+    """Ответ LLM фрагментами по 20-120 символов"""
+    text = []
+    size = 0
+    while size < chars:
+        words = [rng.choice(WORDS) for _ in range(rng.randint(*sentence_words))]
+        sentence = " ".join(words).capitalize() + rng.choice(ENDINGS)
+        text.append(sentence)
+        size += len(sentence) + 1
+    answer = " ".join(text)
+    fragments = []
+    position = 0
+    while position < len(answer):
+        step = rng.randint(20, 120)
+        fragment = answer[position:position + step].strip()
+        if fragment:
+            fragments.append(fragment)
+        position += step
+    return fragments
+
+
+def run_legacy(fragments: list):
+    buffer = ""
+    sentences = []
+    for fragment in fragments:
+        buffer = f"{buffer} {fragment}" if buffer else fragment
+        complete, buffer = legacy_split(buffer)
+        sentences.extend(complete)
+    return sentences, buffer
+
+
+def run_segmenter(fragments: list):
+    segmenter = SentenceSegmenter()
+    sentences = []
+    for fragment in fragments:
+        sentences.extend(segmenter.feed(fragment))
+    return sentences, segmenter.remainder, segmenter.scanned_chars
+
+
+def bench(name: str, answers: list, min_speedup: float, failures: list):
+    legacy_time = segmenter_time = 0.0
+    mismatches = 0
+    scanned = total = 0
+    for fragments in answers:
+        started = time.perf_counter()
+        expected = run_legacy(fragments)
+        legacy_time += time.perf_counter() - started
+
+        started = time.perf_counter()
+        sentences, remainder, scanned_chars = run_segmenter(fragments)
+        segmenter_time += time.perf_counter() - started
+
+        mismatches += (sentences, remainder) != expected
+        scanned += scanned_chars
+        # Каждый символ нормализованных фрагментов ровно один раз
+        total += sum(len(" ".join(fragment.split())) for fragment in fragments)
+
+    chars = sum(len(fragment) for fragments in answers for fragment in fragments)
+    speedup = legacy_time / segmenter_time if segmenter_time else float('inf')
+    print(
+        f"  {name:>15}: {len(answers)} answers, {chars / len(answers):,.0f} chars avg | "
+        f"legacy {legacy_time / len(answers) * 1000:7.2f}ms/answer, "
+        f"segmenter {segmenter_time / len(answers) * 1000:6.2f}ms/answer (x{speedup:.1f}) | "
+        f"scanned {scanned}/{total} chars, mismatches={mismatches}"
+    )
+    if mismatches:
+        failures.append(f"{name}: {mismatches} answers split differently from the legacy path")
+    if scanned != total:
+        failures.append(f"{name}: scanned {scanned} chars for {total} chars of input")
+    if speedup < min_speedup:
+        failures.append(f"{name}: speedup x{speedup:.1f} < x{min_speedup}")
+
+
+def main(args) -> int:
+    failures = []
+    rng = random.Random(args.seed)
+    print(f"answers={args.answers} chars={args.chars}")
+
+    prose = [make_answer(rng, args.chars, (6, 20)) for _ in range(args.answers)]
+    bench("prose", prose, 1.5, failures)
+
+    long_sentences = [make_answer(rng, args.chars, (300, 600)) for _ in range(args.answers)]
+    bench("long sentences", long_sentences, args.min_speedup, failures)
+
+    for failure in failures:
+        print(f"  ❌ {failure}")
+    print("✅ PASS" if not failures else "❌ FAIL")
+    return 0 if not failures else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incremental sentence segmenter benchmark")
+    parser.add_argument('--answers', type=int, default=20)
+    parser.add_argument('--chars', type=int, default=12000)
+    parser.add_argument('--min-speedup', type=float, default=5.0)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    sys.exit(main(args))
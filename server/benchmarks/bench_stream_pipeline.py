@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк TTS конвейера StreamingWorkflowIntegration
+
+Фейковый LLM отдаёт предложения с задержкой, фейковый TTS отдаёт чанки
+с задержкой первого байта и задержкой на чанк. Для разных значений
+STREAM_TTS_CONCURRENCY измеряется время до последнего байта, проверяется
+порядок аудио по sentence_index и печатаются гистограммы стадий из
+трасс запросов (monitoring.tracing).
+
+Режим --slow-client имитирует медленного клиента и проверяет backpressure:
+LLM не должен убегать вперёд больше чем на размер очередей.
+
+Запуск (из каталога server):
+    python benchmarks/bench_stream_pipeline.py --sentences 8
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from integrations.workflow_integrations.streaming_workflow_integration import StreamingWorkflowIntegration
+from monitoring.tracing import TraceRecorder
+
+
+class FakeTextProcessor:
+    """LLM: одно предложение каждые llm_delay секунд, считает сколько отдано"""
+
+    is_initialized = True
+
+    def __init__(self, sentences: int, llm_delay: float):
+        self.sentences = sentences
+        self.llm_delay = llm_delay
+        self.produced = 0
+
+    async def process_text_streaming(self, text: str, image_data: bytes = None, hardware_id: str = None, memory_context=None):
+        for i in range(self.sentences):
+            await asyncio.sleep(self.llm_delay)
+            self.produced += 1
+            yield f"This is generated sentence number {i} of the answer."
+
+
+class FakeAudioProcessor:
+    """TTS: первый байт через first_byte, далее chunks чанков с chunk_delay"""
+
+    is_initialized = True
+
+    def __init__(self, first_byte: float, chunks: int, chunk_delay: float):
+        self.first_byte = first_byte
+        self.chunks = chunks
+        self.chunk_delay = chunk_delay
+
+    async def generate_speech_streaming(self, text: str):
+        await asyncio.sleep(self.first_byte)
+        for i in range(self.chunks):
+            if i:
+                await asyncio.sleep(self.chunk_delay)
+            yield f"{text}|{i}".encode('utf-8')
+
+
+# Стадии конвейера из трассы: отметки от начала запроса и спаны от готовности сегмента
+STAGES = ('llm.first_fragment', 'segment.ready', 'tts.first_byte', 'segment.sent')
+
+
+async def _run(args, concurrency: int, slow_client: float) -> dict:
+    os.environ["STREAM_TTS_CONCURRENCY"] = str(concurrency)
+    os.environ["STREAM_TTS_QUEUE_SIZE"] = str(args.queue_size)
+    os.environ["STREAM_AUDIO_BUFFER_CHUNKS"] = str(args.buffer_chunks)
+
+    text_processor = FakeTextProcessor(args.sentences, args.llm_ms / 1000)
+    workflow = StreamingWorkflowIntegration(
+        text_processor=text_processor,
+        audio_processor=FakeAudioProcessor(args.tts_first_byte_ms / 1000, args.chunks, args.chunk_ms / 1000),
+    )
+    await workflow.initialize()
+
+    recorder = TraceRecorder(enabled=True, jsonl_path="")
+    trace = recorder.start('bench', 'hw')
+    token = trace.activate()
+    order = []
+    max_ahead = 0
+    start = time.perf_counter()
+    try:
+        async for item in workflow.process_request_streaming({'session_id': 'bench', 'hardware_id': 'hw', 'text': 'q'}):
+            if not item.get('success'):
+                raise RuntimeError(item.get('error'))
+            if item.get('audio_chunk'):
+                order.append((item['sentence_index'], item['audio_chunk_index']))
+                # Насколько LLM опережает доставку аудио клиенту
+                max_ahead = max(max_ahead, text_processor.produced - item['sentence_index'])
+                if slow_client:
+                    await asyncio.sleep(slow_client)
+    finally:
+        trace.deactivate(token)
+    elapsed = time.perf_counter() - start
+    recorder.finish(trace)
+    stages_ms = recorder.get_stats()['stages_ms']
+
+    return {
+        'elapsed_ms': elapsed * 1000,
+        'in_order': order == sorted(order) and len(order) == args.sentences * args.chunks,
+        'max_ahead': max_ahead,
+        'stages': {name: stages_ms[name] for name in STAGES if name in stages_ms},
+    }
+
+
+async def main(args) -> int:
+    ok = True
+    print(
+        f"sentences={args.sentences} llm={args.llm_ms}ms tts_first_byte={args.tts_first_byte_ms}ms "
+        f"chunks={args.chunks}x{args.chunk_ms}ms queue={args.queue_size}"
+    )
+    for concurrency in args.concurrency:
+        res = await _run(args, concurrency, 0.0)
+        ok &= res['in_order']
+        stages = " ".join(
+            f"{name}=p50:{snap['p50_ms']:.0f}/p95:{snap['p95_ms']:.0f}"
+            for name, snap in res['stages'].items()
+        )
+        print(f"concurrency={concurrency}: last_byte={res['elapsed_ms']:7.1f}ms in_order={res['in_order']} {stages}")
+
+    # Медленный клиент: LLM не должен уходить вперёд дальше очередей + задач
+    res = await _run(args, max(args.concurrency), args.slow_client_ms / 1000)
+    limit = args.queue_size + max(args.concurrency) + 2
+    bounded = res['max_ahead'] <= limit
+    ok &= res['in_order'] and bounded
+    print(f"slow client: last_byte={res['elapsed_ms']:7.1f}ms max_llm_ahead={res['max_ahead']} (limit {limit}) in_order={res['in_order']}")
+
+    print("✅ PASS" if ok else "❌ FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Streaming TTS pipeline benchmark")
+    parser.add_argument('--sentences', type=int, default=8)
+    parser.add_argument('--llm-ms', type=float, default=40.0)
+    parser.add_argument('--tts-first-byte-ms', type=float, default=80.0)
+    parser.add_argument('--chunks', type=int, default=5)
+    parser.add_argument('--chunk-ms', type=float, default=20.0)
+    parser.add_argument('--queue-size', type=int, default=2)
+    parser.add_argument('--buffer-chunks', type=int, default=4)
+    parser.add_argument('--slow-client-ms', type=float, default=30.0)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    sys.exit(asyncio.run(main(args)))
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк кэша TextFilterManager на потоке фрагментов ответов LLM
+
+Каждый фрагмент ответа проходит clean_text, полные ответы -
+split_sentences (асинхронный API внешних вызовов). Поток воспроизводит ответы ассистента: служебные
+фразы ("Sure!", "Let me check that for you.", "Готово.") повторяются по
+закону Zipf, содержательные предложения почти всегда уникальны, а длинные
+ответы (код, списки) идут сплошным потоком разовых фрагментов.
+
+Сравниваются режимы кэша с одинаковым бюджетом байт:
+- без кэша;
+- lru - допускать всё;
+- tinylfu - допуск по частоте (разовые фрагменты не вымывают частые).
+
+Проверяется: результаты совпадают с вычисленными без кэша, объём не
+превышает бюджет, tinylfu даёт не меньший hit ratio, чем lru.
+
+clean/split по умолчанию не кэшируются (поиск в кэше дороже самой
+обработки), здесь они включены явно через cache_namespaces.
+
+Запуск (из каталога server):
+    python benchmarks/bench_text_filter_cache.py --answers 3000 --budget-kb 256
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from modules.text_filtering import TextFilterManager
+from modules.text_filtering.config import TextFilteringConfig
+
+# Частые фразы ассистента (открывающие, связки, завершающие)
+COMMON = (
+    "Sure!", "Of course.", "Let me check that for you.", "Here is what I found:",
+    "Give me a second.", "Done.", "Anything else?", "I hope this helps!",
+    "Here's a quick summary:", "Let me know if you need more details.",
+    "**Step 1:** Open the settings.", "**Step 2:** Click `Save`.", "That's it!",
+    "Конечно!", "Секунду, проверяю.", "Готово.", "Вот что я нашёл:", "Что-нибудь ещё?",
+    "Хорошо, давай посмотрим.", "Надеюсь, это поможет!", "Открываю браузер.",
+    "The weather today is sunny.", "You have no new messages.", "Your meeting starts in 10 minutes.",
+)
+SUBJECTS = ("The server", "Your file", "This function", "The meeting", "Сервер", "Файл", "Эта функция", "Встреча")
+VERBS = ("returns", "contains", "starts at", "points to", "возвращает", "содержит", "начинается в", "указывает на")
+OBJECTS = ("main.py", "v1.2.3", "port 8080", "the report", "`config.yaml`", "отчёт", "12:30", "192.168.1.1")
+
+
+def make_answer(rng: random.Random, common_weights: list) -> list:
+    """Ответ ассистента: фрагменты по предложениям"""
+    fragments = []
+    if rng.random() < 0.8:
+        fragments.append(rng.choices(COMMON, weights=common_weights)[0])
+    for _ in range(rng.randint(1, 4)):
+        if rng.random() < 0.35:
+            fragments.append(rng.choices(COMMON, weights=common_weights)[0])
+        else:
+            fragments.append(
+                f"{rng.choice(SUBJECTS)} {rng.choice(VERBS)} {rng.choice(OBJECTS)} "
+                f"#{rng.randint(0, 10 ** 6)}{rng.choice('.!?')}"
+            )
+    if rng.random() < 0.05:
+        # Длинный ответ: код/список - поток разовых фрагментов
+        fragments.extend(
+            f"{index}. `item_{rng.randint(0, 10 ** 9)}` -> value {rng.random():.6f};" for index in range(rng.randint(50, 200))
+        )
+    return fragments
+
+
+def make_manager(admission: str, budget: int, enabled: bool = True) -> TextFilterManager:
+    config = TextFilteringConfig()
+    performance = config.config["performance"]
+    performance["cache_enabled"] = enabled
+    performance["cache_admission"] = admission
+    performance["cache_max_bytes"] = budget
+    performance["cache_size"] = 100000
+    performance["cache_namespaces"] = ["clean", "split"]
+    return TextFilterManager(config)
+
+
+async def replay(manager: TextFilterManager, answers: list):
+    """Прогон потока; возвращает (результаты, секунды, пиковый объём кэша)"""
+    outputs = []
+    peak_bytes = 0
+    started = time.perf_counter()
+    for fragments in answers:
+        for fragment in fragments:
+            outputs.append((await manager.clean_text(fragment))["cleaned_text"])
+        outputs.append(tuple((await manager.split_sentences(" ".join(fragments)))["sentences"]))
+        if manager.cache is not None:
+            peak_bytes = max(peak_bytes, manager.cache.get_stats()["bytes"])
+    return outputs, time.perf_counter() - started, peak_bytes
+
+
+async def main(args) -> int:
+    failures = []
+    rng = random.Random(args.seed)
+    common_weights = [1 / (rank + 1) ** args.zipf for rank in range(len(COMMON))]
+    answers = [make_answer(rng, common_weights) for _ in range(args.answers)]
+    fragments = sum(len(answer) for answer in answers)
+    budget = args.budget_kb * 1024
+    print(f"answers={args.answers} fragments={fragments} budget={args.budget_kb}KB zipf={args.zipf}")
+
+    baseline = None
+    hit_ratios = {}
+    for mode in ("none", "lru", "tinylfu"):
+        # Лучшее время из нескольких прогонов, каждый - с пустым кэшем
+        elapsed = float('inf')
+        for _ in range(args.repeat):
+            manager = make_manager(mode if mode != "none" else "lru", budget, enabled=mode != "none")
+            await manager.initialize()
+            outputs, run_elapsed, peak_bytes = await replay(manager, answers)
+            elapsed = min(elapsed, run_elapsed)
+        statistics = manager.get_statistics()
+        cache_stats = statistics["cache_stats"]
+
+        if baseline is None:
+            baseline = outputs
+        elif outputs != baseline:
+            failures.append(f"{mode}: cached results differ from uncached")
+
+        per_fragment_us = elapsed / (fragments + len(answers)) * 1e6
+        if mode == "none":
+            print(f"  {mode:>8}: {per_fragment_us:6.2f}us/op")
+            continue
+        hit_ratios[mode] = statistics["cache_hit_rate"]
+        namespaces = " ".join(
+            f"{name}={stats['hit_ratio']:.1%}" for name, stats in cache_stats["namespaces"].items()
+            if stats["hits"] + stats["misses"]
+        )
+        print(f"  {mode:>8}: {per_fragment_us:6.2f}us/op | hit ratio {statistics['cache_hit_rate']:.1%} ({namespaces}) | "
+              f"entries={cache_stats['entries']} peak {peak_bytes / 1024:.0f}KB/{args.budget_kb}KB "
+              f"evictions={cache_stats['evictions']} rejected={cache_stats['rejected']}")
+        if peak_bytes > budget:
+            failures.append(f"{mode}: cache grew to {peak_bytes} bytes > budget {budget}")
+        if not cache_stats["hits"]:
+            failures.append(f"{mode}: no cache hits")
+
+    if hit_ratios["tinylfu"] < hit_ratios["lru"]:
+        failures.append(f"tinylfu hit ratio {hit_ratios['tinylfu']:.1%} < lru {hit_ratios['lru']:.1%}")
+
+    for failure in failures:
+        print(f"  ❌ {failure}")
+    print("✅ PASS" if not failures else "❌ FAIL")
+    return 0 if not failures else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TextFilterManager cache replay benchmark")
+    parser.add_argument('--answers', type=int, default=3000)
+    parser.add_argument('--budget-kb', type=int, default=256)
+    parser.add_argument('--zipf', type=float, default=1.0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=5)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    sys.exit(asyncio.run(main(args)))
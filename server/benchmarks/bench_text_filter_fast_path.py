@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк синхронного пути фильтрации текста для потокового ответа
+
+Каждый фрагмент ответа LLM очищается перед TTS. Прежний путь -
+await TextFilterManager.clean_text(text, options): корутина, словарь
+результата с success/operations, кэш и статистика провайдера. Быстрый путь -
+clean_text_fast(str) -> str и split_fast(str) -> (list, str) без корутин и
+словарей; асинхронный API остаётся для внешних вызовов.
+
+Проверяется, что быстрый путь возвращает то же, что асинхронный
+(cleaned_text, sentences/remainder), и сравнивается накладной расход на
+фрагмент внутри event loop (как в StreamingWorkflowIntegration).
+
+Запуск (из каталога server):
+    python benchmarks/bench_text_filter_fast_path.py --fragments 20000
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from modules.text_filtering import TextFilterManager
+from modules.text_filtering.config import TextFilteringConfig
+
+# Опции, с которыми _sanitize_for_tts вызывал clean_text
+TTS_OPTIONS = {
+    "remove_special_chars": True,
+    "remove_extra_whitespace": True,
+    "normalize_unicode": True,
+    "remove_control_chars": True
+}
+WORDS = (
+    "the", "server", "returns", "a", "**response**", "with", "`config`", "value", "and", "then",
+    "main.py", "v1.2.3", "user", "memory", "stream", "Привет", "мир", "ответ", "😀", "--flag",
+)
+ENDINGS = (".", ",", "!", "?", "", "")
+
+
+def make_fragments(rng: random.Random, count: int) -> list:
+    """Фрагменты ответа LLM по 2-12 слов"""
+    return [
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 12))) + rng.choice(ENDINGS)
+        + f" {rng.randint(0, 10 ** 6)}"
+        for _ in range(count)
+    ]
+
+
+def make_manager(cache_enabled: bool) -> TextFilterManager:
+    config = TextFilteringConfig()
+    config.config["performance"]["cache_enabled"] = cache_enabled
+    # По умолчанию clean/split не кэшируются - "cache on" включает их явно
+    config.config["performance"]["cache_namespaces"] = ["clean", "split"] if cache_enabled else []
+    return TextFilterManager(config)
+
+
+async def run_async_clean(manager: TextFilterManager, fragments: list) -> list:
+    output = []
+    for fragment in fragments:
+        result = await manager.clean_text(fragment, TTS_OPTIONS)
+        output.append(result["cleaned_text"].strip() if result.get("success") else fragment.strip())
+    return output
+
+
+async def run_fast_clean(manager: TextFilterManager, fragments: list) -> list:
+    return [manager.clean_text_fast(fragment) for fragment in fragments]
+
+
+async def run_async_split(manager: TextFilterManager, fragments: list) -> list:
+    output = []
+    for fragment in fragments:
+        result = await manager.split_sentences(fragment)
+        output.append((result["sentences"], result["remainder"]))
+    return output
+
+
+async def run_fast_split(manager: TextFilterManager, fragments: list) -> list:
+    return [manager.split_fast(fragment) for fragment in fragments]
+
+
+async def timed(runner, manager: TextFilterManager, fragments: list, repeat: int):
+    best = float('inf')
+    output = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        output = await runner(manager, fragments)
+        best = min(best, time.perf_counter() - started)
+    return output, best / len(fragments) * 1e6
+
+
+async def main(args) -> int:
+    failures = []
+    rng = random.Random(args.seed)
+    fragments = make_fragments(rng, args.fragments)
+    print(f"fragments={args.fragments}, best of {args.repeat}")
+
+    for cache_enabled in (False, True):
+        manager = make_manager(cache_enabled)
+        await manager.initialize()
+        label = "cache on " if cache_enabled else "cache off"
+        for name, slow, fast in (
+            ("clean", run_async_clean, run_fast_clean),
+            ("split", run_async_split, run_fast_split),
+        ):
+            expected, slow_us = await timed(slow, manager, fragments, args.repeat)
+            actual, fast_us = await timed(fast, manager, fragments, args.repeat)
+            mismatches = sum(1 for left, right in zip(expected, actual) if left != right)
+            speedup = slow_us / fast_us if fast_us else float('inf')
+            print(f"  {label} {name}: async {slow_us:6.2f}us/fragment, fast {fast_us:5.2f}us/fragment "
+                  f"(x{speedup:.1f}, overhead {slow_us - fast_us:5.2f}us) mismatches={mismatches}")
+            if mismatches:
+                failures.append(f"{label} {name}: {mismatches} fragments differ from the async API")
+            # Без кэша выигрыш - только корутина, словарь и статистика на фрагмент
+            min_speedup = args.min_speedup if cache_enabled else 1.1
+            if speedup < min_speedup:
+                failures.append(f"{label} {name}: speedup x{speedup:.1f} < x{min_speedup}")
+
+    for failure in failures:
+        print(f"  ❌ {failure}")
+    print("✅ PASS" if not failures else "❌ FAIL")
+    return 0 if not failures else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Text filtering synchronous fast path benchmark")
+    parser.add_argument('--fragments', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--min-speedup', type=float, default=1.5)
+    parser.add_argument('--seed', type=int, default=3)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    sys.exit(asyncio.run(main(args)))
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк задержки первого байта TTS на предложение (офлайн, на StubSynthesizer)
+
+Сравнивает два пути:
+- blob:   synthesize_text() -> одно аудио на предложение (как раньше)
+- stream: stream_text() + PcmFramer -> кадры по frame_ms по мере синтеза
+
+Для каждого предложения измеряется время до первого байта аудио
+и время до последнего байта.
+
+Запуск (из каталога server):
+    python benchmarks/bench_tts_first_byte.py --sentences 40 --frame-ms 40
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from modules.audio_generation.core.pcm_framer import PcmFramer
+from modules.audio_generation.providers.synthesizer_pool import SynthesizerPool, StubSynthesizer
+
+SENTENCES = [
+    "Sure, here is a quick summary of what is on your screen right now.",
+    "The window on the left shows your inbox with three unread messages.",
+    "The first one is from your manager and asks about the quarterly report.",
+    "Would you like me to read it out loud or draft a short reply?",
+]
+
+
+def _percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+async def _blob(pool: SynthesizerPool, text: str, framer: PcmFramer) -> tuple:
+    start = time.perf_counter()
+    result = await pool.synthesize_text(text)
+    first = time.perf_counter() - start
+    return first, first, len(result.audio_data)
+
+
+async def _stream(pool: SynthesizerPool, text: str, framer: PcmFramer) -> tuple:
+    start = time.perf_counter()
+    first = None
+    total = 0
+    async for piece in pool.stream_text(text):
+        for frame in framer.feed(piece):
+            if first is None:
+                first = time.perf_counter() - start
+            total += len(frame)
+    tail = framer.flush()
+    total += len(tail)
+    last = time.perf_counter() - start
+    return (first if first is not None else last), last, total
+
+
+async def _run(mode, pool: SynthesizerPool, sentences: int, frame_ms: int) -> dict:
+    firsts, lasts = [], []
+    total_bytes = 0
+    for i in range(sentences):
+        framer = PcmFramer(frame_ms=frame_ms)
+        first, last, size = await mode(pool, SENTENCES[i % len(SENTENCES)], framer)
+        firsts.append(first)
+        lasts.append(last)
+        total_bytes += size
+    return {
+        "p50_first_ms": _percentile(firsts, 0.5) * 1000,
+        "p95_first_ms": _percentile(firsts, 0.95) * 1000,
+        "p50_last_ms": _percentile(lasts, 0.5) * 1000,
+        "bytes": total_bytes,
+    }
+
+
+async def main(args) -> int:
+    stub_kwargs = {
+        "synthesis_delay": args.first_chunk_ms / 1000,
+        "per_char_delay": args.per_char_ms / 1000,
+        "chunk_ms": args.chunk_ms,
+    }
+    pool = SynthesizerPool(lambda: StubSynthesizer(**stub_kwargs), size=1, name="bench")
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, pool.start)
+    try:
+        blob = await _run(_blob, pool, args.sentences, args.frame_ms)
+        stream = await _run(_stream, pool, args.sentences, args.frame_ms)
+    finally:
+        await loop.run_in_executor(None, pool.shutdown)
+
+    print(
+        f"sentences={args.sentences} frame={args.frame_ms}ms "
+        f"first_chunk={args.first_chunk_ms}ms per_char={args.per_char_ms}ms"
+    )
+    for name, res in (("blob", blob), ("stream", stream)):
+        print(
+            f"{name:>6}: first_byte p50={res['p50_first_ms']:7.1f}ms p95={res['p95_first_ms']:7.1f}ms "
+            f"last_byte p50={res['p50_last_ms']:7.1f}ms bytes={res['bytes']}"
+        )
+    if blob["bytes"] != stream["bytes"]:
+        print("❌ FAIL: byte count mismatch between blob and stream paths")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TTS first-byte latency benchmark (blob vs stream)")
+    parser.add_argument('--sentences', type=int, default=40)
+    parser.add_argument('--frame-ms', type=int, default=40)
+    parser.add_argument('--first-chunk-ms', type=float, default=60.0)
+    parser.add_argument('--per-char-ms', type=float, default=4.0)
+    parser.add_argument('--chunk-ms', type=float, default=100.0)
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный бенчмарк пула синтезаторов (офлайн, на StubSynthesizer)
+
+Сравнивает два режима:
+- inline: синтез прямо в корутине (как раньше в AzureTTSProvider.process)
+- pool:   синтез через SynthesizerPool в рабочих потоках
+
+Для каждого режима измеряется общее время и задержка event loop
+(насколько опаздывает тикер с периодом 5 мс).
+
+Запуск (из каталога server):
+    python benchmarks/bench_tts_pool.py --requests 200 --pool-size 4
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from modules.audio_generation.providers.synthesizer_pool import (
+    SynthesizerPool,
+    SynthesisPoolBusyError,
+    StubSynthesizer,
+)
+
+SENTENCE = "This is a typical assistant sentence that goes to speech synthesis."
+TICK = 0.005
+
+
+async def _loop_lag_probe(stop: asyncio.Event, lags: list):
+    """Тикер: фиксирует опоздание пробуждения относительно периода"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + TICK
+        await asyncio.sleep(TICK)
+        lags.append(max(0.0, loop.time() - expected))
+
+
+async def _run_inline(requests: int, stub_kwargs: dict) -> dict:
+    synthesizer = StubSynthesizer(**stub_kwargs)
+
+    async def one():
+        # Блокирующий вызов внутри корутины
+        return synthesizer.speak_text_async(SENTENCE).get()
+
+    return await _measure(lambda: asyncio.gather(*(one() for _ in range(requests))))
+
+
+async def _run_pool(requests: int, pool_size: int, max_queue: int, stub_kwargs: dict) -> dict:
+    pool = SynthesizerPool(lambda: StubSynthesizer(**stub_kwargs), size=pool_size, max_queue=max_queue, name="bench")
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, pool.start)
+
+    async def one():
+        try:
+            return await pool.synthesize_text(SENTENCE)
+        except SynthesisPoolBusyError:
+            return None
+
+    try:
+        result = await _measure(lambda: asyncio.gather(*(one() for _ in range(requests))))
+        result["pool"] = pool.get_metrics()
+        return result
+    finally:
+        await loop.run_in_executor(None, pool.shutdown)
+
+
+async def _measure(factory) -> dict:
+    stop = asyncio.Event()
+    lags: list = []
+    probe = asyncio.create_task(_loop_lag_probe(stop, lags))
+    start = time.perf_counter()
+    results = await factory()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe
+    lags.sort()
+    return {
+        "elapsed_s": elapsed,
+        "completed": sum(1 for r in results if r is not None),
+        "max_loop_lag_ms": (lags[-1] * 1000) if lags else elapsed * 1000,
+        "p99_loop_lag_ms": (lags[int(len(lags) * 0.99) - 1] * 1000) if len(lags) > 1 else elapsed * 1000,
+    }
+
+
+async def main(args) -> int:
+    stub_kwargs = {"synthesis_delay": args.delay_ms / 1000, "per_char_delay": 0.0}
+
+    inline = await _run_inline(args.requests, stub_kwargs)
+    pooled = await _run_pool(args.requests, args.pool_size, args.max_queue, stub_kwargs)
+
+    print(f"requests={args.requests} synth_delay={args.delay_ms}ms pool_size={args.pool_size}")
+    for name, res in (("inline", inline), ("pool", pooled)):
+        print(
+            f"{name:>6}: elapsed={res['elapsed_s'] * 1000:8.1f}ms completed={res['completed']:4d} "
+            f"loop_lag max={res['max_loop_lag_ms']:7.1f}ms p99={res['p99_loop_lag_ms']:7.1f}ms"
+        )
+    pool_metrics = pooled["pool"]
+    print(
+        f"  pool metrics: max_queue_depth={pool_metrics['max_queue_depth']} rejected={pool_metrics['rejected']} "
+        f"avg_wait={pool_metrics['avg_wait_ms']:.1f}ms p95_wait={pool_metrics['p95_wait_ms']:.1f}ms "
+        f"avg_synthesis={pool_metrics['avg_synthesis_ms']:.1f}ms"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SynthesizerPool load benchmark")
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--pool-size', type=int, default=4)
+    parser.add_argument('--max-queue', type=int, default=256)
+    parser.add_argument('--delay-ms', type=float, default=20.0)
+    sys.exit(asyncio.run(main(parser.parse_args())))
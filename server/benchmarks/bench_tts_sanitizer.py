@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк очистки фрагментов ответа LLM перед синтезом речи
+
+Каждый фрагмент проходит TextCleaningProvider.clean_text (в потоковом пути -
+TextFilterManager.clean_text_fast, тот же TextSanitizer). Прежний путь -
+цепочка проходов (split/join, re.sub допустимых символов с компиляцией на
+каждом вызове, шесть re.sub markdown, NFKC, посимвольный фильтр
+управляющих символов). TextSanitizer делает то же самое за один
+вызов с заранее скомпилированными шаблонами.
+
+Проверяется:
+- золотой корпус и эталон прежнего пути - из tests/test_tts_sanitizer.py
+  (там же проверка байт в байт), здесь - на большем числе случайных
+  фрагментов для всех комбинаций флагов очистки;
+- стоимость одного фрагмента (мкс) по сценариям: английский текст,
+  русский текст, markdown/код.
+
+Запуск (из каталога server):
+    python benchmarks/bench_tts_sanitizer.py --fragments 20000
+"""
+
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from modules.text_filtering import TextSanitizer
+from modules.text_filtering.config import TextFilteringConfig
+from tests.test_tts_sanitizer import CONFIGS, GOLDEN, legacy_clean, random_text
+
+WORDS = {
+    "english": ("the", "server", "returns", "a", "response", "with", "value", "and", "then", "user",
+                "memory", "stream", "audio", "text", "config", "is", "ready", "today", "fast"),
+    "russian": ("сервер", "возвращает", "ответ", "с", "памятью", "и", "затем", "пользователь",
+                "поток", "аудио", "текст", "готов", "сегодня", "быстро", "ёлка"),
+    "markdown": ("**bold**", "*italic*", "`code`", "```python", "###", "__init__", "--flag", "==",
+                 "main.py", "v1.2.3", "x = 1", "a_b", "->", "•", "😀", "»", "1.", "-", "—"),
+}
+ENDINGS = (".", ",", "!", "?", ":", "", "\n")
+
+
+def make_fragments(rng: random.Random, kind: str, count: int) -> list:
+    """Фрагменты ответа LLM по 3-20 слов"""
+    words = WORDS[kind]
+    return [
+        " ".join(rng.choice(words) for _ in range(rng.randint(3, 20))) + rng.choice(ENDINGS)
+        for _ in range(count)
+    ]
+
+
+def check_equivalence(rng: random.Random, trials: int, failures: list):
+    mismatches = checked = 0
+    for config in CONFIGS:
+        sanitizer = TextSanitizer(config)
+        corpus = list(GOLDEN) + [random_text(rng) for _ in range(trials)]
+        for text in corpus:
+            checked += 1
+            if sanitizer.clean(text) != legacy_clean(text, config):
+                mismatches += 1
+                if mismatches <= 5:
+                    print(f"  mismatch {config}: {text!r}")
+    print(f"  equivalence: {len(CONFIGS)} configs, {checked} texts ({len(GOLDEN)} golden), mismatches={mismatches}")
+    if mismatches:
+        failures.append(f"{mismatches} texts cleaned differently from the legacy chain")
+
+
+def per_fragment_us(clean, fragments: list, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for fragment in fragments:
+            clean(fragment)
+        best = min(best, time.perf_counter() - started)
+    return best / len(fragments) * 1e6
+
+
+def main(args) -> int:
+    failures = []
+    rng = random.Random(args.seed)
+    check_equivalence(rng, args.trials, failures)
+
+    config = TextFilteringConfig().get_text_cleaning_config()
+    sanitizer = TextSanitizer(config)
+    print(f"fragments={args.fragments} per scenario, best of {args.repeat}")
+    for kind in WORDS:
+        fragments = make_fragments(rng, kind, args.fragments)
+        legacy_us = per_fragment_us(lambda text: legacy_clean(text, config), fragments, args.repeat)
+        sanitizer_us = per_fragment_us(sanitizer.clean, fragments, args.repeat)
+        speedup = legacy_us / sanitizer_us if sanitizer_us else float('inf')
+        avg_chars = sum(len(fragment) for fragment in fragments) / len(fragments)
+        print(f"  {kind:>9}: {avg_chars:5.0f} chars avg | legacy {legacy_us:6.2f}us/fragment, "
+              f"sanitizer {sanitizer_us:5.2f}us/fragment (x{speedup:.1f})")
+        # Markdown/код: удаление маркеров остаётся основной работой и в новом пути
+        min_speedup = args.min_speedup if kind != "markdown" else 1.5
+        if speedup < min_speedup:
+            failures.append(f"{kind}: speedup x{speedup:.1f} < x{min_speedup}")
+
+    for failure in failures:
+        print(f"  ❌ {failure}")
+    print("✅ PASS" if not failures else "❌ FAIL")
+    return 0 if not failures else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Single-pass TTS sanitizer benchmark")
+    parser.add_argument('--fragments', type=int, default=20000)
+    parser.add_argument('--trials', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--min-speedup', type=float, default=3.0)
+    parser.add_argument('--seed', type=int, default=11)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    sys.exit(main(args))
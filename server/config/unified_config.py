@@ -81,6 +81,15 @@ class AudioConfig:
     streaming_chunk_size: int = 4096
     streaming_enabled: bool = True
     
+    # Пул синтезаторов Azure TTS (синтез вне event loop)
+    tts_pool_size: int = 4
+    tts_pool_max_queue: int = 64
+    tts_synthesis_timeout: float = 30.0
+    
+    # Потоковый синтез: PCM кадры по tts_frame_ms вместо одного блока на предложение
+    tts_chunked_synthesis: bool = True
+    tts_frame_ms: int = 40
+    
     @classmethod
     def from_env(cls) -> 'AudioConfig':
         return cls(
@@ -98,7 +107,12 @@ class AudioConfig:
             azure_speech_volume=float(os.getenv('AZURE_SPEECH_VOLUME', '1.0')),
             azure_audio_format=os.getenv('AZURE_AUDIO_FORMAT', 'riff-48khz-16bit-mono-pcm'),
             streaming_chunk_size=int(os.getenv('STREAMING_CHUNK_SIZE', '4096')),
-            streaming_enabled=os.getenv('STREAMING_ENABLED', 'true').lower() == 'true'
+            streaming_enabled=os.getenv('STREAMING_ENABLED', 'true').lower() == 'true',
+            tts_pool_size=int(os.getenv('TTS_POOL_SIZE', '4')),
+            tts_pool_max_queue=int(os.getenv('TTS_POOL_MAX_QUEUE', '64')),
+            tts_synthesis_timeout=float(os.getenv('TTS_SYNTHESIS_TIMEOUT', '30.0')),
+            tts_chunked_synthesis=os.getenv('TTS_CHUNKED_SYNTHESIS', 'true').lower() == 'true',
+            tts_frame_ms=int(os.getenv('TTS_FRAME_MS', '40'))
         )
 
 @dataclass
@@ -149,12 +163,31 @@ class TextProcessingConfig:
     image_max_size: int = 10 * 1024 * 1024  # 10MB
     streaming_chunk_size: int = 8192
     
+    # Пул тёплых Live сессий (соединение не устанавливается на каждый запрос)
+    gemini_live_pool_enabled: bool = True
+    gemini_live_pool_min_size: int = 1
+    gemini_live_pool_max_size: int = 4
+    gemini_live_pool_idle_timeout: float = 120.0
+    gemini_live_pool_max_session_age: float = 540.0
+    gemini_live_pool_max_turns: int = 1
+    gemini_live_pool_acquire_timeout: float = 10.0
+    gemini_live_pool_health_interval: float = 30.0
+    
+    # Нормализация скриншотов (JPEG/WebP/PNG → уменьшенный JPEG)
+    screenshot_normalize_enabled: bool = True
+    screenshot_max_edge: int = 1568
+    screenshot_jpeg_quality: int = 80
+    screenshot_workers: int = 2
+    screenshot_cache_size: int = 256
     
     # Fallback настройки
     fallback_timeout: int = 30
     circuit_breaker_threshold: int = 3
     circuit_breaker_timeout: int = 300
     
+    # Бюджет токенов на блок памяти в промпте
+    context_max_tokens: int = 256
+    
     # Производительность
     max_concurrent_requests: int = 10
     request_timeout: int = 60
@@ -172,9 +205,23 @@ class TextProcessingConfig:
             image_mime_type=os.getenv('IMAGE_MIME_TYPE', 'image/jpeg'),
             image_max_size=int(os.getenv('IMAGE_MAX_SIZE', str(10 * 1024 * 1024))),
             streaming_chunk_size=int(os.getenv('STREAMING_CHUNK_SIZE', '8192')),
+            gemini_live_pool_enabled=os.getenv('GEMINI_LIVE_POOL_ENABLED', 'true').lower() == 'true',
+            gemini_live_pool_min_size=int(os.getenv('GEMINI_LIVE_POOL_MIN_SIZE', '1')),
+            gemini_live_pool_max_size=int(os.getenv('GEMINI_LIVE_POOL_MAX_SIZE', '4')),
+            gemini_live_pool_idle_timeout=float(os.getenv('GEMINI_LIVE_POOL_IDLE_TIMEOUT', '120')),
+            gemini_live_pool_max_session_age=float(os.getenv('GEMINI_LIVE_POOL_MAX_SESSION_AGE', '540')),
+            gemini_live_pool_max_turns=int(os.getenv('GEMINI_LIVE_POOL_MAX_TURNS', '1')),
+            gemini_live_pool_acquire_timeout=float(os.getenv('GEMINI_LIVE_POOL_ACQUIRE_TIMEOUT', '10')),
+            gemini_live_pool_health_interval=float(os.getenv('GEMINI_LIVE_POOL_HEALTH_INTERVAL', '30')),
+            screenshot_normalize_enabled=os.getenv('SCREENSHOT_NORMALIZE_ENABLED', 'true').lower() == 'true',
+            screenshot_max_edge=int(os.getenv('SCREENSHOT_MAX_EDGE', '1568')),
+            screenshot_jpeg_quality=int(os.getenv('SCREENSHOT_JPEG_QUALITY', '80')),
+            screenshot_workers=int(os.getenv('SCREENSHOT_WORKERS', '2')),
+            screenshot_cache_size=int(os.getenv('SCREENSHOT_CACHE_SIZE', '256')),
             fallback_timeout=int(os.getenv('FALLBACK_TIMEOUT', '30')),
             circuit_breaker_threshold=int(os.getenv('CIRCUIT_BREAKER_THRESHOLD', '3')),
             circuit_breaker_timeout=int(os.getenv('CIRCUIT_BREAKER_TIMEOUT', '300')),
+            context_max_tokens=int(os.getenv('CONTEXT_MAX_TOKENS', '256')),
             max_concurrent_requests=int(os.getenv('MAX_CONCURRENT_REQUESTS', '10')),
             request_timeout=int(os.getenv('REQUEST_TIMEOUT', '60'))
         )
@@ -189,6 +236,16 @@ class MemoryConfig:
     analysis_timeout: float = 5.0
     memory_analysis_model: str = "gemini-2.5-flash-lite"
     memory_analysis_temperature: float = 0.3
+    memory_cache_ttl: float = 300.0
+    memory_cache_max_entries: int = 1000
+    memory_cache_max_bytes: int = 16 * 1024 * 1024
+    memory_analysis_debounce: float = 3.0
+    memory_analysis_max_delay: float = 15.0
+    memory_analysis_max_turns: int = 8
+    memory_analysis_max_concurrent: int = 4
+    memory_analysis_max_pending: int = 1000
+    memory_context_short_facts: int = 5
+    memory_context_long_facts: int = 10
     
     @classmethod
     def from_env(cls) -> 'MemoryConfig':
@@ -199,7 +256,17 @@ class MemoryConfig:
             memory_timeout=float(os.getenv('MEMORY_TIMEOUT', '2.0')),
             analysis_timeout=float(os.getenv('ANALYSIS_TIMEOUT', '5.0')),
             memory_analysis_model=os.getenv('MEMORY_ANALYSIS_MODEL', 'gemini-2.5-flash-lite'),
-            memory_analysis_temperature=float(os.getenv('MEMORY_ANALYSIS_TEMPERATURE', '0.3'))
+            memory_analysis_temperature=float(os.getenv('MEMORY_ANALYSIS_TEMPERATURE', '0.3')),
+            memory_cache_ttl=float(os.getenv('MEMORY_CACHE_TTL', '300')),
+            memory_cache_max_entries=int(os.getenv('MEMORY_CACHE_MAX_ENTRIES', '1000')),
+            memory_cache_max_bytes=int(os.getenv('MEMORY_CACHE_MAX_BYTES', str(16 * 1024 * 1024))),
+            memory_analysis_debounce=float(os.getenv('MEMORY_ANALYSIS_DEBOUNCE', '3.0')),
+            memory_analysis_max_delay=float(os.getenv('MEMORY_ANALYSIS_MAX_DELAY', '15.0')),
+            memory_analysis_max_turns=int(os.getenv('MEMORY_ANALYSIS_MAX_TURNS', '8')),
+            memory_analysis_max_concurrent=int(os.getenv('MEMORY_ANALYSIS_MAX_CONCURRENT', '4')),
+            memory_analysis_max_pending=int(os.getenv('MEMORY_ANALYSIS_MAX_PENDING', '1000')),
+            memory_context_short_facts=int(os.getenv('MEMORY_CONTEXT_SHORT_FACTS', '5')),
+            memory_context_long_facts=int(os.getenv('MEMORY_CONTEXT_LONG_FACTS', '10'))
         )
 
 @dataclass
@@ -5,9 +5,13 @@ GrpcServiceIntegration - координирует все workflow интегра
 
 import asyncio
 import logging
+import time
 from typing import Dict, Any, AsyncGenerator, Optional
 from datetime import datetime
 
+from integrations.workflow_integrations.interrupt_workflow_integration import InterruptException
+from utils.request_trace import record_span, trace_span
+
 logger = logging.getLogger(__name__)
 
 
@@ -129,6 +133,10 @@ class GrpcServiceIntegration:
                         session_id
                     ):
                         yield item
+                except InterruptException as e:
+                    # Прерывание - не ошибка: повторная обработка в fallback снова отдала бы ответ
+                    logger.info(f"🛑 Обработка {session_id} прервана: {e}")
+                    return
                 except Exception as e:
                     logger.error(f"Ошибка в InterruptWorkflowIntegration: {e}")
                     # Fallback к прямой обработке
@@ -165,12 +173,7 @@ class GrpcServiceIntegration:
         try:
             logger.debug(f"Внутренняя обработка workflow для {session_id}")
             
-            # 1. Параллельно получаем контекст памяти (неблокирующее)
-            memory_context = None
-            if self.memory_workflow:
-                logger.debug("Получение контекста памяти параллельно")
-                memory_context = await self.memory_workflow.get_memory_context_parallel(hardware_id)
-            
+            # 1. Контекст памяти получает StreamingWorkflowIntegration (общий кэш MemoryManager)
             # 2. Обрабатываем через StreamingWorkflowIntegration
             collected_sentences: list[str] = []
             audio_delivered = False
@@ -179,6 +182,7 @@ class GrpcServiceIntegration:
 
             if self.streaming_workflow:
                 logger.debug("Обработка через StreamingWorkflowIntegration")
+                workflow_started = time.perf_counter()
                 async for result in self.streaming_workflow.process_request_streaming(request_data):
                     try:
                         has_audio = 'audio_chunk' in result and isinstance(result.get('audio_chunk'), (bytes, bytearray))
@@ -194,6 +198,7 @@ class GrpcServiceIntegration:
                     except Exception:
                         pass
                     yield result
+                record_span("workflow.stream", workflow_started, sentences=len(collected_sentences))
             else:
                 logger.warning("⚠️ StreamingWorkflowIntegration не доступен, возвращаем базовый ответ")
                 yield {
@@ -214,7 +219,8 @@ class GrpcServiceIntegration:
                 save_data['sentences'] = collected_sentences
                 
                 if save_data.get('prompt') and save_data.get('response'):
-                    await self.memory_workflow.save_to_memory_background(save_data)
+                    with trace_span("memory.save_enqueue"):
+                        await self.memory_workflow.save_to_memory_background(save_data)
                     logger.debug("✅ Фоновое сохранение в память запущено")
                 else:
                     logger.debug("⚠️ Фоновое сохранение пропущено: недостаточно данных (prompt/response)")
@@ -249,6 +255,7 @@ class GrpcServiceIntegration:
             
             if self.memory_workflow:
                 status['memory_workflow_initialized'] = getattr(self.memory_workflow, 'is_initialized', False)
+                status['memory_cache'] = self.memory_workflow.get_cache_stats()
             
             if self.interrupt_workflow:
                 status['interrupt_workflow_initialized'] = getattr(self.interrupt_workflow, 'is_initialized', False)
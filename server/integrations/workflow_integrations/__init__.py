@@ -2,12 +2,13 @@
 Workflow интеграции для управления потоками данных
 """
 
-from .streaming_workflow_integration import StreamingWorkflowIntegration
+from .streaming_workflow_integration import StreamingWorkflowIntegration, StreamPipelineContext
 from .memory_workflow_integration import MemoryWorkflowIntegration
 from .interrupt_workflow_integration import InterruptWorkflowIntegration
 
 __all__ = [
     'StreamingWorkflowIntegration',
+    'StreamPipelineContext',
     'MemoryWorkflowIntegration',
     'InterruptWorkflowIntegration'
 ]
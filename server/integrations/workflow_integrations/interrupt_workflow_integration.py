@@ -56,12 +56,13 @@ class InterruptWorkflowIntegration:
             logger.error(f"❌ Ошибка инициализации InterruptWorkflowIntegration: {e}")
             return False
     
-    async def check_interrupts(self, hardware_id: str) -> bool:
+    async def check_interrupts(self, hardware_id: str, epoch: Optional[int] = None) -> bool:
         """
         Проверка активных прерываний
         
         Args:
             hardware_id: Идентификатор оборудования
+            epoch: Эпоха прерываний на старте потока (None - недавнее прерывание)
             
         Returns:
             True если есть активные прерывания, False иначе
@@ -76,7 +77,7 @@ class InterruptWorkflowIntegration:
                 return False
             
             # Проверяем через InterruptManager
-            should_interrupt = self.interrupt_manager.should_interrupt(hardware_id)
+            should_interrupt = self.interrupt_manager.should_interrupt(hardware_id, epoch)
             
             if should_interrupt:
                 logger.info(f"🛑 Обнаружено прерывание для {hardware_id}")
@@ -124,10 +125,14 @@ class InterruptWorkflowIntegration:
             
             logger.debug(f"Выполнение workflow для {hardware_id}")
             
+            # Дальше поток прерывается только прерыванием, пришедшим после старта
+            manager = self.interrupt_manager
+            epoch = manager.interrupt_epoch(hardware_id) if manager else 0
+            
             # Выполняем основную функцию как async generator
             async for result in workflow_func():
-                # Проверяем прерывания перед каждым yield
-                if await self.check_interrupts(hardware_id):
+                # Проверяем прерывания перед каждым yield (один dict lookup)
+                if manager is not None and manager.is_interrupted(hardware_id, epoch):
                     logger.info(f"🛑 Прерывание обнаружено во время выполнения для {hardware_id}")
                     await self._cleanup_session(session_id)
                     raise InterruptException(f"Interrupted during processing for {hardware_id}")
@@ -135,7 +140,7 @@ class InterruptWorkflowIntegration:
                 yield result
             
             # Проверяем прерывания после завершения
-            if await self.check_interrupts(hardware_id):
+            if await self.check_interrupts(hardware_id, epoch):
                 logger.info(f"🛑 Прерывание обнаружено после выполнения для {hardware_id}")
                 await self._cleanup_session(session_id)
                 raise InterruptException(f"Interrupted after processing for {hardware_id}")
@@ -6,7 +6,7 @@ MemoryWorkflowIntegration - управляет памятью параллель
 import asyncio
 import logging
 from typing import Dict, Any, Optional
-from datetime import datetime, timedelta
+from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
@@ -25,8 +25,6 @@ class MemoryWorkflowIntegration:
         """
         self.memory_manager = memory_manager
         self.is_initialized = False
-        self.memory_cache = {}  # Кэш для быстрого доступа
-        self.cache_ttl = 300  # 5 минут TTL для кэша
         self.memory_fetch_timeout = 0.3  # Максимальное время ожидания памяти
         self.memory_update_timeout = 1.0  # Таймаут записи памяти
         self._memory_tasks = {}
@@ -57,12 +55,13 @@ class MemoryWorkflowIntegration:
             logger.error(f"❌ Ошибка инициализации MemoryWorkflowIntegration: {e}")
             return False
     
-    async def get_memory_context_parallel(self, hardware_id: str) -> Optional[Dict[str, Any]]:
+    async def get_memory_context_parallel(self, hardware_id: str, query: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """
         Асинхронное получение контекста памяти (неблокирующее)
         
         Args:
             hardware_id: Идентификатор оборудования
+            query: Текст запроса (релевантные ему факты идут первыми)
             
         Returns:
             Контекст памяти или None при ошибке
@@ -74,16 +73,16 @@ class MemoryWorkflowIntegration:
         try:
             logger.debug(f"Получение контекста памяти для {hardware_id}")
             
-            # Проверяем кэш
-            cached_context = self._get_cached_memory(hardware_id)
-            if cached_context:
-                logger.debug("✅ Используем кэшированный контекст памяти")
-                return cached_context
-            
             if not self.memory_manager or not hasattr(self.memory_manager, 'get_user_context'):
                 logger.debug("MemoryManager не доступен или не имеет метода get_user_context")
                 return None
 
+            # Проверяем общий кэш MemoryManager (при попадании get_user_context не идёт в БД)
+            cache = getattr(self.memory_manager, 'context_cache', None)
+            if cache is not None and cache.peek(hardware_id) is not None:
+                logger.debug("✅ Используем кэшированный контекст памяти")
+                return await self.memory_manager.get_user_context(hardware_id, query=query)
+
             # Если запрос уже выполняется, не создаём новый
             existing_task = self._memory_tasks.get(hardware_id)
             if existing_task and not existing_task.done():
@@ -91,7 +90,7 @@ class MemoryWorkflowIntegration:
                 return None
 
             logger.debug("Запускаем фоновой запрос контекста памяти")
-            task = asyncio.create_task(self._fetch_and_cache_memory(hardware_id))
+            task = asyncio.create_task(self._fetch_and_cache_memory(hardware_id, query))
             self._memory_tasks[hardware_id] = task
             task.add_done_callback(lambda _: self._memory_tasks.pop(hardware_id, None))
             return None
@@ -138,12 +137,13 @@ class MemoryWorkflowIntegration:
             logger.error(f"❌ Ошибка запуска фонового сохранения: {e}")
             return False
     
-    async def _fetch_memory_context(self, hardware_id: str) -> Optional[Dict[str, Any]]:
+    async def _fetch_memory_context(self, hardware_id: str, query: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """
         Получение контекста памяти из MemoryManager
         
         Args:
             hardware_id: Идентификатор оборудования
+            query: Текст запроса для ранжирования фактов
             
         Returns:
             Контекст памяти
@@ -153,7 +153,7 @@ class MemoryWorkflowIntegration:
                 return None
             
             memory_context = await asyncio.wait_for(
-                self.memory_manager.get_user_context(hardware_id),
+                self.memory_manager.get_user_context(hardware_id, query=query),
                 timeout=self.memory_fetch_timeout
             )
             
@@ -230,17 +230,17 @@ class MemoryWorkflowIntegration:
             logger.warning(f"⚠️ Ошибка подготовки данных для памяти: {e}")
             return data
 
-    async def _fetch_and_cache_memory(self, hardware_id: str):
-        """Фоновое получение памяти с кэшированием и таймаутом."""
+    async def _fetch_and_cache_memory(self, hardware_id: str, query: Optional[str] = None):
+        """Фоновое получение памяти (кэширует MemoryManager.context_cache) с таймаутом."""
         if not self.memory_manager:
             return None
         try:
+            # shield: по таймауту перестаём ждать, но загрузка в кэш доходит до конца
             memory_context = await asyncio.wait_for(
-                self.memory_manager.get_user_context(hardware_id),
+                asyncio.shield(self.memory_manager.get_user_context(hardware_id, query=query)),
                 timeout=self.memory_fetch_timeout
             )
             if memory_context:
-                self._cache_memory(hardware_id, memory_context)
                 logger.debug(
                     "✅ Фоново получен контекст памяти: %s элементов",
                     len(memory_context) if isinstance(memory_context, dict) else "unknown"
@@ -276,66 +276,16 @@ class MemoryWorkflowIntegration:
         except Exception as e:
             logger.warning("⚠️ Ошибка прогрева MemoryManager: %s", e)
     
-    def _get_cached_memory(self, hardware_id: str) -> Optional[Dict[str, Any]]:
-        """
-        Получение кэшированного контекста памяти
-        
-        Args:
-            hardware_id: Идентификатор оборудования
-            
-        Returns:
-            Кэшированный контекст или None
-        """
-        try:
-            if hardware_id not in self.memory_cache:
-                return None
-            
-            cache_entry = self.memory_cache[hardware_id]
-            cache_time = cache_entry.get('timestamp')
-            
-            # Проверяем TTL
-            if cache_time:
-                cache_age = datetime.now() - cache_time
-                if cache_age > timedelta(seconds=self.cache_ttl):
-                    # Кэш устарел, удаляем
-                    del self.memory_cache[hardware_id]
-                    logger.debug(f"Кэш памяти для {hardware_id} устарел и удален")
-                    return None
-            
-            logger.debug(f"Используем кэшированную память для {hardware_id}")
-            return cache_entry.get('context')
-            
-        except Exception as e:
-            logger.warning(f"⚠️ Ошибка получения кэшированной памяти: {e}")
-            return None
-    
-    def _cache_memory(self, hardware_id: str, memory_context: Dict[str, Any]):
-        """
-        Кэширование контекста памяти
-        
-        Args:
-            hardware_id: Идентификатор оборудования
-            memory_context: Контекст памяти
-        """
-        try:
-            self.memory_cache[hardware_id] = {
-                'context': memory_context,
-                'timestamp': datetime.now()
-            }
-            
-            logger.debug(f"Контекст памяти для {hardware_id} закэширован")
-            
-        except Exception as e:
-            logger.warning(f"⚠️ Ошибка кэширования памяти: {e}")
+    def get_cache_stats(self) -> Optional[Dict[str, Any]]:
+        """Счётчики общего кэша памяти (hit/miss/eviction)"""
+        cache = getattr(self.memory_manager, 'context_cache', None)
+        return cache.get_stats() if cache is not None else None
     
     async def cleanup(self):
         """Очистка ресурсов"""
         try:
             logger.info("Очистка MemoryWorkflowIntegration...")
             
-            # Очищаем кэш
-            self.memory_cache.clear()
-            
             self.is_initialized = False
             logger.info("✅ MemoryWorkflowIntegration очищен")
             
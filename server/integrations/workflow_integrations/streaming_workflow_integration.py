@@ -3,14 +3,87 @@
 StreamingWorkflowIntegration - управляет потоком: текст → аудио → клиент
 """
 
+import asyncio
 import logging
 import os
+import time
 from typing import Dict, Any, AsyncGenerator, Optional
 from datetime import datetime
 
+from utils.request_trace import record_span, trace_mark, trace_span
+
 logger = logging.getLogger(__name__)
 
 
+class StreamPipelineContext:
+    """
+    Состояние одного запроса StreamAudio: буферы сегментации, дедупликация и счётчики.
+
+    Создаётся заново на каждый вызов process_request_streaming, поэтому
+    параллельные сессии не разделяют буферы общего StreamingWorkflowIntegration.
+    """
+
+    __slots__ = (
+        'session_id',
+        'hardware_id',
+        'segmenter',
+        'pending_segment',
+        'has_emitted',
+        'processed_fragments',
+        'emitted_hashes',
+        'captured_segments',
+        'input_sentence_counter',
+        'emitted_segment_counter',
+        'total_audio_chunks',
+        'total_audio_bytes',
+        'sentence_audio_map',
+        'started_at',
+        'segment_started_at',
+    )
+
+    def __init__(self, session_id: str = 'unknown', hardware_id: str = 'unknown', segmenter=None):
+        self.session_id = session_id
+        self.hardware_id = hardware_id
+        self.started_at: float = time.perf_counter()
+        # Сегментация: SentenceSegmenter держит незавершённый хвост ответа между фрагментами
+        self.segmenter = segmenter
+        self.pending_segment: str = ""
+        self.has_emitted: bool = False
+        # Дедупликация: входные фрагменты и готовые сегменты учитываются раздельно,
+        # иначе фрагмент, пришедший целым предложением, отбрасывается как собственный дубль
+        self.processed_fragments: set = set()
+        self.emitted_hashes: set = set()
+        # Результаты и счётчики
+        self.captured_segments: list[str] = []
+        self.input_sentence_counter: int = 0
+        self.emitted_segment_counter: int = 0
+        self.total_audio_chunks: int = 0
+        self.total_audio_bytes: int = 0
+        self.sentence_audio_map: dict[int, int] = {}
+        # Приход первого фрагмента текущего сегмента (время буферизации до готовности)
+        self.segment_started_at: Optional[float] = None
+
+
+class _SegmentJob:
+    """
+    Сегмент в TTS конвейере: текст, очередь его аудио чанков и отметки времени.
+
+    Очередь chunks ограничена - если клиент читает медленно, TTS задача
+    блокируется на put(), и давление доходит до чтения ответа LLM.
+    """
+
+    __slots__ = ('sentence_index', 'text', 'tts_text', 'label', 'chunks', 'ready_at', 'first_byte_at')
+
+    def __init__(self, sentence_index: int, text: str, tts_text: str, label: str, buffer_chunks: int):
+        self.sentence_index = sentence_index
+        self.text = text
+        self.tts_text = tts_text
+        self.label = label
+        self.chunks: asyncio.Queue = asyncio.Queue(maxsize=buffer_chunks)
+        self.ready_at: float = time.perf_counter()
+        self.first_byte_at: Optional[float] = None
+
+
 class StreamingWorkflowIntegration:
     """
     Управляет потоком обработки: получение текста → обработка → генерация аудио → стриминг клиенту
@@ -32,11 +105,8 @@ class StreamingWorkflowIntegration:
         self.text_filter_manager = text_filter_manager
         self.is_initialized = False
         
-        # Единая неблокирующая буферизация и критерии флашинга (для текста и TTS одновременно)
-        self._stream_buffer: str = ""
-        self._has_emitted: bool = False
-        self._pending_segment: str = ""
-        self._processed_sentences: set = set()  # Для дедупликации
+        # Критерии флашинга (для текста и TTS одновременно).
+        # Состояние буферизации хранится в StreamPipelineContext отдельно для каждого запроса.
         # Централизованные пороги (STREAM_*), с бэквард-фоллбеком на TTS_* (уменьшены для естественного воспроизведения)
         self.stream_min_chars: int = int(os.getenv("STREAM_MIN_CHARS", os.getenv("TTS_MIN_CHARS", "15")))
         self.stream_min_words: int = int(os.getenv("STREAM_MIN_WORDS", os.getenv("TTS_MIN_WORDS", "3")))
@@ -45,6 +115,14 @@ class StreamingWorkflowIntegration:
         self.sentence_joiner: str = " "
         self.end_punctuations = ('.', '!', '?')
         
+        # TTS конвейер: синтез предложения N+1 идёт параллельно отправке предложения N
+        self.stream_tts_concurrency: int = max(1, int(os.getenv("STREAM_TTS_CONCURRENCY", "2")))
+        self.stream_tts_queue_size: int = max(1, int(os.getenv("STREAM_TTS_QUEUE_SIZE", "4")))
+        self.stream_audio_buffer_chunks: int = max(1, int(os.getenv("STREAM_AUDIO_BUFFER_CHUNKS", "64")))
+        # Задержки по стадиям пишутся в трассу запроса (monitoring.tracing, /metrics):
+        # llm.first_fragment, segment.ready - отметки от начала запроса;
+        # tts.first_byte, segment.sent - спаны от готовности сегмента
+        
         logger.info("StreamingWorkflowIntegration создан")
     
     async def initialize(self) -> bool:
@@ -92,7 +170,7 @@ class StreamingWorkflowIntegration:
         session_id = request_data.get('session_id', 'unknown')
         try:
             logger.info(f"🔄 Начало обработки запроса: {session_id}")
-            logger.info(f"→ Input text len={len(request_data.get('text','') or '')}, has_screenshot={bool(request_data.get('screenshot'))}")
+            logger.info(f"→ Input text len={len(request_data.get('text','') or '')}, has_screenshot={bool(request_data.get('screenshot_data') or request_data.get('screenshot'))}")
             logger.info(f"→ Input text content: '{request_data.get('text', '')[:100]}...'")
 
             logger.info("🔍 ДИАГНОСТИКА МОДУЛЕЙ:")
@@ -104,176 +182,218 @@ class StreamingWorkflowIntegration:
                 logger.info(f"   → audio_processor.is_initialized: {getattr(self.audio_processor, 'is_initialized', 'NO_ATTR')}")
 
             hardware_id = request_data.get('hardware_id', 'unknown')
-            memory_context = await self._get_memory_context_parallel(hardware_id)
-
-            # Сбрасываем состояние перед новой сессией,
-            # иначе остатки из предыдущей обработки вызывают дублирование чанков
-            self._stream_buffer = ""
-            self._pending_segment = ""
-            self._has_emitted = False
-            self._processed_sentences.clear()
-
-            captured_segments: list[str] = []
-            input_sentence_counter = 0
-            emitted_segment_counter = 0
-            total_audio_chunks = 0
-            total_audio_bytes = 0
-            sentence_audio_map: dict[int, int] = {}
+            with trace_span("memory.context"):
+                memory_context = await self._get_memory_context_parallel(hardware_id, request_data.get('text'))
+
+            # Состояние буферизации живёт в контексте запроса, а не на экземпляре:
+            # GrpcServiceManager отдаёт один StreamingWorkflowIntegration всем StreamAudio
+            ctx = StreamPipelineContext(session_id=session_id, hardware_id=hardware_id, segmenter=self._create_segmenter())
+
+            # Конвейер: сегментация (producer) → TTS задачи → упорядоченная отдача клиенту
+            order_queue: asyncio.Queue = asyncio.Queue()
+            tts_queue: asyncio.Queue = asyncio.Queue(maxsize=self.stream_tts_queue_size)
+            producer = asyncio.create_task(
+                self._produce_segments(ctx, request_data, memory_context, order_queue, tts_queue)
+            )
+            workers = [
+                asyncio.create_task(self._tts_worker(tts_queue))
+                for _ in range(self.stream_tts_concurrency)
+            ]
+            try:
+                while True:
+                    job = await order_queue.get()
+                    if job is None:
+                        break
+                    async for item in self._deliver_segment(ctx, job):
+                        yield item
+                # Пробрасываем ошибку сегментации, если она была
+                await producer
+            finally:
+                producer.cancel()
+                for worker in workers:
+                    worker.cancel()
+                # Дожидаемся отмены: Live/TTS ресурсы освобождены до выхода (и до освобождения слота admission)
+                await asyncio.gather(producer, *workers, return_exceptions=True)
+
+            full_text = " ".join(ctx.captured_segments).strip()
+
+            logger.info(
+                f"✅ Запрос обработан успешно: segments={ctx.emitted_segment_counter}, audio_chunks={ctx.total_audio_chunks}, total_bytes={ctx.total_audio_bytes}"
+            )
+            yield {
+                'success': True,
+                'text_full_response': full_text,
+                'sentences_processed': ctx.emitted_segment_counter,
+                'audio_chunks_processed': ctx.total_audio_chunks,
+                'audio_bytes_processed': ctx.total_audio_bytes,
+                'sentence_audio_map': ctx.sentence_audio_map,
+                'is_final': True
+            }
 
+        except Exception as e:
+            logger.error(f"❌ Ошибка обработки запроса {session_id}: {e}")
+            yield {
+                'success': False,
+                'error': str(e),
+                'text_response': '',
+            }
+
+    def _is_ready_to_emit(self, ctx: "StreamPipelineContext", candidate: str) -> bool:
+        """Проверка порогов флашинга для агрегированного сегмента"""
+        words_count = self._count_meaningful_words(candidate)
+        if not ctx.has_emitted:
+            return words_count >= self.stream_first_sentence_min_words or len(candidate) >= self.stream_min_chars
+        return words_count >= self.stream_min_words or len(candidate) >= self.stream_min_chars
+
+    async def _produce_segments(
+        self,
+        ctx: "StreamPipelineContext",
+        request_data: Dict[str, Any],
+        memory_context: Optional[Dict[str, Any]],
+        order_queue: asyncio.Queue,
+        tts_queue: asyncio.Queue
+    ):
+        """Сегментация ответа LLM: готовые сегменты уходят в TTS очередь и в очередь порядка"""
+        llm_started = time.perf_counter()
+        try:
             async for sentence in self._iter_processed_sentences(
                 request_data.get('text', ''),
-                request_data.get('screenshot'),
-                memory_context
+                self._resolve_screenshot(request_data),
+                memory_context,
+                ctx.hardware_id
             ):
-                input_sentence_counter += 1
-                logger.info(f"📝 In sentence #{input_sentence_counter}: '{sentence[:120]}{'...' if len(sentence) > 120 else ''}' (len={len(sentence)})")
+                ctx.input_sentence_counter += 1
+                if ctx.input_sentence_counter == 1:
+                    trace_mark("llm.first_fragment")
+                logger.info(f"📝 In sentence #{ctx.input_sentence_counter}: '{sentence[:120]}{'...' if len(sentence) > 120 else ''}' (len={len(sentence)})")
 
                 # Единая буферизация: накапливаем, извлекаем завершенные предложения, агрегируем короткие
-                sanitized = await self._sanitize_for_tts(sentence)
-                if sanitized:
-                    # Дедупликация только на уровне очищенного текста (более мягкая)
-                    sanitized_hash = hash(sanitized.strip())
-                    if sanitized_hash in self._processed_sentences:
-                        logger.debug(f"🔄 Пропускаем дублированный очищенный текст: '{sanitized[:50]}...'")
-                        continue
-                    self._processed_sentences.add(sanitized_hash)
-                    
-                    self._stream_buffer = (f"{self._stream_buffer}{self.sentence_joiner}{sanitized}" if self._stream_buffer else sanitized)
-
-                complete_sentences, remainder = await self._split_complete_sentences(self._stream_buffer)
-                self._stream_buffer = remainder
-
-                for complete in complete_sentences:
+                sanitized = self._sanitize_for_tts(sentence)
+                if not sanitized:
+                    continue
+                # Дедупликация только на уровне очищенного текста (более мягкая)
+                sanitized_hash = hash(sanitized.strip())
+                if sanitized_hash in ctx.processed_fragments:
+                    logger.debug(f"🔄 Пропускаем дублированный очищенный текст: '{sanitized[:50]}...'")
+                    continue
+                ctx.processed_fragments.add(sanitized_hash)
+                if ctx.segment_started_at is None:
+                    ctx.segment_started_at = time.perf_counter()
+
+                for complete in self._feed_segmenter(ctx, sanitized):
                     # Агрегируем короткие завершенные предложения до порогов
-                    candidate = complete if not self._pending_segment else f"{self._pending_segment}{self.sentence_joiner}{complete}"
-                    words_count = await self._count_meaningful_words(candidate)
-                    if (not self._has_emitted and (words_count >= self.stream_first_sentence_min_words or len(candidate) >= self.stream_min_chars)) or \
-                       (self._has_emitted and (words_count >= self.stream_min_words or len(candidate) >= self.stream_min_chars)):
+                    candidate = complete if not ctx.pending_segment else f"{ctx.pending_segment}{self.sentence_joiner}{complete}"
+                    if self._is_ready_to_emit(ctx, candidate):
                         # Дедупликация финальных сегментов (только для очень коротких повторений)
                         to_emit = candidate.strip()
                         if len(to_emit) > 10:  # Только для длинных текстов применяем дедупликацию
                             complete_hash = hash(to_emit)
-                            if complete_hash in self._processed_sentences:
+                            if complete_hash in ctx.emitted_hashes:
                                 logger.debug(f"🔄 Пропускаем дублированный финальный сегмент: '{to_emit[:50]}...'")
                                 continue
-                            self._processed_sentences.add(complete_hash)
+                            ctx.emitted_hashes.add(complete_hash)
                         
-                        # Готов к эмиссии
-                        emitted_segment_counter += 1
-                        self._pending_segment = ""
-                        self._has_emitted = True
-
-                        # Текст
-                        captured_segments.append(to_emit)
-                        yield {
-                            'success': True,
-                            'text_response': to_emit,
-                            'sentence_index': emitted_segment_counter
-                        }
-
-                        # Аудио (гарантируем завершающую пунктуацию для TTS)
-                        tts_text = to_emit if to_emit.endswith(self.end_punctuations) else f"{to_emit}."
-                        sentence_audio_chunks = 0
-                        async for audio_chunk in self._stream_audio_for_sentence(tts_text, emitted_segment_counter):
-                            if not audio_chunk:
-                                continue
-                            sentence_audio_chunks += 1
-                            total_audio_chunks += 1
-                            total_audio_bytes += len(audio_chunk)
-                            yield {
-                                'success': True,
-                                'audio_chunk': audio_chunk,
-                                'sentence_index': emitted_segment_counter,
-                                'audio_chunk_index': sentence_audio_chunks
-                            }
-
-                        sentence_audio_map[emitted_segment_counter] = sentence_audio_chunks
-                        logger.info(
-                            f"🎧 Segment #{emitted_segment_counter} → audio_chunks={sentence_audio_chunks}, total_audio_chunks={total_audio_chunks}, total_bytes={total_audio_bytes}"
-                        )
+                        await self._enqueue_segment(ctx, to_emit, "Segment", order_queue, tts_queue)
                     else:
                         # Продолжаем копить
-                        self._pending_segment = candidate
-
-            # Финальный флаш: сначала обработаем завершенные предложения из буфера
-            if self._stream_buffer:
-                complete_sentences, remainder = await self._split_complete_sentences(self._stream_buffer)
-                self._stream_buffer = remainder
-                for complete in complete_sentences:
-                    candidate = complete if not self._pending_segment else f"{self._pending_segment}{self.sentence_joiner}{complete}"
-                    words_count = await self._count_meaningful_words(candidate)
-                    if (not self._has_emitted and (words_count >= self.stream_first_sentence_min_words or len(candidate) >= self.stream_min_chars)) or \
-                       (self._has_emitted and (words_count >= self.stream_min_words or len(candidate) >= self.stream_min_chars)):
-                        emitted_segment_counter += 1
-                        to_emit = candidate.strip()
-                        self._pending_segment = ""
-                        self._has_emitted = True
-                        captured_segments.append(to_emit)
-                        yield {'success': True, 'text_response': to_emit, 'sentence_index': emitted_segment_counter}
-                        tts_text = to_emit if to_emit.endswith(self.end_punctuations) else f"{to_emit}."
-                        sentence_audio_chunks = 0
-                        async for audio_chunk in self._stream_audio_for_sentence(tts_text, emitted_segment_counter):
-                            if not audio_chunk:
-                                continue
-                            sentence_audio_chunks += 1
-                            total_audio_chunks += 1
-                            total_audio_bytes += len(audio_chunk)
-                            yield {'success': True, 'audio_chunk': audio_chunk, 'sentence_index': emitted_segment_counter, 'audio_chunk_index': sentence_audio_chunks}
-                        sentence_audio_map[emitted_segment_counter] = sentence_audio_chunks
-                        logger.info(f"🎧 Final segment #{emitted_segment_counter} → audio_chunks={sentence_audio_chunks}, total_audio_chunks={total_audio_chunks}, total_bytes={total_audio_bytes}")
-                    else:
-                        self._pending_segment = candidate
+                        ctx.pending_segment = candidate
 
             # Если остался незавершенный агрегат, можно форс-флаш, если очень длинный
             force_max = int(os.getenv("STREAM_FORCE_FLUSH_MAX_CHARS", "0") or 0)
-            if self._pending_segment and force_max > 0 and len(self._pending_segment) >= force_max:
-                emitted_segment_counter += 1
-                to_emit = self._pending_segment
-                self._pending_segment = ""
-                self._has_emitted = True
-                captured_segments.append(to_emit)
-                yield {'success': True, 'text_response': to_emit, 'sentence_index': emitted_segment_counter}
-                tts_text = to_emit if to_emit.endswith(self.end_punctuations) else f"{to_emit}."
-                sentence_audio_chunks = 0
-                async for audio_chunk in self._stream_audio_for_sentence(tts_text, emitted_segment_counter):
+            if ctx.pending_segment and force_max > 0 and len(ctx.pending_segment) >= force_max:
+                await self._enqueue_segment(ctx, ctx.pending_segment, "Forced final segment", order_queue, tts_queue)
+            record_span("llm.stream", llm_started, fragments=ctx.input_sentence_counter, segments=ctx.emitted_segment_counter)
+        finally:
+            # Конец потока сегментов (в т.ч. при ошибке - её пробросит await producer)
+            order_queue.put_nowait(None)
+
+    async def _enqueue_segment(
+        self,
+        ctx: "StreamPipelineContext",
+        to_emit: str,
+        label: str,
+        order_queue: asyncio.Queue,
+        tts_queue: asyncio.Queue
+    ):
+        """Регистрация готового сегмента: нумерация, очередь порядка и TTS очередь"""
+        ctx.emitted_segment_counter += 1
+        ctx.pending_segment = ""
+        ctx.has_emitted = True
+        ctx.captured_segments.append(to_emit)
+
+        # Аудио (гарантируем завершающую пунктуацию для TTS)
+        tts_text = to_emit if to_emit.endswith(self.end_punctuations) else f"{to_emit}."
+        job = _SegmentJob(ctx.emitted_segment_counter, to_emit, tts_text, label, self.stream_audio_buffer_chunks)
+        trace_mark("segment.ready", segment=ctx.emitted_segment_counter)
+        record_span("segment.buffer", ctx.segment_started_at or job.ready_at,
+                    segment=ctx.emitted_segment_counter, chars=len(to_emit))
+        ctx.segment_started_at = None
+
+        order_queue.put_nowait(job)
+        # Ограниченная очередь: при отставании TTS/клиента сегментация ждёт здесь
+        await tts_queue.put(job)
+
+    async def _tts_worker(self, tts_queue: asyncio.Queue):
+        """TTS задача конвейера: синтезирует сегменты из очереди в их буферы чанков"""
+        while True:
+            job: _SegmentJob = await tts_queue.get()
+            tts_started = time.perf_counter()
+            record_span("tts.queue_wait", job.ready_at, segment=job.sentence_index)
+            chunks = 0
+            try:
+                async for audio_chunk in self._stream_audio_for_sentence(job.tts_text, job.sentence_index):
                     if not audio_chunk:
                         continue
-                    sentence_audio_chunks += 1
-                    total_audio_chunks += 1
-                    total_audio_bytes += len(audio_chunk)
-                    yield {'success': True, 'audio_chunk': audio_chunk, 'sentence_index': emitted_segment_counter, 'audio_chunk_index': sentence_audio_chunks}
-                sentence_audio_map[emitted_segment_counter] = sentence_audio_chunks
-                logger.info(f"🎧 Forced final segment #{emitted_segment_counter} → audio_chunks={sentence_audio_chunks}, total_audio_chunks={total_audio_chunks}, total_bytes={total_audio_bytes}")
-
-            full_text = " ".join(captured_segments).strip()
-
-            logger.info(
-                f"✅ Запрос обработан успешно: segments={emitted_segment_counter}, audio_chunks={total_audio_chunks}, total_bytes={total_audio_bytes}"
-            )
+                    if job.first_byte_at is None:
+                        job.first_byte_at = time.perf_counter()
+                        record_span("tts.first_byte", job.ready_at, segment=job.sentence_index)
+                    chunks += 1
+                    await job.chunks.put(audio_chunk)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Ошибка TTS задачи для сегмента #{job.sentence_index}: {e}")
+            record_span("tts.segment", tts_started, segment=job.sentence_index, chunks=chunks,
+                        first_byte_ms=round((job.first_byte_at - tts_started) * 1000, 3) if job.first_byte_at else None)
+            await job.chunks.put(None)
+
+    async def _deliver_segment(self, ctx: "StreamPipelineContext", job: _SegmentJob) -> AsyncGenerator[Dict[str, Any], None]:
+        """Отдача сегмента клиенту по порядку sentence_index: сначала текст, затем аудио чанки"""
+        sentence_index = job.sentence_index
+        yield {
+            'success': True,
+            'text_response': job.text,
+            'sentence_index': sentence_index
+        }
+
+        sentence_audio_chunks = 0
+        while True:
+            audio_chunk = await job.chunks.get()
+            if audio_chunk is None:
+                break
+            sentence_audio_chunks += 1
+            ctx.total_audio_chunks += 1
+            ctx.total_audio_bytes += len(audio_chunk)
             yield {
                 'success': True,
-                'text_full_response': full_text,
-                'sentences_processed': emitted_segment_counter,
-                'audio_chunks_processed': total_audio_chunks,
-                'audio_bytes_processed': total_audio_bytes,
-                'sentence_audio_map': sentence_audio_map,
-                'is_final': True
+                'audio_chunk': audio_chunk,
+                'sentence_index': sentence_index,
+                'audio_chunk_index': sentence_audio_chunks
             }
 
-        except Exception as e:
-            logger.error(f"❌ Ошибка обработки запроса {session_id}: {e}")
-            yield {
-                'success': False,
-                'error': str(e),
-                'text_response': '',
-            }
+        record_span("segment.sent", job.ready_at, segment=sentence_index, chunks=sentence_audio_chunks)
+        ctx.sentence_audio_map[sentence_index] = sentence_audio_chunks
+        logger.info(
+            f"🎧 {job.label} #{sentence_index} → audio_chunks={sentence_audio_chunks}, total_audio_chunks={ctx.total_audio_chunks}, total_bytes={ctx.total_audio_bytes}"
+        )
 
-    async def _get_memory_context_parallel(self, hardware_id: str) -> Optional[Dict[str, Any]]:
+    async def _get_memory_context_parallel(self, hardware_id: str, query: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """
         Неблокирующее получение контекста памяти
         
         Args:
             hardware_id: Идентификатор оборудования
+            query: Текст запроса (для выбора релевантных фактов)
         """
         try:
             if not self.memory_workflow:
@@ -281,7 +401,7 @@ class StreamingWorkflowIntegration:
                 return None
             
             logger.debug(f"Получение контекста памяти для {hardware_id}")
-            memory_context = await self.memory_workflow.get_memory_context_parallel(hardware_id)
+            memory_context = await self.memory_workflow.get_memory_context_parallel(hardware_id, query)
             
             if memory_context:
                 logger.debug(f"✅ Получен контекст памяти: {len(memory_context)} элементов")
@@ -294,30 +414,46 @@ class StreamingWorkflowIntegration:
             logger.warning(f"⚠️ Ошибка получения контекста памяти: {e}")
             return None
 
+    def _resolve_screenshot(self, request_data: Dict[str, Any]) -> Optional[bytes]:
+        """
+        Байты скриншота из запроса
+        
+        screenshot_data (сырые байты от новых клиентов) передаётся как есть, без копий;
+        screenshot (base64 строка от старых клиентов) декодируется один раз.
+        """
+        screenshot_data = request_data.get('screenshot_data')
+        if screenshot_data:
+            logger.info(f"📸 Скриншот получен байтами: {len(screenshot_data)} bytes")
+            return screenshot_data
+
+        screenshot = request_data.get('screenshot')
+        if not screenshot:
+            return None
+        import base64
+        try:
+            decoded = base64.b64decode(screenshot)
+            logger.info(f"📸 Скриншот декодирован из base64: {len(decoded)} bytes")
+            return decoded
+        except Exception as decode_error:
+            logger.warning(f"⚠️ Не удалось декодировать скриншот: {decode_error}")
+            return None
+
     async def _iter_processed_sentences(
         self,
         text: str,
-        screenshot: Optional[str],
-        memory_context: Optional[Dict[str, Any]]
+        screenshot_data: Optional[bytes],
+        memory_context: Optional[Dict[str, Any]],
+        hardware_id: Optional[str] = None
     ) -> AsyncGenerator[str, None]:
         """Стримингово возвращает предложения с учётом памяти и скриншота."""
-        enriched_text = self._enrich_with_memory(text, memory_context)
-
-        screenshot_data: Optional[bytes] = None
-        if screenshot:
-            import base64
-            try:
-                screenshot_data = base64.b64decode(screenshot)
-                logger.info(f"📸 Скриншот декодирован: {len(screenshot_data)} bytes")
-            except Exception as decode_error:
-                logger.warning(f"⚠️ Не удалось декодировать скриншот: {decode_error}")
-                screenshot_data = None
-
         yielded_any = False
         if self.text_processor and hasattr(self.text_processor, 'process_text_streaming'):
-            logger.info(f"🔄 Стриминг текста через TextProcessor: '{enriched_text[:80]}...'")
+            logger.info(f"🔄 Стриминг текста через TextProcessor: '{text[:80]}...'")
             try:
-                async for processed_sentence in self.text_processor.process_text_streaming(enriched_text, screenshot_data):
+                # Память добавляет TextProcessor (ContextAssembler, в пределах бюджета токенов)
+                async for processed_sentence in self.text_processor.process_text_streaming(
+                    text, screenshot_data, hardware_id=hardware_id, memory_context=memory_context
+                ):
                     sentence = (processed_sentence or '').strip()
                     if sentence:
                         yielded_any = True
@@ -328,51 +464,50 @@ class StreamingWorkflowIntegration:
 
         if not yielded_any:
             logger.debug("⚠️ TextProcessor не вернул предложений, используем fallback разбивку")
-            for fallback_sentence in self._split_into_sentences(enriched_text):
+            for fallback_sentence in self._split_into_sentences(text):
                 if fallback_sentence:
                     yield fallback_sentence
 
-    async def _sanitize_for_tts(self, text: str) -> str:
+    def _sanitize_for_tts(self, text: str) -> str:
         """
         Очистка текста для синтеза речи через модуль фильтрации
+        (синхронный путь без корутины и словаря результата на каждый фрагмент)
         """
         if not text:
             return ""
 
-        if self.text_filter_manager:
+        if self.text_filter_manager and hasattr(self.text_filter_manager, 'clean_text_fast'):
             try:
-                result = await self.text_filter_manager.clean_text(text, {
-                    "remove_special_chars": True,
-                    "remove_extra_whitespace": True,
-                    "normalize_unicode": True,
-                    "remove_control_chars": True
-                })
-                if result.get("success") and result.get("cleaned_text") is not None:
-                    return result.get("cleaned_text", "").strip()
+                return self.text_filter_manager.clean_text_fast(text)
             except Exception as err:
                 logger.warning("⚠️ Ошибка очистки текста через TextFilterManager: %s", err)
 
         return text.strip()
 
-    async def _split_complete_sentences(self, text: str) -> tuple[list[str], str]:
+    def _create_segmenter(self):
+        """Инкрементальный разбиватель на предложения для одного ответа (None - без модуля фильтрации)"""
+        if self.text_filter_manager and hasattr(self.text_filter_manager, 'create_segmenter'):
+            try:
+                return self.text_filter_manager.create_segmenter(self.sentence_joiner)
+            except Exception as err:
+                logger.warning("⚠️ Ошибка создания SentenceSegmenter: %s", err)
+        return None
+
+    def _feed_segmenter(self, ctx: "StreamPipelineContext", fragment: str) -> list[str]:
         """
-        Разбиение текста на предложения через модуль фильтрации
+        Завершённые предложения после очередного фрагмента ответа.
+        Незавершённый хвост остаётся в сегментаторе и повторно не сканируется.
         """
-        if not text:
-            return [], ""
-
-        if self.text_filter_manager:
+        if ctx.segmenter is not None:
             try:
-                result = await self.text_filter_manager.split_sentences(text)
-                if result.get("success"):
-                    return result.get("sentences", []), result.get("remainder", "")
+                return ctx.segmenter.feed(fragment)
             except Exception as err:
-                logger.warning("⚠️ Ошибка разбиения текста через TextFilterManager: %s", err)
+                logger.warning("⚠️ Ошибка разбиения текста через SentenceSegmenter: %s", err)
 
-        stripped = text.strip()
-        return ([stripped] if stripped else [], "")
+        stripped = fragment.strip()
+        return [stripped] if stripped else []
 
-    async def _count_meaningful_words(self, text: str) -> int:
+    def _count_meaningful_words(self, text: str) -> int:
         """
         Подсчёт значимых слов через модуль фильтрации
         """
@@ -387,28 +522,6 @@ class StreamingWorkflowIntegration:
 
         return len([w for w in text.split() if w.strip()])
 
-    def _enrich_with_memory(self, text: str, memory_context: Optional[Dict[str, Any]]) -> str:
-        """
-        Объединение текста с контекстом памяти
-        
-        Args:
-            text: Исходный текст
-            memory_context: Контекст памяти
-        """
-        if not memory_context:
-            return text
-        
-        try:
-            memory_info = memory_context.get('recent_context', '') if memory_context else ''
-            if memory_info:
-                enriched_text = f"Контекст: {memory_info}\n\n{text}"
-                logger.debug("Текст обогащен контекстом памяти")
-                return enriched_text
-            return text
-        except Exception as e:
-            logger.warning(f"⚠️ Ошибка обогащения текста памятью: {e}")
-            return text
-
     async def _stream_audio_for_sentence(self, sentence: str, sentence_index: int) -> AsyncGenerator[bytes, None]:
         """Стримит аудио чанки для одного предложения."""
         if not sentence.strip():
@@ -460,6 +573,19 @@ class StreamingWorkflowIntegration:
             logger.warning(f"⚠️ Ошибка разбивки текста: {e}")
             return [text]  # Возвращаем весь текст как одно предложение
     
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Метрики конвейера: настройки (задержки по стадиям - в трассах запросов)
+        
+        Returns:
+            Словарь с метриками
+        """
+        return {
+            'tts_concurrency': self.stream_tts_concurrency,
+            'tts_queue_size': self.stream_tts_queue_size,
+            'audio_buffer_chunks': self.stream_audio_buffer_chunks,
+        }
+    
     async def cleanup(self):
         """Очистка ресурсов"""
         try:
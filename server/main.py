@@ -2,6 +2,7 @@ import asyncio
 import logging
 from aiohttp import web
 from modules.grpc_service.core.grpc_server import run_server as serve
+from monitoring import OPENMETRICS_CONTENT_TYPE, render_metrics
 from dotenv import load_dotenv
 
 # 🚀 Тест автоматического деплоя - 30 сентября 2025
@@ -41,11 +42,16 @@ async def status_handler(request):
         "endpoints": {
             "health": "/health",
             "status": "/status",
+            "metrics": "/metrics",
             "grpc": "port 50051",
             "updates": "port 8081" if UPDATE_SERVER_AVAILABLE else "disabled"
         }
     })
 
+async def metrics_handler(request):
+    """Метрики в формате OpenMetrics (Prometheus); текст кэшируется на METRICS_CACHE_TTL"""
+    return web.Response(body=render_metrics(), headers={"Content-Type": OPENMETRICS_CONTENT_TYPE})
+
 async def main():
     """Запуск HTTP, gRPC и Update серверов одновременно"""
     logger.info("🚀 Запуск Voice Assistant Server с системой обновлений...")                               
@@ -55,6 +61,7 @@ async def main():
     app.router.add_get('/health', health_handler)
     app.router.add_get('/', root_handler)
     app.router.add_get('/status', status_handler)
+    app.router.add_get('/metrics', metrics_handler)
     
     # Запускаем HTTP сервер на порту 8080
     runner = web.AppRunner(app)
@@ -65,6 +72,7 @@ async def main():
     logger.info("✅ HTTP сервер запущен на порту 8080")
     logger.info("   - Health check: http://localhost:8080/health")
     logger.info("   - Status: http://localhost:8080/status")
+    logger.info("   - Metrics: http://localhost:8080/metrics")
     logger.info("   - Root: http://localhost:8080/")
     
     # Запускаем сервер обновлений на порту 8081
@@ -45,6 +45,13 @@ class AudioGenerationConfig:
         self.streaming_chunk_size = self.config.get('streaming_chunk_size', unified_config.audio.streaming_chunk_size)
         self.streaming_enabled = self.config.get('streaming_enabled', unified_config.audio.streaming_enabled)
         
+        # Настройки пула синтезаторов
+        self.tts_pool_size = self.config.get('tts_pool_size', unified_config.audio.tts_pool_size)
+        self.tts_pool_max_queue = self.config.get('tts_pool_max_queue', unified_config.audio.tts_pool_max_queue)
+        self.tts_synthesis_timeout = self.config.get('tts_synthesis_timeout', unified_config.audio.tts_synthesis_timeout)
+        self.tts_chunked_synthesis = self.config.get('tts_chunked_synthesis', unified_config.audio.tts_chunked_synthesis)
+        self.tts_frame_ms = self.config.get('tts_frame_ms', unified_config.audio.tts_frame_ms)
+        
         # Настройки логирования
         self.log_level = self.config.get('log_level', unified_config.logging.level)
         self.log_requests = self.config.get('log_requests', unified_config.logging.log_requests)
@@ -70,7 +77,12 @@ class AudioGenerationConfig:
             'channels': self.channels,
             'bits_per_sample': self.bits_per_sample,
             'timeout': self.request_timeout,
-            'connection_timeout': self.connection_timeout
+            'connection_timeout': self.connection_timeout,
+            'pool_size': self.tts_pool_size,
+            'pool_max_queue': self.tts_pool_max_queue,
+            'synthesis_timeout': self.tts_synthesis_timeout,
+            'chunked_synthesis': self.tts_chunked_synthesis,
+            'frame_ms': self.tts_frame_ms
         }
     
     def get_streaming_config(self) -> Dict[str, Any]:
@@ -85,7 +97,9 @@ class AudioGenerationConfig:
             'enabled': self.streaming_enabled,
             'sample_rate': self.sample_rate,
             'channels': self.channels,
-            'bits_per_sample': self.bits_per_sample
+            'bits_per_sample': self.bits_per_sample,
+            'chunked_synthesis': self.tts_chunked_synthesis,
+            'frame_ms': self.tts_frame_ms
         }
     
     def validate(self) -> bool:
@@ -138,6 +152,14 @@ class AudioGenerationConfig:
             print("❌ streaming_chunk_size должен быть положительным")
             return False
             
+        if self.tts_pool_size <= 0:
+            print("❌ tts_pool_size должен быть положительным")
+            return False
+            
+        if not (10 <= self.tts_frame_ms <= 200):
+            print("❌ tts_frame_ms должен быть между 10 и 200")
+            return False
+            
         return True
     
     def get_status(self) -> Dict[str, Any]:
@@ -164,6 +186,11 @@ class AudioGenerationConfig:
             'connection_timeout': self.connection_timeout,
             'streaming_chunk_size': self.streaming_chunk_size,
             'streaming_enabled': self.streaming_enabled,
+            'tts_pool_size': self.tts_pool_size,
+            'tts_pool_max_queue': self.tts_pool_max_queue,
+            'tts_synthesis_timeout': self.tts_synthesis_timeout,
+            'tts_chunked_synthesis': self.tts_chunked_synthesis,
+            'tts_frame_ms': self.tts_frame_ms,
             'log_level': self.log_level,
             'log_requests': self.log_requests,
             'log_responses': self.log_responses
@@ -122,12 +122,18 @@ class AudioProcessor:
                     yield chunk
                 return
             
-            # Потоковая генерация через провайдер
-            async for audio_chunk in self.provider.process(text):
+            # Потоковая генерация через провайдер: кадры по мере синтеза
+            # или (chunked_synthesis выключен) одно аудио на предложение
+            if self.provider.chunked_synthesis:
+                source = self.provider.process_streaming(text)
+            else:
+                source = self.provider.process(text)
+            
+            async for audio_chunk in source:
                 if not audio_chunk:
                     continue
-                logger.info(
-                    "AudioProcessor → emit sentence audio bytes=%s", len(audio_chunk)
+                logger.debug(
+                    "AudioProcessor → emit audio chunk bytes=%s", len(audio_chunk)
                 )
                 yield audio_chunk
                 
@@ -0,0 +1,54 @@
+"""
+Нарезка потока PCM на кадры фиксированной длительности
+"""
+
+from typing import List
+
+
+class PcmFramer:
+    """
+    Собирает произвольные куски PCM в кадры фиксированного размера
+
+    Azure отдаёт аудио кусками разной длины; клиенту удобнее получать
+    равные кадры (например 20-40 мс), чтобы воспроизведение начиналось
+    сразу и буфер джиттера был предсказуемым.
+    """
+
+    def __init__(self, sample_rate: int = 48000, channels: int = 1,
+                 bits_per_sample: int = 16, frame_ms: int = 40):
+        """
+        Args:
+            sample_rate: Частота дискретизации
+            channels: Количество каналов
+            bits_per_sample: Разрядность сэмпла
+            frame_ms: Длительность одного кадра (мс)
+        """
+        bytes_per_sample = max(1, bits_per_sample // 8) * max(1, channels)
+        samples_per_frame = max(1, int(sample_rate * frame_ms / 1000))
+        self.frame_ms = frame_ms
+        self.frame_bytes = samples_per_frame * bytes_per_sample
+        self._buffer = bytearray()
+
+    def feed(self, data: bytes) -> List[bytes]:
+        """Добавляет кусок PCM и возвращает готовые полные кадры"""
+        if not data:
+            return []
+        self._buffer += data
+        frame_bytes = self.frame_bytes
+        ready = len(self._buffer) // frame_bytes
+        if not ready:
+            return []
+        cut = ready * frame_bytes
+        chunk = bytes(self._buffer[:cut])
+        del self._buffer[:cut]
+        return [chunk[i:i + frame_bytes] for i in range(0, cut, frame_bytes)]
+
+    def flush(self) -> bytes:
+        """Возвращает остаток (неполный последний кадр)"""
+        tail = bytes(self._buffer)
+        self._buffer.clear()
+        return tail
+
+    @property
+    def pending_bytes(self) -> int:
+        return len(self._buffer)
@@ -2,9 +2,15 @@
 Azure TTS Provider для генерации речи
 """
 
+import asyncio
 import logging
+import time
+from collections import deque
 from typing import AsyncGenerator, Dict, Any, Optional
 from integrations.core.universal_provider_interface import UniversalProviderInterface
+from modules.audio_generation.core.pcm_framer import PcmFramer
+from modules.audio_generation.providers.synthesizer_pool import SynthesizerPool
+from utils.request_trace import record_span
 
 logger = logging.getLogger(__name__)
 
@@ -56,10 +62,20 @@ class AzureTTSProvider(UniversalProviderInterface):
         # Таймауты
         self.timeout = config.get('timeout', 60)
         self.connection_timeout = config.get('connection_timeout', 30)
+        self.synthesis_timeout = config.get('synthesis_timeout', 30.0)
         
-        # Speech config и synthesizer
+        # Пул синтезаторов: каждый SpeechSynthesizer закреплён за своим потоком
+        self.pool_size = config.get('pool_size', 4)
+        self.pool_max_queue = config.get('pool_max_queue', 64)
+        
+        # Потоковый синтез: кадры фиксированной длительности по мере готовности
+        self.chunked_synthesis = config.get('chunked_synthesis', True)
+        self.frame_ms = config.get('frame_ms', 40)
+        self.first_chunk_times = deque(maxlen=1000)
+        
+        # Speech config и пул синтезаторов
         self.speech_config = None
-        self.synthesizer = None
+        self.synthesizer_pool: Optional[SynthesizerPool] = None
         
         self.is_available = AZURE_SPEECH_AVAILABLE and bool(self.speech_key and self.speech_region)
         
@@ -91,11 +107,18 @@ class AzureTTSProvider(UniversalProviderInterface):
                 speechsdk.SpeechSynthesisOutputFormat.Raw48Khz16BitMonoPcm
             )
             
-            # Создаем synthesizer
-            self.synthesizer = speechsdk.SpeechSynthesizer(
-                speech_config=self.speech_config,
-                audio_config=None  # Используем встроенный аудио конфиг
+            # Создаем пул синтезаторов (создание и синтез выполняются в рабочих потоках)
+            self.synthesizer_pool = SynthesizerPool(
+                synthesizer_factory=self._create_synthesizer,
+                size=self.pool_size,
+                max_queue=self.pool_max_queue,
+                default_timeout=self.synthesis_timeout,
+                name="azure-tts"
             )
+            loop = asyncio.get_running_loop()
+            if not await loop.run_in_executor(None, self.synthesizer_pool.start):
+                logger.error("Azure TTS Provider failed to start synthesizer pool")
+                return False
             
             # Тестируем подключение
             test_result = await self._test_connection()
@@ -123,13 +146,15 @@ class AzureTTSProvider(UniversalProviderInterface):
             Chunks аудио данных
         """
         try:
-            if not self.is_initialized or not self.synthesizer:
+            if not self.is_initialized or not self.synthesizer_pool:
                 raise Exception("Azure TTS Provider not initialized")
             
-            # Используем простой текст вместо SSML для избежания ошибок парсинга
-            # result = self.synthesizer.speak_ssml_async(ssml).get()
+            # Используем простой текст вместо SSML для избежания ошибок парсинга.
+            # Синтез выполняется в потоке пула, event loop не блокируется.
             logger.info(f"🔍 AzureTTS: synthesizing text='{input_data[:50]}...'")
-            result = self.synthesizer.speak_text_async(input_data).get()
+            started = time.perf_counter()
+            result = await self.synthesizer_pool.synthesize_text(input_data)
+            record_span("azure_tts.synthesize", started, chars=len(input_data), streaming=False)
             logger.info(f"🔍 AzureTTS: result.reason={result.reason}")
             
             if result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
@@ -162,6 +187,75 @@ class AzureTTSProvider(UniversalProviderInterface):
             logger.error(f"Azure TTS Provider processing error: {e}")
             raise e
     
+    async def process_streaming(self, input_data: str) -> AsyncGenerator[bytes, None]:
+        """
+        Потоковый синтез: PCM кадры по frame_ms по мере поступления от Azure
+        
+        Аудио берётся из события `synthesizing`, поэтому первый кадр уходит
+        клиенту до окончания синтеза всего предложения.
+        
+        Args:
+            input_data: Текст для преобразования в речь
+            
+        Yields:
+            PCM кадры фиксированного размера (последний может быть короче)
+        """
+        try:
+            if not self.is_initialized or not self.synthesizer_pool:
+                raise Exception("Azure TTS Provider not initialized")
+            
+            logger.info(f"🔍 AzureTTS: streaming text='{input_data[:50]}...'")
+            framer = PcmFramer(
+                sample_rate=self.sample_rate or 48000,
+                channels=self.channels or 1,
+                bits_per_sample=self.bits_per_sample or 16,
+                frame_ms=self.frame_ms
+            )
+            started = time.perf_counter()
+            total_bytes = 0
+            frames = 0
+            
+            async for piece in self.synthesizer_pool.stream_text(input_data, on_result=self._check_result):
+                for frame in framer.feed(piece):
+                    if frames == 0:
+                        self.first_chunk_times.append(time.perf_counter() - started)
+                        record_span("azure_tts.first_chunk", started, chars=len(input_data))
+                    frames += 1
+                    total_bytes += len(frame)
+                    yield frame
+            
+            tail = framer.flush()
+            if tail:
+                if frames == 0:
+                    self.first_chunk_times.append(time.perf_counter() - started)
+                    record_span("azure_tts.first_chunk", started, chars=len(input_data))
+                frames += 1
+                total_bytes += len(tail)
+                yield tail
+            record_span("azure_tts.synthesize", started, chars=len(input_data), frames=frames, bytes=total_bytes)
+            
+            if total_bytes == 0:
+                logger.error("❌ AzureTTS: audio_data is empty")
+                raise Exception("No audio data generated")
+            
+            logger.info(
+                "AzureTTS → total bytes=%s, frames=%s (frame=%sms)",
+                total_bytes, frames, self.frame_ms,
+            )
+            
+        except Exception as e:
+            logger.error(f"Azure TTS Provider streaming error: {e}")
+            raise e
+    
+    def _check_result(self, result):
+        """Проверка итогового результата синтеза (бросает исключение при ошибке)"""
+        if result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
+            return
+        if result.reason == speechsdk.ResultReason.Canceled:
+            cancellation_details = result.cancellation_details
+            raise Exception(f"Synthesis canceled: {cancellation_details.reason} - {cancellation_details.error_details}")
+        raise Exception(f"Synthesis failed with reason: {result.reason}")
+    
     async def cleanup(self) -> bool:
         """
         Очистка ресурсов Azure TTS провайдера
@@ -170,8 +264,10 @@ class AzureTTSProvider(UniversalProviderInterface):
             True если очистка успешна, False иначе
         """
         try:
-            if self.synthesizer:
-                self.synthesizer = None
+            if self.synthesizer_pool:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, self.synthesizer_pool.shutdown)
+                self.synthesizer_pool = None
             if self.speech_config:
                 self.speech_config = None
                 
@@ -183,6 +279,18 @@ class AzureTTSProvider(UniversalProviderInterface):
             logger.error(f"Error cleaning up Azure TTS Provider: {e}")
             return False
     
+    def _create_synthesizer(self):
+        """
+        Фабрика SpeechSynthesizer для пула (вызывается в рабочем потоке)
+        
+        Returns:
+            Новый экземпляр SpeechSynthesizer
+        """
+        return speechsdk.SpeechSynthesizer(
+            speech_config=self.speech_config,
+            audio_config=None  # Используем встроенный аудио конфиг
+        )
+    
     def _create_ssml(self, text: str) -> str:
         """
         Создание SSML для синтеза речи
@@ -217,12 +325,12 @@ class AzureTTSProvider(UniversalProviderInterface):
             True если подключение работает, False иначе
         """
         try:
-            if not self.synthesizer:
+            if not self.synthesizer_pool:
                 return False
             
             # Простой тестовый синтез
             test_text = "Hello, this is a test."
-            result = self.synthesizer.speak_text_async(test_text).get()
+            result = await self.synthesizer_pool.synthesize_text(test_text, timeout=self.connection_timeout)
             
             return result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted
             
@@ -238,7 +346,7 @@ class AzureTTSProvider(UniversalProviderInterface):
             True если провайдер здоров, False иначе
         """
         try:
-            if not self.is_available or not self.synthesizer:
+            if not self.is_available or not self.synthesizer_pool:
                 return False
             
             # Простая проверка - тестовый синтез
@@ -294,7 +402,11 @@ class AzureTTSProvider(UniversalProviderInterface):
             "audio_format": self.audio_format,
             "is_available": self.is_available,
             "speech_key_set": bool(self.speech_key),
-            "speech_region_set": bool(self.speech_region)
+            "speech_region_set": bool(self.speech_region),
+            "synthesizer_pool": self.synthesizer_pool.get_metrics() if self.synthesizer_pool else None,
+            "chunked_synthesis": self.chunked_synthesis,
+            "frame_ms": self.frame_ms,
+            "avg_first_chunk_ms": (sum(self.first_chunk_times) / len(self.first_chunk_times) * 1000) if self.first_chunk_times else 0.0
         })
         
         return base_metrics
@@ -0,0 +1,440 @@
+"""
+Пул синтезаторов речи с выделенными рабочими потоками
+
+Azure Speech SDK синхронный (`speak_text_async(...).get()` блокирует поток),
+поэтому каждый SpeechSynthesizer закреплён за своим рабочим потоком,
+а корутины получают результат через asyncio future с таймаутом.
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional
+
+from utils.cancel_scope import register_cancel_handle
+
+logger = logging.getLogger(__name__)
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    """Перцентиль по отсортированному списку"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(q * len(sorted_values)))
+    return sorted_values[index]
+
+
+class SynthesisPoolBusyError(Exception):
+    """Очередь пула синтеза заполнена"""
+    pass
+
+
+class _SynthesisJob:
+    """Задание синтеза: функция над синтезатором + future вызывающей корутины"""
+
+    __slots__ = ('fn', 'loop', 'future', 'enqueued_at', 'started_at', 'cancelled', 'synthesizer')
+
+    def __init__(self, fn: Callable[[Any], Any], loop: asyncio.AbstractEventLoop, future: asyncio.Future):
+        self.fn = fn
+        self.loop = loop
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+        self.started_at: Optional[float] = None
+        self.cancelled = False
+        self.synthesizer = None
+
+    def resolve(self, result: Any):
+        self._deliver(self._set_result, result)
+
+    def reject(self, error: BaseException):
+        self._deliver(self._set_exception, error)
+
+    def _deliver(self, callback: Callable[[Any], None], value: Any):
+        try:
+            self.loop.call_soon_threadsafe(callback, value)
+        except RuntimeError:
+            # Event loop уже закрыт - результат никому не нужен
+            pass
+
+    def _set_result(self, result: Any):
+        if not self.future.done():
+            self.future.set_result(result)
+
+    def _set_exception(self, error: BaseException):
+        if not self.future.done():
+            self.future.set_exception(error)
+
+
+class SynthesizerPool:
+    """
+    Ограниченный пул синтезаторов речи
+
+    - size синтезаторов, каждый создаётся и используется только в своём потоке
+    - очередь заданий ограничена max_queue, при переполнении SynthesisPoolBusyError
+    - submit()/synthesize_text() возвращают awaitable с таймаутом на вызов
+    - метрики: глубина очереди, время ожидания в очереди, время синтеза
+    """
+
+    def __init__(self,
+                 synthesizer_factory: Callable[[], Any],
+                 size: int = 4,
+                 max_queue: int = 64,
+                 default_timeout: float = 30.0,
+                 name: str = "tts"):
+        """
+        Args:
+            synthesizer_factory: Фабрика синтезатора (вызывается в рабочем потоке)
+            size: Количество синтезаторов/рабочих потоков
+            max_queue: Максимум заданий, ожидающих свободный синтезатор
+            default_timeout: Таймаут вызова по умолчанию (секунды)
+            name: Префикс имён потоков
+        """
+        self.synthesizer_factory = synthesizer_factory
+        self.size = max(1, int(size))
+        self.max_queue = max(1, int(max_queue))
+        self.default_timeout = default_timeout
+        self.name = name
+
+        self._jobs: "queue.Queue[Optional[_SynthesisJob]]" = queue.Queue(maxsize=self.max_queue)
+        self._threads: List[threading.Thread] = []
+        self._synthesizers: List[Any] = []
+        self._active_jobs: Dict[int, _SynthesisJob] = {}
+        self._lock = threading.Lock()
+        self.is_running = False
+
+        # Метрики
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.aborted = 0
+        self.max_queue_depth = 0
+        self.wait_times = deque(maxlen=1000)
+        self.synthesis_times = deque(maxlen=1000)
+
+    def start(self, ready_timeout: float = 30.0) -> bool:
+        """
+        Запуск рабочих потоков (блокирующий, вызывать вне event loop)
+
+        Returns:
+            True если хотя бы один синтезатор успешно создан
+        """
+        if self.is_running:
+            return True
+
+        ready_events = []
+        for worker_id in range(self.size):
+            ready = threading.Event()
+            thread = threading.Thread(
+                target=self._worker_loop,
+                args=(worker_id, ready),
+                name=f"{self.name}-synth-{worker_id}",
+                daemon=True
+            )
+            self._threads.append(thread)
+            ready_events.append(ready)
+            thread.start()
+
+        deadline = time.monotonic() + ready_timeout
+        for ready in ready_events:
+            ready.wait(max(0.0, deadline - time.monotonic()))
+
+        self.is_running = len(self._synthesizers) > 0
+        logger.info(f"SynthesizerPool started: {len(self._synthesizers)}/{self.size} synthesizers, max_queue={self.max_queue}")
+        return self.is_running
+
+    def _worker_loop(self, worker_id: int, ready: threading.Event):
+        """Цикл рабочего потока: синтезатор живёт и используется только здесь"""
+        try:
+            synthesizer = self.synthesizer_factory()
+        except Exception as e:
+            logger.error(f"SynthesizerPool worker {worker_id}: failed to create synthesizer: {e}")
+            ready.set()
+            return
+
+        with self._lock:
+            self._synthesizers.append(synthesizer)
+        ready.set()
+
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            if job.cancelled or job.future.done():
+                continue
+
+            job.started_at = time.perf_counter()
+            job.synthesizer = synthesizer
+            self.wait_times.append(job.started_at - job.enqueued_at)
+            with self._lock:
+                self._active_jobs[worker_id] = job
+            try:
+                result = job.fn(synthesizer)
+                job.resolve(result)
+                succeeded = True
+            except Exception as e:
+                job.reject(e)
+                succeeded = False
+            self.synthesis_times.append(time.perf_counter() - job.started_at)
+            with self._lock:
+                self._active_jobs.pop(worker_id, None)
+                if succeeded:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+
+    async def submit(self, fn: Callable[[Any], Any], timeout: Optional[float] = None) -> Any:
+        """
+        Выполнение fn(synthesizer) на свободном синтезаторе пула
+
+        Args:
+            fn: Блокирующая функция над синтезатором
+            timeout: Таймаут вызова (None - default_timeout)
+
+        Raises:
+            SynthesisPoolBusyError: Очередь заполнена
+            asyncio.TimeoutError: Таймаут вызова
+        """
+        if not self.is_running:
+            raise RuntimeError("SynthesizerPool is not running")
+
+        loop = asyncio.get_running_loop()
+        job = _SynthesisJob(fn, loop, loop.create_future())
+        try:
+            self._jobs.put_nowait(job)
+        except queue.Full:
+            self.rejected += 1
+            raise SynthesisPoolBusyError(f"Synthesis queue is full ({self.max_queue})")
+
+        self.submitted += 1
+        depth = self._jobs.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+
+        # InterruptSession останавливает синтез напрямую, не дожидаясь отмены корутины
+        unregister = register_cancel_handle(lambda: self._abort(job))
+        try:
+            return await asyncio.wait_for(job.future, timeout or self.default_timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self._abort(job)
+            raise
+        except asyncio.CancelledError:
+            self._abort(job)
+            raise
+        finally:
+            unregister()
+
+    async def synthesize_text(self, text: str, timeout: Optional[float] = None) -> Any:
+        """Синтез текста: speak_text_async(text).get() в рабочем потоке"""
+        return await self.submit(lambda synthesizer: synthesizer.speak_text_async(text).get(), timeout)
+
+    async def stream_text(self,
+                          text: str,
+                          timeout: Optional[float] = None,
+                          on_result: Optional[Callable[[Any], None]] = None) -> AsyncGenerator[bytes, None]:
+        """
+        Потоковый синтез: куски аудио из события `synthesizing` по мере готовности
+
+        Args:
+            text: Текст для синтеза
+            timeout: Таймаут всего синтеза (None - default_timeout)
+            on_result: Проверка итогового результата синтеза (может бросить исключение)
+
+        Yields:
+            Куски аудио в порядке поступления от синтезатора
+        """
+        loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue = asyncio.Queue()
+
+        def push(data: Optional[bytes]):
+            try:
+                loop.call_soon_threadsafe(chunks.put_nowait, data)
+            except RuntimeError:
+                pass
+
+        def on_synthesizing(evt):
+            audio = evt.result.audio_data
+            if audio:
+                push(bytes(audio))
+
+        def run(synthesizer):
+            synthesizer.synthesizing.connect(on_synthesizing)
+            try:
+                return synthesizer.speak_text_async(text).get()
+            finally:
+                synthesizer.synthesizing.disconnect_all()
+
+        job = asyncio.ensure_future(self.submit(run, timeout))
+        # Маркер конца: колбэки call_soon_threadsafe выполняются по порядку,
+        # поэтому все куски окажутся в очереди раньше него
+        job.add_done_callback(lambda _: chunks.put_nowait(None))
+        try:
+            while True:
+                data = await chunks.get()
+                if data is None:
+                    break
+                yield data
+            result = await job
+            if on_result is not None:
+                on_result(result)
+        finally:
+            if not job.done():
+                job.cancel()
+
+    def _abort(self, job: _SynthesisJob):
+        """Отмена задания: ещё не начатое пропускается, выполняющееся останавливается"""
+        if job.cancelled:
+            return
+        job.cancelled = True
+        self.aborted += 1
+        # Останавливаем синтезатор, только пока он занят этим заданием, а не уже следующим
+        with self._lock:
+            running = any(active is job for active in self._active_jobs.values())
+        synthesizer = job.synthesizer
+        if running and synthesizer is not None and hasattr(synthesizer, 'stop_speaking_async'):
+            try:
+                synthesizer.stop_speaking_async()
+            except Exception as e:
+                logger.debug(f"SynthesizerPool: stop_speaking_async failed: {e}")
+
+    def shutdown(self, timeout: float = 5.0):
+        """Остановка рабочих потоков (блокирующая)"""
+        if not self._threads:
+            return
+        for _ in self._threads:
+            try:
+                self._jobs.put(None, timeout=timeout)
+            except queue.Full:
+                break
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads.clear()
+        self._synthesizers.clear()
+        self.is_running = False
+        logger.info("SynthesizerPool stopped")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Метрики пула"""
+        waits = sorted(self.wait_times)
+        synth = list(self.synthesis_times)
+        return {
+            "pool_size": len(self._synthesizers),
+            "busy_workers": len(self._active_jobs),
+            "queue_depth": self._jobs.qsize(),
+            "max_queue_depth": self.max_queue_depth,
+            "queue_capacity": self.max_queue,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "aborted": self.aborted,
+            "avg_wait_ms": (sum(waits) / len(waits) * 1000) if waits else 0.0,
+            "p95_wait_ms": _percentile(waits, 0.95) * 1000,
+            "max_wait_ms": (waits[-1] * 1000) if waits else 0.0,
+            "avg_synthesis_ms": (sum(synth) / len(synth) * 1000) if synth else 0.0
+        }
+
+
+class StubSynthesisResult:
+    """Результат заглушки в форме SpeechSynthesisResult"""
+
+    def __init__(self, reason: Any, audio_data: bytes):
+        self.reason = reason
+        self.audio_data = audio_data
+        self.cancellation_details = None
+
+
+class _StubSynthesisEventArgs:
+    """Аналог SpeechSynthesisEventArgs: evt.result.audio_data"""
+
+    def __init__(self, result: StubSynthesisResult):
+        self.result = result
+
+
+class _StubEventSignal:
+    """Аналог EventSignal из Speech SDK (connect/disconnect_all)"""
+
+    def __init__(self):
+        self._handlers: List[Callable[[Any], None]] = []
+
+    def connect(self, handler: Callable[[Any], None]):
+        self._handlers.append(handler)
+
+    def disconnect_all(self):
+        self._handlers.clear()
+
+    def fire(self, evt: Any):
+        for handler in list(self._handlers):
+            handler(evt)
+
+
+class StubSynthesizer:
+    """
+    Заглушка SpeechSynthesizer для офлайн нагрузочного тестирования пула
+
+    Генерирует тишину PCM int16 длительностью пропорционально тексту.
+    Первый кусок аудио готов через synthesis_delay, остальные приходят
+    событиями `synthesizing` по chunk_ms аудио, весь синтез занимает
+    synthesis_delay + per_char_delay * len(text).
+    """
+
+    def __init__(self,
+                 sample_rate: int = 48000,
+                 ms_per_char: float = 60.0,
+                 synthesis_delay: float = 0.05,
+                 per_char_delay: float = 0.0005,
+                 chunk_ms: float = 100.0,
+                 completed_reason: Any = "SynthesizingAudioCompleted"):
+        self.sample_rate = sample_rate
+        self.ms_per_char = ms_per_char
+        self.synthesis_delay = synthesis_delay
+        self.per_char_delay = per_char_delay
+        self.chunk_ms = chunk_ms
+        self.completed_reason = completed_reason
+        self.synthesizing = _StubEventSignal()
+        self._stop = threading.Event()
+
+    def _audio_for(self, text: str) -> bytes:
+        samples = int(self.sample_rate * len(text) * self.ms_per_char / 1000)
+        return b"\x00\x00" * samples
+
+    def speak_text_async(self, text: str) -> "_StubFuture":
+        return _StubFuture(self, text)
+
+    def stop_speaking_async(self) -> "_StubFuture":
+        self._stop.set()
+        return _StubFuture(None, "")
+
+
+class _StubFuture:
+    """Аналог ResultFuture из Speech SDK"""
+
+    def __init__(self, synthesizer: Optional[StubSynthesizer], text: str):
+        self._synthesizer = synthesizer
+        self._text = text
+
+    def get(self) -> Optional[StubSynthesisResult]:
+        synthesizer = self._synthesizer
+        if synthesizer is None:
+            return None
+        synthesizer._stop.clear()
+        audio = synthesizer._audio_for(self._text)
+        chunk_bytes = max(2, int(synthesizer.sample_rate * synthesizer.chunk_ms / 1000) * 2)
+        pieces = [audio[i:i + chunk_bytes] for i in range(0, len(audio), chunk_bytes)] or [b""]
+        # Первый кусок после synthesis_delay, остальные равномерно за per_char_delay * len(text)
+        step = synthesizer.per_char_delay * len(self._text) / len(pieces)
+        if synthesizer._stop.wait(synthesizer.synthesis_delay):
+            return StubSynthesisResult(synthesizer.completed_reason, b"")
+        for index, piece in enumerate(pieces):
+            if index and synthesizer._stop.wait(step):
+                return StubSynthesisResult(synthesizer.completed_reason, b"")
+            synthesizer.synthesizing.fire(_StubSynthesisEventArgs(StubSynthesisResult("SynthesizingAudio", piece)))
+        if synthesizer._stop.wait(step):
+            return StubSynthesisResult(synthesizer.completed_reason, b"")
+        return StubSynthesisResult(synthesizer.completed_reason, audio)
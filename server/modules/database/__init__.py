@@ -2,10 +2,11 @@
 Database Module - Управление базой данных
 
 Модуль предоставляет функциональность для:
-- Управления подключением к PostgreSQL
+- Управления подключением к PostgreSQL (psycopg2 или asyncpg, DB_DRIVER)
 - CRUD операций для всех таблиц БД
 - Асинхронных операций с базой данных
 - Управления соединениями и пулом
+- Пакетной отложенной записи журнальных таблиц (WriteBehindQueue)
 
 100% совместим с существующим database_manager.py
 """
@@ -17,6 +17,12 @@ class DatabaseConfig:
         """
         self.config = config or {}
         
+        # Драйвер: psycopg2 (PostgreSQLProvider) или asyncpg (AsyncPostgreSQLProvider)
+        self.driver = self.config.get('driver', os.getenv('DB_DRIVER', 'psycopg2'))
+        
+        # Готовый пул соединений (например, фейковый для офлайн проверки)
+        self.pool = self.config.get('pool')
+        
         # Настройки подключения к БД
         self.connection_string = self.config.get('connection_string', 'postgresql://localhost/voice_assistant_db')
         self.host = self.config.get('host', 'localhost')
@@ -45,8 +51,20 @@ class DatabaseConfig:
         self.fetch_size = self.config.get('fetch_size', 1000)
         self.batch_size = self.config.get('batch_size', 100)
         self.enable_prepared_statements = self.config.get('enable_prepared_statements', True)
+        self.statement_cache_size = self.config.get('statement_cache_size', 100)
         self.enable_connection_pooling = self.config.get('enable_connection_pooling', True)
         
+        # Отложенная пакетная запись commands/llm_answers/screenshots/performance_metrics
+        self.write_behind_enabled = self.config.get(
+            'write_behind_enabled', os.getenv('DB_WRITE_BEHIND', 'true').lower() == 'true'
+        )
+        self.write_behind_batch_size = self.config.get('write_behind_batch_size', 500)
+        self.write_behind_flush_interval = self.config.get('write_behind_flush_interval', 0.5)  # секунды
+        self.write_behind_max_pending = self.config.get('write_behind_max_pending', 10000)
+        self.write_behind_spill_path = self.config.get(
+            'write_behind_spill_path', os.getenv('DB_WRITE_BEHIND_SPILL_PATH', 'logs/db_write_behind_spill.jsonl')
+        )
+        
         # Настройки логирования
         self.log_level = self.config.get('log_level', 'INFO')
         self.log_queries = self.config.get('log_queries', False)
@@ -109,7 +127,8 @@ class DatabaseConfig:
             'max_connections': self.max_connections,
             'connection_timeout': self.connection_timeout,
             'command_timeout': self.command_timeout,
-            'enable_connection_pooling': self.enable_connection_pooling
+            'enable_connection_pooling': self.enable_connection_pooling,
+            'driver': self.driver
         }
     
     def get_retry_config(self) -> Dict[str, Any]:
@@ -149,11 +168,26 @@ class DatabaseConfig:
             'fetch_size': self.fetch_size,
             'batch_size': self.batch_size,
             'enable_prepared_statements': self.enable_prepared_statements,
+            'statement_cache_size': self.statement_cache_size,
             'log_queries': self.log_queries,
             'log_slow_queries': self.log_slow_queries,
             'slow_query_threshold': self.slow_query_threshold
         }
     
+    def get_write_behind_config(self) -> Dict[str, Any]:
+        """
+        Получение конфигурации отложенной пакетной записи
+        
+        Returns:
+            Словарь с конфигурацией write-behind очереди
+        """
+        return {
+            'batch_size': self.write_behind_batch_size,
+            'flush_interval': self.write_behind_flush_interval,
+            'max_pending': self.write_behind_max_pending,
+            'spill_path': self.write_behind_spill_path
+        }
+    
     def get_monitoring_config(self) -> Dict[str, Any]:
         """
         Получение конфигурации мониторинга
@@ -201,6 +235,10 @@ class DatabaseConfig:
         Returns:
             True если конфигурация валидна, False иначе
         """
+        if self.driver not in ('psycopg2', 'asyncpg'):
+            print("❌ driver должен быть psycopg2 или asyncpg")
+            return False
+            
         # Проверяем корректность параметров подключения
         if not self.host:
             print("❌ host не может быть пустым")
@@ -253,6 +291,18 @@ class DatabaseConfig:
             print("❌ batch_size должен быть положительным")
             return False
             
+        if self.statement_cache_size < 0:
+            print("❌ statement_cache_size должен быть неотрицательным")
+            return False
+            
+        if self.write_behind_batch_size <= 0 or self.write_behind_flush_interval <= 0:
+            print("❌ write_behind_batch_size и write_behind_flush_interval должны быть положительными")
+            return False
+            
+        if self.write_behind_max_pending < self.write_behind_batch_size:
+            print("❌ write_behind_max_pending должен быть не меньше write_behind_batch_size")
+            return False
+            
         if self.slow_query_threshold <= 0:
             print("❌ slow_query_threshold должен быть положительным")
             return False
@@ -281,6 +331,7 @@ class DatabaseConfig:
             Словарь со статусом конфигурации
         """
         return {
+            'driver': self.driver,
             'connection_string': self.connection_string,
             'host': self.host,
             'port': self.port,
@@ -300,7 +351,11 @@ class DatabaseConfig:
             'fetch_size': self.fetch_size,
             'batch_size': self.batch_size,
             'enable_prepared_statements': self.enable_prepared_statements,
+            'statement_cache_size': self.statement_cache_size,
             'enable_connection_pooling': self.enable_connection_pooling,
+            'write_behind_enabled': self.write_behind_enabled,
+            'write_behind_batch_size': self.write_behind_batch_size,
+            'write_behind_flush_interval': self.write_behind_flush_interval,
             'log_level': self.log_level,
             'log_queries': self.log_queries,
             'log_slow_queries': self.log_slow_queries,
@@ -422,6 +477,7 @@ class DatabaseConfig:
             Словарь с конфигурацией из env
         """
         return {
+            'driver': os.getenv('DB_DRIVER', self.driver),
             'connection_string': os.getenv('DATABASE_URL', self.connection_string),
             'host': os.getenv('DB_HOST', self.host),
             'port': int(os.getenv('DB_PORT', self.port)),
@@ -3,9 +3,11 @@
 """
 
 import logging
+import uuid
+from datetime import datetime, timedelta, timezone
 from typing import Dict, Any, Optional, List, AsyncGenerator
 from modules.database.config import DatabaseConfig
-from modules.database.providers.postgresql_provider import PostgreSQLProvider
+from modules.database.core.write_behind import WriteBehindQueue
 
 logger = logging.getLogger(__name__)
 
@@ -13,8 +15,10 @@ class DatabaseManager:
     """
     Основной менеджер базы данных
     
-    Координирует работу PostgreSQL Provider,
-    обеспечивает единый интерфейс для работы с базой данных.
+    Координирует работу PostgreSQL Provider (psycopg2 или asyncpg - по
+    DatabaseConfig.driver), обеспечивает единый интерфейс для работы с базой данных.
+    Журнальные записи (команды, ответы LLM, скриншоты, метрики) при
+    write_behind_enabled пишутся пачками через WriteBehindQueue.
     """
     
     def __init__(self, config: Optional[Dict[str, Any]] = None):
@@ -26,6 +30,7 @@ class DatabaseManager:
         """
         self.config = DatabaseConfig(config)
         self.postgresql_provider = None
+        self.write_behind: Optional[WriteBehindQueue] = None
         self.is_initialized = False
         
         logger.info("DatabaseManager initialized")
@@ -51,6 +56,13 @@ class DatabaseManager:
             # Инициализируем провайдер
             await self._initialize_provider()
             
+            # Очередь отложенной записи журнальных таблиц
+            if self.config.write_behind_enabled:
+                self.write_behind = WriteBehindQueue(
+                    self.postgresql_provider.insert_many, **self.config.get_write_behind_config()
+                )
+                self.write_behind.start()
+            
             self.is_initialized = True
             logger.info("DatabaseManager initialized successfully")
             return True
@@ -62,11 +74,16 @@ class DatabaseManager:
     async def _create_provider(self):
         """Создание провайдера базы данных"""
         try:
-            # PostgreSQL Provider
+            # PostgreSQL Provider; драйвер импортируется только выбранный
             provider_config = self._get_provider_config()
-            self.postgresql_provider = PostgreSQLProvider(provider_config)
+            if self.config.driver == 'asyncpg':
+                from modules.database.providers.asyncpg_provider import AsyncPostgreSQLProvider
+                self.postgresql_provider = AsyncPostgreSQLProvider(provider_config)
+            else:
+                from modules.database.providers.postgresql_provider import PostgreSQLProvider
+                self.postgresql_provider = PostgreSQLProvider(provider_config)
             
-            logger.info("Created database provider")
+            logger.info(f"Created database provider ({self.config.driver})")
             
         except Exception as e:
             logger.error(f"Error creating provider: {e}")
@@ -104,6 +121,8 @@ class DatabaseManager:
             'fetch_size': self.config.fetch_size,
             'batch_size': self.config.batch_size,
             'enable_prepared_statements': self.config.enable_prepared_statements,
+            'statement_cache_size': self.config.statement_cache_size,
+            'pool': self.config.pool,
             'log_queries': self.config.log_queries,
             'log_slow_queries': self.config.log_slow_queries,
             'slow_query_threshold': self.config.slow_query_threshold,
@@ -222,6 +241,14 @@ class DatabaseManager:
             if not self.is_initialized:
                 raise Exception("DatabaseManager not initialized")
             
+            if self.write_behind:
+                return self._enqueue('commands', {
+                    'session_id': session_id,
+                    'prompt': prompt,
+                    'language': language,
+                    'metadata': metadata or {}
+                })
+            
             return await self.postgresql_provider.create_command(session_id, prompt, metadata, language)
             
         except Exception as e:
@@ -252,6 +279,15 @@ class DatabaseManager:
             if not self.is_initialized:
                 raise Exception("DatabaseManager not initialized")
             
+            if self.write_behind:
+                return self._enqueue('llm_answers', {
+                    'command_id': command_id,
+                    'prompt': prompt,
+                    'response': response,
+                    'model_info': model_info or {},
+                    'performance_metrics': performance_metrics or {}
+                })
+            
             return await self.postgresql_provider.create_llm_answer(
                 command_id, prompt, response, model_info, performance_metrics
             )
@@ -282,6 +318,14 @@ class DatabaseManager:
             if not self.is_initialized:
                 raise Exception("DatabaseManager not initialized")
             
+            if self.write_behind:
+                return self._enqueue('screenshots', {
+                    'session_id': session_id,
+                    'file_path': file_path,
+                    'file_url': file_url,
+                    'metadata': metadata or {}
+                })
+            
             return await self.postgresql_provider.create_screenshot(session_id, file_path, file_url, metadata)
             
         except Exception as e:
@@ -309,12 +353,36 @@ class DatabaseManager:
             if not self.is_initialized:
                 raise Exception("DatabaseManager not initialized")
             
+            if self.write_behind:
+                return self._enqueue('performance_metrics', {
+                    'session_id': session_id,
+                    'metric_type': metric_type,
+                    'metric_value': metric_value
+                })
+            
             return await self.postgresql_provider.create_performance_metric(session_id, metric_type, metric_value)
             
         except Exception as e:
             logger.error(f"Error creating performance metric: {e}")
             return None
     
+    def _enqueue(self, table: str, row: Dict[str, Any]) -> str:
+        """Строка в write-behind очередь; id известен сразу, запись в БД - пачкой позже"""
+        row['id'] = str(uuid.uuid4())
+        self.write_behind.enqueue(table, row)
+        return row['id']
+    
+    async def flush_pending_writes(self) -> int:
+        """
+        Немедленный сброс write-behind очереди
+        
+        Returns:
+            Количество записанных строк
+        """
+        if not self.write_behind:
+            return 0
+        return await self.write_behind.flush()
+    
     # =====================================================
     # АНАЛИТИЧЕСКИЕ ЗАПРОСЫ
     # =====================================================
@@ -333,6 +401,9 @@ class DatabaseManager:
             if not self.is_initialized:
                 raise Exception("DatabaseManager not initialized")
             
+            # Читаем в том числе ещё не сброшенные журнальные записи
+            await self.flush_pending_writes()
+            
             return await self.postgresql_provider.get_user_statistics(user_id)
             
         except Exception as e:
@@ -353,6 +424,9 @@ class DatabaseManager:
             if not self.is_initialized:
                 raise Exception("DatabaseManager not initialized")
             
+            # Читаем в том числе ещё не сброшенные журнальные записи
+            await self.flush_pending_writes()
+            
             return await self.postgresql_provider.get_session_commands(session_id)
             
         except Exception as e:
@@ -425,6 +499,38 @@ class DatabaseManager:
             logger.error(f"Error cleaning up expired short-term memory: {e}")
             return 0
     
+    async def expire_short_term_memory_batch(self, hours: float, limit: int) -> List[str]:
+        """
+        Очистка одной пачки устаревшей краткосрочной памяти (для планировщика обслуживания)
+        
+        Args:
+            hours: Память старше стольких часов считается устаревшей
+            limit: Максимум строк за один запрос
+            
+        Returns:
+            hardware_id_hash очищенных пользователей (ошибки пробрасываются)
+        """
+        if not self.is_initialized:
+            raise RuntimeError("DatabaseManager not initialized")
+        updated_before = datetime.now(timezone.utc) - timedelta(hours=hours)
+        return await self.postgresql_provider.expire_short_term_memory_batch(updated_before, limit)
+    
+    async def expire_stale_sessions_batch(self, hours: float, limit: int) -> int:
+        """
+        Закрытие одной пачки активных сессий, начатых больше hours часов назад
+        
+        Args:
+            hours: Максимальная длительность активной сессии
+            limit: Максимум строк за один запрос
+            
+        Returns:
+            Количество закрытых сессий (ошибки пробрасываются)
+        """
+        if not self.is_initialized:
+            raise RuntimeError("DatabaseManager not initialized")
+        started_before = datetime.now(timezone.utc) - timedelta(hours=hours)
+        return await self.postgresql_provider.expire_stale_sessions_batch(started_before, limit)
+    
     async def get_memory_statistics(self) -> Dict[str, Any]:
         """
         Получение статистики памяти
@@ -516,6 +622,11 @@ class DatabaseManager:
         try:
             logger.info("Cleaning up DatabaseManager...")
             
+            # Сначала дописываем очередь, пока пул ещё открыт
+            if self.write_behind:
+                await self.write_behind.stop()
+                self.write_behind = None
+            
             # Очищаем провайдер
             if self.postgresql_provider:
                 await self.postgresql_provider.cleanup()
@@ -563,6 +674,9 @@ class DatabaseManager:
         if self.postgresql_provider:
             metrics["postgresql_provider"] = self.postgresql_provider.get_metrics()
         
+        if self.write_behind:
+            metrics["write_behind"] = self.write_behind.get_stats()
+        
         return metrics
     
     def get_config_status(self) -> Dict[str, Any]:
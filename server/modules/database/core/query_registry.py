@@ -0,0 +1,247 @@
+"""
+Реестр горячих запросов модуля Database
+
+Каждый запрос описан заранее: текст SQL с явной проекцией колонок (никаких
+SELECT * / RETURNING *) и имена параметров по порядку. Провайдеры
+выполняют их как серверные prepared statements:
+- asyncpg: именованный statement из кэша соединения (prepare один раз на соединение)
+- psycopg2: PREPARE <name> один раз на backend, дальше EXECUTE <name>(...)
+
+QueryMetrics собирает по каждому запросу задержку и размер строк для get_metrics().
+"""
+
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from utils.latency_histogram import LatencyHistogram
+
+_PLACEHOLDER = re.compile(r"\$(\d+)")
+
+
+@dataclass(frozen=True)
+class QuerySpec:
+    """Описание запроса: SQL ($1..$n), имена параметров по порядку, проекция результата"""
+
+    name: str
+    sql: str
+    params: Tuple[str, ...]
+    columns: Tuple[str, ...]
+    json_params: Tuple[str, ...] = field(default=())
+
+    def __post_init__(self):
+        object.__setattr__(self, 'sql', " ".join(self.sql.split()))
+        placeholders = {int(index) for index in _PLACEHOLDER.findall(self.sql)}
+        if placeholders != set(range(1, len(self.params) + 1)):
+            raise ValueError(f"Query {self.name}: placeholders {sorted(placeholders)} do not match params {self.params}")
+
+    @property
+    def statement_name(self) -> str:
+        """Имя серверного prepared statement (psycopg2)"""
+        return f"nexy_{self.name}"
+
+    def bind(self, values: Dict[str, Any], encode_json: bool = False) -> Tuple[Any, ...]:
+        """
+        Значения параметров в порядке $1..$n
+
+        Args:
+            values: Параметры по имени
+            encode_json: Сериализовать JSONB параметры (psycopg2; asyncpg делает это кодеком)
+        """
+        missing = [name for name in self.params if name not in values]
+        if missing:
+            raise KeyError(f"Query {self.name}: missing params {missing}")
+        if not encode_json or not self.json_params:
+            return tuple(values[name] for name in self.params)
+        return tuple(
+            json.dumps(values[name]) if name in self.json_params and values[name] is not None else values[name]
+            for name in self.params
+        )
+
+
+QUERY_REGISTRY: Dict[str, QuerySpec] = {}
+
+
+def _register(spec: QuerySpec) -> QuerySpec:
+    if spec.name in QUERY_REGISTRY:
+        raise ValueError(f"Query {spec.name} is already registered")
+    QUERY_REGISTRY[spec.name] = spec
+    return spec
+
+
+def get_query(name: str) -> QuerySpec:
+    """Запрос из реестра (KeyError для неизвестного имени)"""
+    return QUERY_REGISTRY[name]
+
+
+# =====================================================
+# ГОРЯЧИЕ ЗАПРОСЫ
+# =====================================================
+
+USER_MEMORY_READ = _register(QuerySpec(
+    name="user_memory_read",
+    sql="SELECT short_term_memory, long_term_memory FROM users WHERE hardware_id_hash = $1 LIMIT 1",
+    params=("hardware_id_hash",),
+    columns=("short_term_memory", "long_term_memory"),
+))
+
+USER_MEMORY_UPDATE = _register(QuerySpec(
+    name="user_memory_update",
+    sql="""
+        UPDATE users SET short_term_memory = $1, long_term_memory = $2, memory_updated_at = $3
+        WHERE hardware_id_hash = $4 RETURNING id
+    """,
+    params=("short_term_memory", "long_term_memory", "memory_updated_at", "hardware_id_hash"),
+    columns=("id",),
+))
+
+SESSION_CREATE = _register(QuerySpec(
+    name="session_create",
+    sql="INSERT INTO sessions (id, user_id, metadata, status) VALUES ($1, $2, $3, $4) RETURNING id",
+    params=("id", "user_id", "metadata", "status"),
+    columns=("id",),
+    json_params=("metadata",),
+))
+
+SESSION_END = _register(QuerySpec(
+    name="session_end",
+    sql="UPDATE sessions SET status = $1, end_time = $2 WHERE id = $3 RETURNING id",
+    params=("status", "end_time", "id"),
+    columns=("id",),
+))
+
+COMMAND_INSERT = _register(QuerySpec(
+    name="command_insert",
+    sql="""
+        INSERT INTO commands (id, session_id, prompt, language, metadata)
+        VALUES ($1, $2, $3, $4, $5) RETURNING id
+    """,
+    params=("id", "session_id", "prompt", "language", "metadata"),
+    columns=("id",),
+    json_params=("metadata",),
+))
+
+LLM_ANSWER_INSERT = _register(QuerySpec(
+    name="llm_answer_insert",
+    sql="""
+        INSERT INTO llm_answers (id, command_id, prompt, response, model_info, performance_metrics)
+        VALUES ($1, $2, $3, $4, $5, $6) RETURNING id
+    """,
+    params=("id", "command_id", "prompt", "response", "model_info", "performance_metrics"),
+    columns=("id",),
+    json_params=("model_info", "performance_metrics"),
+))
+
+
+# =====================================================
+# ОБСЛУЖИВАНИЕ (пачками: LIMIT + SKIP LOCKED, короткие блокировки)
+# =====================================================
+
+SHORT_MEMORY_EXPIRE_BATCH = _register(QuerySpec(
+    name="short_memory_expire_batch",
+    sql="""
+        UPDATE users SET short_term_memory = NULL
+        WHERE id IN (
+            SELECT id FROM users WHERE short_term_memory IS NOT NULL AND memory_updated_at < $1
+            ORDER BY memory_updated_at LIMIT $2 FOR UPDATE SKIP LOCKED
+        ) RETURNING hardware_id_hash
+    """,
+    params=("updated_before", "limit"),
+    columns=("hardware_id_hash",),
+))
+
+SESSION_EXPIRE_BATCH = _register(QuerySpec(
+    name="session_expire_batch",
+    sql="""
+        UPDATE sessions SET status = $1, end_time = $2
+        WHERE id IN (
+            SELECT id FROM sessions WHERE status = 'active' AND start_time < $3
+            ORDER BY start_time LIMIT $4 FOR UPDATE SKIP LOCKED
+        ) RETURNING id
+    """,
+    params=("status", "end_time", "started_before", "limit"),
+    columns=("id",),
+))
+
+
+# =====================================================
+# СТАТИСТИКА
+# =====================================================
+
+def row_size(row: Optional[Dict[str, Any]]) -> int:
+    """Приблизительный размер строки результата в байтах"""
+    if not row:
+        return 0
+    size = 0
+    for value in row.values():
+        if isinstance(value, (str, bytes)):
+            size += len(value)
+        elif isinstance(value, (dict, list)):
+            size += len(json.dumps(value, default=str))
+        elif value is not None:
+            size += 8
+    return size
+
+
+class QueryStats:
+    """Статистика одного запроса"""
+
+    __slots__ = ('calls', 'errors', 'rows', 'row_bytes', 'max_row_bytes', 'latency')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.row_bytes = 0
+        self.max_row_bytes = 0
+        self.latency = LatencyHistogram()
+
+    def snapshot(self) -> Dict[str, Any]:
+        latency = self.latency.snapshot()
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_ms": latency["avg_ms"],
+            "p50_ms": latency["p50_ms"],
+            "p95_ms": latency["p95_ms"],
+            "max_ms": latency["max_ms"],
+            "rows": self.rows,
+            "avg_row_bytes": self.row_bytes / self.rows if self.rows else 0.0,
+            "max_row_bytes": self.max_row_bytes
+        }
+
+
+class QueryMetrics:
+    """Задержка и размер результата по каждому запросу реестра"""
+
+    def __init__(self, names: Iterable[str] = ()):
+        self.stats: Dict[str, QueryStats] = {name: QueryStats() for name in (names or QUERY_REGISTRY)}
+
+    def observe(self, name: str, elapsed_ms: float, rows: List[Dict[str, Any]]):
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = QueryStats()
+        stats.calls += 1
+        stats.latency.observe(elapsed_ms)
+        stats.rows += len(rows)
+        for row in rows:
+            size = row_size(row)
+            stats.row_bytes += size
+            if size > stats.max_row_bytes:
+                stats.max_row_bytes = size
+
+    def observe_error(self, name: str, elapsed_ms: float):
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = QueryStats()
+        stats.calls += 1
+        stats.errors += 1
+        stats.latency.observe(elapsed_ms)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Только запросы, которые выполнялись"""
+        return {name: stats.snapshot() for name, stats in self.stats.items() if stats.calls}
+
+    def reset(self):
+        self.stats = {name: QueryStats() for name in self.stats}
@@ -0,0 +1,390 @@
+"""
+Отложенная пакетная запись журнальных таблиц (write-behind)
+
+commands, llm_answers, screenshots и performance_metrics никто не читает в
+момент записи, поэтому DatabaseManager не ждёт отдельный INSERT на каждую
+строку: id генерируется сразу, строка ставится в очередь, а фоновая задача
+пишет накопленное пачками (COPY для asyncpg, многострочный INSERT для psycopg2):
+- по размеру (batch_size строк в очереди) или по времени (flush_interval);
+- память ограничена max_pending строками, сверх лимита строки забирает
+  ближайший фоновый сброс (в БД или, если она недоступна, на диск);
+- если PostgreSQL недоступен (или запись сорвалась на стороне драйвера),
+  пачка уходит в spill файл (JSONL) и дописывается в БД при следующем
+  успешном сбросе, в исходном порядке, по batch_size строк с сохранённого
+  смещения; попытки повторяются с растущей паузой;
+- файловый ввод-вывод spill идёт в потоке (asyncio.to_thread), не в event loop;
+  пачка, которую БД отклонила по данным (constraint и т.п.), делится пополам,
+  пока не останутся только плохие строки - отклоняются и не повторяются они одни;
+- stop() сбрасывает всё, что осталось в очереди.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Таблица -> колонки. Порядок таблиц = порядок сброса (llm_answers ссылается на commands)
+WRITE_BEHIND_TABLES: Dict[str, Tuple[str, ...]] = {
+    'commands': ('id', 'session_id', 'prompt', 'language', 'metadata'),
+    'llm_answers': ('id', 'command_id', 'prompt', 'response', 'model_info', 'performance_metrics'),
+    'screenshots': ('id', 'session_id', 'file_path', 'file_url', 'metadata'),
+    'performance_metrics': ('id', 'session_id', 'metric_type', 'metric_value'),
+}
+
+# Ошибки, после которых пачку имеет смысл повторить: нет соединения с БД или
+# ошибка драйвера до отправки данных (InternalClientError - например, кодек
+# не подходит для COPY). Сервер строки не отклонял - терять их нельзя
+_UNAVAILABLE_ERRORS = {
+    'OperationalError', 'InterfaceError', 'ConnectionDoesNotExistError',
+    'CannotConnectNowError', 'TooManyConnectionsError', 'PostgresConnectionError', 'PoolError',
+    'InternalClientError',
+}
+
+# Предел паузы между попытками записи, пока БД недоступна (секунды)
+MAX_RETRY_DELAY = 30.0
+
+# writer(table, columns, records) -> число записанных строк
+BatchWriter = Callable[[str, Sequence[str], List[Tuple[Any, ...]]], Awaitable[int]]
+
+
+def _is_unavailable(error: Exception) -> bool:
+    """Ошибка соединения или клиента (повторить позже, через spill), а не ошибка данных"""
+    if isinstance(error, (OSError, asyncio.TimeoutError)):
+        return True
+    return any(cls.__name__ in _UNAVAILABLE_ERRORS for cls in type(error).__mro__)
+
+
+class WriteBehindQueue:
+    """Очередь отложенной записи с пакетным сбросом и spill на диск"""
+
+    def __init__(self, writer: BatchWriter, batch_size: int = 500, flush_interval: float = 0.5,
+                 max_pending: int = 10000, spill_path: Optional[str] = None):
+        """
+        Args:
+            writer: Пакетная запись провайдера (insert_many)
+            batch_size: Строк в одной пачке и порог внеочередного сброса
+            flush_interval: Максимальное время строки в очереди (секунды)
+            max_pending: Предел строк в памяти, сверх него - в spill файл
+            spill_path: JSONL файл для строк, которые не удалось записать
+        """
+        self.writer = writer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.spill_path = spill_path
+
+        self._buffers: Dict[str, List[Tuple[Any, ...]]] = {table: [] for table in WRITE_BEHIND_TABLES}
+        self._pending = 0
+        # Строки сверх max_pending до ближайшего сброса (без I/O в enqueue)
+        self._overflow: List[Tuple[str, Tuple[Any, ...]]] = []
+        self._wake = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        # Пауза между попытками, пока БД недоступна
+        self._retry_delay = 0.0
+        self._retry_at = 0.0
+        # Смещение в .replay файле (None - ещё не прочитано из .offset)
+        self._replay_offset: Optional[int] = None
+        # Spill с прошлого запуска (в том числе прерванный replay) допишется первым сбросом
+        self._spill_pending = bool(spill_path) and (
+            os.path.exists(spill_path) or os.path.exists(spill_path + ".replay")
+        )
+
+        self.stats = {
+            'enqueued': 0,
+            'written': 0,
+            'batches': 0,
+            'failed_batches': 0,
+            'spilled': 0,
+            'rejected': 0,
+            'replayed': 0,
+            'dropped': 0,
+            'max_pending': 0,
+            'last_flush_ms': 0.0,
+        }
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def start(self):
+        """Запуск фоновой задачи сброса"""
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"✅ Write-behind queue started (batch={self.batch_size}, interval={self.flush_interval}s)")
+
+    async def stop(self):
+        """Остановка: фоновая задача завершается, остаток очереди сбрасывается"""
+        if self._task is not None:
+            # Без cancel: сброс, начатый фоновой задачей, доходит до конца
+            self._stopping = True
+            self._wake.set()
+            await self._task
+            self._task = None
+        await self.flush()
+        if self._pending or self._spill_pending:
+            logger.warning(f"⚠️ Write-behind: {self._pending} rows left in memory, spill pending={self._spill_pending}")
+        logger.info("✅ Write-behind queue stopped")
+
+    def enqueue(self, table: str, row: Dict[str, Any]):
+        """Постановка строки в очередь (без ожидания БД)"""
+        record = tuple(row.get(column) for column in WRITE_BEHIND_TABLES[table])
+        self.stats['enqueued'] += 1
+        if self._pending >= self.max_pending:
+            # Память ограничена - строку заберёт ближайший сброс (в БД или на диск)
+            self._overflow.append((table, record))
+            self._wake.set()
+            return
+        self._buffers[table].append(record)
+        self._pending += 1
+        if self._pending > self.stats['max_pending']:
+            self.stats['max_pending'] = self._pending
+        if self._pending >= self.batch_size:
+            self._wake.set()
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if self._stopping:
+                break
+            try:
+                if time.monotonic() < self._retry_at:
+                    # БД недоступна: без попыток записи, только переполнение памяти - на диск
+                    if self._overflow:
+                        async with self._flush_lock:
+                            await self._spill(self._drain())
+                    continue
+                await self.flush()
+            except Exception as e:
+                logger.error(f"❌ Write-behind flush error: {e}")
+
+    async def flush(self) -> int:
+        """
+        Сброс очереди: сначала spill файл (он старше), потом память
+
+        Returns:
+            Количество записанных строк
+        """
+        async with self._flush_lock:
+            started = time.perf_counter()
+            written_before = self.stats['written']
+            if self._spill_pending:
+                replayed = await self._replay_spill()
+                if replayed is None:
+                    # БД всё ещё недоступна - память тоже на диск, чтобы не нарушить порядок
+                    await self._spill(self._drain())
+                    self._schedule_retry()
+                    return self.stats['written'] - written_before
+
+            entries = self._drain()
+            for index in range(0, len(entries), self.batch_size):
+                chunk = entries[index:index + self.batch_size]
+                done = await self._write_entries(chunk)
+                if done < len(chunk):
+                    # БД недоступна - всё, что не записано, на диск
+                    await self._spill(entries[index + done:])
+                    self._schedule_retry()
+                    break
+            else:
+                self._retry_delay = 0.0
+                self._retry_at = 0.0
+
+            if entries:
+                self.stats['last_flush_ms'] = (time.perf_counter() - started) * 1000
+            return self.stats['written'] - written_before
+
+    def _drain(self) -> List[Tuple[str, Tuple[Any, ...]]]:
+        """Все строки из памяти в порядке таблиц, затем переполнение"""
+        entries = [(table, record) for table, records in self._buffers.items() for record in records]
+        entries.extend(self._overflow)
+        for records in self._buffers.values():
+            records.clear()
+        self._overflow = []
+        self._pending = 0
+        return entries
+
+    def _schedule_retry(self):
+        """Следующая попытка фонового сброса - через удвоенную паузу"""
+        self._retry_delay = min(max(self._retry_delay * 2, self.flush_interval), MAX_RETRY_DELAY)
+        self._retry_at = time.monotonic() + self._retry_delay
+
+    async def _write_entries(self, entries: List[Tuple[str, Tuple[Any, ...]]]) -> int:
+        """
+        Запись подряд идущих строк: одна пачка на каждую таблицу
+
+        Returns:
+            Сколько строк от начала обработано; меньше len(entries) - БД недоступна
+        """
+        start = 0
+        while start < len(entries):
+            table = entries[start][0]
+            end = start
+            while end < len(entries) and entries[end][0] == table:
+                end += 1
+            records = [record for _, record in entries[start:end]]
+            done = await self._write_records(table, records)
+            if done < len(records):
+                return start + done
+            start = end
+        return len(entries)
+
+    async def _write_records(self, table: str, records: List[Tuple[Any, ...]]) -> int:
+        """
+        Пачка одной таблицы. Ошибка данных отклоняет весь COPY/INSERT, поэтому
+        пачка делится пополам, пока плохая строка не останется одна
+
+        Returns:
+            Сколько строк от начала обработано; меньше len(records) - БД недоступна
+        """
+        try:
+            await self.writer(table, WRITE_BEHIND_TABLES[table], records)
+        except Exception as e:
+            self.stats['failed_batches'] += 1
+            if _is_unavailable(e):
+                logger.warning(f"⚠️ Write-behind batch to {table} failed ({len(records)} rows): {e}")
+                return 0
+            if len(records) == 1:
+                # Ошибка данных: повтор не поможет
+                self.stats['rejected'] += 1
+                logger.error(f"❌ Write-behind row {records[0][0]} to {table} rejected: {e}")
+                return 1
+            middle = len(records) // 2
+            done = await self._write_records(table, records[:middle])
+            if done < middle:
+                return done
+            return middle + await self._write_records(table, records[middle:])
+        self.stats['batches'] += 1
+        self.stats['written'] += len(records)
+        return len(records)
+
+    # =====================================================
+    # SPILL НА ДИСК
+    # =====================================================
+
+    async def _spill(self, entries: List[Tuple[str, Tuple[Any, ...]]]):
+        """Дозапись строк в spill файл (без файла строки теряются)"""
+        if not entries:
+            return
+        if not self.spill_path:
+            self.stats['dropped'] += len(entries)
+            logger.error(f"❌ Write-behind: {len(entries)} rows dropped (no spill_path)")
+            return
+        try:
+            await asyncio.to_thread(self._append_spill, entries)
+            self._spill_pending = True
+            self.stats['spilled'] += len(entries)
+        except OSError as e:
+            self.stats['dropped'] += len(entries)
+            logger.error(f"❌ Write-behind spill failed, {len(entries)} rows dropped: {e}")
+
+    def _append_spill(self, entries: List[Tuple[str, Tuple[Any, ...]]]):
+        directory = os.path.dirname(self.spill_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.spill_path, 'a', encoding='utf-8') as f:
+            for table, record in entries:
+                f.write(json.dumps({'table': table, 'record': list(record)}, default=str) + "\n")
+
+    def _read_spill_chunk(self, path: str, offset: int,
+                          limit: int) -> Tuple[List[Tuple[str, Tuple[Any, ...]]], List[int], int]:
+        """До limit строк с байтового смещения offset, смещение после каждой и число битых строк"""
+        entries, offsets, corrupt = [], [], 0
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                offset += len(line)
+                if not line.strip():
+                    continue
+                try:
+                    item = json.loads(line)
+                except ValueError:
+                    # Оборванная строка (процесс упал посреди записи)
+                    corrupt += 1
+                    logger.error(f"❌ Write-behind: corrupt spill line at {path}:{offset} dropped")
+                    continue
+                entries.append((item['table'], tuple(item['record'])))
+                offsets.append(offset)
+                if len(entries) >= limit:
+                    break
+        return entries, offsets, corrupt
+
+    def _load_offset(self) -> int:
+        try:
+            with open(self.spill_path + ".offset", 'r', encoding='utf-8') as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _save_offset(self, offset: int):
+        with open(self.spill_path + ".offset", 'w', encoding='utf-8') as f:
+            f.write(str(offset))
+
+    async def _replay_spill(self) -> Optional[int]:
+        """
+        Запись spill файла в БД по batch_size строк; смещение сохраняется в
+        .offset, так что после сбоя (или перезапуска) replay продолжается с него
+
+        Returns:
+            Количество записанных строк или None, если БД недоступна
+        """
+        replay_path = self.spill_path + ".replay"
+        offset_path = self.spill_path + ".offset"
+        written_before = self.stats['written']
+        self._spill_pending = False
+        while True:
+            if not os.path.exists(replay_path):
+                if not os.path.exists(self.spill_path):
+                    break
+                # Новые spill строки во время replay пишутся уже в свежий файл
+                os.replace(self.spill_path, replay_path)
+                self._replay_offset = 0
+            if self._replay_offset is None:
+                self._replay_offset = await asyncio.to_thread(self._load_offset)
+
+            entries, offsets, corrupt = await asyncio.to_thread(
+                self._read_spill_chunk, replay_path, self._replay_offset, self.batch_size
+            )
+            self.stats['dropped'] += corrupt
+            if not entries:
+                # Сначала смещение: иначе после сбоя оно применится к следующему файлу
+                if os.path.exists(offset_path):
+                    os.remove(offset_path)
+                os.remove(replay_path)
+                self._replay_offset = 0
+                continue
+
+            done = await self._write_entries(entries)
+            if done:
+                self._replay_offset = offsets[done - 1]
+                await asyncio.to_thread(self._save_offset, self._replay_offset)
+            if done < len(entries):
+                # Остаток .replay старше того, что попадёт в spill файл за это время
+                self._spill_pending = True
+                self.stats['replayed'] += self.stats['written'] - written_before
+                return None
+
+        written = self.stats['written'] - written_before
+        self.stats['replayed'] += written
+        logger.info(f"✅ Write-behind: {written} spilled rows written to database")
+        return written
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика очереди"""
+        return {
+            **self.stats,
+            'pending': self._pending,
+            'overflow': len(self._overflow),
+            'spill_pending': self._spill_pending,
+            'batch_size': self.batch_size,
+            'flush_interval': self.flush_interval,
+        }
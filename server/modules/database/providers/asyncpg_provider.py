@@ -0,0 +1,791 @@
+"""
+Асинхронный PostgreSQL Provider на asyncpg
+
+Тот же интерфейс, что у PostgreSQLProvider, но без блокирующих вызовов:
+- настоящий асинхронный пул соединений (asyncpg.Pool)
+- кэш подготовленных запросов на соединении (statement_cache_size);
+  SQL для одной и той же формы запроса строится один раз и переиспользуется
+- горячие запросы - из QUERY_REGISTRY (явная проекция колонок, статистика)
+- JSONB кодируется/декодируется драйвером (dict на входе и выходе, binary кодеки - их требует COPY)
+"""
+
+import json
+import logging
+import re
+import time
+import uuid
+from typing import AsyncGenerator, Dict, Any, Optional, List, Sequence, Tuple
+from datetime import datetime, timezone
+from integrations.core.universal_provider_interface import UniversalProviderInterface
+from modules.database.core.query_registry import (
+    COMMAND_INSERT,
+    LLM_ANSWER_INSERT,
+    SESSION_CREATE,
+    SESSION_END,
+    SESSION_EXPIRE_BATCH,
+    SHORT_MEMORY_EXPIRE_BATCH,
+    USER_MEMORY_READ,
+    USER_MEMORY_UPDATE,
+    QueryMetrics,
+    QuerySpec,
+)
+
+logger = logging.getLogger(__name__)
+
+# Импорт asyncpg (с обработкой отсутствия)
+try:
+    import asyncpg
+    ASYNCPG_AVAILABLE = True
+except ImportError:
+    asyncpg = None
+    ASYNCPG_AVAILABLE = False
+    logger.warning("⚠️ asyncpg не найден - асинхронный PostgreSQL провайдер будет недоступен")
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+_FILTER_OPERATORS = {'gt': '>', 'lt': '<', 'like': 'LIKE'}
+
+
+def _identifier(name: str) -> str:
+    """Имя таблицы/колонки подставляется в SQL как есть - только простые идентификаторы"""
+    if not isinstance(name, str) or not _IDENTIFIER.match(name):
+        raise ValueError(f"Invalid SQL identifier: {name!r}")
+    return name
+
+
+# Binary формат jsonb - байт версии (1) и текст JSON; json - просто текст
+_JSONB_VERSION = b'\x01'
+
+
+def _encode_json(value: Any) -> bytes:
+    return json.dumps(value).encode('utf-8')
+
+
+def _encode_jsonb(value: Any) -> bytes:
+    return _JSONB_VERSION + json.dumps(value).encode('utf-8')
+
+
+def _decode_jsonb(data: bytes) -> Any:
+    return json.loads(data[1:])
+
+
+class AsyncPostgreSQLProvider(UniversalProviderInterface):
+    """
+    Провайдер для работы с PostgreSQL через asyncpg
+
+    Обеспечивает те же операции, что и PostgreSQLProvider:
+    - users, sessions, commands, llm_answers, screenshots, performance_metrics
+    - Управление памятью (short_term_memory, long_term_memory)
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        """
+        Инициализация асинхронного PostgreSQL провайдера
+
+        Args:
+            config: Конфигурация провайдера
+        """
+        super().__init__(
+            name="postgresql_async",
+            priority=1,  # Основной провайдер
+            config=config
+        )
+
+        # Настройки подключения
+        self.connection_string = config.get('connection_string', 'postgresql://localhost/voice_assistant_db')
+        self.host = config.get('host', 'localhost')
+        self.port = config.get('port', 5432)
+        self.database = config.get('database', 'voice_assistant_db')
+        self.username = config.get('username', 'postgres')
+        self.password = config.get('password', '')
+
+        # Настройки пула соединений
+        self.min_connections = config.get('min_connections', 1)
+        self.max_connections = config.get('max_connections', 10)
+        self.connection_timeout = config.get('connection_timeout', 30)
+        self.command_timeout = config.get('command_timeout', 60)
+
+        # Подготовленные запросы
+        self.enable_prepared_statements = config.get('enable_prepared_statements', True)
+        self.statement_cache_size = config.get('statement_cache_size', 100) if self.enable_prepared_statements else 0
+
+        # Настройки логирования
+        self.log_queries = config.get('log_queries', False)
+        self.log_slow_queries = config.get('log_slow_queries', True)
+        self.slow_query_threshold = config.get('slow_query_threshold', 1000)
+
+        # Настройки мониторинга
+        self.enable_metrics = config.get('enable_metrics', True)
+        self.health_check_interval = config.get('health_check_interval', 300)
+
+        # Пул (pool - готовый пул, например FakeAsyncpgPool для офлайн проверки)
+        self._injected_pool = config.get('pool')
+        self.pool = None
+        self.is_available = ASYNCPG_AVAILABLE or self._injected_pool is not None
+
+        # SQL по форме запроса: (операция, таблица, колонки) -> текст
+        self._sql_cache: Dict[Tuple, str] = {}
+
+        # Метрики
+        self.query_metrics = QueryMetrics()
+        self.queries_executed = 0
+        self.total_query_time = 0.0
+        self.slow_queries = 0
+
+        logger.info(f"Async PostgreSQL Provider initialized with host: {self.host}:{self.port}")
+
+    async def initialize(self) -> bool:
+        """
+        Инициализация провайдера: создание пула и проверка подключения
+
+        Returns:
+            True если инициализация успешна, False иначе
+        """
+        try:
+            logger.info("Initializing Async PostgreSQL Provider...")
+
+            if not self.is_available:
+                logger.error("asyncpg is not installed")
+                return False
+
+            await self._create_connection_pool()
+
+            if await self._test_connection():
+                self.is_initialized = True
+                logger.info("Async PostgreSQL Provider initialized successfully")
+                return True
+            else:
+                logger.error("Async PostgreSQL Provider connection test failed")
+                return False
+
+        except Exception as e:
+            logger.error(f"Failed to initialize Async PostgreSQL Provider: {e}")
+            return False
+
+    async def process(self, input_data: Dict[str, Any]) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Обработка запроса к базе данных
+
+        Args:
+            input_data: Данные запроса (operation, table, data и т.д.)
+
+        Yields:
+            Результат операции
+        """
+        try:
+            if not self.is_initialized:
+                raise Exception("Async PostgreSQL Provider not initialized")
+
+            operation = input_data.get('operation')
+            table = input_data.get('table')
+            data = input_data.get('data', {})
+            filters = input_data.get('filters', {})
+
+            if not operation or not table:
+                raise Exception("Operation and table are required")
+
+            result = await self._execute_operation(operation, table, data, filters)
+
+            self.total_requests += 1
+            self.report_success()
+
+            yield result
+            logger.debug(f"Database operation completed: {operation} on {table}")
+
+        except Exception as e:
+            logger.error(f"Async PostgreSQL Provider processing error: {e}")
+            self.report_error(str(e))
+            raise e
+
+    async def cleanup(self) -> bool:
+        """
+        Закрытие пула соединений
+
+        Returns:
+            True если очистка успешна, False иначе
+        """
+        try:
+            logger.info("Cleaning up Async PostgreSQL Provider...")
+
+            if self.pool:
+                await self.pool.close()
+                self.pool = None
+
+            self.is_initialized = False
+            logger.info("Async PostgreSQL Provider cleaned up successfully")
+            return True
+
+        except Exception as e:
+            logger.error(f"Error cleaning up Async PostgreSQL Provider: {e}")
+            return False
+
+    async def _create_connection_pool(self):
+        """Создание пула соединений"""
+        if self._injected_pool is not None:
+            self.pool = self._injected_pool
+            logger.info("Using injected connection pool")
+            return
+
+        self.pool = await asyncpg.create_pool(
+            dsn=self.connection_string,
+            min_size=self.min_connections,
+            max_size=self.max_connections,
+            timeout=self.connection_timeout,
+            command_timeout=self.command_timeout,
+            statement_cache_size=self.statement_cache_size,
+            init=self._init_connection
+        )
+        logger.info(
+            f"Async connection pool created: {self.min_connections}-{self.max_connections} connections, "
+            f"statement cache {self.statement_cache_size}"
+        )
+
+    @staticmethod
+    async def _init_connection(conn):
+        """
+        JSON/JSONB как dict, без ручного json.dumps/loads
+
+        Кодеки в binary формате: COPY (insert_many) принимает только binary
+        кодеки, с текстовым падает "no binary format encoder for type jsonb".
+        """
+        await conn.set_type_codec(
+            'json', encoder=_encode_json, decoder=json.loads, schema='pg_catalog', format='binary'
+        )
+        await conn.set_type_codec(
+            'jsonb', encoder=_encode_jsonb, decoder=_decode_jsonb, schema='pg_catalog', format='binary'
+        )
+
+    async def _test_connection(self) -> bool:
+        """Тестирование подключения к БД"""
+        try:
+            result = await self._fetchval("SELECT 1")
+            if result == 1:
+                logger.info("Database connection test successful")
+                return True
+            logger.error("Database connection test failed")
+            return False
+        except Exception as e:
+            logger.error(f"Database connection test error: {e}")
+            return False
+
+    # =====================================================
+    # ВЫПОЛНЕНИЕ ЗАПРОСОВ
+    # =====================================================
+
+    async def _fetch(self, sql: str, *args) -> List[Dict[str, Any]]:
+        started = time.perf_counter()
+        try:
+            async with self.pool.acquire(timeout=self.connection_timeout) as conn:
+                rows = await conn.fetch(sql, *args)
+            return [dict(row) for row in rows]
+        finally:
+            self._record_query(sql, started)
+
+    async def _fetchrow(self, sql: str, *args) -> Optional[Dict[str, Any]]:
+        started = time.perf_counter()
+        try:
+            async with self.pool.acquire(timeout=self.connection_timeout) as conn:
+                row = await conn.fetchrow(sql, *args)
+            return dict(row) if row is not None else None
+        finally:
+            self._record_query(sql, started)
+
+    async def _fetchval(self, sql: str, *args) -> Any:
+        started = time.perf_counter()
+        try:
+            async with self.pool.acquire(timeout=self.connection_timeout) as conn:
+                return await conn.fetchval(sql, *args)
+        finally:
+            self._record_query(sql, started)
+
+    def _record_query(self, sql: str, started: float):
+        execution_time = (time.perf_counter() - started) * 1000
+        self.queries_executed += 1
+        self.total_query_time += execution_time
+        if self.log_slow_queries and execution_time > self.slow_query_threshold:
+            self.slow_queries += 1
+            logger.warning(f"Slow query detected ({execution_time:.2f}ms): {' '.join(sql.split())[:200]}")
+        if self.log_queries:
+            logger.info(f"Query executed in {execution_time:.2f}ms: {' '.join(sql.split())[:200]}")
+
+    async def _run_query(self, spec: QuerySpec, **values) -> List[Dict[str, Any]]:
+        """Запрос из реестра: prepared statement из кэша соединения + статистика по имени"""
+        args = spec.bind(values)
+        started = time.perf_counter()
+        try:
+            async with self.pool.acquire(timeout=self.connection_timeout) as conn:
+                rows = [dict(row) for row in await conn.fetch(spec.sql, *args)]
+        except Exception:
+            self.query_metrics.observe_error(spec.name, (time.perf_counter() - started) * 1000)
+            self._record_query(spec.sql, started)
+            raise
+        self.query_metrics.observe(spec.name, (time.perf_counter() - started) * 1000, rows)
+        self._record_query(spec.sql, started)
+        return rows
+
+    async def insert_many(self, table: str, columns: Sequence[str], records: List[Tuple[Any, ...]]) -> int:
+        """Пакетная вставка одним COPY (write-behind очередь)"""
+        if not records:
+            return 0
+        name = f"{_identifier(table)}_copy"
+        started = time.perf_counter()
+        try:
+            async with self.pool.acquire(timeout=self.connection_timeout) as conn:
+                await conn.copy_records_to_table(
+                    table, records=records, columns=[_identifier(c) for c in columns], timeout=self.command_timeout
+                )
+        except Exception:
+            self.query_metrics.observe_error(name, (time.perf_counter() - started) * 1000)
+            raise
+        execution_time = (time.perf_counter() - started) * 1000
+        self.query_metrics.observe(name, execution_time, [])
+        self.queries_executed += 1
+        self.total_query_time += execution_time
+        return len(records)
+
+    def _cached_sql(self, key: Tuple, build) -> str:
+        sql = self._sql_cache.get(key)
+        if sql is None:
+            sql = self._sql_cache[key] = build()
+        return sql
+
+    async def _execute_operation(self, operation: str, table: str, data: Dict[str, Any], filters: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Выполнение операции с базой данных
+
+        Args:
+            operation: Тип операции (create, read, update, delete)
+            table: Название таблицы
+            data: Данные для операции
+            filters: Фильтры для операции
+
+        Returns:
+            Результат операции
+        """
+        if operation == 'create':
+            return await self._create_record(table, data)
+        elif operation == 'read':
+            return await self._read_records(table, filters)
+        elif operation == 'update':
+            return await self._update_record(table, data, filters)
+        elif operation == 'delete':
+            return await self._delete_record(table, filters)
+        else:
+            raise Exception(f"Unknown operation: {operation}")
+
+    async def _create_record(self, table: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Создание записи в таблице"""
+        try:
+            if 'id' not in data:
+                data['id'] = str(uuid.uuid4())
+
+            columns = tuple(data.keys())
+            sql = self._cached_sql(('create', table, columns), lambda: (
+                f"INSERT INTO {_identifier(table)} ({', '.join(_identifier(c) for c in columns)}) "
+                f"VALUES ({', '.join(f'${i}' for i in range(1, len(columns) + 1))}) RETURNING *"
+            ))
+
+            row = await self._fetchrow(sql, *data.values())
+            if row:
+                return {'success': True, 'data': row, 'operation': 'create', 'table': table}
+            return {'success': False, 'error': 'No data returned', 'operation': 'create', 'table': table}
+
+        except Exception as e:
+            logger.error(f"Error creating record in {table}: {e}")
+            return {'success': False, 'error': str(e), 'operation': 'create', 'table': table}
+
+    def _where(self, filters: Dict[str, Any], start: int = 1) -> Tuple[Tuple, str, List[Any]]:
+        """
+        WHERE по фильтрам: (форма для кэша SQL, текст условия, значения)
+
+        Поддерживаются значения и операторы gt, lt, like, in (как в PostgreSQLProvider)
+        """
+        shape, conditions, values = [], [], []
+        index = start
+        for key, value in filters.items():
+            column = _identifier(key)
+            if isinstance(value, dict):
+                for op, val in value.items():
+                    if op == 'in':
+                        val = list(val)
+                        conditions.append(f"{column} = ANY(${index})")
+                    elif op in _FILTER_OPERATORS:
+                        conditions.append(f"{column} {_FILTER_OPERATORS[op]} ${index}")
+                    else:
+                        continue
+                    shape.append((column, op))
+                    values.append(val)
+                    index += 1
+            else:
+                conditions.append(f"{column} = ${index}")
+                shape.append((column, '='))
+                values.append(value)
+                index += 1
+        return tuple(shape), " AND ".join(conditions), values
+
+    async def _read_records(self, table: str, filters: Dict[str, Any]) -> Dict[str, Any]:
+        """Чтение записей из таблицы"""
+        try:
+            shape, where, values = self._where(filters or {})
+            sql = self._cached_sql(('read', table, shape), lambda: (
+                f"SELECT * FROM {_identifier(table)}" + (f" WHERE {where}" if where else "")
+            ))
+
+            records = await self._fetch(sql, *values)
+            return {'success': True, 'data': records, 'count': len(records), 'operation': 'read', 'table': table}
+
+        except Exception as e:
+            logger.error(f"Error reading records from {table}: {e}")
+            return {'success': False, 'error': str(e), 'operation': 'read', 'table': table}
+
+    async def _update_record(self, table: str, data: Dict[str, Any], filters: Dict[str, Any]) -> Dict[str, Any]:
+        """Обновление записи в таблице"""
+        try:
+            if not filters:
+                raise Exception("Update operation requires filters")
+
+            columns = tuple(data.keys())
+            filter_columns = tuple(filters.keys())
+            sql = self._cached_sql(('update', table, columns, filter_columns), lambda: (
+                f"UPDATE {_identifier(table)} "
+                f"SET {', '.join(f'{_identifier(c)} = ${i}' for i, c in enumerate(columns, 1))} "
+                f"WHERE {' AND '.join(f'{_identifier(c)} = ${i}' for i, c in enumerate(filter_columns, len(columns) + 1))} "
+                f"RETURNING *"
+            ))
+
+            row = await self._fetchrow(sql, *data.values(), *filters.values())
+            if row:
+                return {'success': True, 'data': row, 'operation': 'update', 'table': table}
+            return {'success': False, 'error': 'No records updated', 'operation': 'update', 'table': table}
+
+        except Exception as e:
+            logger.error(f"Error updating record in {table}: {e}")
+            return {'success': False, 'error': str(e), 'operation': 'update', 'table': table}
+
+    async def _delete_record(self, table: str, filters: Dict[str, Any]) -> Dict[str, Any]:
+        """Удаление записи из таблицы"""
+        try:
+            if not filters:
+                raise Exception("Delete operation requires filters")
+
+            filter_columns = tuple(filters.keys())
+            sql = self._cached_sql(('delete', table, filter_columns), lambda: (
+                f"DELETE FROM {_identifier(table)} "
+                f"WHERE {' AND '.join(f'{_identifier(c)} = ${i}' for i, c in enumerate(filter_columns, 1))} "
+                f"RETURNING *"
+            ))
+
+            row = await self._fetchrow(sql, *filters.values())
+            if row:
+                return {'success': True, 'data': row, 'operation': 'delete', 'table': table}
+            return {'success': False, 'error': 'No records deleted', 'operation': 'delete', 'table': table}
+
+        except Exception as e:
+            logger.error(f"Error deleting record from {table}: {e}")
+            return {'success': False, 'error': str(e), 'operation': 'delete', 'table': table}
+
+    async def _custom_health_check(self) -> bool:
+        """
+        Кастомная проверка здоровья провайдера
+
+        Returns:
+            True если провайдер здоров, False иначе
+        """
+        try:
+            if not self.pool:
+                return False
+            return await self._test_connection()
+        except Exception as e:
+            logger.warning(f"Async PostgreSQL Provider health check failed: {e}")
+            return False
+
+    # =====================================================
+    # СПЕЦИАЛИЗИРОВАННЫЕ МЕТОДЫ ДЛЯ КАЖДОЙ ТАБЛИЦЫ
+    # =====================================================
+
+    async def create_user(self, hardware_id_hash: str, metadata: Dict[str, Any] = None) -> Optional[str]:
+        """Создание нового пользователя"""
+        result = await self._create_record('users', {
+            'hardware_id_hash': hardware_id_hash,
+            'metadata': metadata or {}
+        })
+
+        if result['success']:
+            return result['data']['id']
+        logger.error(f"Failed to create user: {result['error']}")
+        return None
+
+    async def get_user_by_hardware_id(self, hardware_id_hash: str) -> Optional[Dict[str, Any]]:
+        """Получение пользователя по аппаратному ID"""
+        try:
+            return await self._fetchrow("SELECT * FROM users WHERE hardware_id_hash = $1 LIMIT 1", hardware_id_hash)
+        except Exception as e:
+            logger.error(f"Error getting user by hardware ID: {e}")
+            return None
+
+    async def _insert_returning_id(self, spec: QuerySpec, **values) -> Optional[str]:
+        """INSERT из реестра, возвращает id новой записи"""
+        try:
+            rows = await self._run_query(spec, id=str(uuid.uuid4()), **values)
+            if rows:
+                return rows[0]['id']
+            logger.error(f"{spec.name}: no data returned")
+        except Exception as e:
+            logger.error(f"{spec.name} failed: {e}")
+        return None
+
+    async def create_session(self, user_id: str, metadata: Dict[str, Any] = None) -> Optional[str]:
+        """Создание новой сессии"""
+        return await self._insert_returning_id(SESSION_CREATE, user_id=user_id, metadata=metadata or {}, status='active')
+
+    async def end_session(self, session_id: str) -> bool:
+        """Завершение сессии"""
+        try:
+            rows = await self._run_query(SESSION_END, status='ended', end_time=datetime.now(timezone.utc), id=session_id)
+            return bool(rows)
+        except Exception as e:
+            logger.error(f"Error ending session: {e}")
+            return False
+
+    async def create_command(self, session_id: str, prompt: str, metadata: Dict[str, Any] = None, language: str = 'en') -> Optional[str]:
+        """Создание новой команды"""
+        return await self._insert_returning_id(
+            COMMAND_INSERT, session_id=session_id, prompt=prompt, language=language, metadata=metadata or {}
+        )
+
+    async def create_llm_answer(self, command_id: str, prompt: str, response: str,
+                               model_info: Dict[str, Any] = None,
+                               performance_metrics: Dict[str, Any] = None) -> Optional[str]:
+        """Создание ответа LLM"""
+        return await self._insert_returning_id(
+            LLM_ANSWER_INSERT, command_id=command_id, prompt=prompt, response=response,
+            model_info=model_info or {}, performance_metrics=performance_metrics or {}
+        )
+
+    async def create_screenshot(self, session_id: str, file_path: str = None, file_url: str = None,
+                               metadata: Dict[str, Any] = None) -> Optional[str]:
+        """Создание записи о скриншоте"""
+        result = await self._create_record('screenshots', {
+            'session_id': session_id,
+            'file_path': file_path,
+            'file_url': file_url,
+            'metadata': metadata or {}
+        })
+
+        if result['success']:
+            return result['data']['id']
+        logger.error(f"Failed to create screenshot: {result['error']}")
+        return None
+
+    async def create_performance_metric(self, session_id: str, metric_type: str,
+                                       metric_value: Dict[str, Any]) -> Optional[str]:
+        """Создание метрики производительности"""
+        result = await self._create_record('performance_metrics', {
+            'session_id': session_id,
+            'metric_type': metric_type,
+            'metric_value': metric_value
+        })
+
+        if result['success']:
+            return result['data']['id']
+        logger.error(f"Failed to create performance metric: {result['error']}")
+        return None
+
+    # =====================================================
+    # МЕТОДЫ УПРАВЛЕНИЯ ПАМЯТЬЮ (БЕЗ ЛОГИКИ)
+    # =====================================================
+
+    async def get_user_memory(self, hardware_id_hash: str) -> Dict[str, str]:
+        """Получение памяти пользователя (только нужные колонки)"""
+        try:
+            rows = await self._run_query(USER_MEMORY_READ, hardware_id_hash=hardware_id_hash)
+        except Exception as e:
+            logger.error(f"Error getting user memory: {e}")
+            rows = None
+
+        if rows:
+            row = rows[0]
+            return {
+                'short': row.get('short_term_memory') or '',
+                'long': row.get('long_term_memory') or ''
+            }
+        return {'short': '', 'long': ''}
+
+    async def update_user_memory(self, hardware_id_hash: str, short_memory: str, long_memory: str) -> bool:
+        """Обновление памяти пользователя"""
+        try:
+            rows = await self._run_query(
+                USER_MEMORY_UPDATE,
+                short_term_memory=short_memory,
+                long_term_memory=long_memory,
+                memory_updated_at=datetime.now(timezone.utc),
+                hardware_id_hash=hardware_id_hash
+            )
+            return bool(rows)
+        except Exception as e:
+            logger.error(f"Error updating user memory: {e}")
+            return False
+
+    async def cleanup_expired_short_term_memory(self, hours: int = 24) -> int:
+        """Очистка устаревшей краткосрочной памяти"""
+        try:
+            affected_rows = await self._fetchval("SELECT cleanup_expired_short_term_memory($1)", hours) or 0
+            logger.info(f"Cleaned up {affected_rows} expired short-term memory records")
+            return affected_rows
+        except Exception as e:
+            logger.error(f"Error cleaning up expired short-term memory: {e}")
+            return 0
+
+    async def expire_short_term_memory_batch(self, updated_before: datetime, limit: int) -> List[str]:
+        """
+        Очистка пачки устаревшей краткосрочной памяти (не больше limit строк за запрос)
+
+        Returns:
+            hardware_id_hash очищенных пользователей; ошибки пробрасываются
+        """
+        rows = await self._run_query(SHORT_MEMORY_EXPIRE_BATCH, updated_before=updated_before, limit=limit)
+        return [row['hardware_id_hash'] for row in rows]
+
+    async def expire_stale_sessions_batch(self, started_before: datetime, limit: int) -> int:
+        """
+        Закрытие пачки зависших активных сессий (не больше limit строк за запрос)
+
+        Returns:
+            Количество закрытых сессий; ошибки пробрасываются
+        """
+        rows = await self._run_query(
+            SESSION_EXPIRE_BATCH,
+            status='expired',
+            end_time=datetime.now(timezone.utc),
+            started_before=started_before,
+            limit=limit
+        )
+        return len(rows)
+
+    async def get_memory_statistics(self) -> Dict[str, Any]:
+        """Получение статистики памяти"""
+        try:
+            return await self._fetchrow("SELECT * FROM get_memory_stats()") or {}
+        except Exception as e:
+            logger.error(f"Error getting memory statistics: {e}")
+            return {}
+
+    async def get_users_with_active_memory(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Получение пользователей с активной памятью"""
+        try:
+            return await self._fetch("""
+                SELECT hardware_id_hash, memory_updated_at,
+                       LENGTH(COALESCE(short_term_memory, '')) as short_memory_size,
+                       LENGTH(COALESCE(long_term_memory, '')) as long_memory_size
+                FROM users
+                WHERE short_term_memory IS NOT NULL OR long_term_memory IS NOT NULL
+                ORDER BY memory_updated_at DESC
+                LIMIT $1
+            """, limit)
+        except Exception as e:
+            logger.error(f"Error getting users with active memory: {e}")
+            return []
+
+    # =====================================================
+    # АНАЛИТИЧЕСКИЕ МЕТОДЫ
+    # =====================================================
+
+    async def get_user_statistics(self, user_id: str) -> Dict[str, Any]:
+        """Получение статистики пользователя"""
+        try:
+            return await self._fetchrow("""
+                SELECT
+                    COUNT(DISTINCT s.id) as total_sessions,
+                    COUNT(c.id) as total_commands,
+                    COUNT(DISTINCT sc.id) as total_screenshots,
+                    AVG(EXTRACT(EPOCH FROM (s.end_time - s.start_time))) as avg_session_duration_seconds
+                FROM users u
+                LEFT JOIN sessions s ON u.id = s.user_id
+                LEFT JOIN commands c ON s.id = c.session_id
+                LEFT JOIN screenshots sc ON s.id = sc.session_id
+                WHERE u.id = $1
+                GROUP BY u.id
+            """, user_id) or {}
+        except Exception as e:
+            logger.error(f"Error getting user statistics: {e}")
+            return {}
+
+    async def get_session_commands(self, session_id: str) -> List[Dict[str, Any]]:
+        """Получение всех команд сессии с ответами LLM"""
+        try:
+            return await self._fetch("""
+                SELECT
+                    c.*,
+                    la.response as llm_response,
+                    la.model_info,
+                    la.performance_metrics
+                FROM commands c
+                LEFT JOIN llm_answers la ON c.id = la.command_id
+                WHERE c.session_id = $1
+                ORDER BY c.created_at
+            """, session_id)
+        except Exception as e:
+            logger.error(f"Error getting session commands: {e}")
+            return []
+
+    def _pool_metrics(self) -> Dict[str, Any]:
+        if not self.pool:
+            return {}
+        return {
+            "pool_size": self.pool.get_size(),
+            "pool_idle": self.pool.get_idle_size(),
+            "pool_max_size": self.pool.get_max_size()
+        }
+
+    def get_status(self) -> Dict[str, Any]:
+        """
+        Получение расширенного статуса провайдера
+
+        Returns:
+            Словарь со статусом провайдера
+        """
+        base_status = super().get_status()
+
+        base_status.update({
+            "provider_type": "postgresql_async",
+            "host": self.host,
+            "port": self.port,
+            "database": self.database,
+            "username": self.username,
+            "min_connections": self.min_connections,
+            "max_connections": self.max_connections,
+            "connection_timeout": self.connection_timeout,
+            "command_timeout": self.command_timeout,
+            "statement_cache_size": self.statement_cache_size,
+            "enable_metrics": self.enable_metrics,
+            "health_check_interval": self.health_check_interval,
+            "pool_available": bool(self.pool),
+            **self._pool_metrics()
+        })
+
+        return base_status
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Получение расширенных метрик провайдера
+
+        Returns:
+            Словарь с метриками провайдера
+        """
+        base_metrics = super().get_metrics()
+
+        base_metrics.update({
+            "provider_type": "postgresql_async",
+            "host": self.host,
+            "port": self.port,
+            "database": self.database,
+            "pool_available": bool(self.pool),
+            "queries_executed": self.queries_executed,
+            "avg_query_time_ms": self.total_query_time / self.queries_executed if self.queries_executed else 0.0,
+            "slow_queries": self.slow_queries,
+            "sql_shapes_cached": len(self._sql_cache),
+            "queries": self.query_metrics.snapshot(),
+            "enable_metrics": self.enable_metrics,
+            **self._pool_metrics()
+        })
+
+        return base_metrics
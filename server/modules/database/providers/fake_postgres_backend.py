@@ -0,0 +1,441 @@
+"""
+Фейковый PostgreSQL backend для офлайн проверки провайдеров БД и бенчмарков
+
+Таблицы в памяти и разбор только тех запросов, которые строят провайдеры:
+    INSERT INTO t (a, b) VALUES ($1, $2)[, ($3, $4) ...] [RETURNING * | a, b]
+    SELECT * | a, b FROM t [WHERE a = $1 AND b > $2] [ORDER BY a [DESC]] [LIMIT n]
+    UPDATE t SET a = $1 WHERE b = $2 [RETURNING * | a, b]
+    UPDATE t SET a = NULL WHERE id IN (SELECT id FROM t WHERE ... LIMIT $n FOR UPDATE SKIP LOCKED)
+    DELETE FROM t WHERE a = $1 [RETURNING * | a, b]
+    SELECT 1
+    PREPARE name AS <запрос> / EXECUTE name (...)   - только psycopg2 соединение
+    copy_records_to_table                           - только asyncpg соединение
+
+COPY в asyncpg кодирует значения только binary кодеками: dict/list (json/jsonb
+колонки) без set_type_codec(..., format='binary') дают InternalClientError,
+как у настоящего драйвера; с binary кодеком значение проходит encoder/decoder.
+
+Плейсхолдеры asyncpg ($1) и psycopg2 (%s). Каждый запрос стоит latency
+секунд: FakeAsyncpgPool ждёт через asyncio.sleep (как сетевой драйвер),
+FakePsycopgPool - через time.sleep (как блокирующий psycopg2).
+available = False имитирует недоступный сервер (ConnectionError на любой запрос).
+"""
+
+import asyncio
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+_RETURNING = r"(?: RETURNING (\*|[\w, ]+))?"
+_INSERT = re.compile(r"^INSERT INTO (\w+) \(([^)]*)\) VALUES (\([^)]*\)(?:, \([^)]*\))*)" + _RETURNING + "$", re.I)
+_VALUES = re.compile(r"\(([^)]*)\)")
+_SELECT = re.compile(
+    r"^SELECT (.+?) FROM (\w+)(?: WHERE (.+?))?(?: ORDER BY (\w+)( DESC| ASC)?)?(?: LIMIT (\$\d+|\d+))?"
+    r"(?: FOR UPDATE(?: SKIP LOCKED)?)?$", re.I
+)
+_UPDATE_IN = re.compile(r"^UPDATE (\w+) SET (.+?) WHERE (\w+) IN \( ?(SELECT .+?) ?\)" + _RETURNING + "$", re.I)
+_UPDATE = re.compile(r"^UPDATE (\w+) SET (.+?) WHERE (.+?)" + _RETURNING + "$", re.I)
+_DELETE = re.compile(r"^DELETE FROM (\w+) WHERE (.+?)" + _RETURNING + "$", re.I)
+_PREPARE = re.compile(r"^PREPARE (\w+) AS (.+)$", re.I)
+_EXECUTE = re.compile(r"^EXECUTE (\w+)(?: \((.*)\))?$", re.I)
+_CONDITION = re.compile(r"^(\w+) (=|>|<|LIKE) (\$\d+|'[^']*')$", re.I)
+_NULL_CONDITION = re.compile(r"^(\w+) IS (NOT )?NULL$", re.I)
+_ASSIGNMENT = re.compile(r"^(\w+) = (\$\d+|NULL)$", re.I)
+_PERCENT_S = re.compile(r"%s")
+
+
+class InternalClientError(Exception):
+    """Аналог asyncpg.exceptions.InternalClientError"""
+    pass
+
+
+class FakeDatabase:
+    """Таблицы в памяти + счётчики запросов"""
+
+    def __init__(self, latency: float = 0.002):
+        self.latency = latency
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        self.queries = 0
+        self.parses = 0
+        self.available = True
+        self._lock = threading.Lock()
+
+    def insert(self, table: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Прямая вставка (заполнение данных для бенчмарков)"""
+        row = dict(row)
+        row.setdefault('id', str(uuid.uuid4()))
+        row.setdefault('created_at', datetime.now(timezone.utc))
+        with self._lock:
+            self.tables.setdefault(table, []).append(row)
+        return dict(row)
+
+    def execute(self, sql: str, args: Sequence[Any]) -> Tuple[List[Dict[str, Any]], str]:
+        """Выполнение запроса: (строки, статус в формате asyncpg)"""
+        self._check_available()
+        sql = " ".join(sql.split())
+        if '%s' in sql:
+            counter = iter(range(1, len(args) + 1))
+            sql = _PERCENT_S.sub(lambda _: f"${next(counter)}", sql)
+        with self._lock:
+            self.queries += 1
+            return self._execute(sql, list(args))
+
+    def _check_available(self):
+        if not self.available:
+            raise ConnectionError("connection refused")
+
+    def copy(self, table: str, columns: Sequence[str], records: Sequence[Sequence[Any]]) -> str:
+        """COPY table (columns) FROM STDIN"""
+        self._check_available()
+        with self._lock:
+            self.queries += 1
+            rows = self.tables.setdefault(table, [])
+            for record in records:
+                row = dict(zip(columns, record))
+                row.setdefault('id', str(uuid.uuid4()))
+                row.setdefault('created_at', datetime.now(timezone.utc))
+                rows.append(row)
+        return f"COPY {len(records)}"
+
+    def _execute(self, sql: str, args: List[Any]) -> Tuple[List[Dict[str, Any]], str]:
+        if sql.upper() == "SELECT 1":
+            return [{'?column?': 1}], "SELECT 1"
+
+        match = _INSERT.match(sql)
+        if match:
+            table, columns, values, returning = match.groups()
+            inserted = []
+            for tuple_values in _VALUES.findall(values):
+                row = {
+                    column.strip(): self._value(token.strip(), args)
+                    for column, token in zip(columns.split(','), tuple_values.split(','))
+                }
+                row.setdefault('id', str(uuid.uuid4()))
+                row.setdefault('created_at', datetime.now(timezone.utc))
+                inserted.append(row)
+            self.tables.setdefault(table, []).extend(inserted)
+            return self._project(inserted, returning), f"INSERT 0 {len(inserted)}"
+
+        match = _SELECT.match(sql)
+        if match:
+            columns, table, where, order_by, direction, limit = match.groups()
+            rows = [row for row in self.tables.get(table, []) if self._matches(row, where, args)]
+            if order_by:
+                rows.sort(key=lambda row: (row.get(order_by) is None, row.get(order_by)),
+                          reverse=bool(direction and direction.strip().upper() == 'DESC'))
+            if limit:
+                rows = rows[:int(self._value(limit, args))]
+            return self._project(rows, columns), f"SELECT {len(rows)}"
+
+        match = _UPDATE_IN.match(sql)
+        if match:
+            table, assignments, column, subquery, returning = match.groups()
+            selected, _ = self._execute(subquery, args)
+            keys = {next(iter(row.values())) for row in selected}
+            rows = [row for row in self.tables.get(table, []) if row.get(column) in keys]
+            for row in rows:
+                row.update(self._assignments(assignments, args))
+            return self._project(rows, returning), f"UPDATE {len(rows)}"
+
+        match = _UPDATE.match(sql)
+        if match:
+            table, assignments, where, returning = match.groups()
+            updates = self._assignments(assignments, args)
+            rows = [row for row in self.tables.get(table, []) if self._matches(row, where, args)]
+            for row in rows:
+                row.update(updates)
+            return self._project(rows, returning), f"UPDATE {len(rows)}"
+
+        match = _DELETE.match(sql)
+        if match:
+            table, where, returning = match.groups()
+            rows = [row for row in self.tables.get(table, []) if self._matches(row, where, args)]
+            self.tables[table] = [row for row in self.tables.get(table, []) if row not in rows]
+            return self._project(rows, returning), f"DELETE {len(rows)}"
+
+        raise NotImplementedError(f"FakeDatabase: unsupported query: {sql}")
+
+    @staticmethod
+    def _project(rows: List[Dict[str, Any]], columns: Optional[str]) -> List[Dict[str, Any]]:
+        """Проекция колонок (SELECT a, b / RETURNING a, b); None - без результата"""
+        if not columns:
+            return []
+        if columns.strip() == '*':
+            return [dict(row) for row in rows]
+        names = [name.strip() for name in columns.split(',')]
+        return [{name: row.get(name) for name in names} for row in rows]
+
+    @classmethod
+    def _assignments(cls, assignments: str, args: List[Any]) -> Dict[str, Any]:
+        updates = {}
+        for assignment in assignments.split(','):
+            parsed = _ASSIGNMENT.match(assignment.strip())
+            if not parsed:
+                raise NotImplementedError(f"FakeDatabase: unsupported assignment: {assignment}")
+            updates[parsed.group(1)] = cls._value(parsed.group(2), args)
+        return updates
+
+    @staticmethod
+    def _value(token: str, args: List[Any]) -> Any:
+        if token.startswith('$'):
+            return args[int(token[1:]) - 1]
+        if token.upper() == 'NULL':
+            return None
+        return int(token) if token.isdigit() else token.strip("'")
+
+    @staticmethod
+    def _matches(row: Dict[str, Any], where: Optional[str], args: List[Any]) -> bool:
+        if not where:
+            return True
+        for condition in re.split(r" AND ", where, flags=re.I):
+            null_check = _NULL_CONDITION.match(condition.strip())
+            if null_check:
+                if (row.get(null_check.group(1)) is None) == bool(null_check.group(2)):
+                    return False
+                continue
+            parsed = _CONDITION.match(condition.strip())
+            if not parsed:
+                raise NotImplementedError(f"FakeDatabase: unsupported condition: {condition}")
+            column, op, token = parsed.groups()
+            value, expected = row.get(column), FakeDatabase._value(token, args)
+            op = op.upper()
+            if op == '=' and value != expected:
+                return False
+            if op in ('>', '<') and (value is None or not (value > expected if op == '>' else value < expected)):
+                return False
+            if op == 'LIKE':
+                pattern = '^' + re.escape(str(expected)).replace('%', '.*').replace('_', '.') + '$'
+                if value is None or not re.match(pattern, str(value)):
+                    return False
+        return True
+
+
+# =====================================================
+# asyncpg
+# =====================================================
+
+class FakeAsyncpgConnection:
+    """Аналог asyncpg.Connection: fetch/fetchrow/fetchval/execute и кэш подготовленных запросов"""
+
+    def __init__(self, db: FakeDatabase, statement_cache_size: int):
+        self.db = db
+        self.statement_cache_size = statement_cache_size
+        self._statements: "OrderedDict[str, None]" = OrderedDict()
+        # Тип -> (encoder, decoder, format) из set_type_codec
+        self._codecs: Dict[str, Tuple[Any, Any, str]] = {}
+
+    async def _run(self, sql: str, args: Sequence[Any]) -> Tuple[List[Dict[str, Any]], str]:
+        # Запрос не из кэша сначала подготавливается (Parse/Describe - отдельный round-trip)
+        if sql in self._statements:
+            self._statements.move_to_end(sql)
+        else:
+            self.db.parses += 1
+            await asyncio.sleep(self.db.latency)
+            if self.statement_cache_size > 0:
+                self._statements[sql] = None
+                while len(self._statements) > self.statement_cache_size:
+                    self._statements.popitem(last=False)
+        await asyncio.sleep(self.db.latency)
+        return self.db.execute(sql, args)
+
+    async def fetch(self, sql: str, *args, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        rows, _ = await self._run(sql, args)
+        return rows
+
+    async def fetchrow(self, sql: str, *args, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        rows, _ = await self._run(sql, args)
+        return rows[0] if rows else None
+
+    async def fetchval(self, sql: str, *args, column: int = 0, timeout: Optional[float] = None) -> Any:
+        rows, _ = await self._run(sql, args)
+        return list(rows[0].values())[column] if rows else None
+
+    async def execute(self, sql: str, *args, timeout: Optional[float] = None) -> str:
+        _, status = await self._run(sql, args)
+        return status
+
+    async def copy_records_to_table(self, table_name: str, *, records, columns=None,
+                                    timeout: Optional[float] = None) -> str:
+        # COPY не подготавливается: один round-trip на всю пачку
+        records = [tuple(self._copy_value(value) for value in record) for record in records]
+        await asyncio.sleep(self.db.latency)
+        return self.db.copy(table_name, columns, records)
+
+    def _copy_value(self, value: Any) -> Any:
+        """Значение json/jsonb колонки через binary кодек, как в COPY asyncpg"""
+        if not isinstance(value, (dict, list)):
+            return value
+        encoder, decoder, codec_format = self._codecs.get('jsonb', (None, None, 'text'))
+        if codec_format != 'binary':
+            raise InternalClientError("no binary format encoder for type jsonb (OID 3802)")
+        return decoder(encoder(value))
+
+    async def set_type_codec(self, typename: str, *, schema: str = 'public', encoder=None, decoder=None,
+                             format: str = 'text'):
+        self._codecs[typename] = (encoder, decoder, format)
+
+
+class _FakeAcquire:
+    def __init__(self, pool: "FakeAsyncpgPool", timeout: Optional[float]):
+        self._pool = pool
+        self._timeout = timeout
+        self._connection: Optional[FakeAsyncpgConnection] = None
+
+    async def __aenter__(self) -> FakeAsyncpgConnection:
+        self._connection = await self._pool._acquire(self._timeout)
+        return self._connection
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._pool._release(self._connection)
+
+
+class FakeAsyncpgPool:
+    """Аналог asyncpg.Pool: acquire() как async context manager, ограничение max_size"""
+
+    def __init__(self, db: FakeDatabase, min_size: int = 1, max_size: int = 10, statement_cache_size: int = 100,
+                 init=None):
+        """
+        Args:
+            init: Настройка нового соединения, как init у asyncpg.create_pool
+                (AsyncPostgreSQLProvider._init_connection - кодеки json/jsonb)
+        """
+        self.db = db
+        self.min_size = min_size
+        self.max_size = max_size
+        self.statement_cache_size = statement_cache_size
+        self.init = init
+        self._idle: List[FakeAsyncpgConnection] = []
+        self._size = 0
+        self._semaphore = asyncio.Semaphore(max_size)
+        self.closed = False
+
+    def acquire(self, timeout: Optional[float] = None) -> _FakeAcquire:
+        return _FakeAcquire(self, timeout)
+
+    async def _acquire(self, timeout: Optional[float]) -> FakeAsyncpgConnection:
+        if self.closed:
+            raise ConnectionError("pool is closed")
+        await asyncio.wait_for(self._semaphore.acquire(), timeout)
+        if self._idle:
+            return self._idle.pop()
+        self._size += 1
+        connection = FakeAsyncpgConnection(self.db, self.statement_cache_size)
+        if self.init is not None:
+            await self.init(connection)
+        return connection
+
+    def _release(self, connection: FakeAsyncpgConnection):
+        self._idle.append(connection)
+        self._semaphore.release()
+
+    def get_size(self) -> int:
+        return self._size
+
+    def get_idle_size(self) -> int:
+        return len(self._idle)
+
+    def get_min_size(self) -> int:
+        return self.min_size
+
+    def get_max_size(self) -> int:
+        return self.max_size
+
+    async def close(self):
+        self.closed = True
+        self._idle.clear()
+
+
+# =====================================================
+# psycopg2 (блокирующий)
+# =====================================================
+
+class _FakeCursor:
+    def __init__(self, connection: "_FakePsycopgConnection", as_dict: bool):
+        self.connection = connection
+        self.db = connection.db
+        self.as_dict = as_dict
+        self.description = None
+        self._rows: List[Dict[str, Any]] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def execute(self, sql: str, values: Sequence[Any] = ()):
+        time.sleep(self.db.latency)
+        self.db._check_available()
+        statement = " ".join(sql.split())
+        prepare = _PREPARE.match(statement)
+        if prepare:
+            if prepare.group(1) in self.connection.prepared:
+                raise RuntimeError(f'prepared statement "{prepare.group(1)}" already exists')
+            self.db.parses += 1
+            self.connection.prepared[prepare.group(1)] = prepare.group(2)
+            self._rows, self.description = [], None
+            return
+        execute = _EXECUTE.match(statement)
+        if execute:
+            if execute.group(1) not in self.connection.prepared:
+                raise RuntimeError(f'prepared statement "{execute.group(1)}" does not exist')
+            sql = self.connection.prepared[execute.group(1)]
+        self._rows, _ = self.db.execute(sql, values)
+        self.description = [(name,) for name in self._rows[0]] if self._rows else None
+
+    def _convert(self, row: Dict[str, Any]):
+        return dict(row) if self.as_dict else tuple(row.values())
+
+    def fetchone(self):
+        return self._convert(self._rows[0]) if self._rows else None
+
+    def fetchall(self):
+        return [self._convert(row) for row in self._rows]
+
+
+class _FakePsycopgConnection:
+    _pids = iter(range(1000, 10 ** 9))
+
+    def __init__(self, db: FakeDatabase):
+        self.db = db
+        self.pid = next(self._pids)
+        self.prepared: Dict[str, str] = {}
+        self.closed = 0
+
+    def get_backend_pid(self) -> int:
+        return self.pid
+
+    def cursor(self, cursor_factory: Any = None) -> _FakeCursor:
+        # cursor_factory (RealDictCursor) - строки как dict
+        return _FakeCursor(self, as_dict=cursor_factory is not None)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+        self.prepared.clear()
+
+
+class FakePsycopgPool:
+    """Аналог psycopg2.pool.ThreadedConnectionPool: getconn/putconn, запросы блокируют поток"""
+
+    def __init__(self, db: FakeDatabase):
+        self.db = db
+        self._idle: List[_FakePsycopgConnection] = []
+
+    def getconn(self) -> _FakePsycopgConnection:
+        return self._idle.pop() if self._idle else _FakePsycopgConnection(self.db)
+
+    def putconn(self, connection: _FakePsycopgConnection):
+        self._idle.append(connection)
+
+    def closeall(self):
+        pass
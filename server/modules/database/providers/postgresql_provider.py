@@ -5,14 +5,27 @@ PostgreSQL Provider для работы с базой данных
 import asyncio
 import logging
 import json
+import re
 import uuid
 import time
-from typing import AsyncGenerator, Dict, Any, Optional, List, Union
+from typing import AsyncGenerator, Dict, Any, Optional, List, Sequence, Tuple, Union
 from datetime import datetime, timezone
 import psycopg2
 import psycopg2.extras
 import psycopg2.pool
 from integrations.core.universal_provider_interface import UniversalProviderInterface
+from modules.database.core.query_registry import (
+    COMMAND_INSERT,
+    LLM_ANSWER_INSERT,
+    SESSION_CREATE,
+    SESSION_END,
+    SESSION_EXPIRE_BATCH,
+    SHORT_MEMORY_EXPIRE_BATCH,
+    USER_MEMORY_READ,
+    USER_MEMORY_UPDATE,
+    QueryMetrics,
+    QuerySpec,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -71,10 +84,15 @@ class PostgreSQLProvider(UniversalProviderInterface):
         self.enable_metrics = config.get('enable_metrics', True)
         self.health_check_interval = config.get('health_check_interval', 300)
         
-        # Пулы соединений
+        # Пулы соединений (pool - готовый пул, например FakePsycopgPool для офлайн проверки)
+        self._injected_pool = config.get('pool')
         self.connection_pool = None
         self.connection = None
         
+        # Запросы реестра: (backend pid, имя statement) уже подготовлены на соединении
+        self._prepared: set = set()
+        self.query_metrics = QueryMetrics()
+        
         logger.info(f"PostgreSQL Provider initialized with host: {self.host}:{self.port}")
     
     async def initialize(self) -> bool:
@@ -155,6 +173,7 @@ class PostgreSQLProvider(UniversalProviderInterface):
             if self.connection_pool:
                 self.connection_pool.closeall()
                 self.connection_pool = None
+                self._prepared.clear()
             
             # Закрываем основное соединение
             if self.connection:
@@ -172,6 +191,11 @@ class PostgreSQLProvider(UniversalProviderInterface):
     async def _create_connection_pool(self):
         """Создание пула соединений"""
         try:
+            if self._injected_pool is not None:
+                self.connection_pool = self._injected_pool
+                logger.info("Using injected connection pool")
+                return
+            
             # Создаем пул соединений
             self.connection_pool = psycopg2.pool.ThreadedConnectionPool(
                 minconn=self.min_connections,
@@ -383,6 +407,68 @@ class PostgreSQLProvider(UniversalProviderInterface):
                 'table': table
             }
     
+    async def _run_query(self, spec: QuerySpec, **values) -> List[Dict[str, Any]]:
+        """Запрос из реестра: PREPARE один раз на backend, дальше EXECUTE с параметрами"""
+        args = spec.bind(values, encode_json=True)
+        started = time.perf_counter()
+        conn = self.connection_pool.getconn()
+        key = None
+        try:
+            key = (conn.get_backend_pid(), spec.statement_name)
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+                if not self.enable_prepared_statements:
+                    # $n -> %(pn)s: тот же SQL без серверной подготовки
+                    sql = re.sub(r"\$(\d+)", r"%(p\1)s", spec.sql)
+                    cursor.execute(sql, {f"p{i}": value for i, value in enumerate(args, 1)})
+                else:
+                    if key not in self._prepared:
+                        cursor.execute(f"PREPARE {spec.statement_name} AS {spec.sql}")
+                        # Statement живёт до конца сессии: rollback и ошибка EXECUTE его не удаляют
+                        self._prepared.add(key)
+                    placeholders = ", ".join(["%s"] * len(args))
+                    cursor.execute(f"EXECUTE {spec.statement_name} ({placeholders})" if args else f"EXECUTE {spec.statement_name}", args)
+                rows = [dict(row) for row in cursor.fetchall()] if cursor.description else []
+            conn.commit()
+        except Exception:
+            if conn.closed:
+                # Соединение сброшено - его statement пропали вместе с backend
+                if key is not None:
+                    self._prepared = {item for item in self._prepared if item[0] != key[0]}
+            else:
+                conn.rollback()
+            self.query_metrics.observe_error(spec.name, (time.perf_counter() - started) * 1000)
+            raise
+        finally:
+            self.connection_pool.putconn(conn)
+        self.query_metrics.observe(spec.name, (time.perf_counter() - started) * 1000, rows)
+        return rows
+    
+    async def insert_many(self, table: str, columns: Sequence[str], records: List[Tuple[Any, ...]]) -> int:
+        """Пакетная вставка одним многострочным INSERT (write-behind очередь)"""
+        if not records:
+            return 0
+        name = f"{table}_batch_insert"
+        started = time.perf_counter()
+        conn = self.connection_pool.getconn()
+        try:
+            row = "(" + ", ".join(["%s"] * len(columns)) + ")"
+            sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES " + ", ".join([row] * len(records))
+            values = [
+                json.dumps(value) if isinstance(value, (dict, list)) else value
+                for record in records for value in record
+            ]
+            with conn.cursor() as cursor:
+                cursor.execute(sql, values)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            self.query_metrics.observe_error(name, (time.perf_counter() - started) * 1000)
+            raise
+        finally:
+            self.connection_pool.putconn(conn)
+        self.query_metrics.observe(name, (time.perf_counter() - started) * 1000, [])
+        return len(records)
+    
     async def _update_record(self, table: str, data: Dict[str, Any], filters: Dict[str, Any]) -> Dict[str, Any]:
         """Обновление записи в таблице"""
         try:
@@ -596,70 +682,44 @@ class PostgreSQLProvider(UniversalProviderInterface):
         else:
             return None
     
+    async def _insert_returning_id(self, spec: QuerySpec, **values) -> Optional[str]:
+        """INSERT из реестра, возвращает id новой записи"""
+        try:
+            rows = await self._run_query(spec, id=str(uuid.uuid4()), **values)
+            if rows:
+                return rows[0]['id']
+            logger.error(f"{spec.name}: no data returned")
+        except Exception as e:
+            logger.error(f"{spec.name} failed: {e}")
+        return None
+    
     async def create_session(self, user_id: str, metadata: Dict[str, Any] = None) -> Optional[str]:
         """Создание новой сессии"""
-        data = {
-            'user_id': user_id,
-            'metadata': metadata or {},
-            'status': 'active'
-        }
-        
-        result = await self._execute_operation('create', 'sessions', data, {})
-        
-        if result['success']:
-            return result['data']['id']
-        else:
-            logger.error(f"Failed to create session: {result['error']}")
-            return None
+        return await self._insert_returning_id(SESSION_CREATE, user_id=user_id, metadata=metadata or {}, status='active')
     
     async def end_session(self, session_id: str) -> bool:
         """Завершение сессии"""
-        data = {
-            'status': 'ended',
-            'end_time': datetime.now(timezone.utc)
-        }
-        filters = {'id': session_id}
-        
-        result = await self._execute_operation('update', 'sessions', data, filters)
-        
-        return result['success']
+        try:
+            rows = await self._run_query(SESSION_END, status='ended', end_time=datetime.now(timezone.utc), id=session_id)
+            return bool(rows)
+        except Exception as e:
+            logger.error(f"Error ending session: {e}")
+            return False
     
     async def create_command(self, session_id: str, prompt: str, metadata: Dict[str, Any] = None, language: str = 'en') -> Optional[str]:
         """Создание новой команды"""
-        data = {
-            'session_id': session_id,
-            'prompt': prompt,
-            'language': language,
-            'metadata': metadata or {}
-        }
-        
-        result = await self._execute_operation('create', 'commands', data, {})
-        
-        if result['success']:
-            return result['data']['id']
-        else:
-            logger.error(f"Failed to create command: {result['error']}")
-            return None
+        return await self._insert_returning_id(
+            COMMAND_INSERT, session_id=session_id, prompt=prompt, language=language, metadata=metadata or {}
+        )
     
     async def create_llm_answer(self, command_id: str, prompt: str, response: str,
                                model_info: Dict[str, Any] = None,
                                performance_metrics: Dict[str, Any] = None) -> Optional[str]:
         """Создание ответа LLM"""
-        data = {
-            'command_id': command_id,
-            'prompt': prompt,
-            'response': response,
-            'model_info': model_info or {},
-            'performance_metrics': performance_metrics or {}
-        }
-        
-        result = await self._execute_operation('create', 'llm_answers', data, {})
-        
-        if result['success']:
-            return result['data']['id']
-        else:
-            logger.error(f"Failed to create LLM answer: {result['error']}")
-            return None
+        return await self._insert_returning_id(
+            LLM_ANSWER_INSERT, command_id=command_id, prompt=prompt, response=response,
+            model_info=model_info or {}, performance_metrics=performance_metrics or {}
+        )
     
     async def create_screenshot(self, session_id: str, file_path: str = None, file_url: str = None,
                                metadata: Dict[str, Any] = None) -> Optional[str]:
@@ -701,32 +761,35 @@ class PostgreSQLProvider(UniversalProviderInterface):
     # =====================================================
     
     async def get_user_memory(self, hardware_id_hash: str) -> Dict[str, str]:
-        """Получение памяти пользователя"""
-        filters = {'hardware_id_hash': hardware_id_hash}
-        
-        result = await self._execute_operation('read', 'users', {}, filters)
+        """Получение памяти пользователя (только нужные колонки)"""
+        try:
+            rows = await self._run_query(USER_MEMORY_READ, hardware_id_hash=hardware_id_hash)
+        except Exception as e:
+            logger.error(f"Error getting user memory: {e}")
+            rows = None
         
-        if result['success'] and result['data']:
-            user_data = result['data'][0]
+        if rows:
             return {
-                'short': user_data.get('short_term_memory') or '',
-                'long': user_data.get('long_term_memory') or ''
+                'short': rows[0].get('short_term_memory') or '',
+                'long': rows[0].get('long_term_memory') or ''
             }
         else:
             return {'short': '', 'long': ''}
     
     async def update_user_memory(self, hardware_id_hash: str, short_memory: str, long_memory: str) -> bool:
         """Обновление памяти пользователя"""
-        data = {
-            'short_term_memory': short_memory,
-            'long_term_memory': long_memory,
-            'memory_updated_at': datetime.now(timezone.utc)
-        }
-        filters = {'hardware_id_hash': hardware_id_hash}
-        
-        result = await self._execute_operation('update', 'users', data, filters)
-        
-        return result['success']
+        try:
+            rows = await self._run_query(
+                USER_MEMORY_UPDATE,
+                short_term_memory=short_memory,
+                long_term_memory=long_memory,
+                memory_updated_at=datetime.now(timezone.utc),
+                hardware_id_hash=hardware_id_hash
+            )
+            return bool(rows)
+        except Exception as e:
+            logger.error(f"Error updating user memory: {e}")
+            return False
     
     async def cleanup_expired_short_term_memory(self, hours: int = 24) -> int:
         """Очистка устаревшей краткосрочной памяти"""
@@ -755,6 +818,32 @@ class PostgreSQLProvider(UniversalProviderInterface):
         except Exception as e:
             logger.error(f"Error cleaning up expired short-term memory: {e}")
             return 0
+
+    async def expire_short_term_memory_batch(self, updated_before: datetime, limit: int) -> List[str]:
+        """
+        Очистка пачки устаревшей краткосрочной памяти (не больше limit строк за запрос)
+
+        Returns:
+            hardware_id_hash очищенных пользователей; ошибки пробрасываются
+        """
+        rows = await self._run_query(SHORT_MEMORY_EXPIRE_BATCH, updated_before=updated_before, limit=limit)
+        return [row['hardware_id_hash'] for row in rows]
+    
+    async def expire_stale_sessions_batch(self, started_before: datetime, limit: int) -> int:
+        """
+        Закрытие пачки зависших активных сессий (не больше limit строк за запрос)
+
+        Returns:
+            Количество закрытых сессий; ошибки пробрасываются
+        """
+        rows = await self._run_query(
+            SESSION_EXPIRE_BATCH,
+            status='expired',
+            end_time=datetime.now(timezone.utc),
+            started_before=started_before,
+            limit=limit
+        )
+        return len(rows)
     
     async def get_memory_statistics(self) -> Dict[str, Any]:
         """Получение статистики памяти"""
@@ -925,7 +1014,9 @@ class PostgreSQLProvider(UniversalProviderInterface):
             "database": self.database,
             "pool_available": bool(self.connection_pool),
             "connection_available": bool(self.connection),
-            "enable_metrics": self.enable_metrics
+            "enable_metrics": self.enable_metrics,
+            "prepared_statements": len(self._prepared),
+            "queries": self.query_metrics.snapshot()
         })
         
         return base_metrics
@@ -36,6 +36,24 @@ class GrpcServiceConfig:
             "max_concurrent_requests": int(os.getenv("MAX_CONCURRENT_REQUESTS", "10")),
             "request_timeout": int(os.getenv("REQUEST_TIMEOUT", "60")),  # 60 секунд
             
+            # Admission control для StreamAudio
+            "admission_enabled": os.getenv("ADMISSION_ENABLED", "true").lower() == "true",
+            "admission_queue_size": int(os.getenv("ADMISSION_QUEUE_SIZE", "20")),
+            "admission_max_wait": float(os.getenv("ADMISSION_MAX_WAIT", "5")),  # секунд
+            "max_requests_per_minute": int(os.getenv("MAX_REQUESTS_PER_MINUTE", "1000")),  # на весь сервер
+            "max_requests_per_user": int(os.getenv("MAX_REQUESTS_PER_USER", "10")),  # в минуту на hardware_id
+            
+            # Фоновое обслуживание БД (очистка пачками по расписанию)
+            "maintenance_enabled": os.getenv("MAINTENANCE_ENABLED", "true").lower() == "true",
+            "maintenance_memory_interval": float(os.getenv("MAINTENANCE_MEMORY_INTERVAL", "3600")),  # секунд
+            "maintenance_session_interval": float(os.getenv("MAINTENANCE_SESSION_INTERVAL", "900")),  # секунд
+            "maintenance_batch_size": int(os.getenv("MAINTENANCE_BATCH_SIZE", "500")),  # строк на запрос
+            "maintenance_max_batches": int(os.getenv("MAINTENANCE_MAX_BATCHES", "20")),  # пачек за проход
+            "maintenance_batch_pause": float(os.getenv("MAINTENANCE_BATCH_PAUSE", "0.2")),  # секунд
+            "maintenance_jitter": float(os.getenv("MAINTENANCE_JITTER", "0.1")),  # доля интервала
+            "memory_ttl_hours": float(os.getenv("MAINTENANCE_MEMORY_TTL_HOURS", "24")),
+            "session_max_age_hours": float(os.getenv("MAINTENANCE_SESSION_MAX_AGE_HOURS", "24")),
+            
             # Настройки модулей
             "modules": {
                 "text_processing": {
@@ -103,6 +121,31 @@ class GrpcServiceConfig:
             "session_timeout": self.config["session_timeout"]
         }
     
+    def get_admission_settings(self) -> Dict[str, Any]:
+        """Получение настроек admission control (аргументы AdmissionController)"""
+        return {
+            "max_concurrent": self.config["max_concurrent_requests"],
+            "max_queue": self.config["admission_queue_size"],
+            "max_wait": self.config["admission_max_wait"],
+            "user_burst": self.config["max_requests_per_user"],
+            "user_requests_per_minute": self.config["max_requests_per_user"],
+            "requests_per_minute": self.config["max_requests_per_minute"]
+        }
+    
+    def get_maintenance_settings(self) -> Dict[str, Any]:
+        """Получение настроек планировщика обслуживания"""
+        return {
+            "enabled": self.config["maintenance_enabled"],
+            "memory_interval": self.config["maintenance_memory_interval"],
+            "session_interval": self.config["maintenance_session_interval"],
+            "batch_size": self.config["maintenance_batch_size"],
+            "max_batches": self.config["maintenance_max_batches"],
+            "batch_pause": self.config["maintenance_batch_pause"],
+            "jitter": self.config["maintenance_jitter"],
+            "memory_ttl_hours": self.config["memory_ttl_hours"],
+            "session_max_age_hours": self.config["session_max_age_hours"]
+        }
+    
     def get_interrupt_settings(self) -> Dict[str, Any]:
         """Получение настроек прерывания"""
         return {
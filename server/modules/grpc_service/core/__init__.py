@@ -4,5 +4,8 @@ Core components для gRPC Service Module
 
 from .grpc_service_manager import GrpcServiceManager
 from .grpc_server import run_server, NewStreamingServicer
+from .admission_controller import AdmissionController, AdmissionRejectedError
+from .maintenance_scheduler import MaintenanceJob, MaintenanceScheduler
 
-__all__ = ['GrpcServiceManager', 'run_server', 'NewStreamingServicer']
+__all__ = ['GrpcServiceManager', 'run_server', 'NewStreamingServicer', 'AdmissionController', 'AdmissionRejectedError',
+           'MaintenanceJob', 'MaintenanceScheduler']
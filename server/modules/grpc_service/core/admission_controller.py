@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Admission control для StreamAudio
+
+- глобальный лимит одновременно обрабатываемых запросов (FIFO семафор)
+- token bucket на hardware_id (burst + пополнение в минуту) и общий на сервер
+- токен возвращается, если запрос отклонён очередью или дедлайном
+- ограниченная очередь ожидания; запрос, который не дождётся слота
+  до своего дедлайна, отклоняется сразу, а не после таймаута
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from utils.latency_histogram import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+REJECT_RATE_LIMITED = "rate_limited"
+REJECT_QUEUE_FULL = "queue_full"
+REJECT_DEADLINE = "deadline"
+
+
+class AdmissionRejectedError(Exception):
+    """Запрос не допущен к обработке (маппится в RESOURCE_EXHAUSTED)"""
+
+    def __init__(self, reason: str, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Token bucket: capacity запросов подряд, пополнение refill_per_sec"""
+
+    __slots__ = ('capacity', 'refill_per_sec', 'tokens', 'updated_at')
+
+    def __init__(self, capacity: float, refill_per_sec: float, now: float):
+        self.capacity = capacity
+        self.refill_per_sec = refill_per_sec
+        self.tokens = capacity
+        self.updated_at = now
+
+    def _refill(self, now: float):
+        if now > self.updated_at:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_per_sec)
+            self.updated_at = now
+
+    def try_take(self, now: float) -> bool:
+        self._refill(now)
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+    def refund(self):
+        """Возврат токена запроса, который так и не был обработан"""
+        self.tokens = min(self.capacity, self.tokens + 1.0)
+
+    def retry_after(self, now: float) -> float:
+        """Через сколько секунд появится токен"""
+        self._refill(now)
+        if self.tokens >= 1.0 or self.refill_per_sec <= 0:
+            return 0.0
+        return (1.0 - self.tokens) / self.refill_per_sec
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class AdmissionTicket:
+    """Допуск к обработке; возвращается через AdmissionController.release()"""
+
+    __slots__ = ('hardware_id', 'admitted_at', 'wait_time', 'released')
+
+    def __init__(self, hardware_id: str, admitted_at: float, wait_time: float):
+        self.hardware_id = hardware_id
+        self.admitted_at = admitted_at
+        self.wait_time = wait_time
+        self.released = False
+
+
+class AdmissionController:
+    """Глобальный лимит + token bucket на hardware_id + очередь с дедлайнами"""
+
+    def __init__(self,
+                 max_concurrent: int = 10,
+                 max_queue: int = 20,
+                 max_wait: float = 5.0,
+                 user_burst: int = 10,
+                 user_requests_per_minute: float = 30.0,
+                 requests_per_minute: float = 0.0,
+                 bucket_idle_ttl: float = 600.0):
+        """
+        Args:
+            max_concurrent: Одновременно обрабатываемых запросов
+            max_queue: Максимум запросов в очереди ожидания
+            max_wait: Максимальное ожидание слота (сек), даже если дедлайн клиента больше
+            user_burst: Запросов подряд от одного hardware_id (ёмкость bucket)
+            user_requests_per_minute: Пополнение bucket (0 - без лимита на пользователя)
+            requests_per_minute: Общий лимит сервера, ёмкость - минута запросов (0 - без лимита)
+            bucket_idle_ttl: Полные bucket без запросов дольше этого удаляются (сек)
+        """
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_queue = max(0, int(max_queue))
+        self.max_wait = max_wait
+        self.user_burst = max(1, int(user_burst))
+        self.user_refill_per_sec = max(0.0, float(user_requests_per_minute)) / 60.0
+        self.bucket_idle_ttl = bucket_idle_ttl
+        requests_per_minute = max(0.0, float(requests_per_minute))
+        self._global_bucket = (
+            TokenBucket(requests_per_minute, requests_per_minute / 60.0, time.monotonic())
+            if requests_per_minute > 0 else None
+        )
+
+        self._active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._last_gc = time.monotonic()
+        # Сглаженное время обработки запроса - для оценки ожидания в очереди
+        self._avg_hold_time = 0.0
+
+        # Метрики
+        self.admitted = 0
+        self.admitted_immediately = 0
+        self.rejected: Dict[str, int] = {REJECT_RATE_LIMITED: 0, REJECT_QUEUE_FULL: 0, REJECT_DEADLINE: 0}
+        self.max_queue_depth = 0
+        self.wait_histogram = LatencyHistogram()
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, hardware_id: str, time_remaining: Optional[float] = None) -> AdmissionTicket:
+        """
+        Допуск запроса к обработке
+
+        Args:
+            hardware_id: Идентификатор оборудования
+            time_remaining: Сколько секунд осталось до дедлайна клиента (None - без дедлайна)
+
+        Raises:
+            AdmissionRejectedError: rate_limited / queue_full / deadline
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        now = time.monotonic()
+        self._maybe_gc(now)
+
+        buckets = self._take_tokens(hardware_id, now)
+
+        if self._active < self.max_concurrent and not self._waiters:
+            self._active += 1
+            self.admitted_immediately += 1
+            return self._admit(hardware_id, started, loop.time())
+
+        if len(self._waiters) >= self.max_queue:
+            self._refund(buckets)
+            self._reject(REJECT_QUEUE_FULL)
+            raise AdmissionRejectedError(
+                REJECT_QUEUE_FULL,
+                f"Server busy: {self._active} active, {len(self._waiters)} queued",
+                self._estimated_wait(len(self._waiters))
+            )
+
+        budget = self.max_wait if time_remaining is None else min(self.max_wait, time_remaining)
+        estimated = self._estimated_wait(len(self._waiters) + 1)
+        if budget <= 0 or estimated > budget:
+            self._refund(buckets)
+            self._reject(REJECT_DEADLINE)
+            raise AdmissionRejectedError(
+                REJECT_DEADLINE,
+                f"Server busy: estimated wait {estimated:.2f}s exceeds deadline {budget:.2f}s",
+                estimated
+            )
+
+        waiter = loop.create_future()
+        self._waiters.append(waiter)
+        self.max_queue_depth = max(self.max_queue_depth, len(self._waiters))
+        try:
+            await asyncio.wait_for(waiter, budget)
+        except asyncio.TimeoutError:
+            if not waiter.done() or waiter.cancelled():
+                self._refund(buckets)
+                self._reject(REJECT_DEADLINE)
+                raise AdmissionRejectedError(
+                    REJECT_DEADLINE,
+                    f"Server busy: no slot within {budget:.2f}s",
+                    self._estimated_wait(len(self._waiters))
+                )
+            # Слот передан одновременно с таймаутом - принимаем его
+        except BaseException:
+            # Клиент ушёл из очереди: запрос не обслужен, лимит не расходуется.
+            # Слот мог быть передан нам прямо перед отменой - отдаём следующему
+            self._refund(buckets)
+            if waiter.done() and not waiter.cancelled():
+                self._release_slot()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+        # Слот передан release(): _active уже учитывает этот запрос
+        return self._admit(hardware_id, started, loop.time())
+
+    def _take_tokens(self, hardware_id: str, now: float) -> List[TokenBucket]:
+        """Токены пользователя и сервера (RESOURCE_EXHAUSTED rate_limited, если нет)"""
+        taken = []
+        if self.user_refill_per_sec > 0:
+            bucket = self._buckets.get(hardware_id)
+            if bucket is None:
+                bucket = self._buckets[hardware_id] = TokenBucket(self.user_burst, self.user_refill_per_sec, now)
+            if not bucket.try_take(now):
+                self._rate_limited(f"Too many requests from {hardware_id}", bucket.retry_after(now))
+            taken.append(bucket)
+        if self._global_bucket is not None:
+            if not self._global_bucket.try_take(now):
+                self._refund(taken)
+                self._rate_limited("Server request rate limit reached", self._global_bucket.retry_after(now))
+            taken.append(self._global_bucket)
+        return taken
+
+    def _rate_limited(self, message: str, retry_after: float):
+        self._reject(REJECT_RATE_LIMITED)
+        raise AdmissionRejectedError(REJECT_RATE_LIMITED, f"{message}, retry in {retry_after:.1f}s", retry_after)
+
+    @staticmethod
+    def _refund(buckets: List[TokenBucket]):
+        """Отклонённый очередью/дедлайном или отменённый в очереди запрос не расходует лимит"""
+        for bucket in buckets:
+            bucket.refund()
+
+    def release(self, ticket: AdmissionTicket):
+        """Освобождение слота (повторный вызов игнорируется)"""
+        if ticket.released:
+            return
+        ticket.released = True
+        hold_time = time.monotonic() - ticket.admitted_at
+        self._avg_hold_time = hold_time if not self._avg_hold_time else (0.8 * self._avg_hold_time + 0.2 * hold_time)
+        self._release_slot()
+
+    def _release_slot(self):
+        """Слот переходит первому живому ожидающему, иначе освобождается"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    def _admit(self, hardware_id: str, started: float, now: float) -> AdmissionTicket:
+        wait_time = now - started
+        self.admitted += 1
+        self.wait_histogram.observe(wait_time * 1000)
+        return AdmissionTicket(hardware_id, time.monotonic(), wait_time)
+
+    def _reject(self, reason: str):
+        self.rejected[reason] += 1
+        logger.warning(
+            f"🚦 Admission rejected ({reason}): active={self._active}/{self.max_concurrent}, "
+            f"queued={len(self._waiters)}/{self.max_queue}"
+        )
+
+    def _estimated_wait(self, position: int) -> float:
+        """Оценка ожидания для позиции в очереди по сглаженному времени обработки"""
+        if not self._avg_hold_time:
+            return 0.0
+        return math.ceil(position / self.max_concurrent) * self._avg_hold_time
+
+    def _maybe_gc(self, now: float):
+        """Удаление полных bucket простаивающих пользователей"""
+        if now - self._last_gc < self.bucket_idle_ttl / 4:
+            return
+        self._last_gc = now
+        stale = [
+            hardware_id for hardware_id, bucket in self._buckets.items()
+            if now - bucket.updated_at >= self.bucket_idle_ttl and bucket.is_full(now)
+        ]
+        for hardware_id in stale:
+            del self._buckets[hardware_id]
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Метрики admission control"""
+        return {
+            "active": self._active,
+            "max_concurrent": self.max_concurrent,
+            "queue_depth": len(self._waiters),
+            "max_queue": self.max_queue,
+            "max_queue_depth": self.max_queue_depth,
+            "admitted": self.admitted,
+            "admitted_immediately": self.admitted_immediately,
+            "rejected": dict(self.rejected),
+            "rejected_total": sum(self.rejected.values()),
+            "tracked_users": len(self._buckets),
+            "avg_hold_time": self._avg_hold_time,
+            "wait_time_ms": self.wait_histogram.snapshot()
+        }
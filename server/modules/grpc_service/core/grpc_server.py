@@ -22,12 +22,17 @@ import streaming_pb2_grpc
 
 # Импорт новых модулей
 from .grpc_service_manager import GrpcServiceManager
+from .admission_controller import AdmissionController, AdmissionRejectedError
 
 # Импорты мониторинга (относительные пути)
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '../../..'))
-from monitoring import record_request, set_active_connections, get_metrics, get_status
+from monitoring import (
+    record_request, record_admission, add_active_connections, start_sampler, stop_sampler,
+    register_collector, unregister_collector, start_trace, finish_trace, get_trace_recorder
+)
+from utils.request_trace import trace_mark
 
 # Логирование настроено в main.py
 logger = logging.getLogger(__name__)
@@ -55,6 +60,16 @@ class NewStreamingServicer(streaming_pb2_grpc.StreamingServiceServicer):
         self.grpc_service_manager = GrpcServiceManager()
         self.interrupt_manager = None
         
+        # Admission control перед grpc_service_manager.process
+        service_config = self.grpc_service_manager.config
+        self.admission_controller = (
+            AdmissionController(**service_config.get_admission_settings())
+            if service_config.get("admission_enabled", True) else None
+        )
+        
+        # Коллекторы /metrics, зарегистрированные при initialize()
+        self._metric_collectors = []
+        
         # Флаг инициализации
         self.is_initialized = False
         
@@ -83,6 +98,10 @@ class NewStreamingServicer(streaming_pb2_grpc.StreamingServiceServicer):
             await self.grpc_service_manager.start()
             logger.info("✅ Все модули запущены")
             
+            # CPU/RSS и сводка метрик пересчитываются в фоне, не на каждом запросе
+            start_sampler()
+            self._register_metric_collectors()
+            
             self.is_initialized = True
             logger.info("🎉 Новый gRPC сервер полностью инициализирован")
             return True
@@ -97,6 +116,11 @@ class NewStreamingServicer(streaming_pb2_grpc.StreamingServiceServicer):
             logger.info("🧹 Очистка ресурсов нового сервера...")
             
             if self.is_initialized:
+                await stop_sampler()
+                for name in self._metric_collectors:
+                    unregister_collector(name)
+                get_trace_recorder().close()
+                
                 # Останавливаем все модули
                 await self.grpc_service_manager.stop()
                 logger.info("✅ Все модули остановлены")
@@ -112,19 +136,83 @@ class NewStreamingServicer(streaming_pb2_grpc.StreamingServiceServicer):
         except Exception as e:
             logger.error(f"❌ Ошибка очистки нового сервера: {e}")
     
+    def _register_metric_collectors(self):
+        """Метрики модулей для /metrics (собираются при опросе, не на горячем пути)"""
+        modules = self.grpc_service_manager.modules
+        collectors = {}
+        for name in ('text_processing', 'audio_generation', 'database', 'session_management'):
+            module = modules.get(name)
+            if module is not None and hasattr(module, 'get_metrics'):
+                collectors[name] = module.get_metrics
+        text_filter = modules.get('text_filtering')
+        if text_filter is not None and getattr(text_filter, 'cache', None) is not None:
+            collectors['text_filter_cache'] = text_filter.cache.get_stats
+        memory = modules.get('memory_management')
+        if memory is not None and hasattr(memory, 'context_cache'):
+            collectors['memory_context_cache'] = memory.context_cache.get_stats
+        if self.admission_controller is not None:
+            collectors['admission_controller'] = self.admission_controller.get_metrics
+        for name, collect in collectors.items():
+            register_collector(name, collect)
+        self._metric_collectors = list(collectors)
+    
     async def StreamAudio(self, request: streaming_pb2.StreamRequest, context) -> AsyncGenerator[streaming_pb2.StreamResponse, None]:
         """Обработка StreamRequest через новые модули с мониторингом"""
         start_time = time.time()
         session_id = request.session_id or f"session_{datetime.now().timestamp()}"
         hardware_id = request.hardware_id or "unknown"
         
+        # Каждое обращение к полю protobuf создаёт новый объект - читаем скриншот один раз.
+        # Новые клиенты шлют сырые байты (screenshot_data), старые - base64 строку (screenshot)
+        screenshot_data = request.screenshot_data if request.HasField('screenshot_data') else None
+        screenshot_b64 = request.screenshot if (screenshot_data is None and request.HasField('screenshot')) else None
+        
         logger.info(f"📨 Получен StreamRequest: session={session_id}, hardware_id={hardware_id}")
-        logger.info(f"📨 StreamRequest данные: prompt_len={len(request.prompt)}, screenshot_len={len(request.screenshot) if request.screenshot else 0}")
+        logger.info(
+            f"📨 StreamRequest данные: prompt_len={len(request.prompt)}, "
+            f"screenshot_bytes={len(screenshot_data) if screenshot_data else 0}, "
+            f"screenshot_b64_len={len(screenshot_b64) if screenshot_b64 else 0}"
+        )
+        
+        # Трасса стадий запроса: провайдеры ниже по стеку пишут в неё через utils.request_trace
+        trace = start_trace(session_id, hardware_id)
+        trace_token = trace.activate() if trace is not None else None
         
+        ticket = None
+        admitted = False
+        cancel_scope = None
+        cancel_token = None
+        trace_status = 'ok'
+        # Отдача клиенту: первое сообщение, число сообщений и время, проведённое в yield (flow control gRPC)
+        first_send_at = None
+        send_blocked = 0.0
+        messages_sent = 0
         try:
+            # Admission control: глобальный лимит, token bucket на hardware_id, очередь с учётом дедлайна клиента.
+            # Ожидание внутри try: отключение клиента в очереди тоже завершает трассу
+            if self.admission_controller:
+                admission_started = time.perf_counter()
+                try:
+                    ticket = await self.admission_controller.acquire(hardware_id, context.time_remaining())
+                except AdmissionRejectedError as e:
+                    record_admission(0.0, self.admission_controller.queue_depth, e.reason)
+                    trace_status = 'rejected'
+                    if trace is not None:
+                        trace.add_span("grpc.admission", admission_started, attrs={'rejected': e.reason})
+                    logger.warning(f"🚦 StreamAudio отклонён для {hardware_id} ({e.reason}): {e}")
+                    await context.abort(
+                        grpc.StatusCode.RESOURCE_EXHAUSTED,
+                        str(e),
+                        trailing_metadata=(('retry-after-ms', str(int(e.retry_after * 1000))),)
+                    )
+                    return
+                record_admission(ticket.wait_time, self.admission_controller.queue_depth)
+                if trace is not None:
+                    trace.add_span("grpc.admission", admission_started)
+
             # Увеличиваем счетчик активных соединений
-            current_connections = get_metrics().get('active_connections', 0)
-            set_active_connections(current_connections + 1)
+            add_active_connections(1)
+            admitted = True
             # В новом protobuf нет interrupt_flag в StreamRequest
             # Прерывания обрабатываются через отдельный InterruptSession API
             
@@ -143,6 +231,10 @@ class NewStreamingServicer(streaming_pb2_grpc.StreamingServiceServicer):
                 yield response
                 return
             
+            # InterruptSession отменяет задачи запроса и ресурсы провайдеров через этот scope
+            cancel_scope = self.interrupt_manager.open_cancel_scope(hardware_id, session_id)
+            cancel_token = cancel_scope.activate()
+            
             # Обрабатываем запрос через gRPC Service Manager
             logger.info(f"🔄 Обработка запроса через модули...")
             
@@ -150,14 +242,16 @@ class NewStreamingServicer(streaming_pb2_grpc.StreamingServiceServicer):
             request_data = {
                 'hardware_id': hardware_id,
                 'text': request.prompt,
-                'screenshot': request.screenshot,
+                'screenshot': screenshot_b64,
+                'screenshot_data': screenshot_data,
                 'session_id': session_id,
                 'interrupt_flag': False  # В новом protobuf нет interrupt_flag в StreamRequest
             }
-            logger.info(f"🔄 Request data подготовлен: text='{request.prompt[:50]}...', screenshot_exists={bool(request.screenshot)}")
+            logger.info(f"🔄 Request data подготовлен: text='{request.prompt[:50]}...', screenshot_exists={bool(screenshot_data or screenshot_b64)}")
             
             # Потоковая обработка: передаём результаты по мере готовности
             sent_any = False
+            audio_sent = False
             logger.info(f"🔄 Начинаем потоковую обработку для {session_id}")
             async for item in self.grpc_service_manager.process(request_data):
                 logger.info(f"🔄 Получен item от grpc_service_manager: {list(item.keys())}")
@@ -165,33 +259,69 @@ class NewStreamingServicer(streaming_pb2_grpc.StreamingServiceServicer):
                 if not success:
                     err = item.get('error') or 'Ошибка обработки запроса'
                     logger.error(f"❌ Ошибка обработки запроса {session_id}: {err}")
+                    trace_status = 'error'
                     yield streaming_pb2.StreamResponse(error_message=err)
                     return
                 # Текст
                 txt = item.get('text_response')
                 if txt:
                     logger.info(f"→ StreamAudio: sending text_chunk len={len(txt)} for session={session_id}")
+                    if first_send_at is None:
+                        trace_mark("grpc.first_text")
+                    send_started = time.perf_counter()
+                    first_send_at = first_send_at or send_started
                     yield streaming_pb2.StreamResponse(text_chunk=txt)
+                    send_blocked += time.perf_counter() - send_started
+                    messages_sent += 1
                     sent_any = True
                 # Одиночный аудио-чанк
                 ch = item.get('audio_chunk')
                 if isinstance(ch, (bytes, bytearray)) and len(ch) > 0:
                     logger.info(f"→ StreamAudio: sending audio_chunk bytes={len(ch)} for session={session_id}")
+                    if not audio_sent:
+                        trace_mark("grpc.first_audio")
+                        audio_sent = True
+                    send_started = time.perf_counter()
+                    first_send_at = first_send_at or send_started
                     yield streaming_pb2.StreamResponse(
                         audio_chunk=streaming_pb2.AudioChunk(audio_data=ch, dtype='int16', shape=[])
                     )
+                    send_blocked += time.perf_counter() - send_started
+                    messages_sent += 1
                     sent_any = True
                 # Список аудио-чанков (на случай, если интеграция вернёт массив)
                 for idx, chunk_data in enumerate(item.get('audio_chunks') or []):
                     if chunk_data:
                         logger.info(f"→ StreamAudio: sending audio_chunk[{idx}] bytes={len(chunk_data)} for session={session_id}")
+                        if not audio_sent:
+                            trace_mark("grpc.first_audio")
+                            audio_sent = True
+                        send_started = time.perf_counter()
+                        first_send_at = first_send_at or send_started
                         yield streaming_pb2.StreamResponse(
                             audio_chunk=streaming_pb2.AudioChunk(audio_data=chunk_data, dtype='int16', shape=[])
                         )
+                        send_blocked += time.perf_counter() - send_started
+                        messages_sent += 1
                         sent_any = True
             # Завершение стрима
             logger.info(f"→ StreamAudio: end_message for session={session_id} (sent_any={sent_any})")
             yield streaming_pb2.StreamResponse(end_message="Обработка завершена")
+        except asyncio.CancelledError:
+            # Отмена от InterruptSession - штатное завершение стрима; любая другая (клиент отключился) - пробрасываем
+            if cancel_scope is None or not cancel_scope.cancelled:
+                trace_status = 'cancelled'
+                raise
+            task = asyncio.current_task()
+            if task is not None and hasattr(task, 'uncancel'):
+                task.uncancel()
+            interrupt_ms = (time.monotonic() - cancel_scope.cancelled_at) * 1000
+            logger.info(f"🛑 StreamAudio {session_id} прерван через {interrupt_ms:.1f}ms после InterruptSession")
+            trace_status = 'interrupted'
+            yield streaming_pb2.StreamResponse(end_message="Прервано")
+        except grpc.aio.AbortError:
+            # context.abort() (отказ admission) - статус уже выставлен
+            raise
         except Exception as e:
             logger.error(f"💥 Критическая ошибка в StreamRequest: {e}")
             import traceback
@@ -199,19 +329,35 @@ class NewStreamingServicer(streaming_pb2_grpc.StreamingServiceServicer):
             
             # Записываем ошибку в метрики
             record_request(time.time() - start_time, is_error=True)
+            trace_status = 'error'
             
             response = streaming_pb2.StreamResponse(
                 error_message=f"Внутренняя ошибка сервера: {str(e)}"
             )
             yield response
         finally:
+            if cancel_scope is not None:
+                self.interrupt_manager.close_cancel_scope(cancel_scope)
+                cancel_scope.deactivate(cancel_token)
+            if ticket is not None:
+                self.admission_controller.release(ticket)
+            
             # Уменьшаем счетчик активных соединений
-            current_connections = get_metrics().get('active_connections', 0)
-            set_active_connections(max(0, current_connections - 1))
+            if admitted:
+                add_active_connections(-1)
             
-            # Записываем метрику запроса
-            response_time = time.time() - start_time
-            record_request(response_time, is_error=False)
+            if trace is not None:
+                if first_send_at is not None:
+                    trace.add_span("grpc.send", first_send_at, attrs={
+                        'messages': messages_sent, 'blocked_ms': round(send_blocked * 1000, 3)
+                    })
+                finish_trace(trace, trace_status)
+                trace.deactivate(trace_token)
+            
+            # Записываем метрику запроса (отклонённые admission учтены в record_admission)
+            if admitted:
+                response_time = time.time() - start_time
+                record_request(response_time, is_error=False)
 
     async def GenerateWelcomeAudio(self, request: streaming_pb2.WelcomeRequest, context) -> AsyncGenerator[streaming_pb2.WelcomeResponse, None]:
         """Генерация приветственного аудио через AudioProcessor"""
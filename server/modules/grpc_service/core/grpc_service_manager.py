@@ -25,6 +25,8 @@ from modules.interrupt_handling import InterruptManager
 from modules.text_filtering import TextFilterManager
 
 from modules.grpc_service.config import GrpcServiceConfig
+from modules.grpc_service.core.maintenance_scheduler import MaintenanceJob, MaintenanceScheduler
+from monitoring import record_maintenance
 
 logger = logging.getLogger(__name__)
 
@@ -63,6 +65,9 @@ class GrpcServiceManager(UniversalModuleInterface):
         self.grpc_service_integration: Optional[GrpcServiceIntegration] = None
         self.module_coordinator: Optional[ModuleCoordinatorIntegration] = None
         
+        # Фоновое обслуживание БД
+        self.maintenance_scheduler: Optional[MaintenanceScheduler] = None
+        
         logger.info("gRPC Service Manager created")
     
     async def initialize(self) -> bool:
@@ -87,6 +92,9 @@ class GrpcServiceManager(UniversalModuleInterface):
             # 4. Инициализируем все интеграции
             await self._initialize_integrations()
             
+            # 5. Запускаем фоновое обслуживание БД
+            self._start_maintenance()
+            
             # Устанавливаем флаг инициализации и статус
             self.is_initialized = True
             self.set_status(ModuleStatus.READY)
@@ -237,6 +245,40 @@ class GrpcServiceManager(UniversalModuleInterface):
             logger.error(f"❌ Error initializing integrations: {e}")
             raise
     
+    def _start_maintenance(self):
+        """Планировщик очистки устаревшей памяти и зависших сессий"""
+        settings = self.config.get_maintenance_settings()
+        database = self.modules.get('database')
+        memory_manager = self.modules.get('memory_management')
+        if not settings["enabled"] or not database or not getattr(database, 'is_initialized', False):
+            logger.info("🧹 Maintenance scheduler disabled")
+            return
+        
+        batch_options = {
+            'batch_size': settings["batch_size"],
+            'max_batches': settings["max_batches"],
+            'batch_pause': settings["batch_pause"],
+            'jitter': settings["jitter"]
+        }
+        jobs = [
+            MaintenanceJob(
+                'expired_sessions',
+                lambda limit: database.expire_stale_sessions_batch(settings["session_max_age_hours"], limit),
+                interval=settings["session_interval"],
+                **batch_options
+            )
+        ]
+        if memory_manager:
+            # Через MemoryManager: очищенные пользователи вычищаются и из кэша памяти
+            jobs.append(MaintenanceJob(
+                'expired_short_term_memory',
+                lambda limit: memory_manager.expire_memory_batch(limit, settings["memory_ttl_hours"]),
+                interval=settings["memory_interval"],
+                **batch_options
+            ))
+        self.maintenance_scheduler = MaintenanceScheduler(jobs, recorder=record_maintenance)
+        self.maintenance_scheduler.start()
+    
     async def start(self) -> bool:
         """Запуск gRPC сервиса"""
         try:
@@ -372,6 +414,9 @@ class GrpcServiceManager(UniversalModuleInterface):
             if self.module_coordinator:
                 status['module_coordinator'] = await self.module_coordinator.get_status()
             
+            if self.maintenance_scheduler:
+                status['maintenance'] = self.maintenance_scheduler.get_status()
+            
             return status
             
         except Exception as e:
@@ -387,6 +432,11 @@ class GrpcServiceManager(UniversalModuleInterface):
         try:
             logger.info("Cleaning up gRPC Service Manager...")
             
+            # Останавливаем обслуживание до закрытия пула БД
+            if self.maintenance_scheduler:
+                await self.maintenance_scheduler.stop()
+                self.maintenance_scheduler = None
+            
             # Очищаем service интеграции
             if self.grpc_service_integration:
                 await self.grpc_service_integration.cleanup()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Планировщик фонового обслуживания внутри процесса сервера
+
+Периодические задачи (очистка устаревшей краткосрочной памяти, закрытие
+зависших сессий) выполняются короткими пачками:
+- каждая пачка - один запрос с LIMIT batch_size (FOR UPDATE SKIP LOCKED),
+  блокировки держатся только на время пачки;
+- между пачками пауза batch_pause, проход ограничен max_batches пачками -
+  остаток дочищает следующий запуск;
+- интервал и паузы сдвигаются на случайную долю jitter, чтобы несколько
+  процессов не били в БД одновременно;
+- время прохода, число строк и отставание от расписания (lag) пишутся
+  в гистограммы и передаются recorder (мониторинг).
+"""
+
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+from utils.latency_histogram import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+# batch(limit) -> число обработанных строк
+MaintenanceBatch = Callable[[int], Awaitable[int]]
+# recorder(job, runtime, rows, lag, error=False) - секунды
+MaintenanceRecorder = Callable[..., Any]
+
+
+@dataclass
+class MaintenanceJob:
+    """Периодическая задача обслуживания"""
+
+    name: str
+    batch: MaintenanceBatch
+    interval: float
+    batch_size: int = 500
+    max_batches: int = 20
+    batch_pause: float = 0.2
+    jitter: float = 0.1
+
+
+def _jittered(value: float, jitter: float) -> float:
+    return max(0.0, value * (1 + random.uniform(-jitter, jitter)))
+
+
+class MaintenanceScheduler:
+    """Запуск задач обслуживания по расписанию пачками"""
+
+    def __init__(self, jobs: Iterable[MaintenanceJob], recorder: Optional[MaintenanceRecorder] = None):
+        """
+        Args:
+            jobs: Задачи обслуживания
+            recorder: Запись результата прохода в мониторинг
+        """
+        self.jobs: Dict[str, MaintenanceJob] = {job.name: job for job in jobs}
+        self.recorder = recorder
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._locks: Dict[str, asyncio.Lock] = {name: asyncio.Lock() for name in self.jobs}
+        self._stop_event = asyncio.Event()
+        self._stopping = False
+        self._stats = {
+            name: {
+                'runs': 0,
+                'errors': 0,
+                'rows': 0,
+                'batches': 0,
+                'last_rows': 0,
+                'last_run_at': None,
+                'runtime_ms': LatencyHistogram(),
+                'lag_ms': LatencyHistogram(),
+            }
+            for name in self.jobs
+        }
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self):
+        """Запуск циклов всех задач (первый проход - после случайной доли интервала)"""
+        if self._tasks:
+            return
+        self._stopping = False
+        self._stop_event.clear()
+        for name, job in self.jobs.items():
+            self._tasks[name] = asyncio.create_task(self._loop(job))
+        logger.info(f"🧹 Maintenance scheduler started: {', '.join(self.jobs) or 'no jobs'}")
+
+    async def stop(self, timeout: float = 10.0):
+        """Остановка: текущая пачка доделывается, новые не начинаются"""
+        if not self._tasks:
+            return
+        self._stopping = True
+        self._stop_event.set()
+        _, pending = await asyncio.wait(list(self._tasks.values()), timeout=timeout)
+        for task in pending:
+            task.cancel()
+        self._tasks.clear()
+        logger.info("✅ Maintenance scheduler stopped")
+
+    async def run_now(self, name: str) -> Dict[str, Any]:
+        """Внеочередной проход задачи (например, из админки или бенчмарка)"""
+        return await self._run_job(self.jobs[name], lag=0.0)
+
+    async def _loop(self, job: MaintenanceJob):
+        loop = asyncio.get_running_loop()
+        due = loop.time() + random.uniform(0, job.interval * job.jitter)
+        while not self._stopping:
+            if await self._sleep(due - loop.time()):
+                break
+            started = loop.time()
+            await self._run_job(job, lag=max(0.0, started - due))
+            due = started + _jittered(job.interval, job.jitter)
+
+    async def _sleep(self, delay: float) -> bool:
+        """Пауза, прерываемая остановкой; True - планировщик останавливается"""
+        if delay > 0 and not self._stopping:
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+        return self._stopping
+
+    async def _run_job(self, job: MaintenanceJob, lag: float) -> Dict[str, Any]:
+        async with self._locks[job.name]:
+            rows = batches = 0
+            error = False
+            started = time.perf_counter()
+            try:
+                while batches < job.max_batches:
+                    affected = await job.batch(job.batch_size)
+                    rows += affected
+                    batches += 1
+                    if affected < job.batch_size or batches >= job.max_batches:
+                        break
+                    if await self._sleep(_jittered(job.batch_pause, job.jitter)):
+                        break
+            except Exception as e:
+                error = True
+                logger.error(f"❌ Maintenance job {job.name} failed after {batches} batches: {e}")
+            runtime = time.perf_counter() - started
+
+            stats = self._stats[job.name]
+            stats['runs'] += 1
+            stats['errors'] += int(error)
+            stats['rows'] += rows
+            stats['batches'] += batches
+            stats['last_rows'] = rows
+            stats['last_run_at'] = time.time()
+            stats['runtime_ms'].observe(runtime * 1000)
+            stats['lag_ms'].observe(lag * 1000)
+            if rows:
+                logger.info(f"🧹 Maintenance {job.name}: {rows} rows in {batches} batches, {runtime * 1000:.0f}ms")
+
+            if self.recorder:
+                try:
+                    self.recorder(job.name, runtime, rows, lag, error=error)
+                except Exception as e:
+                    logger.warning(f"⚠️ Maintenance metrics not recorded for {job.name}: {e}")
+            return {'rows': rows, 'batches': batches, 'runtime': runtime, 'error': error}
+
+    def get_status(self) -> Dict[str, Any]:
+        """Счётчики задач: строки, пачки, время прохода и отставание"""
+        jobs = {}
+        for name, stats in self._stats.items():
+            job = self.jobs[name]
+            jobs[name] = {
+                **{key: value for key, value in stats.items() if not isinstance(value, LatencyHistogram)},
+                'interval': job.interval,
+                'batch_size': job.batch_size,
+                'max_batches': job.max_batches,
+                'runtime_ms': stats['runtime_ms'].snapshot(),
+                'lag_ms': stats['lag_ms'].snapshot(),
+            }
+        return {'running': self.is_running, 'jobs': jobs}
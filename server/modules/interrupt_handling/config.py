@@ -19,6 +19,7 @@ class InterruptHandlingConfig:
             "global_interrupt_enabled": os.getenv("GLOBAL_INTERRUPT_ENABLED", "true").lower() == "true",
             "interrupt_check_interval": float(os.getenv("INTERRUPT_CHECK_INTERVAL", "0.1")),  # 100ms
             "interrupt_timeout": float(os.getenv("INTERRUPT_TIMEOUT", "5.0")),  # 5 секунд
+            "interrupt_epoch_ttl": float(os.getenv("INTERRUPT_EPOCH_TTL", "600.0")),  # 10 минут
             
             # Настройки сессий
             "session_cleanup_delay": float(os.getenv("SESSION_CLEANUP_DELAY", "2.0")),  # 2 секунды
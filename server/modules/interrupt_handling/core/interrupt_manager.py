@@ -5,6 +5,7 @@
 """
 
 import asyncio
+import itertools
 import logging
 import time
 from typing import Dict, Any, Optional, Set, Callable
@@ -12,6 +13,7 @@ from datetime import datetime
 
 from integrations.core.universal_module_interface import UniversalModuleInterface, ModuleStatus
 from modules.interrupt_handling.config import InterruptHandlingConfig
+from utils.cancel_scope import CancelScope
 
 logger = logging.getLogger(__name__)
 
@@ -33,11 +35,21 @@ class InterruptManager(UniversalModuleInterface):
         
         self.config = config or InterruptHandlingConfig()
         
-        # Глобальные флаги прерывания
+        # Глобальные флаги прерывания (последнее прерывание - для статистики и провайдеров)
         self.global_interrupt_flag = False
         self.interrupt_hardware_id: Optional[str] = None
         self.interrupt_timestamp: Optional[float] = None
         
+        # Эпохи прерываний по hardware_id: поток запоминает эпоху при старте и
+        # прерывается, когда текущая эпоха стала больше. Счётчик общий и только
+        # растёт, поэтому удалённая по TTL запись не даёт ложного прерывания.
+        self.interrupt_epochs: Dict[str, int] = {}
+        self.interrupted_at: Dict[str, float] = {}
+        self._epoch_counter = itertools.count(1)
+        self.interrupt_timeout = self.config.get("interrupt_timeout", 5.0)
+        self.interrupt_epoch_ttl = self.config.get("interrupt_epoch_ttl", 600.0)
+        self._last_epoch_gc = time.monotonic()
+        
         # Активные сессии
         self.active_sessions: Dict[str, Dict[str, Any]] = {}
         self.session_counter = 0
@@ -48,10 +60,15 @@ class InterruptManager(UniversalModuleInterface):
         # Callback функции для прерывания
         self.interrupt_callbacks: Set[Callable] = set()
         
+        # Выполняющиеся запросы: hardware_id -> cancel scope (задачи и обработчики отмены провайдеров)
+        self.cancel_scopes: Dict[str, Set[CancelScope]] = {}
+        
         # Статистика
         self.total_interrupts = 0
         self.successful_interrupts = 0
         self.failed_interrupts = 0
+        self.cancelled_tasks = 0
+        self.cancelled_handles = 0
         
         logger.info("Interrupt Manager created")
     
@@ -154,6 +171,9 @@ class InterruptManager(UniversalModuleInterface):
             # Устанавливаем глобальные флаги
             await self._set_global_interrupt_flags(hardware_id)
             
+            # Отменяем выполняющиеся запросы напрямую: задачи, Live websocket, синтез
+            cancelled = await self._cancel_running(hardware_id)
+            
             # Прерываем все зарегистрированные модули
             interrupted_modules = await self._interrupt_all_modules(hardware_id)
             
@@ -174,6 +194,8 @@ class InterruptManager(UniversalModuleInterface):
                 "hardware_id": hardware_id,
                 "interrupted_modules": interrupted_modules,
                 "cleaned_sessions": cleaned_sessions,
+                "cancelled_tasks": cancelled["tasks"],
+                "cancelled_handles": cancelled["handles"],
                 "total_time_ms": total_time,
                 "timestamp": interrupt_start_time
             }
@@ -192,6 +214,11 @@ class InterruptManager(UniversalModuleInterface):
     async def _set_global_interrupt_flags(self, hardware_id: str):
         """Установка глобальных флагов прерывания"""
         try:
+            now = time.monotonic()
+            self.interrupt_epochs[hardware_id] = next(self._epoch_counter)
+            self.interrupted_at[hardware_id] = now
+            self._maybe_gc_epochs(now)
+            
             self.global_interrupt_flag = True
             self.interrupt_hardware_id = hardware_id
             self.interrupt_timestamp = time.time()
@@ -206,6 +233,66 @@ class InterruptManager(UniversalModuleInterface):
             logger.error(f"Error setting global interrupt flags: {e}")
             raise
     
+    def _maybe_gc_epochs(self, now: float):
+        """Удаление эпох, прерывания которых старше interrupt_epoch_ttl"""
+        if now - self._last_epoch_gc < self.interrupt_epoch_ttl / 4:
+            return
+        self._last_epoch_gc = now
+        stale = [hw for hw, at in self.interrupted_at.items() if now - at >= self.interrupt_epoch_ttl]
+        for hardware_id in stale:
+            del self.interrupted_at[hardware_id]
+            self.interrupt_epochs.pop(hardware_id, None)
+        if stale:
+            logger.debug(f"Interrupt epochs GC: removed {len(stale)}, tracked {len(self.interrupt_epochs)}")
+    
+    def open_cancel_scope(self, hardware_id: str, session_id: Optional[str] = None) -> CancelScope:
+        """
+        Открытие cancel scope запроса; текущая задача регистрируется в нём
+        
+        Args:
+            hardware_id: ID оборудования
+            session_id: ID сессии (для логов)
+            
+        Returns:
+            CancelScope - активировать в контексте запроса и закрыть через close_cancel_scope()
+        """
+        scope = CancelScope(hardware_id, session_id)
+        scope.add_task()
+        self.cancel_scopes.setdefault(hardware_id, set()).add(scope)
+        return scope
+    
+    def close_cancel_scope(self, scope: CancelScope):
+        """Закрытие cancel scope завершённого запроса"""
+        scopes = self.cancel_scopes.get(scope.hardware_id)
+        if scopes is None:
+            return
+        scopes.discard(scope)
+        if not scopes:
+            del self.cancel_scopes[scope.hardware_id]
+    
+    async def _cancel_running(self, hardware_id: str) -> Dict[str, int]:
+        """Отмена всех выполняющихся запросов hardware_id"""
+        scopes = self.cancel_scopes.pop(hardware_id, set())
+        totals = {"tasks": 0, "handles": 0}
+        if not scopes:
+            return totals
+        
+        results = await asyncio.gather(*(scope.cancel() for scope in scopes), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Error cancelling request for {hardware_id}: {result}")
+                continue
+            totals["tasks"] += result["tasks"]
+            totals["handles"] += result["handles"]
+        
+        self.cancelled_tasks += totals["tasks"]
+        self.cancelled_handles += totals["handles"]
+        logger.warning(
+            f"🚨 Cancelled {len(scopes)} running requests for {hardware_id}: "
+            f"{totals['tasks']} tasks, {totals['handles']} provider handles"
+        )
+        return totals
+    
     async def _interrupt_all_modules(self, hardware_id: str) -> list:
         """Прерывание всех зарегистрированных модулей"""
         interrupted_modules = []
@@ -324,33 +411,46 @@ class InterruptManager(UniversalModuleInterface):
             logger.error(f"Error registering callback: {e}")
             return False
     
-    def should_interrupt(self, hardware_id: str) -> bool:
+    def interrupt_epoch(self, hardware_id: str) -> int:
+        """
+        Текущая эпоха прерываний hardware_id - запомнить при старте потока
+        
+        Args:
+            hardware_id: ID оборудования
+            
+        Returns:
+            Эпоха для is_interrupted()
+        """
+        return self.interrupt_epochs.get(hardware_id, 0)
+    
+    def is_interrupted(self, hardware_id: str, epoch: int) -> bool:
+        """
+        Было ли прерывание hardware_id после эпохи epoch
+        
+        Проверка на каждый отдаваемый элемент потока: один dict lookup, без
+        блокировок и системных вызовов.
+        """
+        return self.interrupt_epochs.get(hardware_id, 0) > epoch
+    
+    def should_interrupt(self, hardware_id: str, epoch: Optional[int] = None) -> bool:
         """
         Проверка, нужно ли прерывать операцию для указанного hardware_id
         
         Args:
             hardware_id: ID оборудования
+            epoch: Эпоха, запомненная при старте потока (interrupt_epoch()).
+                Без неё - было ли прерывание за последние interrupt_timeout секунд
             
         Returns:
             True если нужно прерывать, False иначе
         """
-        if not self.global_interrupt_flag:
-            return False
+        if epoch is not None:
+            return self.interrupt_epochs.get(hardware_id, 0) > epoch
         
-        if self.interrupt_hardware_id != hardware_id:
+        interrupted_at = self.interrupted_at.get(hardware_id)
+        if interrupted_at is None:
             return False
-        
-        # Проверяем таймаут прерывания
-        if self.interrupt_timestamp:
-            current_time = time.time()
-            interrupt_timeout = self.config.get("interrupt_timeout", 5.0)
-            
-            if current_time - self.interrupt_timestamp > interrupt_timeout:
-                logger.warning(f"Interrupt timeout for {hardware_id}, resetting flags")
-                self._reset_interrupt_flags()
-                return False
-        
-        return True
+        return time.monotonic() - interrupted_at <= self.interrupt_timeout
     
     def _reset_interrupt_flags(self):
         """Сброс глобальных флагов прерывания"""
@@ -421,9 +521,12 @@ class InterruptManager(UniversalModuleInterface):
             
             # Сбрасываем флаги
             self._reset_interrupt_flags()
+            self.interrupt_epochs.clear()
+            self.interrupted_at.clear()
             
             # Очищаем сессии
             self.active_sessions.clear()
+            self.cancel_scopes.clear()
             
             # Очищаем зарегистрированные модули
             self.registered_modules.clear()
@@ -458,8 +561,12 @@ class InterruptManager(UniversalModuleInterface):
                 if self.total_interrupts > 0 else 0
             ),
             "active_sessions": len(self.active_sessions),
+            "running_requests": sum(len(scopes) for scopes in self.cancel_scopes.values()),
+            "cancelled_tasks": self.cancelled_tasks,
+            "cancelled_handles": self.cancelled_handles,
             "registered_modules": len(self.registered_modules),
             "registered_callbacks": len(self.interrupt_callbacks),
+            "interrupt_epochs": len(self.interrupt_epochs),
             "global_interrupt_flag": self.global_interrupt_flag,
             "interrupt_hardware_id": self.interrupt_hardware_id
         }
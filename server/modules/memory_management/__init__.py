@@ -10,13 +10,22 @@ Memory Management Module для Nexy AI Assistant
 Архитектура:
 - MemoryAnalyzer: анализ диалогов через Gemini API
 - MemoryManager: координация всех операций с памятью
+- MemoryContextCache: общий LRU/TTL кэш памяти с single-flight загрузкой
+- MemoryAnalysisQueue: debounce-очередь фонового анализа с объединением ходов
+- MemoryFact: память как набор фактов с дедупликацией и ужатием до бюджета
 - Интеграция с существующим TextProcessor без изменения логики
 """
 
 from .core.memory_manager import MemoryManager
+from .core.memory_context_cache import MemoryContextCache
+from .core.analysis_queue import MemoryAnalysisQueue
+from .core.fact_store import MemoryFact
 from .providers.memory_analyzer import MemoryAnalyzer
 
 __all__ = [
     'MemoryManager',
+    'MemoryContextCache',
+    'MemoryAnalysisQueue',
+    'MemoryFact',
     'MemoryAnalyzer'
 ]
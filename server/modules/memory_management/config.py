@@ -28,16 +28,31 @@ class MemoryConfig:
         self.memory_timeout = self.config.get('memory_timeout', unified_config.memory.memory_timeout)
         self.analysis_timeout = self.config.get('analysis_timeout', unified_config.memory.analysis_timeout)
         
+        # Кэш памяти пользователей
+        self.memory_cache_ttl = self.config.get('memory_cache_ttl', unified_config.memory.memory_cache_ttl)
+        self.memory_cache_max_entries = self.config.get('memory_cache_max_entries', unified_config.memory.memory_cache_max_entries)
+        self.memory_cache_max_bytes = self.config.get('memory_cache_max_bytes', unified_config.memory.memory_cache_max_bytes)
+        
         # Настройки анализа памяти
         self.memory_analysis_model = self.config.get('memory_analysis_model', unified_config.memory.memory_analysis_model)
         self.memory_analysis_temperature = self.config.get('memory_analysis_temperature', unified_config.memory.memory_analysis_temperature)
         
+        # Очередь фонового анализа (объединение ходов по hardware_id)
+        self.memory_analysis_debounce = self.config.get('memory_analysis_debounce', unified_config.memory.memory_analysis_debounce)
+        self.memory_analysis_max_delay = self.config.get('memory_analysis_max_delay', unified_config.memory.memory_analysis_max_delay)
+        self.memory_analysis_max_turns = self.config.get('memory_analysis_max_turns', unified_config.memory.memory_analysis_max_turns)
+        self.memory_analysis_max_concurrent = self.config.get('memory_analysis_max_concurrent', unified_config.memory.memory_analysis_max_concurrent)
+        self.memory_analysis_max_pending = self.config.get('memory_analysis_max_pending', unified_config.memory.memory_analysis_max_pending)
+        
+        # Сколько фактов памяти попадает в контекст LLM
+        self.memory_context_short_facts = self.config.get('memory_context_short_facts', unified_config.memory.memory_context_short_facts)
+        self.memory_context_long_facts = self.config.get('memory_context_long_facts', unified_config.memory.memory_context_long_facts)
+        
         # Промпты для анализа памяти
         self.memory_analysis_prompt = """
         Analyze this conversation between user and AI assistant to extract memory information.
         
-        USER INPUT: {prompt}
-        AI RESPONSE: {response}
+        {conversation}
         
         Extract and categorize information into:
         
@@ -74,8 +89,18 @@ class MemoryConfig:
             'MAX_LONG_TERM_MEMORY_SIZE': self.max_long_term_memory_size,
             'MEMORY_TIMEOUT': self.memory_timeout,
             'ANALYSIS_TIMEOUT': self.analysis_timeout,
+            'MEMORY_CACHE_TTL': self.memory_cache_ttl,
+            'MEMORY_CACHE_MAX_ENTRIES': self.memory_cache_max_entries,
+            'MEMORY_CACHE_MAX_BYTES': self.memory_cache_max_bytes,
             'MEMORY_ANALYSIS_MODEL': self.memory_analysis_model,
             'MEMORY_ANALYSIS_TEMPERATURE': self.memory_analysis_temperature,
+            'MEMORY_ANALYSIS_DEBOUNCE': self.memory_analysis_debounce,
+            'MEMORY_ANALYSIS_MAX_DELAY': self.memory_analysis_max_delay,
+            'MEMORY_ANALYSIS_MAX_TURNS': self.memory_analysis_max_turns,
+            'MEMORY_ANALYSIS_MAX_CONCURRENT': self.memory_analysis_max_concurrent,
+            'MEMORY_ANALYSIS_MAX_PENDING': self.memory_analysis_max_pending,
+            'MEMORY_CONTEXT_SHORT_FACTS': self.memory_context_short_facts,
+            'MEMORY_CONTEXT_LONG_FACTS': self.memory_context_long_facts,
             'MEMORY_ANALYSIS_PROMPT': self.memory_analysis_prompt
         }
     
@@ -92,5 +117,9 @@ class MemoryConfig:
         if self.max_short_term_memory_size <= 0 or self.max_long_term_memory_size <= 0:
             print("❌ max_short_term_memory_size и max_long_term_memory_size должны быть больше 0")
             return False
+        
+        if self.memory_analysis_max_turns <= 0 or self.memory_analysis_max_concurrent <= 0:
+            print("❌ memory_analysis_max_turns и memory_analysis_max_concurrent должны быть больше 0")
+            return False
             
         return True
@@ -3,5 +3,8 @@ Core components для Memory Management Module
 """
 
 from .memory_manager import MemoryManager
+from .memory_context_cache import MemoryContextCache
+from .analysis_queue import MemoryAnalysisQueue
+from .fact_store import MemoryFact
 
-__all__ = ['MemoryManager']
+__all__ = ['MemoryManager', 'MemoryContextCache', 'MemoryAnalysisQueue', 'MemoryFact']
@@ -0,0 +1,169 @@
+"""
+Очередь фонового анализа памяти с объединением ходов диалога
+
+После каждого ответа MemoryManager ставит ход (prompt, response) в очередь
+вместо немедленного вызова Gemini:
+- debounce по hardware_id: ходы, пришедшие подряд, анализируются одним
+  запросом, когда пользователь замолчал на debounce секунд (но не позже
+  max_delay после первого хода);
+- одна задача на hardware_id за раз: ходы, пришедшие во время анализа,
+  копятся в следующую задачу, записи в БД не обгоняют друг друга;
+- в задаче не больше max_turns последних ходов, более старые отбрасываются;
+- одновременно выполняется не больше max_concurrent анализов на весь сервер;
+- при переполнении (max_pending_users) вытесняется самая старая задача.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from utils.latency_histogram import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+Turn = Tuple[str, str]
+# processor(hardware_id, turns) - анализ и запись памяти
+AnalysisProcessor = Callable[[str, List[Turn]], Awaitable[Any]]
+
+
+class _Job:
+    __slots__ = ('turns', 'first_at', 'handle')
+
+    def __init__(self, now: float):
+        self.turns: List[Turn] = []
+        self.first_at = now
+        self.handle: Optional[asyncio.TimerHandle] = None
+
+
+class MemoryAnalysisQueue:
+    """Debounce-очередь анализа памяти по hardware_id"""
+
+    def __init__(self, processor: AnalysisProcessor, debounce: float = 3.0, max_delay: float = 15.0,
+                 max_turns: int = 8, max_concurrent: int = 4, max_pending_users: int = 1000):
+        """
+        Args:
+            processor: Анализ и сохранение памяти для набора ходов
+            debounce: Пауза после последнего хода до анализа (секунды)
+            max_delay: Максимальная задержка анализа от первого хода (секунды)
+            max_turns: Максимум ходов в одном анализе (старые отбрасываются)
+            max_concurrent: Максимум одновременных анализов
+            max_pending_users: Максимум ожидающих задач
+        """
+        self.processor = processor
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.max_turns = max_turns
+        self.max_pending_users = max_pending_users
+
+        self._pending: "OrderedDict[str, _Job]" = OrderedDict()
+        self._running: Dict[str, asyncio.Task] = {}
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.max_concurrent = max_concurrent
+
+        self.lag = LatencyHistogram()
+        self.stats = {
+            'turns_submitted': 0,
+            'analyses': 0,
+            'analysis_errors': 0,
+            'turns_merged': 0,
+            'turns_dropped': 0,
+            'jobs_dropped': 0,
+        }
+
+    def submit(self, hardware_id: str, prompt: str, response: str):
+        """Ход диалога в очередь (без ожидания анализа)"""
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        self.stats['turns_submitted'] += 1
+
+        job = self._pending.get(hardware_id)
+        if job is None:
+            if len(self._pending) >= self.max_pending_users:
+                self._drop_oldest()
+            job = self._pending[hardware_id] = _Job(now)
+        job.turns.append((prompt, response))
+        if len(job.turns) > self.max_turns:
+            del job.turns[0]
+            self.stats['turns_dropped'] += 1
+
+        # Перезапуск debounce, но не дальше max_delay от первого хода
+        if job.handle is not None:
+            job.handle.cancel()
+        due = min(now + self.debounce, job.first_at + self.max_delay)
+        job.handle = loop.call_at(due, self._dispatch, hardware_id)
+
+    def _drop_oldest(self):
+        hardware_id, job = self._pending.popitem(last=False)
+        if job.handle is not None:
+            job.handle.cancel()
+        self.stats['jobs_dropped'] += 1
+        self.stats['turns_dropped'] += len(job.turns)
+        logger.warning(f"⚠️ Memory analysis queue full, dropped {len(job.turns)} turns for {hardware_id}")
+
+    def _dispatch(self, hardware_id: str):
+        """Срок задачи наступил: запуск, если по этому hardware_id ничего не выполняется"""
+        if hardware_id in self._running:
+            # Запустится по завершении текущего анализа
+            return
+        job = self._pending.pop(hardware_id, None)
+        if job is None:
+            return
+        task = asyncio.create_task(self._run(hardware_id, job))
+        self._running[hardware_id] = task
+
+    async def _run(self, hardware_id: str, job: _Job):
+        try:
+            async with self._semaphore:
+                loop = asyncio.get_running_loop()
+                self.lag.observe((loop.time() - job.first_at) * 1000)
+                self.stats['analyses'] += 1
+                self.stats['turns_merged'] += len(job.turns) - 1
+                started = time.perf_counter()
+                try:
+                    await self.processor(hardware_id, job.turns)
+                    logger.debug(
+                        f"🧠 Memory analysis for {hardware_id}: {len(job.turns)} turns "
+                        f"in {(time.perf_counter() - started) * 1000:.0f}ms"
+                    )
+                except Exception as e:
+                    self.stats['analysis_errors'] += 1
+                    logger.error(f"❌ Memory analysis failed for {hardware_id}: {e}")
+        finally:
+            self._running.pop(hardware_id, None)
+            # Ходы, пришедшие во время анализа: если срок уже прошёл - сразу следующая задача
+            next_job = self._pending.get(hardware_id)
+            if next_job is not None and (next_job.handle is None or next_job.handle.when() <= asyncio.get_running_loop().time()):
+                self._dispatch(hardware_id)
+
+    async def stop(self, timeout: float = 10.0):
+        """Остановка: ожидающие задачи запускаются сразу, ждём завершения не дольше timeout"""
+        for job in self._pending.values():
+            if job.handle is not None:
+                job.handle.cancel()
+                job.handle = None
+        deadline = asyncio.get_running_loop().time() + timeout
+        while self._running or self._pending:
+            for hardware_id in [key for key in self._pending if key not in self._running]:
+                self._dispatch(hardware_id)
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                logger.warning(f"⚠️ Memory analysis queue stopped with {len(self._running) + len(self._pending)} jobs left")
+                break
+            await asyncio.wait(list(self._running.values()), timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+        for task in self._running.values():
+            task.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Счётчики очереди: сэкономленные вызовы и задержка в очереди"""
+        lag = self.lag.snapshot()
+        return {
+            **self.stats,
+            # Без очереди каждый ход - отдельный анализ
+            'calls_saved': self.stats['turns_merged'] + self.stats['turns_dropped'],
+            'pending_jobs': len(self._pending),
+            'running_jobs': len(self._running),
+            'max_concurrent': self.max_concurrent,
+            'queue_lag_ms': {key: lag[key] for key in ('avg_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms')},
+        }
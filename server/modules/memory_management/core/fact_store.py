@@ -0,0 +1,174 @@
+"""
+Память пользователя как набор отдельных фактов
+
+Колонки short_term_memory / long_term_memory хранят не цельный текст, а
+JSON со списком фактов (текст, время появления, время последнего упоминания,
+число упоминаний, хэш для дедупликации):
+- новый анализ дописывает факты, а не перезаписывает память целиком;
+- дубликаты определяются по хэшу нормализованного текста - повтор только
+  обновляет время упоминания;
+- compact_facts держит сериализованную память в пределах бюджета байт
+  (MAX_SHORT_TERM_MEMORY_SIZE / MAX_LONG_TERM_MEMORY_SIZE), вытесняя
+  давно не упоминавшиеся факты;
+- в промпт попадают только top-K фактов (select_facts): сначала
+  релевантные запросу, затем самые свежие.
+
+Старый формат (обычный текст) читается как набор фактов без времени.
+"""
+
+import hashlib
+import json
+import re
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+FACTS_FORMAT_VERSION = 1
+# Запись факта в JSON сверх текста: кавычки, запятые, два времени, счётчик, хэш
+_RECORD_OVERHEAD_BYTES = 64
+
+# Границы фактов в ответе анализатора и в старом текстовом формате
+_FACT_SPLIT = re.compile(r'\n+|;\s*|(?<=[.!?])\s+(?=[A-ZА-ЯЁ0-9])')
+_BULLET = re.compile(r'^\s*(?:[-*•]|\d+[.)])\s*')
+_NON_WORD = re.compile(r'[^\w\s]+')
+_SPACES = re.compile(r'\s+')
+_WORD = re.compile(r'\w{3,}')
+_EMPTY_MARKERS = {'', 'empty', 'none', 'no information', 'n/a'}
+
+
+def normalize_fact(text: str) -> str:
+    """Текст факта для сравнения: регистр, пунктуация и пробелы не учитываются"""
+    return _SPACES.sub(' ', _NON_WORD.sub(' ', text.lower())).strip()
+
+
+def fact_key(text: str) -> str:
+    """Хэш нормализованного текста (ключ дедупликации)"""
+    return hashlib.sha1(normalize_fact(text).encode('utf-8')).hexdigest()[:16]
+
+
+def split_facts(text: str) -> List[str]:
+    """Разбиение текста памяти на отдельные факты (строки, пункты, предложения)"""
+    facts = []
+    for part in _FACT_SPLIT.split(text or ''):
+        fact = _SPACES.sub(' ', _BULLET.sub('', part)).strip()
+        if normalize_fact(fact) not in _EMPTY_MARKERS:
+            facts.append(fact)
+    return facts
+
+
+@dataclass
+class MemoryFact:
+    """Один факт о пользователе"""
+
+    text: str
+    created_at: float
+    seen_at: float
+    hits: int = 1
+    key: str = ''
+
+    def __post_init__(self):
+        if not self.key:
+            self.key = fact_key(self.text)
+
+    def to_record(self) -> list:
+        return [self.text, round(self.created_at, 3), round(self.seen_at, 3), self.hits, self.key]
+
+
+def load_facts(raw: Optional[str]) -> List[MemoryFact]:
+    """Факты из значения колонки (JSON или старый текстовый формат)"""
+    if not raw:
+        return []
+    if raw.startswith('{"v":'):
+        try:
+            return [MemoryFact(*record) for record in json.loads(raw)['facts']]
+        except (ValueError, KeyError, TypeError):
+            pass
+    # Старый формат: текст целиком - факты без времени (самые старые)
+    return [MemoryFact(fact, 0.0, 0.0) for fact in split_facts(raw)]
+
+
+def dump_facts(facts: Sequence[MemoryFact]) -> str:
+    """Значение колонки; пустая память - пустая строка"""
+    if not facts:
+        return ''
+    return json.dumps({'v': FACTS_FORMAT_VERSION, 'facts': [fact.to_record() for fact in facts]},
+                      ensure_ascii=False, separators=(',', ':'))
+
+
+def merge_facts(facts: List[MemoryFact], texts: Iterable[str], now: float) -> Tuple[List[MemoryFact], int, int]:
+    """
+    Дописывание новых фактов с дедупликацией
+
+    Args:
+        facts: Текущие факты пользователя (изменяются на месте)
+        texts: Факты из нового анализа
+        now: Время анализа (unix time)
+
+    Returns:
+        (факты, добавлено, повторов)
+    """
+    by_key = {fact.key: fact for fact in facts}
+    added = duplicates = 0
+    for text in texts:
+        key = fact_key(text)
+        existing = by_key.get(key)
+        if existing is not None:
+            existing.seen_at = now
+            existing.hits += 1
+            duplicates += 1
+            continue
+        fact = MemoryFact(text, now, now, key=key)
+        facts.append(fact)
+        by_key[key] = fact
+        added += 1
+    return facts, added, duplicates
+
+
+def compact_facts(facts: List[MemoryFact], max_bytes: int) -> Tuple[List[MemoryFact], int]:
+    """
+    Ужатие памяти до бюджета: вытесняются давно не упоминавшиеся факты
+
+    Returns:
+        (оставшиеся факты в исходном порядке, удалено)
+    """
+    size = len(dump_facts(facts).encode('utf-8'))
+    if size <= max_bytes:
+        return facts, 0
+    # Кандидаты на вытеснение: сначала старые по упоминанию, при равенстве - реже упоминавшиеся
+    order = sorted(range(len(facts)), key=lambda i: (facts[i].seen_at, facts[i].hits, facts[i].created_at))
+    dropped = set()
+    position = 0
+    while True:
+        # Размер по оценке (с запасом), затем проверка точным размером
+        while size > max_bytes and position < len(order):
+            index = order[position]
+            dropped.add(index)
+            size -= len(facts[index].text.encode('utf-8')) + _RECORD_OVERHEAD_BYTES
+            position += 1
+        kept = [fact for index, fact in enumerate(facts) if index not in dropped]
+        size = len(dump_facts(kept).encode('utf-8'))
+        if size <= max_bytes or position >= len(order):
+            return kept, len(dropped)
+
+
+def select_facts(facts: Sequence[MemoryFact], limit: int, query: Optional[str] = None) -> List[MemoryFact]:
+    """
+    Top-K фактов для промпта: релевантные запросу (общие слова), затем свежие
+
+    Returns:
+        Выбранные факты по убыванию ранга - ContextAssembler урезает список
+        под бюджет токенов с конца, не ранжируя заново
+    """
+    if limit <= 0 or not facts:
+        return []
+    words = set(_WORD.findall(query.lower())) if query else set()
+
+    def score(fact: MemoryFact):
+        overlap = len(words.intersection(_WORD.findall(fact.text.lower()))) if words else 0
+        return (overlap, fact.seen_at, fact.hits)
+
+    return sorted(facts, key=score, reverse=True)[:limit]
+
+
+def render_facts(facts: Sequence[MemoryFact]) -> str:
+    """Факты списком для контекста LLM"""
+    return "\n".join(f"- {fact.text}" for fact in facts)
@@ -0,0 +1,181 @@
+"""
+Кэш памяти пользователей (short/long) для контекста LLM
+
+Один экземпляр на MemoryManager, им пользуются все пути запроса:
+- LRU + TTL: запись живёт ttl секунд, при переполнении вытесняется самая старая по доступу;
+- ограничение по числу записей (max_entries) и по байтам (max_bytes);
+- single-flight: одновременные промахи по одному hardware_id ждут одну загрузку;
+- write-through: успешный update_user_memory кладёт новую память в кэш, а
+  загрузка, начатая до обновления, уже не перезапишет её старым значением.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Накладные расходы записи (ключ, кортеж, dict) сверх длины строк памяти
+_ENTRY_OVERHEAD_BYTES = 256
+# Полная проверка TTL - не чаще чем раз в столько секунд
+_EXPIRE_SWEEP_INTERVAL = 30.0
+
+
+def memory_size(memory: Dict[str, str]) -> int:
+    """Приблизительный размер записи в байтах (2 байта на символ - кириллица в str)"""
+    return _ENTRY_OVERHEAD_BYTES + sum(len(value) * 2 for value in memory.values() if isinstance(value, str))
+
+
+class MemoryContextCache:
+    """LRU + TTL кэш памяти с single-flight загрузкой"""
+
+    def __init__(self, ttl: float = 300.0, max_entries: int = 1000, max_bytes: int = 16 * 1024 * 1024):
+        """
+        Args:
+            ttl: Время жизни записи (секунды)
+            max_entries: Максимум записей
+            max_bytes: Бюджет памяти на все записи
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        # hardware_id -> (память, размер, истекает в monotonic)
+        self._entries: "OrderedDict[str, Tuple[Dict[str, str], int, float]]" = OrderedDict()
+        self._bytes = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # Версия памяти: растёт при каждой записи/инвалидации, устаревшая загрузка не кэшируется
+        self._versions: Dict[str, int] = {}
+        self._last_sweep = time.monotonic()
+
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'loads': 0,
+            'load_errors': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0,
+            'stale_loads': 0,
+        }
+
+    def peek(self, hardware_id: str) -> Optional[Dict[str, str]]:
+        """Память из кэша без загрузки (None - нет или истекла)"""
+        entry = self._entries.get(hardware_id)
+        if entry is None:
+            return None
+        if entry[2] <= time.monotonic():
+            self._remove(hardware_id)
+            self.stats['expirations'] += 1
+            return None
+        self._entries.move_to_end(hardware_id)
+        return entry[0]
+
+    async def get(self, hardware_id: str, loader: Callable[[str], Awaitable[Dict[str, str]]]) -> Dict[str, str]:
+        """
+        Память пользователя: из кэша или через loader (одна загрузка на hardware_id)
+
+        Args:
+            hardware_id: Аппаратный ID пользователя
+            loader: Загрузка из БД при промахе
+        """
+        memory = self.peek(hardware_id)
+        if memory is not None:
+            self.stats['hits'] += 1
+            return memory
+        self.stats['misses'] += 1
+
+        inflight = self._inflight.get(hardware_id)
+        if inflight is not None:
+            self.stats['coalesced'] += 1
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[hardware_id] = future
+        version = self._versions.get(hardware_id, 0)
+        try:
+            self.stats['loads'] += 1
+            memory = await loader(hardware_id)
+        except BaseException as e:
+            self.stats['load_errors'] += 1
+            # Отмена ведущего запроса не должна отменять ожидающих - им обычная ошибка
+            future.set_exception(
+                RuntimeError(f"memory load for {hardware_id} cancelled") if isinstance(e, asyncio.CancelledError) else e
+            )
+            # Исключение уже передано ожидающим; без них future не должен ругаться в логах
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(hardware_id, None)
+
+        if self._versions.get(hardware_id, 0) == version:
+            self.put(hardware_id, memory, bump_version=False)
+        else:
+            # Память обновили, пока шла загрузка - её результат уже устарел
+            self.stats['stale_loads'] += 1
+        future.set_result(memory)
+        return memory
+
+    def put(self, hardware_id: str, memory: Dict[str, str], bump_version: bool = True):
+        """Запись памяти в кэш (write-through после update_user_memory)"""
+        if bump_version:
+            self._versions[hardware_id] = self._versions.get(hardware_id, 0) + 1
+        size = memory_size(memory)
+        if size > self.max_bytes:
+            self.invalidate(hardware_id)
+            return
+        self._remove(hardware_id)
+        self._entries[hardware_id] = (memory, size, time.monotonic() + self.ttl)
+        self._bytes += size
+        self._evict()
+
+    def invalidate(self, hardware_id: str):
+        """Удаление записи; загрузка, начатая раньше, результат не закэширует"""
+        self._versions[hardware_id] = self._versions.get(hardware_id, 0) + 1
+        if self._remove(hardware_id):
+            self.stats['invalidations'] += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._versions.clear()
+        self._bytes = 0
+
+    def _remove(self, hardware_id: str) -> bool:
+        entry = self._entries.pop(hardware_id, None)
+        if entry is None:
+            return False
+        self._bytes -= entry[1]
+        return True
+
+    def _evict(self):
+        """Вытеснение по LRU до лимитов; истекшие записи - при периодической проверке"""
+        now = time.monotonic()
+        if now - self._last_sweep >= _EXPIRE_SWEEP_INTERVAL:
+            self._last_sweep = now
+            for hardware_id in [key for key, entry in self._entries.items() if entry[2] <= now]:
+                self._remove(hardware_id)
+                self.stats['expirations'] += 1
+            # Версии нужны только пока по ключу может идти загрузка
+            for hardware_id in [key for key in self._versions if key not in self._entries and key not in self._inflight]:
+                del self._versions[hardware_id]
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, (_, size, _) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.stats['evictions'] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Счётчики кэша"""
+        lookups = self.stats['hits'] + self.stats['misses']
+        return {
+            **self.stats,
+            'hit_ratio': self.stats['hits'] / lookups if lookups else 0.0,
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'inflight': len(self._inflight),
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'ttl': self.ttl,
+        }
@@ -10,10 +10,14 @@ Memory Manager - координатор всех операций с памят
 
 import asyncio
 import logging
-from typing import Dict, Optional, Tuple
+import time
+from typing import Any, Dict, List, Optional, Tuple
 
 from ..config import MemoryConfig
 from ..providers.memory_analyzer import MemoryAnalyzer
+from .analysis_queue import MemoryAnalysisQueue
+from .fact_store import compact_facts, dump_facts, load_facts, merge_facts, render_facts, select_facts, split_facts
+from .memory_context_cache import MemoryContextCache
 
 logger = logging.getLogger(__name__)
 
@@ -36,6 +40,26 @@ class MemoryManager:
         self.db_manager = db_manager
         self.memory_analyzer = None
         self.is_initialized = False
+        # Общий кэш памяти для всех путей запроса (gRPC, streaming workflow)
+        self.context_cache = MemoryContextCache(
+            ttl=self.config.memory_cache_ttl,
+            max_entries=self.config.memory_cache_max_entries,
+            max_bytes=self.config.memory_cache_max_bytes
+        )
+        # Фоновый анализ: ходы одного пользователя объединяются в один вызов Gemini
+        self.analysis_queue = MemoryAnalysisQueue(
+            self._apply_analysis,
+            debounce=self.config.memory_analysis_debounce,
+            max_delay=self.config.memory_analysis_max_delay,
+            max_turns=self.config.memory_analysis_max_turns,
+            max_concurrent=self.config.memory_analysis_max_concurrent,
+            max_pending_users=self.config.memory_analysis_max_pending
+        )
+        self.fact_stats = {
+            'facts_added': 0,
+            'facts_duplicate': 0,
+            'facts_compacted': 0,
+        }
         
     async def initialize(self):
         """Инициализация MemoryManager"""
@@ -70,47 +94,89 @@ class MemoryManager:
         self.db_manager = db_manager
         logger.info("✅ DatabaseManager set in MemoryManager")
     
-    async def get_memory_context(self, hardware_id: str) -> str:
+    async def _load_user_memory(self, hardware_id: str) -> Dict[str, str]:
+        """Загрузка памяти из БД (для кэша)"""
+        # Таймаут 2 секунды на получение памяти (как в оригинале)
+        return await asyncio.wait_for(
+            self.db_manager.get_user_memory(hardware_id),
+            timeout=self.config.memory_timeout
+        )
+    
+    async def get_user_memory(self, hardware_id: str) -> Dict[str, str]:
+        """
+        Память пользователя {'short', 'long'} через общий кэш.
+        
+        Args:
+            hardware_id: Аппаратный ID пользователя
+            
+        Returns:
+            Словарь с памятью (пустые строки, если памяти нет)
+        """
+        if not hardware_id or not self.db_manager:
+            return {'short': '', 'long': ''}
+        return await self.context_cache.get(hardware_id, self._load_user_memory)
+    
+    def _render_memory(self, memory: Dict[str, str], query: Optional[str] = None) -> Tuple[str, str]:
+        """Top-K фактов краткосрочной и долгосрочной памяти списком"""
+        short_facts = select_facts(load_facts(memory.get('short')), self.config.memory_context_short_facts, query)
+        long_facts = select_facts(load_facts(memory.get('long')), self.config.memory_context_long_facts, query)
+        return render_facts(short_facts), render_facts(long_facts)
+    
+    async def get_user_context(self, hardware_id: str, query: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Контекст памяти для workflow интеграций.
+        
+        Args:
+            hardware_id: Аппаратный ID пользователя
+            query: Текущий запрос (факты, релевантные ему, идут первыми)
+            
+        Returns:
+            {'short', 'long', 'recent_context'} или None, если памяти нет
+        """
+        memory = await self.get_user_memory(hardware_id)
+        if not memory.get('short') and not memory.get('long'):
+            return None
+        short_text, long_text = self._render_memory(memory, query)
+        return {
+            'short': short_text,
+            'long': long_text,
+            'recent_context': short_text
+        }
+    
+    async def get_memory_context(self, hardware_id: str, query: Optional[str] = None) -> str:
         """
         Получает контекст памяти для LLM.
         
         Args:
             hardware_id: Аппаратный ID пользователя
+            query: Текущий запрос (для выбора релевантных фактов)
             
         Returns:
             Строка с контекстом памяти или пустая строка
             
-        Этот метод заменяет логику из text_processor.py (строки 254-282)
+        В контекст попадают только top-K фактов (MEMORY_CONTEXT_SHORT_FACTS /
+        MEMORY_CONTEXT_LONG_FACTS), а не вся сохранённая память. Инструкции по
+        использованию памяти - в system instruction Live сессии (TextProcessor).
         """
         if not hardware_id or not self.db_manager:
             return ""
         
         try:
-            # Таймаут 2 секунды на получение памяти (как в оригинале)
-            memory_data = await asyncio.wait_for(
-                asyncio.to_thread(self.db_manager.get_user_memory, hardware_id),
-                timeout=self.config.memory_timeout
-            )
+            memory_data = await self.get_user_memory(hardware_id)
             
             if memory_data.get('short') or memory_data.get('long'):
+                short_text, long_text = self._render_memory(memory_data, query)
                 memory_context = f"""
 🧠 MEMORY CONTEXT (for response context):
 
 📋 SHORT-TERM MEMORY (current session):
-{memory_data.get('short', 'No short-term memory')}
+{short_text or 'No short-term memory'}
 
 📚 LONG-TERM MEMORY (user information):
-{memory_data.get('long', 'No long-term memory')}
-
-💡 MEMORY USAGE INSTRUCTIONS:
-- Use short-term memory to understand current conversation context
-- Use long-term memory for response personalization (name, preferences, important details)
-- If memory is not relevant to current request - ignore it
-- Memory should complement the answer, not replace it
-- Priority: current request > short-term memory > long-term memory
-                """
+{long_text or 'No long-term memory'}
+"""
                 
-                logger.info(f"🧠 Memory obtained for {hardware_id}: short-term ({len(memory_data.get('short', ''))} chars), long-term ({len(memory_data.get('long', ''))} chars)")
+                logger.info(f"🧠 Memory obtained for {hardware_id}: short-term ({len(short_text)} chars), long-term ({len(long_text)} chars)")
                 return memory_context
             else:
                 logger.info(f"🧠 No memory found for {hardware_id}")
@@ -155,38 +221,73 @@ class MemoryManager:
             prompt: Запрос пользователя
             response: Ответ ассистента
             
-        Этот метод заменяет _update_memory_background() из text_processor.py
+        Ход ставится в очередь анализа и возвращается сразу: ходы, пришедшие
+        подряд, анализируются и записываются в БД одним вызовом (_apply_analysis).
         """
+        if not self.memory_analyzer:
+            logger.debug("🧠 MemoryAnalyzer not available - skipping memory analysis")
+            return
+        if not self.db_manager:
+            logger.warning("⚠️ DatabaseManager is not set in MemoryManager; skipping memory update")
+            return
         try:
-            logger.debug(f"🔄 Starting background memory update for {hardware_id}")
-            
-            # Анализируем разговор для извлечения памяти
-            short_memory, long_memory = await self.analyze_conversation(prompt, response)
-            
-            # Если есть что сохранять
-            if short_memory or long_memory:
-                # Проверяем наличие менеджера базы данных
-                if not self.db_manager:
-                    logger.warning("⚠️ DatabaseManager is not set in MemoryManager; skipping memory update")
-                    return
-                # Обновляем память в базе данных
-                success = await self.db_manager.update_user_memory(
-                    hardware_id,
-                    short_memory,
-                    long_memory
-                )
-                
-                if success:
-                    logger.info(f"✅ Memory for {hardware_id} updated: short-term ({len(short_memory)} chars), long-term ({len(long_memory)} chars)")
-                else:
-                    logger.warning(f"⚠️ Could not update memory for {hardware_id}")
-            else:
-                logger.debug(f"🧠 No information found for {hardware_id} to remember")
-                
+            self.analysis_queue.submit(hardware_id, prompt, response)
+            logger.debug(f"🔄 Memory update queued for {hardware_id}")
         except Exception as e:
-            logger.error(f"❌ Error in background memory update for {hardware_id}: {e}")
+            logger.error(f"❌ Error queueing memory update for {hardware_id}: {e}")
             # НЕ поднимаем исключение - это фоновая задача
     
+    async def _apply_analysis(self, hardware_id: str, turns: List[Tuple[str, str]]):
+        """
+        Анализ накопленных ходов и запись памяти (вызывается очередью анализа).
+        
+        Args:
+            hardware_id: Аппаратный ID пользователя
+            turns: Ходы (prompt, response) в хронологическом порядке
+            
+        Ошибки не перехватываются - их считает и логирует очередь.
+        """
+        logger.debug(f"🔄 Starting background memory update for {hardware_id} ({len(turns)} turns)")
+        
+        # Анализируем разговор для извлечения памяти
+        short_memory, long_memory = await self.memory_analyzer.analyze_turns(turns)
+        
+        new_short, new_long = split_facts(short_memory), split_facts(long_memory)
+        
+        # Если есть что сохранять
+        if not new_short and not new_long:
+            logger.debug(f"🧠 No information found for {hardware_id} to remember")
+            return
+        
+        # Дописываем факты к текущей памяти (очередь держит одну задачу на hardware_id)
+        memory = await self.get_user_memory(hardware_id)
+        now = time.time()
+        short_raw, short_count = self._merge_memory(memory.get('short'), new_short, now, self.config.max_short_term_memory_size)
+        long_raw, long_count = self._merge_memory(memory.get('long'), new_long, now, self.config.max_long_term_memory_size)
+        
+        # Обновляем память в базе данных
+        success = await self.db_manager.update_user_memory(
+            hardware_id,
+            short_raw,
+            long_raw
+        )
+        
+        if success:
+            # Write-through: следующий запрос увидит новую память без похода в БД
+            self.context_cache.put(hardware_id, {'short': short_raw, 'long': long_raw})
+            logger.info(f"✅ Memory for {hardware_id} updated from {len(turns)} turns: short-term {short_count} facts ({len(short_raw)} bytes), long-term {long_count} facts ({len(long_raw)} bytes)")
+        else:
+            logger.warning(f"⚠️ Could not update memory for {hardware_id}")
+    
+    def _merge_memory(self, raw: Optional[str], texts, now: float, max_bytes: int) -> Tuple[str, int]:
+        """Новые факты к сохранённым: дедупликация и ужатие до бюджета байт"""
+        facts, added, duplicates = merge_facts(load_facts(raw), texts, now)
+        facts, removed = compact_facts(facts, max_bytes)
+        self.fact_stats['facts_added'] += added
+        self.fact_stats['facts_duplicate'] += duplicates
+        self.fact_stats['facts_compacted'] += removed
+        return dump_facts(facts), len(facts)
+    
     def is_available(self) -> bool:
         """
         Проверяет доступность модуля памяти.
@@ -210,10 +311,54 @@ class MemoryManager:
             return 0
         
         try:
-            return await asyncio.to_thread(
-                self.db_manager.cleanup_expired_short_term_memory,
-                hours
-            )
+            cleaned = await self.db_manager.cleanup_expired_short_term_memory(hours)
+            if cleaned:
+                # Какие именно пользователи затронуты, неизвестно - кэш сбрасывается целиком
+                self.context_cache.clear()
+            return cleaned
         except Exception as e:
             logger.error(f"❌ Error cleaning up expired memory: {e}")
             return 0
+    
+    async def expire_memory_batch(self, limit: int, hours: float = 24) -> int:
+        """
+        Очистка одной пачки устаревшей краткосрочной памяти (планировщик обслуживания).
+        
+        Args:
+            limit: Максимум пользователей за пачку
+            hours: Память старше стольких часов считается устаревшей
+            
+        Returns:
+            Количество очищенных записей (ошибки пробрасываются)
+        """
+        if not self.db_manager:
+            return 0
+        hardware_ids = await self.db_manager.expire_short_term_memory_batch(hours, limit)
+        # Точечная инвалидация вместо сброса всего кэша
+        for hardware_id in hardware_ids:
+            self.context_cache.invalidate(hardware_id)
+        return len(hardware_ids)
+    
+    async def get_status(self) -> Dict[str, Any]:
+        """
+        Статус модуля памяти со счётчиками кэша.
+        
+        Returns:
+            Словарь со статусом
+        """
+        return {
+            'is_initialized': self.is_initialized,
+            'analyzer_available': self.memory_analyzer is not None,
+            'database_available': self.db_manager is not None,
+            'memory_cache': self.context_cache.get_stats(),
+            'analysis_queue': self.analysis_queue.get_stats(),
+            'facts': dict(self.fact_stats)
+        }
+    
+    async def cleanup(self):
+        """Остановка: ходы, ещё не проанализированные, обрабатываются до выхода"""
+        try:
+            await self.analysis_queue.stop(timeout=self.config.analysis_timeout * 2)
+            logger.info("✅ MemoryManager cleaned up")
+        except Exception as e:
+            logger.error(f"❌ MemoryManager cleanup failed: {e}")
@@ -11,7 +11,7 @@ Memory Analyzer - анализ диалогов для извлечения па
 import asyncio
 import logging
 import re
-from typing import Tuple
+from typing import List, Sequence, Tuple
 
 try:
     import google.generativeai as genai
@@ -47,12 +47,20 @@ class MemoryAnalyzer:
         self.model_name = "gemini-2.5-flash-lite"
         self.temperature = 0.3
         
+        # Один клиент модели на весь процесс (не создаётся на каждый анализ)
+        self.model = genai.GenerativeModel(
+            model_name=self.model_name,
+            generation_config=genai.types.GenerationConfig(
+                temperature=self.temperature,
+                max_output_tokens=1024,
+            )
+        )
+        
         # Промпт для анализа памяти
         self.analysis_prompt_template = """
         Analyze this conversation between user and AI assistant to extract memory information.
         
-        USER INPUT: {prompt}
-        AI RESPONSE: {response}
+        {conversation}
         
         CRITICAL: You MUST respond ONLY in English. Never use any other language.
         If the conversation is in another language, understand it but respond in English.
@@ -79,10 +87,15 @@ class MemoryAnalyzer:
         - Focus on what would be useful for future conversations
         - Separate short-term and long-term clearly
         - ALWAYS write memory in English, regardless of the original language
+        - If several turns are given, later turns are more recent and take priority
+        
+        - Write each fact as a separate short line starting with "- "
         
         Return in this format:
-        SHORT_TERM: [extracted short-term memory or empty]
-        LONG_TERM: [extracted long-term memory or empty]
+        SHORT_TERM:
+        - [short-term fact, one per line, or empty]
+        LONG_TERM:
+        - [long-term fact, one per line, or empty]
         """
         
         logger.info("✅ MemoryAnalyzer initialized with Gemini API")
@@ -98,28 +111,43 @@ class MemoryAnalyzer:
         Returns:
             Кортеж (short_memory, long_memory)
         """
+        return await self.analyze_turns([(prompt, response)])
+    
+    @staticmethod
+    def format_conversation(turns: Sequence[Tuple[str, str]]) -> str:
+        """Ходы диалога для промпта анализа (несколько ходов - по порядку, с номерами)"""
+        if len(turns) == 1:
+            prompt, response = turns[0]
+            return f"USER INPUT: {prompt}\n        AI RESPONSE: {response}"
+        parts: List[str] = []
+        for number, (prompt, response) in enumerate(turns, 1):
+            parts.append(f"TURN {number}:\n        USER INPUT: {prompt}\n        AI RESPONSE: {response}")
+        return "\n\n        ".join(parts)
+    
+    async def analyze_turns(self, turns: Sequence[Tuple[str, str]]) -> Tuple[str, str]:
+        """
+        Анализирует несколько подряд идущих ходов одним запросом к Gemini.
+        
+        Args:
+            turns: Ходы (prompt, response) в хронологическом порядке
+            
+        Returns:
+            Кортеж (short_memory, long_memory)
+        """
+        if not turns:
+            return "", ""
         try:
             # Формируем промпт для анализа
             analysis_prompt = self.analysis_prompt_template.format(
-                prompt=prompt,
-                response=response
-            )
-            
-            # Создаем модель
-            model = genai.GenerativeModel(
-                model_name=self.model_name,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=self.temperature,
-                    max_output_tokens=1024,
-                )
+                conversation=self.format_conversation(turns)
             )
             
             # Анализируем диалог
-            logger.debug(f"🧠 Analyzing conversation for memory extraction...")
+            logger.debug(f"🧠 Analyzing {len(turns)} turns for memory extraction...")
             
             # Выполняем анализ асинхронно
             response_obj = await asyncio.to_thread(
-                model.generate_content,
+                self.model.generate_content,
                 analysis_prompt
             )
             
@@ -157,14 +185,10 @@ class MemoryAnalyzer:
             long_memory = ""
             
             if short_term_match:
-                short_memory = short_term_match.group(1).strip()
-                # Убираем лишние пробелы и переносы строк
-                short_memory = re.sub(r'\s+', ' ', short_memory)
+                short_memory = self._normalize_lines(short_term_match.group(1))
             
             if long_term_match:
-                long_memory = long_term_match.group(1).strip()
-                # Убираем лишние пробелы и переносы строк
-                long_memory = re.sub(r'\s+', ' ', long_memory)
+                long_memory = self._normalize_lines(long_term_match.group(1))
             
             # Проверяем, что память не пустая и не содержит только служебные слова
             if short_memory.lower() in ['empty', 'none', 'no information', '']:
@@ -181,6 +205,12 @@ class MemoryAnalyzer:
             logger.error(f"❌ Error parsing memory analysis response: {e}")
             return "", ""
     
+    @staticmethod
+    def _normalize_lines(text: str) -> str:
+        """Лишние пробелы убираются, переносы строк (границы фактов) сохраняются"""
+        lines = (re.sub(r'\s+', ' ', line).strip() for line in text.strip().splitlines())
+        return "\n".join(line for line in lines if line)
+    
     def is_available(self) -> bool:
         """
         Проверяет доступность анализатора.
@@ -5,8 +5,10 @@ Text Filtering Module
 """
 
 from .core.text_filter_manager import TextFilterManager
+from .core.sentence_segmenter import SentenceSegmenter
+from .core.tts_sanitizer import TextSanitizer
 
-__all__ = ['TextFilterManager']
+__all__ = ['TextFilterManager', 'SentenceSegmenter', 'TextSanitizer']
 
 
 
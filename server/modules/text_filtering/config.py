@@ -69,8 +69,16 @@ class TextFilteringConfig:
             # Настройки производительности
             "performance": {
                 "cache_enabled": os.getenv("TEXT_FILTER_CACHE_ENABLED", "true").lower() == "true",
+                # Что кэшировать: clean/split дешевле поиска в кэше, по умолчанию только filter
+                "cache_namespaces": [
+                    name.strip() for name in os.getenv("TEXT_FILTER_CACHE_NAMESPACES", "filter").split(",") if name.strip()
+                ],
                 "cache_size": int(os.getenv("TEXT_FILTER_CACHE_SIZE", "1000")),
                 "cache_ttl": int(os.getenv("TEXT_FILTER_CACHE_TTL", "3600")),
+                # Бюджет памяти кэша и допуск новых записей: tinylfu (по частоте) или lru
+                "cache_max_bytes": int(os.getenv("TEXT_FILTER_CACHE_MAX_BYTES", str(8 * 1024 * 1024))),
+                "cache_admission": os.getenv("TEXT_FILTER_CACHE_ADMISSION", "tinylfu").lower(),
+                "cache_max_text_length": int(os.getenv("TEXT_FILTER_CACHE_MAX_TEXT_LENGTH", "1000")),
                 "batch_processing": os.getenv("BATCH_PROCESSING_ENABLED", "false").lower() == "true",
                 "max_batch_size": int(os.getenv("MAX_BATCH_SIZE", "100"))
             },
@@ -3,8 +3,11 @@ Core components для Text Filtering Module
 """
 
 from .text_filter_manager import TextFilterManager
+from .sentence_segmenter import SentenceSegmenter, split_complete_sentences
+from .tts_sanitizer import TextSanitizer
+from .text_filter_cache import TextFilterCache
 
-__all__ = ['TextFilterManager']
+__all__ = ['TextFilterManager', 'SentenceSegmenter', 'split_complete_sentences', 'TextSanitizer', 'TextFilterCache']
 
 
 
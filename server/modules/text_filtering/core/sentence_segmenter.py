@@ -0,0 +1,163 @@
+"""
+Инкрементальное разбиение потокового ответа LLM на предложения
+
+Раньше каждый фрагмент ответа дописывался в буфер, и весь незавершённый
+остаток заново проходил четыре re.sub защиты технических фраз и re.split -
+на длинных предложениях (списки, код, перечисления) это квадратично от
+длины ответа. SentenceSegmenter держит состояние между feed():
+- незавершённое предложение хранится уже защищённым и повторно не сканируется;
+- каждый символ ответа сканируется один раз;
+- технические фразы (main.py, 1.2.3, 192.168.1.1) защищаются так же, как в
+  SentenceProcessingProvider. Защита не выходит за пределы слова (между
+  пробелами), поэтому при joiner=" " хватает нового фрагмента, а при
+  joiner="" последнее слово фрагмента придерживается до следующего feed();
+- двоеточие предложение не завершает, порты (:8080) отдельной защиты не требуют.
+
+Результат совпадает с разбиением буфера целиком (split_complete_sentences).
+Пробелы внутри предложения схлопываются до одного: с прежним разбиением
+(SentenceProcessingProvider._split_complete_sentences) результат совпадает
+на тексте с нормализованными пробелами, как в split_sentences.
+"""
+
+import re
+from typing import List, Tuple
+
+_DOT_MARKER = '__DOT__'
+
+# Технические фразы (те же шаблоны и порядок, что и в прежнем разбиении).
+# Совпадение всегда начинается с начала слова/числа, поэтому (?<!\w)/(?<!\d)
+# результат не меняют, но избавляют от повторных попыток с каждой буквы слова.
+# IP адреса (192.168.1.1) целиком защищают эти два прохода - отдельный проход
+# прежнего кода ничего не менял
+_FILE_NAME = re.compile(r'(?<!\w)(\w+)\.(\w{1,4})\b')            # main.py -> main__DOT__py
+_VERSION = re.compile(r'(?<!\d)(\d+)\.(\d+)(?:\.(\d+))?')         # 12.10, 3.14159
+# Защищать нечего, если точка не стоит между буквами/цифрами
+_INNER_DOT = re.compile(r'\w\.\w')
+
+_SENTENCE_SPLIT = re.compile(r'([.!?]+)')
+_WHITESPACE = re.compile(r'\s+')
+
+# Части, завершающие предложение: одиночный знак, '.!', '!?', '.!?' и пустая
+# часть на краю текста. Прочие серии ('...', '?!') завершают предложение
+# только в конце текста - как в исходном разбиении
+_BOUNDARIES = frozenset(('', '.', '!', '?', '.!', '!?', '.!?'))
+
+
+def _protect(text: str) -> str:
+    if '.' not in text or not _INNER_DOT.search(text):
+        return text
+    text = _FILE_NAME.sub(r'\1__DOT__\2', text)
+    return _VERSION.sub(r'\1__DOT__\2\3', text)
+
+
+def _restore(text: str) -> str:
+    return text.replace(_DOT_MARKER, '.') if _DOT_MARKER in text else text
+
+
+class SentenceSegmenter:
+    """Разбиение потока фрагментов на законченные предложения (один на ответ)"""
+
+    __slots__ = ('joiner', '_pending', '_has_text', '_held', 'fragments', 'sentences', 'scanned_chars')
+
+    def __init__(self, joiner: str = " "):
+        """
+        Args:
+            joiner: Разделитель между фрагментами (" " - как в streaming workflow,
+                "" - фрагменты продолжают друг друга посреди слова)
+        """
+        self.joiner = joiner
+        # Незавершённое предложение (защищённые части)
+        self._pending: List[str] = []
+        self._has_text = False
+        # Последнее слово при joiner="" - его защита ещё не известна
+        self._held = ""
+        self.fragments = 0
+        self.sentences = 0
+        self.scanned_chars = 0
+
+    def feed(self, fragment: str) -> List[str]:
+        """
+        Очередной фрагмент ответа
+
+        Returns:
+            Предложения, завершённые этим фрагментом
+        """
+        if not fragment:
+            return []
+        if self.joiner:
+            text = ' '.join(fragment.split())
+            if not text:
+                return []
+            self.fragments += 1
+            return self._scan(text, self.joiner)
+
+        self.fragments += 1
+        text = self._held + _WHITESPACE.sub(' ', fragment)
+        cut = text.rfind(' ')
+        if cut < 0:
+            self._held = text
+            return []
+        self._held = text[cut + 1:]
+        # Предыдущий кусок закончился пробелом - ведущий пробел лишний
+        return self._scan(text[:cut + 1].lstrip(' '), "")
+
+    def _scan(self, text: str, glue: str) -> List[str]:
+        if not text:
+            return []
+        self.scanned_chars += len(text)
+        parts = _SENTENCE_SPLIT.split(_protect(text))
+        pending = self._pending
+        has_text = self._has_text
+        sentences = []
+        start = 0
+        if has_text:
+            # Продолжение незавершённого предложения
+            pending.append(glue + parts[0])
+            start = 1
+        for part in parts[start:]:
+            if part in _BOUNDARIES:
+                if has_text or part:
+                    pending.append(part)
+                    sentences.append(_restore(''.join(pending)).strip())
+                pending.clear()
+                has_text = False
+            else:
+                pending.append(part)
+                if not has_text and not part.isspace():
+                    has_text = True
+        if not has_text:
+            pending.clear()
+        self._has_text = has_text
+        self.sentences += len(sentences)
+        return sentences
+
+    @property
+    def remainder(self) -> str:
+        """Незавершённый хвост ответа"""
+        return (_restore(''.join(self._pending)) + self._held).strip()
+
+    def flush(self) -> Tuple[List[str], str]:
+        """
+        Конец ответа: досканировать придержанное слово и сбросить состояние
+
+        Returns:
+            (предложения, незавершённый хвост)
+        """
+        held, self._held = self._held, ""
+        sentences = self._scan(held, "") if held else []
+        remainder = self.remainder
+        self._pending.clear()
+        self._has_text = False
+        return sentences, remainder
+
+
+def split_complete_sentences(text: str) -> Tuple[List[str], str]:
+    """
+    Законченные предложения и незавершённый остаток текста целиком
+
+    Сохраняет завершающую пунктуацию, учитывает технические фразы
+    ("main.py", "12.10", "v1.2.3").
+    """
+    segmenter = SentenceSegmenter()
+    sentences = segmenter.feed(text)
+    return sentences, segmenter.remainder
@@ -0,0 +1,241 @@
+"""
+Кэш результатов фильтрации текста (clean / split / filter)
+
+Фрагменты ответов LLM в основном уникальны, но служебные фразы
+("Sure!", "Let me check.", "Готово.") и повторы между ответами повторяются
+часто. Кэш:
+- LRU по байтам (max_bytes) и по числу записей (max_entries);
+- TinyLFU допуск: при переполнении новая запись вытесняет самую старую,
+  только если встречалась чаще неё (count-min sketch с периодическим
+  старением) - разовые фрагменты не вымывают частые;
+- ключ - кортеж (namespace, текст, опции) на встроенном hash(), без md5;
+- отдельные пространства имён и счётчики для clean / split / filter.
+"""
+
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+NAMESPACES = ("clean", "split", "filter")
+
+# Накладные расходы записи (ключ-кортеж, запись в OrderedDict) сверх объектов
+_ENTRY_OVERHEAD_BYTES = 200
+# Средний размер записи (исходный текст + результат) для оценки ширины sketch
+_AVERAGE_ENTRY_BYTES = 1024
+_STR_OVERHEAD_BYTES = 50
+_COUNTER_MAX = 15
+# Старение sketch: деление всех счётчиков пополам
+_HALVE = bytes(value >> 1 for value in range(256))
+
+
+def estimate_size(value: Any) -> int:
+    """Приблизительный размер результата в байтах (словарь строк и списков строк)"""
+    if isinstance(value, str):
+        return sys.getsizeof(value)
+    size = sys.getsizeof(value)
+    items = value.values() if isinstance(value, dict) else value
+    for item in items:
+        if isinstance(item, str):
+            size += sys.getsizeof(item)
+        elif isinstance(item, (list, tuple)):
+            # Элементы - строки: длина плюс заголовок объекта
+            try:
+                size += sys.getsizeof(item) + sum(map(len, item)) + _STR_OVERHEAD_BYTES * len(item)
+            except TypeError:
+                size += sys.getsizeof(item) + 32 * len(item)
+        else:
+            size += 32
+    return size
+
+
+def _options_key(options: Optional[Dict[str, Any]]) -> Hashable:
+    if not options:
+        return ()
+    try:
+        items = frozenset(options.items())
+        hash(items)
+        return items
+    except TypeError:
+        # Вложенные списки/словари в опциях
+        return repr(sorted(options.items()))
+
+
+class FrequencySketch:
+    """Count-min sketch частоты ключей: 4 счётчика до 15 на ключ, старение делением пополам"""
+
+    __slots__ = ('_mask', '_width', '_table', '_additions', '_sample_size')
+
+    def __init__(self, width: int):
+        size = 1024
+        while size < width:
+            size <<= 1
+        self._mask = size - 1
+        self._width = size
+        self._table = bytearray(size * 4)
+        self._additions = 0
+        # После 10 * width увеличений частоты стареют
+        self._sample_size = size * 10
+
+    def increment(self, key_hash: int):
+        table, mask, width = self._table, self._mask, self._width
+        high = key_hash >> 20
+        a = key_hash & mask
+        b = width + (((key_hash >> 10) ^ high) & mask)
+        c = 2 * width + ((high ^ (key_hash * 31)) & mask)
+        d = 3 * width + (((key_hash >> 5) ^ (high * 17)) & mask)
+        frequency = min(table[a], table[b], table[c], table[d])
+        if frequency < _COUNTER_MAX:
+            # Консервативное увеличение: только минимальные счётчики
+            for index in (a, b, c, d):
+                if table[index] == frequency:
+                    table[index] = frequency + 1
+        self._additions += 1
+        if self._additions >= self._sample_size:
+            self._table = table.translate(_HALVE)
+            self._additions //= 2
+
+    def frequency(self, key_hash: int) -> int:
+        table, mask, width = self._table, self._mask, self._width
+        high = key_hash >> 20
+        return min(
+            table[key_hash & mask],
+            table[width + (((key_hash >> 10) ^ high) & mask)],
+            table[2 * width + ((high ^ (key_hash * 31)) & mask)],
+            table[3 * width + (((key_hash >> 5) ^ (high * 17)) & mask)],
+        )
+
+
+class TextFilterCache:
+    """LRU кэш с бюджетом в байтах и TinyLFU допуском"""
+
+    def __init__(self,
+                 max_bytes: int = 8 * 1024 * 1024,
+                 max_entries: int = 10000,
+                 ttl: float = 3600.0,
+                 admission: str = "tinylfu",
+                 max_text_length: int = 1000):
+        """
+        Args:
+            max_bytes: Бюджет памяти на все записи
+            max_entries: Максимум записей
+            ttl: Время жизни записи (секунды, 0 - без ограничения)
+            admission: "tinylfu" - допуск по частоте, "lru" - допускать всё
+            max_text_length: Более длинные тексты не кэшируются
+        """
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.admission = admission
+        self.max_text_length = max_text_length
+
+        # (namespace, текст, опции) -> (результат, размер, истекает в monotonic)
+        self._entries: "OrderedDict[Tuple[str, str, Hashable], Tuple[Any, int, float]]" = OrderedDict()
+        self._bytes = 0
+        # Sketch помнит частоты в несколько раз большего числа ключей, чем помещается в кэш
+        self._sketch = (
+            FrequencySketch(4 * min(max_entries, max_bytes // _AVERAGE_ENTRY_BYTES))
+            if admission == "tinylfu" else None
+        )
+        self.stats = {namespace: self._empty_stats() for namespace in NAMESPACES}
+
+    @staticmethod
+    def _empty_stats() -> Dict[str, int]:
+        return {'hits': 0, 'misses': 0, 'admitted': 0, 'rejected': 0, 'evictions': 0, 'expirations': 0}
+
+    def _stats(self, namespace: str) -> Dict[str, int]:
+        stats = self.stats.get(namespace)
+        if stats is None:
+            stats = self.stats[namespace] = self._empty_stats()
+        return stats
+
+    def get(self, namespace: str, text: str, options: Optional[Dict[str, Any]] = None) -> Optional[Any]:
+        """Результат из кэша (None - промах); запрос учитывается в частоте ключа"""
+        if len(text) > self.max_text_length:
+            return None
+        key = (namespace, text, _options_key(options))
+        stats = self._stats(namespace)
+        if self._sketch is not None:
+            self._sketch.increment(hash(key))
+        entry = self._entries.get(key)
+        if entry is None:
+            stats['misses'] += 1
+            return None
+        if self.ttl and entry[2] <= time.monotonic():
+            self._remove(key)
+            stats['expirations'] += 1
+            stats['misses'] += 1
+            return None
+        self._entries.move_to_end(key)
+        stats['hits'] += 1
+        return entry[0]
+
+    def put(self, namespace: str, text: str, options: Optional[Dict[str, Any]], value: Any) -> bool:
+        """
+        Сохранение результата (хранится как есть - вызывающий не должен его менять)
+
+        Returns:
+            True если запись допущена в кэш
+        """
+        if len(text) > self.max_text_length:
+            return False
+        key = (namespace, text, _options_key(options))
+        stats = self._stats(namespace)
+
+        if self._sketch is not None and self._entries and (
+            len(self._entries) >= self.max_entries
+            or self._bytes + _ENTRY_OVERHEAD_BYTES + sys.getsizeof(text) > self.max_bytes
+        ):
+            # Кэш полон: новая запись вытесняет самую старую, только если встречается чаще неё.
+            # Разовый текст (частота 1 - только этот промах) не проходит без сравнения
+            frequency = self._sketch.frequency(hash(key))
+            if frequency <= 1 or frequency <= self._sketch.frequency(hash(next(iter(self._entries)))):
+                stats['rejected'] += 1
+                return False
+
+        size = _ENTRY_OVERHEAD_BYTES + sys.getsizeof(text) + estimate_size(value)
+        if size > self.max_bytes:
+            stats['rejected'] += 1
+            return False
+        self._remove(key)
+        self._entries[key] = (value, size, time.monotonic() + self.ttl if self.ttl else 0.0)
+        self._bytes += size
+        stats['admitted'] += 1
+        while self._bytes > self.max_bytes or len(self._entries) > self.max_entries:
+            (victim_namespace, _, _), (_, victim_size, _) = self._entries.popitem(last=False)
+            self._bytes -= victim_size
+            self._stats(victim_namespace)['evictions'] += 1
+        return True
+
+    def _remove(self, key) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._bytes -= entry[1]
+        return True
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+        self.stats = {namespace: self._empty_stats() for namespace in NAMESPACES}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Счётчики кэша: общие и по пространствам имён"""
+        namespaces = {}
+        totals = self._empty_stats()
+        for namespace, stats in self.stats.items():
+            lookups = stats['hits'] + stats['misses']
+            namespaces[namespace] = {**stats, 'hit_ratio': stats['hits'] / lookups if lookups else 0.0}
+            for name, value in stats.items():
+                totals[name] += value
+        lookups = totals['hits'] + totals['misses']
+        return {
+            **totals,
+            'hit_ratio': totals['hits'] / lookups if lookups else 0.0,
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'admission': self.admission,
+            'namespaces': namespaces,
+        }
@@ -7,11 +7,14 @@
 import asyncio
 import logging
 import time
-from typing import Dict, Any, Optional, List, Union
+from typing import Dict, Any, Optional, List, Tuple, Union
 from datetime import datetime
 
 from integrations.core.universal_module_interface import UniversalModuleInterface, ModuleStatus
 from modules.text_filtering.config import TextFilteringConfig
+from modules.text_filtering.core.sentence_segmenter import SentenceSegmenter, split_complete_sentences
+from modules.text_filtering.core.text_filter_cache import TextFilterCache
+from modules.text_filtering.core.tts_sanitizer import TextSanitizer
 
 logger = logging.getLogger(__name__)
 
@@ -33,9 +36,12 @@ class TextFilterManager(UniversalModuleInterface):
         
         self.config = config or TextFilteringConfig()
         
-        # Кэш для производительности
-        self.cache = {} if self.config.is_feature_enabled("performance") else None
-        self.cache_stats = {"hits": 0, "misses": 0, "size": 0}
+        # Кэш результатов (LRU по байтам + TinyLFU допуск) для пространств из cache_namespaces
+        self.cache = self._create_cache()
+        self.cache_namespaces = frozenset(self.config.get_performance_config().get("cache_namespaces", ["filter"]))
+        
+        # Очистка для синхронного пути (та же конфигурация, что у TextCleaningProvider)
+        self.sanitizer = TextSanitizer(self.config.get_text_cleaning_config())
         
         # Статистика
         self.total_processed = 0
@@ -149,15 +155,11 @@ class TextFilterManager(UniversalModuleInterface):
                 return {"success": True, "filtered_text": "", "operations": []}
             
             # Проверяем кэш
-            cache_key = self._get_cache_key(text, options or {})
-            if self.cache and cache_key in self.cache:
-                self.cache_stats["hits"] += 1
-                cached_result = self.cache[cache_key]
+            cached_result = self._cache_get("filter", text, options)
+            if cached_result is not None:
                 cached_result["cached"] = True
                 return cached_result
             
-            self.cache_stats["misses"] += 1
-            
             operations = []
             filtered_text = text
             
@@ -224,8 +226,7 @@ class TextFilterManager(UniversalModuleInterface):
             }
             
             # Сохраняем в кэш
-            if self.cache and self._should_cache(text):
-                self._cache_result(cache_key, result)
+            self._cache_put("filter", text, options, result)
             
             return result
             
@@ -249,11 +250,16 @@ class TextFilterManager(UniversalModuleInterface):
             if not text:
                 return {"success": True, "cleaned_text": "", "operations": []}
             
+            cached_result = self._cache_get("clean", text, options)
+            if cached_result is not None:
+                return cached_result
+            
             # Если провайдер не инициализирован, используем простую очистку
             if not hasattr(self, 'text_cleaning_provider'):
-                return self._simple_clean_text(text, options or {})
-            
-            result = await self.text_cleaning_provider.clean_text(text, options or {})
+                result = self._simple_clean_text(text, options or {})
+            else:
+                result = await self.text_cleaning_provider.clean_text(text, options or {})
+            self._cache_put("clean", text, options, result)
             return result
             
         except Exception as e:
@@ -275,17 +281,62 @@ class TextFilterManager(UniversalModuleInterface):
             if not text:
                 return {"success": True, "sentences": [], "remainder": "", "operations": []}
             
+            cached_result = self._cache_get("split", text, options)
+            if cached_result is not None:
+                return cached_result
+            
             # Если провайдер не инициализирован, используем простое разбиение
             if not hasattr(self, 'sentence_processing_provider'):
-                return self._simple_split_sentences(text, options or {})
-            
-            result = await self.sentence_processing_provider.split_sentences(text, options or {})
+                result = self._simple_split_sentences(text, options or {})
+            else:
+                result = await self.sentence_processing_provider.split_sentences(text, options or {})
+            self._cache_put("split", text, options, result)
             return result
             
         except Exception as e:
             logger.error(f"Error splitting sentences: {e}")
             return {"success": False, "error": str(e)}
     
+    def clean_text_fast(self, text: str) -> str:
+        """
+        Синхронная очистка для горячего пути (фрагменты потокового ответа)
+        
+        Тот же результат, что cleaned_text из clean_text, без корутины,
+        словаря результата, кэша и статистики.
+        
+        Args:
+            text: Текст для очистки
+            
+        Returns:
+            Очищенный текст
+        """
+        return self.sanitizer.clean(text) if text else ""
+    
+    def split_fast(self, text: str) -> Tuple[List[str], str]:
+        """
+        Синхронное разбиение на предложения для горячего пути
+        
+        Args:
+            text: Текст для разбиения
+            
+        Returns:
+            (законченные предложения, незавершённый остаток) - как sentences/remainder из split_sentences
+            (пробелы схлопываются, как при нормализации в split_sentences)
+        """
+        return split_complete_sentences(text) if text else ([], "")
+    
+    def create_segmenter(self, joiner: str = " ") -> SentenceSegmenter:
+        """
+        Инкрементальный разбиватель на предложения для одного потокового ответа
+        
+        Args:
+            joiner: Разделитель между фрагментами
+            
+        Returns:
+            SentenceSegmenter (то же разбиение, что split_sentences, без повторного сканирования остатка)
+        """
+        return SentenceSegmenter(joiner)
+    
     def count_meaningful_words(self, text: str) -> int:
         """
         Умный подсчёт значимых слов в тексте
@@ -388,37 +439,35 @@ class TextFilterManager(UniversalModuleInterface):
             logger.error(f"Error preprocessing text: {e}")
             return {"success": False, "error": str(e)}
     
-    def _get_cache_key(self, text: str, options: Dict[str, Any]) -> str:
-        """Генерация ключа кэша"""
-        import hashlib
-        content = f"{text}_{str(sorted(options.items()))}"
-        return hashlib.md5(content.encode()).hexdigest()
-    
-    def _should_cache(self, text: str) -> bool:
-        """Проверка, стоит ли кэшировать результат"""
-        if not self.cache:
-            return False
-        
+    def _create_cache(self) -> Optional[TextFilterCache]:
+        """Кэш по настройкам performance (None - кэш выключен)"""
         performance_config = self.config.get_performance_config()
-        max_length = performance_config.get("cache_size", 1000)
-        
-        return len(text) < 1000 and len(self.cache) < max_length
+        if not performance_config.get("cache_enabled", True):
+            return None
+        return TextFilterCache(
+            max_bytes=performance_config.get("cache_max_bytes", 8 * 1024 * 1024),
+            max_entries=performance_config.get("cache_size", 1000),
+            ttl=performance_config.get("cache_ttl", 3600),
+            admission=performance_config.get("cache_admission", "tinylfu"),
+            max_text_length=performance_config.get("cache_max_text_length", 1000),
+        )
     
-    def _cache_result(self, cache_key: str, result: Dict[str, Any]):
-        """Сохранение результата в кэш"""
-        if not self.cache:
-            return
-        
-        performance_config = self.config.get_performance_config()
-        max_size = performance_config.get("cache_size", 1000)
-        
-        if len(self.cache) >= max_size:
-            # Удаляем самые старые записи
-            oldest_key = next(iter(self.cache))
-            del self.cache[oldest_key]
-        
-        self.cache[cache_key] = result
-        self.cache_stats["size"] = len(self.cache)
+    def _cache_get(self, namespace: str, text: str, options: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Копия закэшированного результата (вызывающий может её менять)"""
+        if self.cache is None or namespace not in self.cache_namespaces:
+            return None
+        cached_result = self.cache.get(namespace, text, options)
+        return self._copy_result(cached_result) if cached_result is not None else None
+    
+    def _cache_put(self, namespace: str, text: str, options: Optional[Dict[str, Any]], result: Dict[str, Any]):
+        """Кэшируются только успешные результаты (в кэше своя копия, вызывающему остаётся result)"""
+        if self.cache is not None and namespace in self.cache_namespaces and result.get("success"):
+            self.cache.put(namespace, text, options, self._copy_result(result))
+    
+    @staticmethod
+    def _copy_result(result: Dict[str, Any]) -> Dict[str, Any]:
+        """Копия результата вместе со списками (sentences, operations)"""
+        return {key: list(value) if isinstance(value, list) else value for key, value in result.items()}
     
     async def cleanup(self) -> bool:
         """
@@ -431,9 +480,8 @@ class TextFilterManager(UniversalModuleInterface):
             logger.info("Cleaning up Text Filter Manager...")
             
             # Очищаем кэш
-            if self.cache:
+            if self.cache is not None:
                 self.cache.clear()
-                self.cache_stats = {"hits": 0, "misses": 0, "size": 0}
             
             # Очищаем провайдеры
             if hasattr(self, 'text_cleaning_provider'):
@@ -466,10 +514,7 @@ class TextFilterManager(UniversalModuleInterface):
             if self.processing_times else 0
         )
         
-        cache_hit_rate = (
-            self.cache_stats["hits"] / (self.cache_stats["hits"] + self.cache_stats["misses"])
-            if (self.cache_stats["hits"] + self.cache_stats["misses"]) > 0 else 0
-        )
+        cache_stats = self.cache.get_stats() if self.cache is not None else {}
         
         return {
             "total_processed": self.total_processed,
@@ -478,8 +523,9 @@ class TextFilterManager(UniversalModuleInterface):
             "filter_rate": self.total_filtered / self.total_processed if self.total_processed > 0 else 0,
             "error_rate": self.total_errors / self.total_processed if self.total_processed > 0 else 0,
             "avg_processing_time_ms": avg_processing_time,
-            "cache_stats": self.cache_stats.copy(),
-            "cache_hit_rate": cache_hit_rate,
+            "cache_enabled": self.cache is not None,
+            "cache_stats": cache_stats,
+            "cache_hit_rate": cache_stats.get("hit_ratio", 0.0),
             "processing_times_count": len(self.processing_times)
         }
     
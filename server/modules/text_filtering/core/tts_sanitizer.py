@@ -0,0 +1,115 @@
+"""
+Однопроходная очистка текста перед синтезом речи
+
+TextCleaningProvider.clean_text для каждого фрагмента ответа LLM делал
+цепочку проходов: split/join пробелов, фильтр допустимых символов
+(re.sub с компиляцией шаблона на каждом вызове), шесть re.sub markdown,
+NFKC и посимвольный генератор управляющих символов. TextSanitizer
+компилирует всё один раз и делает то же самое за меньшее число проходов:
+- фильтр допустимых символов и удаление '*', '`', '#' - одно регулярное
+  выражение (оба шага только удаляют символы, порядок не важен);
+- серии '__', '--', '==' - один проход по кластерам из '_-='. Удаление
+  серии одного символа может склеить серию другого ('-__-' -> '--'),
+  но символы вне кластера не удаляются, поэтому кластер обрабатывается
+  независимо теми же тремя заменами по порядку;
+- NFKC пропускается для ASCII и уже нормализованного текста;
+- после split/join и фильтра управляющих символов не остаётся, а NFKC их
+  не порождает - отдельный проход нужен только при отключённых шагах.
+
+Результат совпадает с прежней цепочкой байт в байт (см.
+benchmarks/bench_tts_sanitizer.py).
+"""
+
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional
+
+# Допустимые символы по умолчанию (TextFilteringConfig, text_cleaning.allowed_chars)
+DEFAULT_ALLOWED_CHARS = r'[^\w\s\.\,\!\?\-\:\;\(\)\[\]\{\}\"\'@#$%&*+=<>/\\|~`]'
+# То же множество без markdown маркеров '#', '*', '`' - удаляются тем же проходом
+# (серии удаляемых символов - одним совпадением)
+_DEFAULT_REMOVE_WITH_MARKDOWN = r'[^\w\s\.\,\!\?\-\:\;\(\)\[\]\{\}\"\'@$%&+=<>/\\|~]+'
+_MARKDOWN_CHARS = r'[*`#]+'
+
+# Кластер символов, из которых состоят серии '__', '--', '=='
+_MARKDOWN_CLUSTER = re.compile(r'[-_=]{2,}')
+_MARKDOWN_RUNS = (re.compile(r'_{2,}'), re.compile(r'-{2,}'), re.compile(r'={2,}'))
+
+# Управляющие символы, кроме '\n', '\r', '\t'
+_CONTROL_CHARS = {code: None for code in range(32) if chr(code) not in '\n\r\t'}
+
+
+def _strip_markdown_runs(match: "re.Match") -> str:
+    cluster = match.group()
+    if cluster.count(cluster[0]) == len(cluster):
+        # Серия одного символа - удаляется целиком
+        return ''
+    for run in _MARKDOWN_RUNS:
+        cluster = run.sub('', cluster)
+    return cluster
+
+
+class TextSanitizer:
+    """Очистка текста по конфигурации text_cleaning, шаблоны компилируются один раз"""
+
+    __slots__ = (
+        'remove_extra_whitespace', 'remove_markdown', 'normalize_unicode',
+        'remove_control_chars', '_remove', '_control_pass', 'operations'
+    )
+
+    def __init__(self, cleaning_config: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            cleaning_config: Конфигурация очистки (TextFilteringConfig.get_text_cleaning_config())
+        """
+        config = cleaning_config or {}
+        self.remove_extra_whitespace = config.get("remove_extra_whitespace", True)
+        remove_special_chars = config.get("remove_special_chars", True)
+        self.remove_markdown = config.get("remove_markdown", True)
+        self.normalize_unicode = config.get("normalize_unicode", True)
+        self.remove_control_chars = config.get("remove_control_chars", True)
+
+        # Проходы удаления символов по порядку
+        self._remove: List["re.Pattern"] = []
+        allowed_chars = config.get("allowed_chars", DEFAULT_ALLOWED_CHARS)
+        if remove_special_chars and self.remove_markdown and allowed_chars == DEFAULT_ALLOWED_CHARS:
+            self._remove.append(re.compile(_DEFAULT_REMOVE_WITH_MARKDOWN))
+        else:
+            if remove_special_chars:
+                self._remove.append(re.compile(allowed_chars))
+            if self.remove_markdown:
+                self._remove.append(re.compile(_MARKDOWN_CHARS))
+
+        # Управляющие символы остаются, только если их не убрали split/join и фильтр
+        self._control_pass = self.remove_control_chars and not (
+            self.remove_extra_whitespace and remove_special_chars and allowed_chars == DEFAULT_ALLOWED_CHARS
+        )
+
+        operations = []
+        for name, enabled in (
+            ("remove_extra_whitespace", self.remove_extra_whitespace),
+            ("remove_special_chars", remove_special_chars),
+            ("remove_markdown", self.remove_markdown),
+            ("normalize_unicode", self.normalize_unicode),
+            ("remove_control_chars", self.remove_control_chars),
+        ):
+            if enabled:
+                operations.append(name)
+        self.operations = tuple(operations)
+
+    def clean(self, text: str) -> str:
+        """Очищенный текст (пустая строка для пустого входа)"""
+        if not text:
+            return ""
+        if self.remove_extra_whitespace:
+            text = ' '.join(text.split())
+        for pattern in self._remove:
+            text = pattern.sub('', text)
+        # Кластер меняется, только если в нём есть серия из двух одинаковых символов
+        if self.remove_markdown and ('__' in text or '--' in text or '==' in text):
+            text = _MARKDOWN_CLUSTER.sub(_strip_markdown_runs, text)
+        if self.normalize_unicode and not text.isascii() and not unicodedata.is_normalized('NFKC', text):
+            text = unicodedata.normalize('NFKC', text)
+        if self._control_pass:
+            text = text.translate(_CONTROL_CHARS)
+        return text.strip()
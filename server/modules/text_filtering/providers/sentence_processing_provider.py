@@ -132,6 +132,8 @@ class SentenceProcessingProvider(UniversalProviderInterface):
         Делит текст на законченные предложения и остаток (незавершённый хвост).
         Сохраняет завершающую пунктуацию в предложениях.
         Учитывает технические фразы типа "main.py", "12.10", "v1.2.3".
+        Работает с исходным текстом (пробелы и переводы строк не схлопываются).
+        Потоковый вариант для нормализованного текста - SentenceSegmenter.
         """
         sentences: list[str] = []
         remainder = (text or "")
@@ -7,6 +7,7 @@ import logging
 from typing import Dict, Any, Optional
 
 from integrations.core.universal_provider_interface import UniversalProviderInterface, ProviderStatus
+from modules.text_filtering.core.tts_sanitizer import TextSanitizer
 
 logger = logging.getLogger(__name__)
 
@@ -44,6 +45,8 @@ class TextCleaningProvider(UniversalProviderInterface):
             # Загружаем конфигурацию
             self.cleaning_config = self.config.get_text_cleaning_config()
             self.preprocessing_config = self.config.get_preprocessing_config()
+            # Шаблоны очистки компилируются один раз на провайдер
+            self.sanitizer = TextSanitizer(self.cleaning_config)
             
             self.is_initialized = True
             self.status = ProviderStatus.HEALTHY
@@ -102,43 +105,9 @@ class TextCleaningProvider(UniversalProviderInterface):
             if not text:
                 return {"success": True, "cleaned_text": "", "operations": []}
             
-            operations = []
-            cleaned_text = text
-            
-            # Убираем лишние пробелы и переносы строк
-            if self.cleaning_config.get("remove_extra_whitespace", True):
-                cleaned_text = ' '.join(cleaned_text.split())
-                operations.append("remove_extra_whitespace")
-            
-            # Убираем специальные символы
-            if self.cleaning_config.get("remove_special_chars", True):
-                allowed_chars = self.cleaning_config.get("allowed_chars", r'[^\w\s\.\,\!\?\-\:\;\(\)\[\]\{\}\"\'@#$%&*+=<>/\\|~`]')
-                cleaned_text = re.sub(allowed_chars, '', cleaned_text)
-                operations.append("remove_special_chars")
-            
-            # Убираем markdown символы
-            if self.cleaning_config.get("remove_markdown", True):
-                # Удаляем markdown маркеры
-                cleaned_text = re.sub(r'\*\*?', '', cleaned_text)  # ** и *
-                cleaned_text = re.sub(r'`+', '', cleaned_text)     # ```
-                cleaned_text = re.sub(r'#+', '', cleaned_text)     # ###
-                cleaned_text = re.sub(r'_{2,}', '', cleaned_text)  # __
-                cleaned_text = re.sub(r'-{2,}', '', cleaned_text)  # --
-                cleaned_text = re.sub(r'={2,}', '', cleaned_text)  # ==
-                operations.append("remove_markdown")
-            
-            # Нормализация Unicode
-            if self.cleaning_config.get("normalize_unicode", True):
-                import unicodedata
-                cleaned_text = unicodedata.normalize('NFKC', cleaned_text)
-                operations.append("normalize_unicode")
-            
-            # Удаление управляющих символов
-            if self.cleaning_config.get("remove_control_chars", True):
-                cleaned_text = ''.join(char for char in cleaned_text if ord(char) >= 32 or char in '\n\r\t')
-                operations.append("remove_control_chars")
-            
-            cleaned_text = cleaned_text.strip()
+            # Пробелы, спецсимволы, markdown, Unicode и управляющие символы - за один вызов
+            cleaned_text = self.sanitizer.clean(text)
+            operations = list(self.sanitizer.operations)
             
             self.cleaning_stats["total_cleaned"] += 1
             self.report_success()
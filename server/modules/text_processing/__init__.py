@@ -3,15 +3,17 @@ Text Processing Module - Обработка текста с использова
 
 Модуль предоставляет функциональность для:
 - Стриминговой обработки текстовых запросов через Gemini Live API
-- Поддержки JPEG изображений
+- Поддержки изображений (JPEG/WebP/PNG нормализуются в уменьшенный JPEG)
 - Интеграции Google Search
 - Универсального интерфейса для Live API провайдера
+- Сборки промпта с памятью в пределах бюджета токенов (ContextAssembler)
 
 Реализован только со стриминговыми методами.
 """
 
 from .core.text_processor import TextProcessor
+from .core.context_assembler import ContextAssembler
 from .config import TextProcessingConfig
 
-__all__ = ['TextProcessor', 'TextProcessingConfig']
+__all__ = ['TextProcessor', 'ContextAssembler', 'TextProcessingConfig']
 __version__ = '1.0.0'
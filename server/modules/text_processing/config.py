@@ -38,6 +38,25 @@ class TextProcessingConfig:
         self.image_max_size = self.config.get('image_max_size', unified_config.text_processing.image_max_size)
         self.streaming_chunk_size = self.config.get('streaming_chunk_size', unified_config.text_processing.streaming_chunk_size)
         
+        # Пул Live сессий
+        self.live_pool_enabled = self.config.get('live_pool_enabled', unified_config.text_processing.gemini_live_pool_enabled)
+        self.live_pool_min_size = self.config.get('live_pool_min_size', unified_config.text_processing.gemini_live_pool_min_size)
+        self.live_pool_max_size = self.config.get('live_pool_max_size', unified_config.text_processing.gemini_live_pool_max_size)
+        self.live_pool_idle_timeout = self.config.get('live_pool_idle_timeout', unified_config.text_processing.gemini_live_pool_idle_timeout)
+        self.live_pool_max_session_age = self.config.get('live_pool_max_session_age', unified_config.text_processing.gemini_live_pool_max_session_age)
+        self.live_pool_max_turns = self.config.get('live_pool_max_turns', unified_config.text_processing.gemini_live_pool_max_turns)
+        self.live_pool_acquire_timeout = self.config.get('live_pool_acquire_timeout', unified_config.text_processing.gemini_live_pool_acquire_timeout)
+        self.live_pool_health_interval = self.config.get('live_pool_health_interval', unified_config.text_processing.gemini_live_pool_health_interval)
+        
+        # Нормализация скриншотов
+        self.screenshot_normalize_enabled = self.config.get('screenshot_normalize_enabled', unified_config.text_processing.screenshot_normalize_enabled)
+        self.screenshot_max_edge = self.config.get('screenshot_max_edge', unified_config.text_processing.screenshot_max_edge)
+        self.screenshot_jpeg_quality = self.config.get('screenshot_jpeg_quality', unified_config.text_processing.screenshot_jpeg_quality)
+        self.screenshot_workers = self.config.get('screenshot_workers', unified_config.text_processing.screenshot_workers)
+        self.screenshot_cache_size = self.config.get('screenshot_cache_size', unified_config.text_processing.screenshot_cache_size)
+        
+        # Бюджет токенов на контекст памяти в промпте
+        self.context_max_tokens = self.config.get('context_max_tokens', unified_config.text_processing.context_max_tokens)
         
         # Настройки fallback
         self.fallback_timeout = self.config.get('fallback_timeout', unified_config.text_processing.fallback_timeout)
@@ -74,12 +93,36 @@ class TextProcessingConfig:
                 'image_mime_type': self.image_mime_type,
                 'image_max_size': self.image_max_size,
                 'streaming_chunk_size': self.streaming_chunk_size,
-                'timeout': self.request_timeout
+                'timeout': self.request_timeout,
+                'pool_enabled': self.live_pool_enabled,
+                'pool_min_size': self.live_pool_min_size,
+                'pool_max_size': self.live_pool_max_size,
+                'pool_idle_timeout': self.live_pool_idle_timeout,
+                'pool_max_session_age': self.live_pool_max_session_age,
+                'pool_max_turns': self.live_pool_max_turns,
+                'pool_acquire_timeout': self.live_pool_acquire_timeout,
+                'pool_health_interval': self.live_pool_health_interval
             },
         }
         
         return provider_configs.get(provider_name, {})
     
+    def get_screenshot_config(self) -> Dict[str, Any]:
+        """
+        Получение конфигурации нормализации скриншотов
+        
+        Returns:
+            Словарь с конфигурацией ScreenshotNormalizer
+        """
+        return {
+            'enabled': self.screenshot_normalize_enabled,
+            'max_edge': self.screenshot_max_edge,
+            'quality': self.screenshot_jpeg_quality,
+            'workers': self.screenshot_workers,
+            'cache_size': self.screenshot_cache_size,
+            'max_input_size': self.image_max_size
+        }
+    
     def get_fallback_config(self) -> Dict[str, Any]:
         """
         Получение конфигурации fallback менеджера
@@ -119,6 +162,10 @@ class TextProcessingConfig:
             print("❌ fallback_timeout должен быть положительным")
             return False
             
+        if self.live_pool_enabled and self.live_pool_max_size <= 0:
+            print("❌ live_pool_max_size должен быть положительным")
+            return False
+            
         return True
     
     def get_status(self) -> Dict[str, Any]:
@@ -138,6 +185,14 @@ class TextProcessingConfig:
             'image_mime_type': self.image_mime_type,
             'image_max_size': self.image_max_size,
             'streaming_chunk_size': self.streaming_chunk_size,
+            'live_pool_enabled': self.live_pool_enabled,
+            'live_pool_min_size': self.live_pool_min_size,
+            'live_pool_max_size': self.live_pool_max_size,
+            'live_pool_max_turns': self.live_pool_max_turns,
+            'screenshot_normalize_enabled': self.screenshot_normalize_enabled,
+            'screenshot_max_edge': self.screenshot_max_edge,
+            'screenshot_jpeg_quality': self.screenshot_jpeg_quality,
+            'context_max_tokens': self.context_max_tokens,
             'fallback_timeout': self.fallback_timeout,
             'circuit_breaker_threshold': self.circuit_breaker_threshold,
             'circuit_breaker_timeout': self.circuit_breaker_timeout,
@@ -0,0 +1,154 @@
+"""
+Сборка промпта для Live API с бюджетом токенов на контекст памяти
+
+Раньше память приклеивалась к каждому запросу целиком ("Контекст: ...") и
+сопровождалась большим статическим шаблоном инструкций. Теперь:
+- инструкции по использованию памяти (MEMORY_SYSTEM_INSTRUCTION) один раз
+  добавляются в system_instruction Live сессии;
+- к запросу добавляется только компактный блок [MEMORY], не больше
+  max_context_tokens: строки (факты) уже ранжированы памятью
+  (fact_store.select_facts), не поместившиеся в бюджет отбрасываются
+  с конца списка, раздел short важнее long;
+- размеры промптов каждого запроса попадают в метрики.
+
+Токены оцениваются дёшево: байты UTF-8 / 4 (без токенизатора).
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from utils.latency_histogram import LatencyHistogram
+
+# Размер промпта в токенах: от 1 до 65536 (16 степеней двойки)
+PROMPT_TOKEN_RANGE = {'lowest': 1.0, 'powers': 16, 'unit': ""}
+
+MEMORY_SYSTEM_INSTRUCTION = (
+    "Memory:\n"
+    "- A request may start with a [MEMORY] ... [/MEMORY] block with facts remembered about the user.\n"
+    "- 'Recent' lines are the current conversation context; 'User' lines are long-term facts (name, preferences, important details).\n"
+    "- Use memory only when it is relevant to the current request; otherwise ignore it.\n"
+    "- Memory complements the answer, it never replaces it. Priority: current request > Recent > User.\n"
+    "- Never read the memory block aloud or mention that it exists."
+)
+
+# (ключ в контексте памяти, заголовок в блоке) в порядке приоритета
+MEMORY_SECTIONS: Tuple[Tuple[str, str], ...] = (('short', 'Recent'), ('long', 'User'))
+
+
+def estimate_tokens(text: str) -> int:
+    """Оценка числа токенов без токенизатора (~4 байта UTF-8 на токен)"""
+    if not text:
+        return 0
+    size = len(text) if text.isascii() else len(text.encode('utf-8'))
+    return (size + 3) // 4
+
+
+def with_memory_instruction(system_prompt: str) -> str:
+    """System instruction Live сессии с инструкциями по памяти"""
+    if not system_prompt:
+        return MEMORY_SYSTEM_INSTRUCTION
+    if MEMORY_SYSTEM_INSTRUCTION in system_prompt:
+        return system_prompt
+    return f"{system_prompt}\n\n{MEMORY_SYSTEM_INSTRUCTION}"
+
+
+def _lines(text: str) -> List[str]:
+    lines = []
+    for line in (text or '').splitlines():
+        line = line.strip()
+        if line.startswith('- '):
+            line = line[2:].strip()
+        if line:
+            lines.append(line)
+    return lines
+
+
+class ContextAssembler:
+    """Промпт запроса с памятью в пределах бюджета токенов"""
+
+    def __init__(self, max_context_tokens: int = 256):
+        """
+        Args:
+            max_context_tokens: Бюджет на блок памяти (0 - память не добавляется)
+        """
+        self.max_context_tokens = max_context_tokens
+        self.prompt_tokens = LatencyHistogram(**PROMPT_TOKEN_RANGE)
+        self.context_tokens = LatencyHistogram(**PROMPT_TOKEN_RANGE)
+        self.stats = {
+            'requests': 0,
+            'with_context': 0,
+            'truncated': 0,
+            'lines_used': 0,
+            'lines_dropped': 0,
+        }
+
+    def assemble(self, text: str, memory_context: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Промпт запроса: блок [MEMORY] (если есть что добавить) и текст пользователя
+
+        Args:
+            text: Запрос пользователя
+            memory_context: {'short', 'long'} - факты памяти строками
+        """
+        block, context_tokens = self._memory_block(memory_context)
+        prompt = f"{block}\n\n{text}" if block else text
+
+        self.stats['requests'] += 1
+        if block:
+            self.stats['with_context'] += 1
+            self.context_tokens.observe(context_tokens)
+        self.prompt_tokens.observe(estimate_tokens(prompt))
+        return prompt
+
+    def _memory_block(self, memory_context: Optional[Dict[str, Any]]) -> Tuple[str, int]:
+        if not memory_context or self.max_context_tokens <= 0:
+            return "", 0
+        sections = [(title, _lines(memory_context.get(key) or '')) for key, title in MEMORY_SECTIONS]
+        total_lines = sum(len(lines) for _, lines in sections)
+        if not total_lines:
+            return "", 0
+
+        # Обёртка [MEMORY]...[/MEMORY] и заголовки разделов
+        budget = self.max_context_tokens - estimate_tokens("[MEMORY]\n[/MEMORY]")
+        rendered = []
+        used = 0
+        for title, lines in sections:
+            header_tokens = estimate_tokens(f"{title}:\n")
+            chosen = self._fit(lines, budget - header_tokens)
+            if not chosen:
+                continue
+            section = f"{title}:\n" + "\n".join(f"- {line}" for line in chosen)
+            budget -= estimate_tokens(section) + 1
+            rendered.append(section)
+            used += len(chosen)
+
+        self.stats['lines_used'] += used
+        if used < total_lines:
+            self.stats['truncated'] += 1
+            self.stats['lines_dropped'] += total_lines - used
+        if not rendered:
+            return "", 0
+        block = "[MEMORY]\n" + "\n".join(rendered) + "\n[/MEMORY]"
+        return block, estimate_tokens(block)
+
+    @staticmethod
+    def _fit(lines: Sequence[str], budget: int) -> List[str]:
+        """Строки раздела в бюджет по порядку (он же ранг): не поместившаяся пропускается"""
+        if budget <= 0 or not lines:
+            return []
+        chosen = []
+        for line in lines:
+            # "- " + строка + перевод строки
+            cost = estimate_tokens(line) + 1
+            if cost <= budget:
+                chosen.append(line)
+                budget -= cost
+        return chosen
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Размеры промптов (токены, оценка) и счётчики усечения памяти"""
+        return {
+            **self.stats,
+            'max_context_tokens': self.max_context_tokens,
+            'prompt_tokens': self.prompt_tokens.snapshot(),
+            'context_tokens': self.context_tokens.snapshot(),
+        }
@@ -0,0 +1,220 @@
+"""
+Нормализация скриншотов перед отправкой в Live API
+
+- принимает JPEG/WebP/PNG (по сигнатуре), на выходе всегда JPEG
+- уменьшает до max_edge по длинной стороне и пережимает с quality
+- декодирование/кодирование выполняется в пуле процессов, event loop не блокируется
+- повторный одинаковый скриншот от того же hardware_id берётся из LRU по хешу содержимого
+- JPEG, который уже укладывается в max_edge, и результат, который получился
+  больше исходного JPEG, не пережимаются (исходник передаётся как есть)
+"""
+
+import asyncio
+import hashlib
+import io
+import logging
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    Image = None
+    PIL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+def detect_image_format(data: bytes) -> Optional[str]:
+    """Формат изображения по сигнатуре: 'jpeg', 'png', 'webp' или None"""
+    if data.startswith(b'\xff\xd8\xff'):
+        return 'jpeg'
+    if data.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if len(data) >= 12 and data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+def _normalize_image(data: bytes, image_format: str, max_edge: int, quality: int) -> Tuple[Optional[bytes], int, int]:
+    """
+    Декодирование, уменьшение и JPEG кодирование (выполняется в процессе пула)
+
+    Returns:
+        (jpeg байты или None если исходный JPEG не нужно пережимать, ширина, высота)
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        width, height = image.size
+        if image_format == 'jpeg' and max(width, height) <= max_edge:
+            return None, width, height
+
+        # draft() позволяет JPEG декодеру сразу уменьшать в 2/4/8 раз
+        if image_format == 'jpeg':
+            image.draft('RGB', (max_edge, max_edge))
+        if image.mode not in ('RGB', 'L'):
+            if image.mode in ('RGBA', 'LA', 'P'):
+                image = image.convert('RGBA')
+                background = Image.new('RGB', image.size, (255, 255, 255))
+                background.paste(image, mask=image.getchannel('A'))
+                image = background
+            else:
+                image = image.convert('RGB')
+        if max(image.size) > max_edge:
+            image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+        out = io.BytesIO()
+        image.save(out, format='JPEG', quality=quality, optimize=False)
+        return out.getvalue(), image.size[0], image.size[1]
+
+
+class ScreenshotNormalizer:
+    """Стадия предобработки скриншотов с пулом процессов и LRU по hardware_id"""
+
+    def __init__(self,
+                 enabled: bool = True,
+                 max_edge: int = 1568,
+                 quality: int = 80,
+                 workers: int = 2,
+                 cache_size: int = 256,
+                 max_input_size: int = 20 * 1024 * 1024):
+        """
+        Args:
+            enabled: Включить нормализацию (иначе JPEG проходит как есть)
+            max_edge: Максимальная длинная сторона (px)
+            quality: Качество JPEG при пережатии
+            workers: Процессов в пуле (0 - в потоке по умолчанию)
+            cache_size: Сколько hardware_id помнить в LRU
+            max_input_size: Максимальный размер входного изображения (байт)
+        """
+        self.enabled = enabled and PIL_AVAILABLE
+        self.max_edge = max(16, int(max_edge))
+        self.quality = max(1, min(95, int(quality)))
+        self.workers = max(0, int(workers))
+        self.cache_size = max(0, int(cache_size))
+        self.max_input_size = max_input_size
+
+        self._executor: Optional[Executor] = None
+        # hardware_id -> (sha256 входа, результат)
+        self._cache: "OrderedDict[str, Tuple[bytes, bytes]]" = OrderedDict()
+
+        # Метрики
+        self.requests = 0
+        self.cache_hits = 0
+        self.processed = 0
+        self.passthrough = 0
+        self.errors = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.encode_times = deque(maxlen=1000)
+
+        if enabled and not PIL_AVAILABLE:
+            logger.warning("⚠️ Pillow не установлен - скриншоты не нормализуются, принимается только JPEG")
+
+    async def normalize(self, image_data: Optional[bytes], hardware_id: Optional[str] = None) -> Optional[bytes]:
+        """
+        Нормализация скриншота
+
+        Args:
+            image_data: JPEG/WebP/PNG байты (None - без изображения)
+            hardware_id: Идентификатор оборудования для кэша повторов
+
+        Returns:
+            JPEG байты
+
+        Raises:
+            ValueError: Неподдерживаемый формат или слишком большое изображение
+        """
+        if image_data is None:
+            return None
+        self.requests += 1
+
+        image_format = detect_image_format(image_data)
+        if image_format is None:
+            raise ValueError("Unsupported image format (expected JPEG, WebP or PNG)")
+        if len(image_data) > self.max_input_size:
+            raise ValueError(f"Image too large: {len(image_data)} bytes")
+
+        if not self.enabled:
+            if image_format != 'jpeg':
+                raise ValueError(f"Image must be in JPEG format (got {image_format}, Pillow unavailable)")
+            self._account(len(image_data), len(image_data))
+            self.passthrough += 1
+            return image_data
+
+        digest = hashlib.sha256(image_data).digest() if self.cache_size and hardware_id else None
+        if digest is not None:
+            cached = self._cache.get(hardware_id)
+            if cached is not None and cached[0] == digest:
+                self._cache.move_to_end(hardware_id)
+                self.cache_hits += 1
+                self._account(len(image_data), len(cached[1]))
+                logger.debug(f"📸 Скриншот {hardware_id} не изменился - берём из кэша")
+                return cached[1]
+
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            normalized, width, height = await loop.run_in_executor(
+                self._get_executor(), _normalize_image, image_data, image_format, self.max_edge, self.quality
+            )
+        except Exception as e:
+            self.errors += 1
+            raise ValueError(f"Failed to decode {image_format} image: {e}") from e
+        encode_ms = (time.perf_counter() - started) * 1000
+
+        if normalized is None or (image_format == 'jpeg' and len(normalized) >= len(image_data)):
+            normalized = image_data
+            self.passthrough += 1
+        else:
+            self.processed += 1
+            self.encode_times.append(encode_ms)
+
+        self._account(len(image_data), len(normalized))
+        if digest is not None:
+            self._cache[hardware_id] = (digest, normalized)
+            self._cache.move_to_end(hardware_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        logger.info(
+            f"📸 Скриншот {image_format} {len(image_data)} → {len(normalized)} bytes "
+            f"({width}x{height}, {encode_ms:.1f}ms)"
+        )
+        return normalized
+
+    def _account(self, size_in: int, size_out: int):
+        self.bytes_in += size_in
+        self.bytes_out += size_out
+
+    def _get_executor(self) -> Optional[Executor]:
+        if self.workers and self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def close(self):
+        """Остановка пула процессов"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._cache.clear()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Метрики нормализации"""
+        encode = sorted(self.encode_times)
+        return {
+            "enabled": self.enabled,
+            "requests": self.requests,
+            "cache_hits": self.cache_hits,
+            "processed": self.processed,
+            "passthrough": self.passthrough,
+            "errors": self.errors,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "bytes_saved": self.bytes_in - self.bytes_out,
+            "avg_bytes_saved": ((self.bytes_in - self.bytes_out) / self.requests) if self.requests else 0.0,
+            "avg_encode_ms": (sum(encode) / len(encode)) if encode else 0.0,
+            "p95_encode_ms": encode[min(len(encode) - 1, int(len(encode) * 0.95))] if encode else 0.0
+        }
@@ -11,6 +11,8 @@ import logging
 from typing import Dict, Any, Optional, AsyncGenerator
 from modules.text_processing.config import TextProcessingConfig
 from modules.text_processing.providers.gemini_live_provider import GeminiLiveProvider
+from modules.text_processing.core.context_assembler import ContextAssembler, with_memory_instruction
+from modules.text_processing.core.screenshot_normalizer import ScreenshotNormalizer
 
 logger = logging.getLogger(__name__)
 
@@ -32,7 +34,12 @@ class TextProcessor:
         self.config = TextProcessingConfig(config)
         
         # ТОЛЬКО Live API провайдер (без fallback)
-        self.live_provider = GeminiLiveProvider(self.config.get_provider_config('gemini_live'))
+        provider_config = self.config.get_provider_config('gemini_live')
+        # Инструкции по памяти - один раз в system_instruction сессии, а не в каждом запросе
+        provider_config['system_prompt'] = with_memory_instruction(provider_config.get('system_prompt', ''))
+        self.live_provider = GeminiLiveProvider(provider_config)
+        self.context_assembler = ContextAssembler(self.config.context_max_tokens)
+        self.screenshot_normalizer = ScreenshotNormalizer(**self.config.get_screenshot_config())
         self.is_initialized = False
         
         logger.info("TextProcessor initialized with Live API")
@@ -60,13 +67,16 @@ class TextProcessor:
             return False
     
     
-    async def process_text_streaming(self, text: str, image_data: bytes = None) -> AsyncGenerator[str, None]:
+    async def process_text_streaming(self, text: str, image_data: bytes = None, hardware_id: Optional[str] = None,
+                                     memory_context: Optional[Dict[str, Any]] = None) -> AsyncGenerator[str, None]:
         """
         Стриминговая обработка текста с изображением через Live API
         
         Args:
             text: Текстовый запрос
-            image_data: JPEG данные изображения (опционально)
+            image_data: JPEG/WebP/PNG данные изображения (опционально)
+            hardware_id: Идентификатор оборудования (кэш повторяющихся скриншотов)
+            memory_context: Память пользователя {'short', 'long'} (в промпт - в пределах бюджета токенов)
             
         Yields:
             Части текстового ответа
@@ -75,7 +85,16 @@ class TextProcessor:
             if not self.is_initialized:
                 raise Exception("TextProcessor not initialized")
             
-            async for chunk in self.live_provider.process_with_image(text, image_data):
+            prompt = self.context_assembler.assemble(text, memory_context)
+            
+            if image_data is not None:
+                try:
+                    image_data = await self.screenshot_normalizer.normalize(image_data, hardware_id)
+                except ValueError as e:
+                    logger.warning(f"⚠️ Скриншот отброшен: {e}")
+                    image_data = None
+            
+            async for chunk in self.live_provider.process_with_image(prompt, image_data):
                 yield chunk
                 
         except Exception as e:
@@ -95,6 +114,7 @@ class TextProcessor:
             # Очищаем Live API провайдер
             if self.live_provider:
                 await self.live_provider.cleanup()
+            self.screenshot_normalizer.close()
             
             self.is_initialized = False
             logger.info("TextProcessor cleaned up successfully")
@@ -128,7 +148,9 @@ class TextProcessor:
         """
         metrics = {
             "is_initialized": self.is_initialized,
-            "live_provider": self.live_provider.get_metrics() if self.live_provider else None
+            "live_provider": self.live_provider.get_metrics() if self.live_provider else None,
+            "screenshot_normalizer": self.screenshot_normalizer.get_metrics(),
+            "prompt_sizes": self.context_assembler.get_metrics()
         }
         
         return metrics
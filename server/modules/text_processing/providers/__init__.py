@@ -3,9 +3,11 @@ Text Processing Providers - Провайдеры для обработки те
 
 Содержит:
 - GeminiLiveProvider - основной провайдер для Live API
+- LiveSessionPool - пул тёплых Live сессий
 - Поддержка стриминга, JPEG изображений и Google Search
 """
 
 from .gemini_live_provider import GeminiLiveProvider
+from .live_session_pool import LiveSessionPool, LiveSessionPoolExhaustedError
 
-__all__ = ['GeminiLiveProvider']
+__all__ = ['GeminiLiveProvider', 'LiveSessionPool', 'LiveSessionPoolExhaustedError']
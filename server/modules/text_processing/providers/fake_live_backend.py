@@ -0,0 +1,184 @@
+"""
+Фейковый Gemini Live backend для офлайн проверки пула сессий и бенчмарков
+
+Повторяет используемую нами часть google-genai:
+    client.aio.live.connect(model=..., config=...)  -> async context manager
+    session.send_client_content(turns=..., turn_complete=...)
+    session.receive()  -> ответы с .text и .server_content.turn_complete
+    session.close()    -> закрытие websocket
+    session._ws        -> websocket с .closed, close() и ping()
+"""
+
+import asyncio
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+
+class _FakeServerContent:
+    def __init__(self, turn_complete: bool):
+        self.turn_complete = turn_complete
+
+
+class FakeLiveResponse:
+    """Аналог LiveServerMessage"""
+
+    def __init__(self, text: Optional[str], turn_complete: bool = False):
+        self.text = text
+        self.server_content = _FakeServerContent(turn_complete)
+        self.tool_calls = None
+
+
+class _FakeWebSocket:
+    def __init__(self):
+        self.closed_event = asyncio.Event()
+
+    @property
+    def closed(self) -> bool:
+        return self.closed_event.is_set()
+
+    @closed.setter
+    def closed(self, value: bool):
+        if value:
+            self.closed_event.set()
+        else:
+            self.closed_event.clear()
+
+    async def close(self):
+        self.closed = True
+
+    async def ping(self):
+        if self.closed:
+            raise ConnectionError("websocket closed")
+        fut = asyncio.get_running_loop().create_future()
+        fut.set_result(None)
+        return fut
+
+
+class FakeLiveSession:
+    """Live сессия: хранит историю ходов, как настоящая"""
+
+    def __init__(self, client: "FakeLiveClient", model: str, config: Dict[str, Any]):
+        self.client = client
+        self.model = model
+        self.config = config
+        self.history: List[Any] = []
+        self.turns_completed = 0
+        self._ws = _FakeWebSocket()
+        self._pending_turn = False
+
+    async def send_client_content(self, turns: Any = None, turn_complete: bool = True):
+        if self._ws.closed:
+            raise ConnectionError("websocket closed")
+        if turns is not None:
+            self.history.append(turns)
+        if turn_complete:
+            self._pending_turn = True
+
+    async def receive(self) -> AsyncGenerator[FakeLiveResponse, None]:
+        if not self._pending_turn:
+            return
+        self._pending_turn = False
+        client = self.client
+        fail = client.fail_next_turns > 0
+        if fail:
+            client.fail_next_turns -= 1
+
+        await self._wait(client.first_token_delay)
+        for index, piece in enumerate(client.response_pieces):
+            if index:
+                await self._wait(client.token_delay)
+            if fail and index == 1:
+                self._ws.closed = True
+                raise ConnectionError("fake Live connection dropped mid-turn")
+            yield FakeLiveResponse(piece)
+        self.turns_completed += 1
+        yield FakeLiveResponse(None, turn_complete=True)
+
+    async def close(self):
+        await self._ws.close()
+
+    async def _wait(self, delay: float):
+        """Пауза генерации; закрытие websocket прерывает её, как у настоящего соединения"""
+        try:
+            await asyncio.wait_for(self._ws.closed_event.wait(), delay)
+        except asyncio.TimeoutError:
+            return
+        raise ConnectionError("websocket closed")
+
+
+class _FakeLiveConnection:
+    """Async context manager, который возвращает connect()"""
+
+    def __init__(self, client: "FakeLiveClient", model: str, config: Dict[str, Any]):
+        self.client = client
+        self.model = model
+        self.config = config
+        self.session: Optional[FakeLiveSession] = None
+
+    async def __aenter__(self) -> FakeLiveSession:
+        client = self.client
+        await asyncio.sleep(client.connect_delay)
+        if client.fail_next_connects > 0:
+            client.fail_next_connects -= 1
+            raise ConnectionError("fake Live connect failed")
+        client.connects += 1
+        self.session = FakeLiveSession(client, self.model, self.config)
+        client.open_sessions.append(self.session)
+        return self.session
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self.session is not None:
+            self.session._ws.closed = True
+            if self.session in self.client.open_sessions:
+                self.client.open_sessions.remove(self.session)
+            self.client.disconnects += 1
+        return False
+
+
+class _FakeLive:
+    def __init__(self, client: "FakeLiveClient"):
+        self._client = client
+
+    def connect(self, model: str, config: Dict[str, Any]) -> _FakeLiveConnection:
+        return _FakeLiveConnection(self._client, model, config)
+
+
+class _FakeAio:
+    def __init__(self, client: "FakeLiveClient"):
+        self.live = _FakeLive(client)
+
+
+class FakeLiveClient:
+    """
+    Фейковый genai.Client с Live API
+
+    Args:
+        connect_delay: Время установки соединения (сек)
+        first_token_delay: Время до первого фрагмента ответа (сек)
+        token_delay: Пауза между фрагментами (сек)
+        response_pieces: Фрагменты ответа на любой ход
+    """
+
+    def __init__(self,
+                 connect_delay: float = 0.15,
+                 first_token_delay: float = 0.05,
+                 token_delay: float = 0.005,
+                 response_pieces: Optional[List[str]] = None):
+        self.connect_delay = connect_delay
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.response_pieces = response_pieces or ["Sure, ", "here is ", "the answer."]
+        self.aio = _FakeAio(self)
+
+        # Инъекция отказов
+        self.fail_next_turns = 0
+        self.fail_next_connects = 0
+
+        # Наблюдение
+        self.connects = 0
+        self.disconnects = 0
+        self.open_sessions: List[FakeLiveSession] = []
+
+    def drop_open_sessions(self):
+        """Разорвать все открытые соединения (как при сетевом сбое)"""
+        for session in self.open_sessions:
+            session._ws.closed = True
@@ -9,9 +9,17 @@ Gemini Live Provider для обработки текста с поддержк
 
 import asyncio
 import logging
-import base64
-from typing import AsyncGenerator, Dict, Any, Optional
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, AsyncIterator, Dict, Any, Optional
 from integrations.core.universal_provider_interface import UniversalProviderInterface
+from utils.cancel_scope import register_cancel_handle
+from utils.request_trace import record_span, trace_span
+from modules.text_processing.providers.live_session_pool import (
+    LiveSessionPool,
+    PooledLiveSession,
+    make_session_key,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -63,9 +71,25 @@ class GeminiLiveProvider(UniversalProviderInterface):
         self.image_max_size = config.get('image_max_size', 10 * 1024 * 1024)
         self.streaming_chunk_size = config.get('streaming_chunk_size', 8192)
         
-        # Клиент
+        # Пул тёплых Live сессий
+        self.pool_enabled = config.get('pool_enabled', True)
+        self.pool_min_size = config.get('pool_min_size', 1)
+        self.pool_max_size = config.get('pool_max_size', 4)
+        self.pool_idle_timeout = config.get('pool_idle_timeout', 120.0)
+        self.pool_max_session_age = config.get('pool_max_session_age', 540.0)
+        self.pool_max_turns = config.get('pool_max_turns', 1)
+        self.pool_acquire_timeout = config.get('pool_acquire_timeout', 10.0)
+        self.pool_health_interval = config.get('pool_health_interval', 30.0)
+        self.session_pool: Optional[LiveSessionPool] = None
+        self._session_key = make_session_key(self.model_name, self.system_prompt, self.tools)
+        self._live_config: Optional[Dict[str, Any]] = None
+        # Ходы, прерванные InterruptSession (websocket закрыт)
+        self.aborted_turns = 0
+        
+        # Клиент (live_client - готовый клиент, например FakeLiveClient для офлайн проверки)
+        self._injected_client = config.get('live_client')
         self.client = None
-        self.is_available = GEMINI_LIVE_AVAILABLE and bool(self.api_key)
+        self.is_available = (GEMINI_LIVE_AVAILABLE and bool(self.api_key)) or self._injected_client is not None
         self.is_initialized = False
         
         logger.info(f"GeminiLiveProvider initialized: available={self.is_available}")
@@ -89,63 +113,157 @@ class GeminiLiveProvider(UniversalProviderInterface):
             
             # Создаем клиент
             logger.info(f"🔍 Создаем Gemini клиент...")
-            self.client = genai.Client(api_key=self.api_key)
+            self.client = self._injected_client or genai.Client(api_key=self.api_key)
             logger.info(f"✅ Gemini клиент создан")
             
-            # Базовая конфигурация
-            config = {
-                "response_modalities": ["TEXT"]
-            }
-            # Добавляем system_instruction если задан
-            if self.system_prompt:
-                logger.info(f"🔍 System prompt: '{self.system_prompt[:100]}...'")
-                try:
-                    # Если доступен types.Content, используем его, иначе строку
-                    if types and hasattr(types, 'Content') and hasattr(types, 'Part'):
-                        config["system_instruction"] = types.Content(
-                            parts=[types.Part.from_text(text=self.system_prompt)],
-                            role="user"
-                        )
-                        logger.info(f"✅ System instruction добавлен с role='user'")
-                    else:
-                        config["system_instruction"] = self.system_prompt
-                        logger.info(f"✅ System instruction добавлен как строка")
-                except Exception:
-                    config["system_instruction"] = self.system_prompt
-            
-            # Добавляем инструменты если есть (Google Search для этапа 3)
-            if self.tools and "google_search" in self.tools:
-                config["tools"] = [{"google_search": {}}]
+            # Конфигурация сессии собирается один раз
+            self._live_config = self._build_live_config()
             
-            # НЕ добавляем media_resolution - модель не поддерживает
-            
-            # Тестируем подключение
-            logger.info(f"🔍 Тестируем подключение к Gemini Live API...")
-            async with self.client.aio.live.connect(model=self.model_name, config=config) as test_session:
-                logger.info(f"✅ Подключение к Gemini Live API установлено")
-                
-                logger.info(f"🔍 Отправляем тестовое сообщение...")
-                await test_session.send_client_content(
-                    turns={"role": "user", "parts": [{"text": "Hello"}]}, 
-                    turn_complete=True
+            if self.pool_enabled:
+                # Прогрев пула: проверка подключения без тестового хода модели
+                self.session_pool = LiveSessionPool(
+                    connect=self._connect,
+                    min_size=self.pool_min_size,
+                    max_size=self.pool_max_size,
+                    idle_timeout=self.pool_idle_timeout,
+                    max_session_age=self.pool_max_session_age,
+                    max_turns=self.pool_max_turns,
+                    acquire_timeout=self.pool_acquire_timeout,
+                    health_interval=self.pool_health_interval,
+                    health_probe=self._probe_session,
+                    name="gemini-live"
                 )
-                logger.info(f"✅ Тестовое сообщение отправлено")
-                
-                logger.info(f"🔍 Ожидаем ответ от Gemini...")
-                async for response in test_session.receive():
-                    logger.info(f"🔍 Получен ответ: {type(response)}")
-                    if response.text:
-                        self.is_initialized = True
-                        logger.info(f"✅ Live API initialized: {self.model_name}")
-                        return True
+                warmed = await self.session_pool.start(keys=[self._session_key])
+                if self.pool_min_size > 0 and warmed == 0:
+                    logger.error(f"❌ Не удалось открыть ни одной Live сессии")
+                    await self.session_pool.close()
+                    self.session_pool = None
+                    return False
+                logger.info(f"✅ Live session pool warmed: {warmed} session(s)")
+            else:
+                # Тестируем подключение (открыть и закрыть сессию)
+                logger.info(f"🔍 Тестируем подключение к Gemini Live API...")
+                async with self._connect(self._session_key):
+                    logger.info(f"✅ Подключение к Gemini Live API установлено")
             
-            logger.error(f"❌ Тестовое подключение не получило ответ")
-            return False
+            self.is_initialized = True
+            logger.info(f"✅ Live API initialized: {self.model_name}")
+            return True
             
         except Exception as e:
             logger.error(f"Live API initialization failed: {e}")
             return False
     
+    def _build_live_config(self) -> Dict[str, Any]:
+        """
+        Конфигурация Live сессии (модель не поддерживает media_resolution)
+        
+        Returns:
+            Словарь конфигурации для client.aio.live.connect
+        """
+        config = {
+            "response_modalities": ["TEXT"]
+        }
+        # Добавляем system_instruction если задан
+        if self.system_prompt:
+            logger.info(f"🔍 System prompt: '{self.system_prompt[:100]}...'")
+            try:
+                # Если доступен types.Content, используем его, иначе строку
+                if types and hasattr(types, 'Content') and hasattr(types, 'Part'):
+                    config["system_instruction"] = types.Content(
+                        parts=[types.Part.from_text(text=self.system_prompt)],
+                        role="user"
+                    )
+                else:
+                    config["system_instruction"] = self.system_prompt
+            except Exception:
+                config["system_instruction"] = self.system_prompt
+        
+        # Добавляем инструменты если есть (Google Search для этапа 3)
+        if self.tools and "google_search" in self.tools:
+            config["tools"] = [{"google_search": {}}]
+        
+        return config
+    
+    def _connect(self, key=None):
+        """Новое Live соединение (async context manager) с конфигурацией провайдера"""
+        return self.client.aio.live.connect(model=self.model_name, config=self._live_config)
+    
+    @asynccontextmanager
+    async def _lease_session(self) -> AsyncIterator[PooledLiveSession]:
+        """Сессия на один ход: из пула или новое соединение, если пул выключен"""
+        if self.session_pool:
+            async with self.session_pool.lease(self._session_key) as entry:
+                unregister = register_cancel_handle(lambda: self._abort_session(entry))
+                try:
+                    yield entry
+                finally:
+                    unregister()
+        else:
+            async with self._connect(self._session_key) as session:
+                entry = PooledLiveSession(self._session_key, None, session)
+                unregister = register_cancel_handle(lambda: self._abort_session(entry))
+                try:
+                    yield entry
+                finally:
+                    unregister()
+    
+    async def _abort_session(self, entry: PooledLiveSession) -> None:
+        """Прерывание хода: закрываем websocket сразу, сессия в пул не вернётся"""
+        entry.mark_broken()
+        self.aborted_turns += 1
+        close = getattr(entry.session, 'close', None)
+        if close is None:
+            close = getattr(getattr(entry.session, '_ws', None), 'close', None)
+        if close is not None:
+            await close()
+        logger.info("🛑 Live session closed by interrupt")
+    
+    async def _probe_session(self, session) -> bool:
+        """Health probe свободной сессии: websocket открыт и отвечает на ping"""
+        ws = getattr(session, '_ws', None)
+        if ws is None:
+            return True
+        if getattr(ws, 'closed', False):
+            return False
+        state = getattr(ws, 'state', None)
+        if state is not None and getattr(state, 'name', '') in ('CLOSING', 'CLOSED'):
+            return False
+        ping = getattr(ws, 'ping', None)
+        if ping is None:
+            return True
+        pong_waiter = await ping()
+        if pong_waiter is not None:
+            await pong_waiter
+        return True
+    
+    async def _receive_turn(self, entry: PooledLiveSession, search_log: str) -> AsyncGenerator[str, None]:
+        """Чтение ответа до turn_complete; незавершённый ход помечает сессию сломанной"""
+        turn_complete = False
+        receive_started = time.perf_counter()
+        first_token = True
+        async for response in entry.session.receive():
+            if response.text:
+                if first_token:
+                    record_span("gemini.first_token", receive_started)
+                    first_token = False
+                # НЕ разбиваем на предложения здесь - это делает StreamingWorkflowIntegration
+                yield response.text
+            
+            # Обрабатываем инструменты (Google Search) - проверяем наличие атрибута
+            if hasattr(response, 'tool_calls') and response.tool_calls:
+                for tool_call in response.tool_calls:
+                    if hasattr(tool_call, 'google_search') and tool_call.google_search:
+                        logger.info(search_log)
+            
+            if response.server_content and response.server_content.turn_complete:
+                turn_complete = True
+                break
+        
+        record_span("gemini.receive", receive_started, turn_complete=turn_complete)
+        if not turn_complete:
+            entry.mark_broken()
+    
     async def process(self, input_data: str) -> AsyncGenerator[str, None]:
         """
         ЭТАП 1: Обработка текста через Live API
@@ -160,47 +278,19 @@ class GeminiLiveProvider(UniversalProviderInterface):
             if not self.is_initialized or not self.client:
                 raise Exception("Live API not initialized")
             
-            # Конфигурация
-            config = {
-                "response_modalities": ["TEXT"]
-            }
-            if self.system_prompt:
-                try:
-                    if types and hasattr(types, 'Content') and hasattr(types, 'Part'):
-                        config["system_instruction"] = types.Content(
-                            parts=[types.Part.from_text(text=self.system_prompt)],
-                            role="user"
-                        )
-                    else:
-                        config["system_instruction"] = self.system_prompt
-                except Exception:
-                    config["system_instruction"] = self.system_prompt
-            
-            # Добавляем инструменты если есть (Google Search для этапа 3)
-            if self.tools and "google_search" in self.tools:
-                config["tools"] = [{"google_search": {}}]
-            
-            async with self.client.aio.live.connect(model=self.model_name, config=config) as session:
+            lease_started = time.perf_counter()
+            async with self._lease_session() as entry:
+                record_span("gemini.lease", lease_started, pooled=self.session_pool is not None)
                 # Отправляем текст
-                await session.send_client_content(
-                    turns={"role": "user", "parts": [{"text": input_data}]}, 
-                    turn_complete=True
-                )
+                with trace_span("gemini.send"):
+                    await entry.session.send_client_content(
+                        turns={"role": "user", "parts": [{"text": input_data}]}, 
+                        turn_complete=True
+                    )
                 
                 # Получаем ответ
-                async for response in session.receive():
-                    if response.text:
-                        # НЕ разбиваем на предложения здесь - это делает StreamingWorkflowIntegration
-                        yield response.text
-                    
-                    # Обрабатываем инструменты (Google Search) - проверяем наличие атрибута
-                    if hasattr(response, 'tool_calls') and response.tool_calls:
-                        for tool_call in response.tool_calls:
-                            if hasattr(tool_call, 'google_search') and tool_call.google_search:
-                                logger.info("Google Search executed")
-                    
-                    if response.server_content and response.server_content.turn_complete:
-                        break
+                async for text in self._receive_turn(entry, "Google Search executed"):
+                    yield text
                 
                 logger.debug("Live API text processing completed")
                 
@@ -223,55 +313,29 @@ class GeminiLiveProvider(UniversalProviderInterface):
             if not self.is_initialized or not self.client:
                 raise Exception("Live API not initialized")
             
-            # Конфигурация (без media_resolution)
-            config = {
-                "response_modalities": ["TEXT"]
-            }
-            if self.system_prompt:
-                try:
-                    if types and hasattr(types, 'Content') and hasattr(types, 'Part'):
-                        config["system_instruction"] = types.Content(
-                            parts=[types.Part.from_text(text=self.system_prompt)],
-                            role="user"
-                        )
-                    else:
-                        config["system_instruction"] = self.system_prompt
-                except Exception:
-                    config["system_instruction"] = self.system_prompt
+            # Проверяем изображение до аренды сессии, чтобы не терять её на невалидных данных
+            self._validate_jpeg(image_data)
             
-            # НЕ добавляем media_resolution - модель не поддерживает
-            
-            # Добавляем инструменты если есть (Google Search для этапа 3)
-            if self.tools and "google_search" in self.tools:
-                config["tools"] = [{"google_search": {}}]
-            
-            async with self.client.aio.live.connect(model=self.model_name, config=config) as session:
-                # Отправляем текст
-                await session.send_client_content(
-                    turns={"role": "user", "parts": [{"text": input_data}]}, 
-                    turn_complete=False
-                )
-                
-                # Отправляем JPEG изображение
-                await self._send_jpeg_image(session, image_data)
-                
-                # Завершаем ввод
-                await session.send_client_content(turn_complete=True)
-                
-                # Получаем ответ
-                async for response in session.receive():
-                    if response.text:
-                        # НЕ разбиваем на предложения здесь - это делает StreamingWorkflowIntegration
-                        yield response.text
+            lease_started = time.perf_counter()
+            async with self._lease_session() as entry:
+                record_span("gemini.lease", lease_started, pooled=self.session_pool is not None)
+                session = entry.session
+                with trace_span("gemini.send", image_bytes=len(image_data)):
+                    # Отправляем текст
+                    await session.send_client_content(
+                        turns={"role": "user", "parts": [{"text": input_data}]}, 
+                        turn_complete=False
+                    )
                     
-                    # Обрабатываем инструменты (Google Search) - проверяем наличие атрибута
-                    if hasattr(response, 'tool_calls') and response.tool_calls:
-                        for tool_call in response.tool_calls:
-                            if hasattr(tool_call, 'google_search') and tool_call.google_search:
-                                logger.info("Google Search executed with image")
+                    # Отправляем JPEG изображение
+                    await self._send_jpeg_image(session, image_data)
                     
-                    if response.server_content and response.server_content.turn_complete:
-                        break
+                    # Завершаем ввод
+                    await session.send_client_content(turn_complete=True)
+                
+                # Получаем ответ
+                async for text in self._receive_turn(entry, "Google Search executed with image"):
+                    yield text
                 
                 logger.debug("Live API with image processing completed")
                 
@@ -279,6 +343,20 @@ class GeminiLiveProvider(UniversalProviderInterface):
             logger.error(f"Live API with image processing error: {e}")
             raise e
     
+    def _validate_jpeg(self, image_data: Optional[bytes]) -> None:
+        """
+        Проверка JPEG изображения (None - без изображения)
+        
+        Raises:
+            ValueError: Не JPEG или слишком большое
+        """
+        if image_data is None:
+            return
+        if not image_data.startswith(b'\xff\xd8\xff'):
+            raise ValueError("Image must be in JPEG format")
+        if len(image_data) > self.image_max_size:
+            raise ValueError(f"Image too large: {len(image_data)} bytes")
+    
     async def _send_jpeg_image(self, session, image_data: bytes) -> None:
         """
         Отправка JPEG изображения через Live API
@@ -293,28 +371,14 @@ class GeminiLiveProvider(UniversalProviderInterface):
                 logger.debug("No image data provided, skipping image processing")
                 return
             
-            # Проверяем JPEG формат
-            if not image_data.startswith(b'\xff\xd8\xff'):
-                raise ValueError("Image must be in JPEG format")
-            
-            # Проверяем размер
-            if len(image_data) > self.image_max_size:
-                raise ValueError(f"Image too large: {len(image_data)} bytes")
+            # Проверяем JPEG формат и размер
+            self._validate_jpeg(image_data)
             
             # КРИТИЧНО: Используем send_client_content, НЕ send_realtime_input
-            image_b64 = base64.b64encode(image_data).decode('utf-8')
-            
             await session.send_client_content(
                 turns={
                     "role": "user", 
-                    "parts": [
-                        {
-                            "inline_data": {
-                                "mime_type": self.image_mime_type,
-                                "data": image_b64
-                            }
-                        }
-                    ]
+                    "parts": [self._image_part(image_data)]
                 }, 
                 turn_complete=False
             )
@@ -325,6 +389,23 @@ class GeminiLiveProvider(UniversalProviderInterface):
             logger.error(f"Error sending JPEG image: {e}")
             raise e
     
+    def _image_part(self, image_data: bytes) -> Dict[str, Any]:
+        """
+        Часть сообщения с изображением
+        
+        Blob.data в SDK имеет тип bytes и кодируется в base64 один раз при
+        отправке в websocket, поэтому передаём сырые байты без своей копии.
+        
+        Args:
+            image_data: JPEG данные изображения
+        """
+        return {
+            "inline_data": {
+                "mime_type": self.image_mime_type,
+                "data": image_data
+            }
+        }
+    
     def _split_into_sentences(self, text: str) -> list:
         """
         Разбиение текста на предложения для стриминга
@@ -359,6 +440,9 @@ class GeminiLiveProvider(UniversalProviderInterface):
             True если очистка успешна, False иначе
         """
         try:
+            if self.session_pool:
+                await self.session_pool.close()
+                self.session_pool = None
             self.client = None
             self.is_initialized = False
             logger.info("Live API cleaned up")
@@ -406,7 +490,9 @@ class GeminiLiveProvider(UniversalProviderInterface):
             "model_name": self.model_name,
             "is_available": self.is_available,
             "api_key_set": bool(self.api_key),
-            "tools_enabled": len(self.tools) > 0
+            "tools_enabled": len(self.tools) > 0,
+            "aborted_turns": self.aborted_turns,
+            "live_session_pool": self.session_pool.get_metrics() if self.session_pool else None
         })
         
         return base_metrics
\ No newline at end of file
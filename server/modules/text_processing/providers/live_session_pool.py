@@ -0,0 +1,449 @@
+"""
+Пул тёплых сессий Gemini Live API
+
+Установка websocket соединения `client.aio.live.connect(...)` занимает
+большую часть времени короткого запроса, поэтому сессии открываются заранее
+и выдаются запросам в аренду.
+
+- ключ пула - конфигурация сессии (модель, system prompt, инструменты)
+- min_size тёплых свободных сессий на ключ, не больше max_size всего
+- сессия, давшая ошибку посреди хода, закрывается и не возвращается в пул
+- после max_turns ходов или max_session_age сессия выводится из оборота
+  (Live сессия хранит историю диалога; max_turns=1 - чистый контекст на запрос)
+- фоновое обслуживание: вытеснение простаивающих, health probe, пополнение
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def make_session_key(model: str, system_prompt: str = "", tools: Optional[Iterable[str]] = None) -> Tuple[str, str, Tuple[str, ...]]:
+    """Ключ пула по конфигурации Live сессии"""
+    prompt_digest = hashlib.sha1((system_prompt or "").encode('utf-8')).hexdigest()[:16]
+    return (model, prompt_digest, tuple(sorted(tools or ())))
+
+
+class LiveSessionPoolExhaustedError(Exception):
+    """Нет свободной сессии за acquire_timeout"""
+    pass
+
+
+class PooledLiveSession:
+    """Сессия в пуле: контекстный менеджер соединения, сама сессия и счётчики"""
+
+    __slots__ = ('key', 'connection', 'session', 'created_at', 'last_used_at', 'turns', 'broken')
+
+    def __init__(self, key: Hashable, connection: Any, session: Any):
+        self.key = key
+        self.connection = connection
+        self.session = session
+        self.created_at = time.monotonic()
+        self.last_used_at = self.created_at
+        self.turns = 0
+        self.broken = False
+
+    def mark_broken(self):
+        """Сессия в неизвестном состоянии (ход не завершён) - не возвращать в пул"""
+        self.broken = True
+
+
+class _KeyState:
+    """Состояние пула для одного ключа"""
+
+    __slots__ = ('idle', 'total', 'opening', 'waiters')
+
+    def __init__(self):
+        self.idle: Deque[PooledLiveSession] = deque()
+        self.total = 0      # свободные + арендованные + открывающиеся
+        self.opening = 0    # пополнение: запланировано или открывается
+        self.waiters: Deque[asyncio.Future] = deque()
+
+
+class LiveSessionPool:
+    """Пул Live сессий с арендой, вытеснением и health probe"""
+
+    def __init__(self,
+                 connect: Callable[[Hashable], Any],
+                 min_size: int = 1,
+                 max_size: int = 4,
+                 idle_timeout: float = 120.0,
+                 max_session_age: float = 540.0,
+                 max_turns: int = 1,
+                 acquire_timeout: float = 10.0,
+                 health_interval: float = 30.0,
+                 health_probe: Optional[Callable[[Any], Awaitable[bool]]] = None,
+                 name: str = "live"):
+        """
+        Args:
+            connect: Фабрика соединения по ключу - async context manager, как client.aio.live.connect(...)
+            min_size: Сколько свободных тёплых сессий держать на ключ
+            max_size: Максимум сессий на ключ (свободные + арендованные)
+            idle_timeout: Простаивающие дольше сессии сверх min_size закрываются (сек)
+            max_session_age: Максимальный возраст сессии (сек)
+            max_turns: Сколько ходов обслуживает одна сессия
+            acquire_timeout: Ожидание свободной сессии при исчерпании max_size (сек)
+            health_interval: Период фонового обслуживания (сек)
+            health_probe: Проверка свободной сессии (True - здорова)
+            name: Имя пула для логов
+        """
+        self.connect = connect
+        self.max_size = max(1, int(max_size))
+        self.min_size = max(0, min(int(min_size), self.max_size))
+        self.idle_timeout = idle_timeout
+        self.max_session_age = max_session_age
+        self.max_turns = max(1, int(max_turns))
+        self.acquire_timeout = acquire_timeout
+        self.health_interval = health_interval
+        self.health_probe = health_probe
+        self.name = name
+
+        self._states: Dict[Hashable, _KeyState] = {}
+        self._refills: Set[asyncio.Task] = set()
+        self._closing: Set[asyncio.Task] = set()
+        self._maintenance_task: Optional[asyncio.Task] = None
+        self.is_closed = False
+
+        # Метрики
+        self.opened = 0
+        self.closed = 0
+        self.hits = 0
+        self.misses = 0
+        self.discarded = 0
+        self.retired = 0
+        self.evicted_idle = 0
+        self.probe_failures = 0
+        self.connect_failures = 0
+        self.exhausted = 0
+        self.connect_times = deque(maxlen=1000)
+        self.acquire_times = deque(maxlen=1000)
+
+    # ---------- жизненный цикл ----------
+
+    async def start(self, keys: Iterable[Hashable] = ()) -> int:
+        """
+        Прогрев пула для ключей и запуск фонового обслуживания
+
+        Returns:
+            Количество открытых при прогреве сессий
+        """
+        warmed = 0
+        for key in keys:
+            warmed += await self.warm(key)
+        if self._maintenance_task is None and self.health_interval > 0:
+            self._maintenance_task = asyncio.create_task(self._maintenance_loop())
+        return warmed
+
+    async def warm(self, key: Hashable) -> int:
+        """Открыть недостающие до min_size свободные сессии (параллельно)"""
+        results = await asyncio.gather(*self._schedule_refill(key), return_exceptions=True)
+        return sum(1 for r in results if r is True)
+
+    async def close(self):
+        """Остановка обслуживания и закрытие свободных сессий (арендованные закроются при возврате)"""
+        self.is_closed = True
+        # Обслуживание и пополнение отменяем и дожидаемся: до выхода из отмены они
+        # держат сессии вне idle (проверка, только что открытое соединение)
+        cancelled = [task for task in (self._maintenance_task, *self._refills) if task is not None]
+        self._maintenance_task = None
+        for task in cancelled:
+            task.cancel()
+        await asyncio.gather(*cancelled, return_exceptions=True)
+        entries = []
+        for state in self._states.values():
+            while state.idle:
+                entries.append(state.idle.pop())
+                state.total -= 1
+            for waiter in state.waiters:
+                if not waiter.done():
+                    waiter.set_exception(LiveSessionPoolExhaustedError("Live session pool closed"))
+            state.waiters.clear()
+        for entry in entries:
+            self._close_entry(entry)
+        # shield: отмена close() не прерывает закрытие websocket
+        await asyncio.shield(asyncio.gather(*list(self._closing), return_exceptions=True))
+        logger.info(f"LiveSessionPool[{self.name}] closed")
+
+    # ---------- аренда ----------
+
+    @asynccontextmanager
+    async def lease(self, key: Hashable) -> AsyncIterator[PooledLiveSession]:
+        """
+        Аренда сессии на один ход
+
+        Исключение внутри блока (включая отмену и закрытие генератора
+        посреди ответа) - сессия закрывается, а не возвращается в пул.
+        """
+        entry = await self.acquire(key)
+        try:
+            yield entry
+        except BaseException:
+            entry.mark_broken()
+            raise
+        finally:
+            self.release(entry)
+
+    async def acquire(self, key: Hashable) -> PooledLiveSession:
+        """Получение свободной сессии (или открытие новой в пределах max_size)"""
+        if self.is_closed:
+            raise LiveSessionPoolExhaustedError("Live session pool closed")
+
+        state = self._state(key)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = started + self.acquire_timeout
+
+        while True:
+            entry = self._pop_idle(state)
+            if entry is not None:
+                self.hits += 1
+                self.acquire_times.append(loop.time() - started)
+                self._schedule_refill(key)
+                return entry
+
+            if state.total < self.max_size:
+                state.total += 1
+                try:
+                    entry = await self._open(key)
+                except BaseException:
+                    state.total -= 1
+                    self._wake(state)
+                    raise
+                self.misses += 1
+                self.acquire_times.append(loop.time() - started)
+                return entry
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                self.exhausted += 1
+                raise LiveSessionPoolExhaustedError(
+                    f"No Live session available for {self.acquire_timeout}s (max_size={self.max_size})"
+                )
+            waiter = loop.create_future()
+            state.waiters.append(waiter)
+            try:
+                await asyncio.wait_for(waiter, remaining)
+            except asyncio.TimeoutError:
+                pass
+            except BaseException:
+                # Пробуждение не должно потеряться, если нас отменили сразу после него
+                if waiter.done() and not waiter.cancelled():
+                    self._wake(state)
+                raise
+            finally:
+                if waiter in state.waiters:
+                    state.waiters.remove(waiter)
+
+    def release(self, entry: PooledLiveSession):
+        """Возврат сессии: в пул или на закрытие (ошибка, лимит ходов/возраста, пул закрыт)"""
+        state = self._state(entry.key)
+        entry.turns += 1
+        entry.last_used_at = time.monotonic()
+
+        if entry.broken or self.is_closed:
+            self.discarded += 1
+            self._retire(state, entry)
+        elif entry.turns >= self.max_turns or self._is_expired(entry):
+            self.retired += 1
+            self._retire(state, entry)
+        else:
+            state.idle.append(entry)
+            self._wake(state)
+
+        if not self.is_closed:
+            self._schedule_refill(entry.key)
+
+    # ---------- внутреннее ----------
+
+    def _state(self, key: Hashable) -> _KeyState:
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = _KeyState()
+        return state
+
+    def _pop_idle(self, state: _KeyState) -> Optional[PooledLiveSession]:
+        """Самая свежая свободная сессия; просроченные по пути закрываются"""
+        while state.idle:
+            entry = state.idle.pop()
+            if self._is_expired(entry):
+                self.retired += 1
+                self._retire(state, entry)
+                continue
+            return entry
+        return None
+
+    def _is_expired(self, entry: PooledLiveSession) -> bool:
+        return (time.monotonic() - entry.created_at) >= self.max_session_age
+
+    def _retire(self, state: _KeyState, entry: PooledLiveSession):
+        state.total -= 1
+        self._close_entry(entry)
+        self._wake(state)
+
+    def _wake(self, state: _KeyState):
+        while state.waiters:
+            waiter = state.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+    def _spawn(self, tasks: Set[asyncio.Task], coro: Awaitable) -> asyncio.Task:
+        task = asyncio.ensure_future(coro)
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        return task
+
+    def _schedule_refill(self, key: Hashable) -> List[asyncio.Task]:
+        """Пополнение свободных сессий до min_size фоновыми задачами"""
+        state = self._state(key)
+        missing = min(self.min_size - len(state.idle) - state.opening, self.max_size - state.total)
+        tasks = []
+        for _ in range(max(0, missing)):
+            # Место резервируется сразу, а не при старте задачи - иначе вызовы
+            # до её старта не видят пополнение и открывают лишние сессии
+            state.total += 1
+            state.opening += 1
+            task = self._spawn(self._refills, self._open_idle(key))
+            task.add_done_callback(lambda task, state=state: self._refill_done(state, task))
+            tasks.append(task)
+        return tasks
+
+    def _refill_done(self, state: _KeyState, task: asyncio.Task):
+        """Снятие резерва пополнения (в том числе отменённого до старта)"""
+        state.opening -= 1
+        if task.cancelled() or task.exception() is not None or task.result() is not True:
+            state.total -= 1
+            self._wake(state)
+
+    async def _open(self, key: Hashable) -> PooledLiveSession:
+        """Открытие соединения (total уже учтён вызывающим)"""
+        started = time.perf_counter()
+        connection = self.connect(key)
+        try:
+            session = await connection.__aenter__()
+        except Exception:
+            self.connect_failures += 1
+            raise
+        self.opened += 1
+        self.connect_times.append(time.perf_counter() - started)
+        return PooledLiveSession(key, connection, session)
+
+    async def _open_idle(self, key: Hashable) -> bool:
+        """Фоновое открытие сессии в свободный пул (место зарезервировано в _schedule_refill)"""
+        if self.is_closed:
+            return False
+        try:
+            entry = await self._open(key)
+        except Exception as e:
+            logger.warning(f"LiveSessionPool[{self.name}]: warm connect failed: {e}")
+            return False
+        if self.is_closed:
+            self._close_entry(entry)
+            return False
+        state = self._state(key)
+        state.idle.appendleft(entry)
+        self._wake(state)
+        return True
+
+    def _close_entry(self, entry: PooledLiveSession) -> asyncio.Task:
+        """Закрытие отдельной задачей: отмена вызывающего не оставляет websocket открытым"""
+        return self._spawn(self._closing, self._close_connection(entry))
+
+    async def _close_connection(self, entry: PooledLiveSession):
+        try:
+            await asyncio.wait_for(entry.connection.__aexit__(None, None, None), 5.0)
+        except Exception as e:
+            logger.debug(f"LiveSessionPool[{self.name}]: close failed: {e}")
+        self.closed += 1
+
+    async def _maintenance_loop(self):
+        """Фоновое обслуживание: простаивающие, просроченные, health probe, пополнение"""
+        while not self.is_closed:
+            await asyncio.sleep(self.health_interval)
+            try:
+                for key in list(self._states):
+                    await self._maintain_key(key)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"LiveSessionPool[{self.name}] maintenance error: {e}")
+
+    async def _maintain_key(self, key: Hashable):
+        state = self._state(key)
+        now = time.monotonic()
+
+        # Забираем свободные сессии на время проверки, чтобы их не выдали
+        checking = list(state.idle)
+        state.idle.clear()
+        keep = []
+        for entry in checking:
+            if self._is_expired(entry):
+                self.retired += 1
+                self._retire(state, entry)
+            elif now - entry.last_used_at >= self.idle_timeout and len(keep) >= self.min_size:
+                self.evicted_idle += 1
+                self._retire(state, entry)
+            else:
+                keep.append(entry)
+
+        if self.health_probe is not None and keep:
+            try:
+                results = await asyncio.gather(*(self._probe(entry) for entry in keep))
+            except BaseException:
+                # Отмена (close) посреди проверки - сессии обратно, иначе их никто не закроет
+                state.idle.extendleft(reversed(keep))
+                raise
+            healthy = []
+            for entry, ok in zip(keep, results):
+                if ok:
+                    healthy.append(entry)
+                else:
+                    self.probe_failures += 1
+                    self._retire(state, entry)
+            keep = healthy
+
+        # Свежие и проверенные - в конец (выдаются первыми)
+        state.idle.extendleft(reversed(keep))
+        for _ in keep:
+            self._wake(state)
+        self._schedule_refill(key)
+
+    async def _probe(self, entry: PooledLiveSession) -> bool:
+        try:
+            return bool(await asyncio.wait_for(self.health_probe(entry.session), 5.0))
+        except Exception:
+            return False
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Метрики пула"""
+        connect = list(self.connect_times)
+        acquire = list(self.acquire_times)
+        leases = self.hits + self.misses
+        return {
+            "keys": len(self._states),
+            "idle": sum(len(s.idle) for s in self._states.values()),
+            "total": sum(s.total for s in self._states.values()),
+            "waiters": sum(len(s.waiters) for s in self._states.values()),
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "max_turns": self.max_turns,
+            "opened": self.opened,
+            "closed": self.closed,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits / leases) if leases else 0.0,
+            "discarded": self.discarded,
+            "retired": self.retired,
+            "evicted_idle": self.evicted_idle,
+            "probe_failures": self.probe_failures,
+            "connect_failures": self.connect_failures,
+            "exhausted": self.exhausted,
+            "avg_connect_ms": (sum(connect) / len(connect) * 1000) if connect else 0.0,
+            "avg_acquire_ms": (sum(acquire) / len(acquire) * 1000) if acquire else 0.0
+        }
@@ -8,10 +8,32 @@ from .grpc_monitor import (
     PerformanceLimits,
     get_monitor,
     record_request,
+    record_admission,
+    record_maintenance,
     set_active_connections,
+    add_active_connections,
+    start_sampler,
+    stop_sampler,
     get_metrics,
     get_status
 )
+from utils.latency_histogram import LatencyHistogram
+
+from .metrics_core import Counter, Gauge, ProcessSampler
+from .tracing import (
+    TraceRecorder,
+    get_trace_recorder,
+    start_trace,
+    finish_trace
+)
+from .openmetrics import (
+    CONTENT_TYPE as OPENMETRICS_CONTENT_TYPE,
+    OpenMetricsExporter,
+    get_exporter,
+    register_collector,
+    unregister_collector,
+    render_metrics
+)
 
 __all__ = [
     'GrpcMonitor',
@@ -19,7 +41,26 @@ __all__ = [
     'PerformanceLimits',
     'get_monitor',
     'record_request',
+    'record_admission',
+    'record_maintenance',
     'set_active_connections',
+    'add_active_connections',
+    'start_sampler',
+    'stop_sampler',
     'get_metrics',
-    'get_status'
+    'get_status',
+    'Counter',
+    'Gauge',
+    'LatencyHistogram',
+    'ProcessSampler',
+    'OPENMETRICS_CONTENT_TYPE',
+    'OpenMetricsExporter',
+    'get_exporter',
+    'register_collector',
+    'unregister_collector',
+    'render_metrics',
+    'TraceRecorder',
+    'get_trace_recorder',
+    'start_trace',
+    'finish_trace'
 ]
@@ -3,27 +3,33 @@
 Отслеживание метрик для масштабирования до 100 пользователей
 """
 
-import asyncio
 import logging
 import time
-from typing import Dict, Any, Optional
+from typing import Deque, Dict, Any, List, Optional, Tuple
 from dataclasses import dataclass, field
-from collections import defaultdict, deque
+from collections import deque
 import psutil
 import os
 
+from utils.latency_histogram import LatencyHistogram
+
+from .metrics_core import Counter, Gauge, ProcessSampler
+
 logger = logging.getLogger(__name__)
 
 @dataclass
 class GrpcMetrics:
-    """Метрики gRPC сервера"""
+    """Метрики gRPC сервера (сводка, пересчитывается фоновым сэмплером)"""
     active_connections: int = 0
     total_requests: int = 0
     requests_per_minute: int = 0
     error_rate: float = 0.0
     avg_response_time: float = 0.0
     memory_usage: float = 0.0
+    memory_rss: int = 0
     cpu_usage: float = 0.0
+    admission_queue_depth: int = 0
+    admission_rejections: Dict[str, int] = field(default_factory=dict)
     timestamp: float = field(default_factory=time.time)
 
 @dataclass
@@ -37,74 +43,133 @@ class PerformanceLimits:
     max_response_time: float = 5.0  # 5 секунд
 
 class GrpcMonitor:
-    """Монитор производительности gRPC сервера"""
+    """
+    Монитор производительности gRPC сервера
     
-    def __init__(self, limits: Optional[PerformanceLimits] = None):
+    record_* на горячем пути только увеличивают счётчики и пишут в
+    гистограммы (utils.latency_histogram). CPU/RSS процесса, RPM, среднее
+    время ответа за минуту, перцентили и проверка лимитов пересчитываются
+    фоновым сэмплером раз в sample_interval; get_metrics() читает готовую сводку.
+    """
+    
+    def __init__(self, limits: Optional[PerformanceLimits] = None, sample_interval: Optional[float] = None):
         self.limits = limits or PerformanceLimits()
         self.metrics = GrpcMetrics()
-        self.request_times = deque(maxlen=1000)  # Последние 1000 запросов
-        self.error_count = 0
+        self.sample_interval = sample_interval if sample_interval is not None else float(os.getenv("MONITOR_SAMPLE_INTERVAL", "5"))
+        
+        # Горячий путь: счётчики и гистограммы (мс)
+        self.requests = Counter()
+        self.errors = Counter()
+        self.active_connections = Gauge()
+        self.admission_queue_depth = Gauge()
+        self.response_time_ms = LatencyHistogram()
+        self.admission_wait_ms = LatencyHistogram()
+        self.admission_rejections: Dict[str, int] = {}
+        self.maintenance: Dict[str, Dict[str, Any]] = {}  # Фоновые задачи обслуживания
         self.start_time = time.time()
         self.process = psutil.Process(os.getpid())
         
-        # Счетчики для расчета RPS
-        self.requests_in_minute = deque(maxlen=60)  # Запросы за последнюю минуту
-        self.last_minute_check = time.time()
+        # Снимки (время, запросы, сумма времени ответа мс) за последнюю минуту - для RPM и среднего
+        self._window: Deque[Tuple[float, int, float]] = deque([(self.start_time, 0, 0.0)])
+        self._summary: Dict[str, Any] = {}
+        self._warnings: List[str] = []
+        self._sampled_at = 0.0
+        self.sampler = ProcessSampler(self.sample, self.sample_interval)
         
         logger.info("🔍 GrpcMonitor инициализирован")
         logger.info(f"📊 Лимиты: {self.limits.max_connections} соединений, {self.limits.max_requests_per_minute} RPS")
     
     def record_request(self, response_time: float, is_error: bool = False):
-        """Записать метрику запроса"""
-        current_time = time.time()
-        
-        # Обновляем счетчики
-        self.metrics.total_requests += 1
-        self.request_times.append(response_time)
-        
+        """Записать метрику запроса (response_time - секунды)"""
+        self.requests.value += 1
         if is_error:
-            self.error_count += 1
-        
-        # Добавляем запрос в минуту
-        self.requests_in_minute.append(current_time)
-        
-        # Обновляем метрики
-        self._update_metrics()
-        
-        # Проверяем лимиты
-        self._check_limits()
+            self.errors.value += 1
+        self.response_time_ms.observe(response_time * 1000.0)
+    
+    def record_admission(self, wait_time: float, queue_depth: int, rejected_reason: Optional[str] = None):
+        """Записать результат admission control (rejected_reason=None - запрос допущен)"""
+        self.admission_queue_depth.value = queue_depth
+        if rejected_reason:
+            rejections = self.admission_rejections
+            rejections[rejected_reason] = rejections.get(rejected_reason, 0) + 1
+        else:
+            self.admission_wait_ms.observe(wait_time * 1000.0)
+    
+    def record_maintenance(self, job: str, runtime: float, rows: int, lag: float, error: bool = False):
+        """Записать проход задачи обслуживания (runtime и lag - секунды)"""
+        stats = self.maintenance.get(job)
+        if stats is None:
+            stats = self.maintenance[job] = {
+                "runs": 0, "errors": 0, "rows": 0, "max_runtime": 0.0, "max_lag": 0.0
+            }
+        stats["runs"] += 1
+        stats["errors"] += int(error)
+        stats["rows"] += rows
+        stats["max_runtime"] = max(stats["max_runtime"], runtime)
+        stats["max_lag"] = max(stats["max_lag"], lag)
+        stats["last_rows"] = rows
+        stats["last_runtime"] = runtime
+        stats["last_lag"] = lag
+        stats["last_run_at"] = time.time()
     
     def set_active_connections(self, count: int):
         """Установить количество активных соединений"""
-        self.metrics.active_connections = count
-        self._check_limits()
+        self.active_connections.value = count
     
-    def _update_metrics(self):
-        """Обновить метрики"""
-        current_time = time.time()
+    def add_active_connections(self, delta: int):
+        """Изменить количество активных соединений (+1 при входе, -1 при выходе)"""
+        self.active_connections.value = max(0, self.active_connections.value + delta)
+    
+    def start_sampler(self):
+        """Запуск фонового сэмплера в текущем event loop"""
+        self.sampler.start()
+        logger.info(f"📈 Сэмплер метрик процесса запущен (интервал {self.sample_interval}s)")
+    
+    async def stop_sampler(self):
+        """Остановка фонового сэмплера"""
+        await self.sampler.stop()
+    
+    def sample(self):
+        """Снять CPU/RSS процесса и пересчитать сводку (вызывается сэмплером)"""
+        now = time.time()
         
-        # Обновляем RPS
-        if current_time - self.last_minute_check >= 60:
-            # Удаляем старые запросы (старше минуты)
-            minute_ago = current_time - 60
-            while self.requests_in_minute and self.requests_in_minute[0] < minute_ago:
-                self.requests_in_minute.popleft()
-            
-            self.metrics.requests_per_minute = len(self.requests_in_minute)
-            self.last_minute_check = current_time
+        # Системные метрики
+        self.metrics.cpu_usage = self.process.cpu_percent()
+        self.metrics.memory_rss = self.process.memory_info().rss
+        self.metrics.memory_usage = self.process.memory_percent()
         
-        # Обновляем среднее время ответа
-        if self.request_times:
-            self.metrics.avg_response_time = sum(self.request_times) / len(self.request_times)
+        # RPM и среднее время ответа за последнюю минуту - по разнице снимков
+        total = self.requests.value
+        total_ms = self.response_time_ms.sum
+        window = self._window
+        window.append((now, total, total_ms))
+        while len(window) > 1 and window[1][0] <= now - 60:
+            window.popleft()
+        # Базовый снимок - последний не позже минуты назад (или старт монитора)
+        _, base_total, base_ms = window[0]
+        recent = total - base_total
+        self.metrics.requests_per_minute = recent
+        self.metrics.avg_response_time = ((total_ms - base_ms) / recent / 1000.0) if recent else 0.0
         
-        # Обновляем процент ошибок
-        if self.metrics.total_requests > 0:
-            self.metrics.error_rate = self.error_count / self.metrics.total_requests
+        self.metrics.total_requests = total
+        self.metrics.error_rate = self.errors.value / total if total else 0.0
+        self.metrics.active_connections = self.active_connections.value
+        self.metrics.admission_queue_depth = self.admission_queue_depth.value
+        self.metrics.admission_rejections = dict(self.admission_rejections)
+        self.metrics.timestamp = now
         
-        # Обновляем системные метрики
-        self.metrics.memory_usage = self.process.memory_percent()
-        self.metrics.cpu_usage = self.process.cpu_percent()
-        self.metrics.timestamp = current_time
+        admission = self.admission_wait_ms.snapshot()
+        self._summary = {
+            "response_time_ms": self.response_time_ms.snapshot(),
+            "admission_wait_ms": admission,
+        }
+        self._sampled_at = now
+        self._warnings = self._check_limits()
+    
+    def _ensure_fresh(self):
+        """Без сэмплера (скрипты, тесты) сводка пересчитывается по запросу, не чаще интервала"""
+        if not self.sampler.is_running and time.time() - self._sampled_at >= self.sample_interval:
+            self.sample()
     
     def _check_limits(self):
         """Проверить лимиты и выдать предупреждения"""
@@ -141,28 +206,37 @@ class GrpcMonitor:
         return warnings
     
     def get_metrics(self) -> Dict[str, Any]:
-        """Получить текущие метрики"""
-        self._update_metrics()
+        """Получить текущие метрики (счётчики и готовая сводка сэмплера)"""
+        self._ensure_fresh()
+        summary = self._summary
+        admission = summary.get("admission_wait_ms", {})
+        total = self.requests.value
         return {
-            "active_connections": self.metrics.active_connections,
-            "total_requests": self.metrics.total_requests,
+            "active_connections": self.active_connections.value,
+            "total_requests": total,
             "requests_per_minute": self.metrics.requests_per_minute,
-            "error_rate": self.metrics.error_rate,
+            "error_rate": self.errors.value / total if total else 0.0,
             "avg_response_time": self.metrics.avg_response_time,
+            "response_time_ms": summary.get("response_time_ms", {}),
             "memory_usage": self.metrics.memory_usage,
+            "memory_rss": self.metrics.memory_rss,
             "cpu_usage": self.metrics.cpu_usage,
+            "admission_queue_depth": self.admission_queue_depth.value,
+            "admission_avg_wait": admission.get("avg_ms", 0.0) / 1000.0,
+            "admission_max_wait": admission.get("max_ms", 0.0) / 1000.0,
+            "admission_rejections": dict(self.admission_rejections),
+            "maintenance": {job: dict(stats) for job, stats in self.maintenance.items()},
             "uptime": time.time() - self.start_time,
-            "timestamp": self.metrics.timestamp
+            "timestamp": self.metrics.timestamp,
+            "sampler_running": self.sampler.is_running
         }
     
     def get_status(self) -> str:
-        """Получить статус сервера"""
-        metrics = self.get_metrics()
-        warnings = self._check_limits()
-        
-        if warnings:
+        """Получить статус сервера (по предупреждениям последнего пересчёта)"""
+        self._ensure_fresh()
+        if self._warnings:
             return "WARNING"
-        elif metrics["active_connections"] > 0:
+        elif self.active_connections.value > 0:
             return "ACTIVE"
         else:
             return "IDLE"
@@ -170,10 +244,19 @@ class GrpcMonitor:
     def reset_metrics(self):
         """Сбросить метрики"""
         self.metrics = GrpcMetrics()
-        self.request_times.clear()
-        self.error_count = 0
-        self.requests_in_minute.clear()
+        self.requests.reset()
+        self.errors.reset()
+        self.active_connections.set(0)
+        self.admission_queue_depth.set(0)
+        self.response_time_ms.reset()
+        self.admission_wait_ms.reset()
+        self.admission_rejections.clear()
+        self.maintenance.clear()
+        self._summary = {}
+        self._warnings = []
+        self._sampled_at = 0.0
         self.start_time = time.time()
+        self._window = deque([(self.start_time, 0, 0.0)])
         logger.info("🔄 Метрики сброшены")
 
 # Глобальный экземпляр монитора
@@ -191,11 +274,36 @@ def record_request(response_time: float, is_error: bool = False):
     monitor = get_monitor()
     monitor.record_request(response_time, is_error)
 
+def record_admission(wait_time: float, queue_depth: int, rejected_reason: Optional[str] = None):
+    """Записать результат admission control"""
+    monitor = get_monitor()
+    monitor.record_admission(wait_time, queue_depth, rejected_reason)
+
+def record_maintenance(job: str, runtime: float, rows: int, lag: float, error: bool = False):
+    """Записать проход задачи обслуживания"""
+    monitor = get_monitor()
+    monitor.record_maintenance(job, runtime, rows, lag, error)
+
 def set_active_connections(count: int):
     """Установить количество активных соединений"""
     monitor = get_monitor()
     monitor.set_active_connections(count)
 
+def add_active_connections(delta: int):
+    """Изменить количество активных соединений"""
+    monitor = get_monitor()
+    monitor.add_active_connections(delta)
+
+def start_sampler():
+    """Запустить фоновый сэмплер метрик процесса"""
+    monitor = get_monitor()
+    monitor.start_sampler()
+
+async def stop_sampler():
+    """Остановить фоновый сэмплер метрик процесса"""
+    monitor = get_monitor()
+    await monitor.stop_sampler()
+
 def get_metrics() -> Dict[str, Any]:
     """Получить текущие метрики"""
     monitor = get_monitor()
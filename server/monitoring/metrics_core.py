@@ -0,0 +1,106 @@
+"""
+Ядро метрик с минимальной стоимостью записи
+
+Запись метрики на горячем пути (каждый запрос) - несколько операций над
+целыми числами, без блокировок, psutil и логирования:
+- Counter/Gauge - простые поля. gRPC сервер работает на grpc.aio, все
+  записи идут из потока event loop, поэтому блокировки не нужны;
+- гистограммы - utils.latency_histogram.LatencyHistogram (логарифмические
+  корзины в стиле HDR, O(1) запись), общая для модулей и /metrics;
+- ProcessSampler - фоновая задача: раз в interval снимает CPU/RSS процесса
+  и вызывает пересчёт сводки (перцентили, RPM, проверка лимитов), так что
+  get_metrics() только читает готовые значения.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+
+class Counter:
+    """Монотонный счётчик"""
+
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: int = 1):
+        self.value += amount
+
+    def reset(self):
+        self.value = 0
+
+
+class Gauge:
+    """Текущее значение (соединения, глубина очереди)"""
+
+    __slots__ = ('value',)
+
+    def __init__(self, value: Union[int, float] = 0):
+        self.value = value
+
+    def set(self, value: Union[int, float]):
+        self.value = value
+
+    def add(self, amount: Union[int, float]):
+        self.value += amount
+
+
+class ProcessSampler:
+    """Фоновая задача: раз в interval вызывает sample() (CPU/RSS и пересчёт сводки)"""
+
+    def __init__(self, sample: Callable[[], Union[None, Awaitable[None]]], interval: float = 5.0):
+        """
+        Args:
+            sample: Снятие показаний и пересчёт сводки
+            interval: Период (секунды)
+        """
+        self.sample = sample
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self._stop_event = asyncio.Event()
+        self._stopping = False
+        self.samples = 0
+        self.errors = 0
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Запуск в текущем event loop (повторный вызов ничего не делает)"""
+        if self.is_running:
+            return
+        self._stopping = False
+        self._stop_event.clear()
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self, timeout: float = 5.0):
+        """Остановка: текущее снятие показаний доделывается"""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._stop_event.set()
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), timeout=timeout)
+        except asyncio.TimeoutError:
+            self._task.cancel()
+        self._task = None
+
+    async def _loop(self):
+        while not self._stopping:
+            try:
+                result = self.sample()
+                if asyncio.iscoroutine(result):
+                    await result
+                self.samples += 1
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"⚠️ Ошибка снятия метрик процесса: {e}")
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,301 @@
+"""
+Экспорт метрик в текстовом формате OpenMetrics (/metrics)
+
+- счётчики и гистограммы GrpcMonitor - типизированные семейства
+  (counter / gauge / histogram с корзинами LatencyHistogram);
+- гистограммы стадий трасс запросов (stage="...");
+- метрики модулей (TextProcessor, AudioProcessor, DatabaseManager, кэши) -
+  зарегистрированные коллекторы, возвращающие словарь; snapshot()
+  LatencyHistogram становится histogram, монотонные счётчики (COUNTER_KEYS)
+  - counter с _total, остальные числовые значения - gauge; имя - по пути ключей;
+- готовый текст кэшируется на cache_ttl секунд: частый опрос (каждые 5 с,
+  несколько scraper'ов) не пересобирает метрики модулей.
+"""
+
+import logging
+import math
+import os
+import re
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .grpc_monitor import GrpcMonitor, get_monitor
+from utils.latency_histogram import LatencyHistogram
+
+from .tracing import TraceRecorder, get_trace_recorder
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+PREFIX = "nexy"
+
+_INVALID_NAME_CHARS = re.compile(r'[^a-zA-Z0-9_]+')
+
+# Ключи метрик модулей, которые только растут (counter); вложенный словарь
+# под таким ключом (rejected: {reason: n}) - счётчики целиком
+COUNTER_KEYS = frozenset((
+    'hits', 'misses', 'evictions', 'expirations', 'invalidations', 'loads', 'load_errors', 'stale_loads',
+    'coalesced', 'cache_hits', 'requests', 'total_requests', 'processed', 'errors', 'calls', 'rows',
+    'written', 'rejected', 'rejected_total', 'admitted', 'admitted_immediately', 'enqueued', 'flushed',
+    'batches', 'failed_batches', 'spilled', 'replayed', 'dropped', 'opened', 'closed', 'discarded',
+    'retired', 'exhausted', 'connect_failures', 'probe_failures', 'submitted', 'completed', 'failed',
+    'timeouts', 'aborted', 'bytes_in', 'bytes_out', 'bytes_saved', 'truncated', 'with_context',
+    'lines_used', 'lines_dropped', 'analyses', 'analysis_errors', 'jobs_dropped', 'turns_submitted',
+    'turns_merged', 'turns_dropped', 'facts_added', 'facts_duplicate', 'facts_compacted', 'runs',
+    'total_allowed', 'total_blocked', 'total_cleaned', 'total_errors', 'total_filtered',
+    'total_preprocessed', 'total_sentences', 'total_split', 'total_sessions', 'expired_sessions',
+    'interrupted_sessions',
+))
+
+
+def _metric_name(*parts: str) -> str:
+    cleaned = (_INVALID_NAME_CHARS.sub("_", str(part)).strip("_") for part in parts)
+    name = "_".join(part for part in cleaned if part)
+    return name if not name[:1].isdigit() else f"_{name}"
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, int):
+        return str(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class OpenMetricsExporter:
+    """Сборка текста /metrics из GrpcMonitor и коллекторов модулей"""
+
+    def __init__(self, monitor: Optional[GrpcMonitor] = None, cache_ttl: Optional[float] = None,
+                 trace_recorder: Optional[TraceRecorder] = None):
+        """
+        Args:
+            monitor: Монитор gRPC (по умолчанию - глобальный)
+            trace_recorder: Гистограммы стадий (по умолчанию - глобальные)
+            cache_ttl: Время жизни готового текста (секунды, 0 - без кэша)
+        """
+        self.monitor = monitor
+        self.trace_recorder = trace_recorder
+        self.cache_ttl = cache_ttl if cache_ttl is not None else float(os.getenv("METRICS_CACHE_TTL", "2"))
+        self.collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        self.collector_errors: Dict[str, int] = {}
+        self._cached: Optional[bytes] = None
+        self._cached_at = 0.0
+        self.renders = 0
+        self.cache_hits = 0
+
+    def register(self, name: str, collect: Callable[[], Dict[str, Any]]):
+        """Регистрация коллектора модуля (name - префикс семейств)"""
+        self.collectors[name] = collect
+        self.invalidate()
+
+    def unregister(self, name: str):
+        self.collectors.pop(name, None)
+        self.invalidate()
+
+    def invalidate(self):
+        self._cached = None
+
+    def render(self) -> bytes:
+        """Текст OpenMetrics (UTF-8), из кэша если он свежий"""
+        now = time.monotonic()
+        if self._cached is not None and now - self._cached_at < self.cache_ttl:
+            self.cache_hits += 1
+            return self._cached
+        lines: List[str] = []
+        families: Set[str] = set()
+        self._render_monitor(lines, families)
+        for name, collect in list(self.collectors.items()):
+            try:
+                values = collect()
+            except Exception as e:
+                self.collector_errors[name] = self.collector_errors.get(name, 0) + 1
+                logger.warning(f"⚠️ Коллектор метрик {name} завершился с ошибкой: {e}")
+                continue
+            if values:
+                self._render_dict(lines, families, _metric_name(PREFIX, name), values)
+        self._render_exporter(lines, families)
+        lines.append("# EOF\n")
+        self._cached = "\n".join(lines).encode("utf-8")
+        self._cached_at = now
+        self.renders += 1
+        return self._cached
+
+    # Семейства GrpcMonitor
+
+    def _render_monitor(self, lines: List[str], families: Set[str]):
+        monitor = self.monitor or get_monitor()
+        metrics = monitor.get_metrics()
+
+        self._family(lines, families, "grpc_requests", "counter", "Completed StreamAudio requests")
+        lines.append(f"{PREFIX}_grpc_requests_total {monitor.requests.value}")
+        self._family(lines, families, "grpc_errors", "counter", "Failed StreamAudio requests")
+        lines.append(f"{PREFIX}_grpc_errors_total {monitor.errors.value}")
+        self._gauge(lines, families, "grpc_active_connections", monitor.active_connections.value, "Open StreamAudio calls")
+        self._gauge(lines, families, "grpc_requests_per_minute", metrics["requests_per_minute"])
+        self._histogram(lines, families, "grpc_response_time_seconds", monitor.response_time_ms, "StreamAudio response time")
+
+        self._gauge(lines, families, "admission_queue_depth", monitor.admission_queue_depth.value)
+        self._histogram(lines, families, "admission_wait_seconds", monitor.admission_wait_ms, "Admission control wait")
+        self._family(lines, families, "admission_rejections", "counter", "Rejected requests by reason")
+        for reason, count in monitor.admission_rejections.items():
+            lines.append(f'{PREFIX}_admission_rejections_total{{reason="{_escape_label(reason)}"}} {count}')
+
+        if monitor.maintenance:
+            for field, kind in (("runs", "counter"), ("errors", "counter"), ("rows", "counter")):
+                self._family(lines, families, f"maintenance_{field}", kind)
+                for job, stats in monitor.maintenance.items():
+                    lines.append(f'{PREFIX}_maintenance_{field}_total{{job="{_escape_label(job)}"}} {stats[field]}')
+            for field in ("last_runtime", "max_runtime", "last_lag", "max_lag"):
+                self._family(lines, families, f"maintenance_{field}_seconds", "gauge")
+                for job, stats in monitor.maintenance.items():
+                    lines.append(f'{PREFIX}_maintenance_{field}_seconds{{job="{_escape_label(job)}"}} '
+                                 f'{_format_value(stats.get(field, 0.0))}')
+
+        self._render_stages(lines, families)
+
+        self._gauge(lines, families, "process_cpu_percent", metrics["cpu_usage"])
+        self._gauge(lines, families, "process_memory_percent", metrics["memory_usage"])
+        self._gauge(lines, families, "process_resident_memory_bytes", metrics["memory_rss"])
+        self._gauge(lines, families, "process_uptime_seconds", metrics["uptime"])
+
+    def _render_stages(self, lines: List[str], families: Set[str]):
+        """Гистограммы стадий из трасс запросов (monitoring.tracing)"""
+        recorder = self.trace_recorder or get_trace_recorder()
+        if not recorder.traces:
+            return
+        self._histogram(lines, families, "request_trace_duration_seconds", recorder.request_ms, "Traced request duration")
+        self._family(lines, families, "stage_duration_seconds", "histogram",
+                     "Span duration per pipeline stage (marks: time since request start)")
+        for stage, histogram in recorder.stages.items():
+            self._histogram(lines, families, "stage_duration_seconds", histogram,
+                            labels=f'stage="{_escape_label(stage)}"')
+
+    def _render_exporter(self, lines: List[str], families: Set[str]):
+        self._family(lines, families, "metrics_collector_errors", "counter", "Module collector failures")
+        for name, count in self.collector_errors.items():
+            lines.append(f'{PREFIX}_metrics_collector_errors_total{{collector="{_escape_label(name)}"}} {count}')
+
+    # Форматирование
+
+    @staticmethod
+    def _family(lines: List[str], families: Set[str], name: str, kind: str, help_text: str = "") -> bool:
+        family = f"{PREFIX}_{name}"
+        if family in families:
+            return False
+        families.add(family)
+        lines.append(f"# TYPE {family} {kind}")
+        if help_text:
+            lines.append(f"# HELP {family} {help_text}")
+        return True
+
+    def _gauge(self, lines: List[str], families: Set[str], name: str, value: float, help_text: str = ""):
+        if self._family(lines, families, name, "gauge", help_text):
+            lines.append(f"{PREFIX}_{name} {_format_value(value)}")
+
+    def _histogram(self, lines: List[str], families: Set[str], name: str, histogram: LatencyHistogram,
+                   help_text: str = "", labels: str = ""):
+        """
+        LatencyHistogram (мс) -> histogram в секундах; корзины - непустые корзины гистограммы
+
+        labels - метки серии ('stage="tts"'), семейство объявляется один раз
+        """
+        self._histogram_lines(lines, families, f"{PREFIX}_{name}", histogram.buckets(), histogram.count,
+                              histogram.sum, 1000.0, help_text, labels)
+
+    @staticmethod
+    def _histogram_lines(lines: List[str], families: Set[str], family: str, buckets: Iterable[Tuple[float, int]],
+                         count: int, total: float, scale: float, help_text: str = "", labels: str = ""):
+        if family not in families:
+            families.add(family)
+            lines.append(f"# TYPE {family} histogram")
+            if help_text:
+                lines.append(f"# HELP {family} {help_text}")
+        elif not labels:
+            return
+        prefix = f"{labels}," if labels else ""
+        suffix = f"{{{labels}}}" if labels else ""
+        for upper_bound, cumulative in buckets:
+            if math.isinf(upper_bound):
+                break
+            lines.append(f'{family}_bucket{{{prefix}le="{_format_value(upper_bound / scale)}"}} {cumulative}')
+        lines.append(f'{family}_bucket{{{prefix}le="+Inf"}} {count}')
+        lines.append(f"{family}_count{suffix} {count}")
+        lines.append(f"{family}_sum{suffix} {_format_value(total / scale)}")
+
+    def _render_snapshot(self, lines: List[str], families: Set[str], name: str, snapshot: Dict[str, Any]):
+        """snapshot() LatencyHistogram из коллектора -> histogram (мс - в секундах, *_ms -> *_seconds)"""
+        unit = snapshot.get("unit", "")
+        suffix = f"_{unit}" if unit else ""
+        scale = 1.0
+        if unit == "ms":
+            name = f"{name[:-3] if name.endswith('_ms') else name}_seconds"
+            scale = 1000.0
+        if name in families:
+            return
+        self._histogram_lines(lines, families, name, snapshot["buckets"], snapshot["count"],
+                              snapshot.get(f"sum{suffix}", 0.0), scale)
+
+    def _render_dict(self, lines: List[str], families: Set[str], prefix: str, values: Dict[str, Any],
+                     counters: bool = False):
+        """
+        Числовые значения словаря (рекурсивно) -> prefix_путь_ключей: counter для
+        COUNTER_KEYS, иначе gauge; snapshot() гистограммы -> histogram;
+        строки и списки пропускаются
+        """
+        for key, value in values.items():
+            name = _metric_name(prefix, key)
+            is_counter = counters or key in COUNTER_KEYS
+            if isinstance(value, dict):
+                if isinstance(value.get("buckets"), list) and "count" in value:
+                    self._render_snapshot(lines, families, name, value)
+                else:
+                    self._render_dict(lines, families, name, value, is_counter)
+                continue
+            if isinstance(value, bool):
+                value = int(value)
+                is_counter = False
+            elif not isinstance(value, (int, float)):
+                continue
+            if is_counter:
+                # Семейство counter без _total, отсчёт - с ним (rejected_total -> rejected)
+                family = name[:-len("_total")] if name.endswith("_total") else name
+                if family in families:
+                    continue
+                families.add(family)
+                lines.append(f"# TYPE {family} counter")
+                lines.append(f"{family}_total {_format_value(value)}")
+                continue
+            if name in families:
+                continue
+            families.add(name)
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_format_value(value)}")
+
+
+# Глобальный экспортёр
+_exporter: Optional[OpenMetricsExporter] = None
+
+def get_exporter() -> OpenMetricsExporter:
+    """Получить глобальный экспортёр"""
+    global _exporter
+    if _exporter is None:
+        _exporter = OpenMetricsExporter()
+    return _exporter
+
+def register_collector(name: str, collect: Callable[[], Dict[str, Any]]):
+    """Зарегистрировать коллектор метрик модуля"""
+    get_exporter().register(name, collect)
+
+def unregister_collector(name: str):
+    """Удалить коллектор метрик модуля"""
+    get_exporter().unregister(name)
+
+def render_metrics() -> bytes:
+    """Текст /metrics в формате OpenMetrics"""
+    return get_exporter().render()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Офлайн разбор трасс запросов (JSONL из TRACE_JSONL_PATH)
+
+Для каждого запроса печатается waterfall стадий: начало и длительность
+от старта StreamAudio, полоса на общей шкале запроса; отметки (первый
+токен, первый аудио чанк) - ◆. В конце - сводка по стадиям (p50/p95/max
+по всем запросам файла).
+
+Запуск (из каталога server):
+    python monitoring/trace_report.py traces.jsonl --limit 5
+    python monitoring/trace_report.py traces.jsonl --session session_123
+"""
+
+import argparse
+import json
+import math
+import sys
+from typing import Any, Dict, List
+
+
+def load_traces(path: str) -> List[Dict[str, Any]]:
+    """Трассы из файла; повреждённые строки (обрыв записи) пропускаются"""
+    traces = []
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                traces.append(json.loads(line))
+            except json.JSONDecodeError:
+                print(f"⚠️ line {line_number}: invalid JSON, skipped", file=sys.stderr)
+    return traces
+
+
+def _format_attrs(attrs: Dict[str, Any]) -> str:
+    return " ".join(f"{key}={value}" for key, value in attrs.items() if value is not None)
+
+
+def render_waterfall(trace: Dict[str, Any], width: int = 50) -> str:
+    """Waterfall одного запроса"""
+    total = max(trace.get('duration_ms') or 0.0, 1e-6)
+    spans = trace.get('spans', [])
+    name_width = max([len(span['name']) for span in spans] + [5])
+    lines = [
+        f"{trace.get('session_id')}  hardware_id={trace.get('hardware_id')}  "
+        f"{trace.get('duration_ms', 0.0):.1f}ms  status={trace.get('status')}",
+        f"  {'stage':<{name_width}} {'start':>10} {'dur':>10}  timeline",
+    ]
+    scale = width / total
+    for span in spans:
+        start, duration = span['start_ms'], span['duration_ms']
+        offset = min(width - 1, int(start * scale))
+        if duration > 0:
+            length = max(1, min(width - offset, int(math.ceil(duration * scale))))
+            bar = " " * offset + "█" * length
+            duration_text = f"{duration:8.1f}ms"
+        else:
+            bar = " " * offset + "◆"
+            duration_text = " " * 10
+        attrs = _format_attrs(span.get('attrs') or {})
+        lines.append(f"  {span['name']:<{name_width}} {start:8.1f}ms {duration_text}  |{bar:<{width}}| {attrs}".rstrip())
+    if trace.get('dropped_spans'):
+        lines.append(f"  ... {trace['dropped_spans']} spans dropped")
+    return "\n".join(lines)
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def render_summary(traces: List[Dict[str, Any]]) -> str:
+    """Сводка по стадиям: спаны - длительность, отметки - время от начала запроса"""
+    stages: Dict[str, List[float]] = {}
+    for trace in traces:
+        for span in trace.get('spans', []):
+            value = span['duration_ms'] if span['duration_ms'] > 0 else span['start_ms']
+            stages.setdefault(span['name'], []).append(value)
+    totals = [trace.get('duration_ms', 0.0) for trace in traces]
+    name_width = max([len(name) for name in stages] + [len("request")])
+    lines = [
+        f"{len(traces)} requests",
+        f"  {'stage':<{name_width}} {'count':>7} {'p50':>10} {'p95':>10} {'max':>10}",
+    ]
+    rows = [("request", totals)] + sorted(stages.items(), key=lambda item: _percentile(item[1], 0.5))
+    for name, values in rows:
+        if not values:
+            continue
+        lines.append(
+            f"  {name:<{name_width}} {len(values):>7} {_percentile(values, 0.5):>8.1f}ms "
+            f"{_percentile(values, 0.95):>8.1f}ms {max(values):>8.1f}ms"
+        )
+    return "\n".join(lines)
+
+
+def main(args) -> int:
+    traces = load_traces(args.path)
+    if not traces:
+        print("no traces")
+        return 1
+    if args.session:
+        selected = [trace for trace in traces if trace.get('session_id') == args.session]
+        if not selected:
+            print(f"session {args.session} not found")
+            return 1
+    elif args.sort == 'slowest':
+        selected = sorted(traces, key=lambda trace: trace.get('duration_ms', 0.0), reverse=True)[:args.limit]
+    else:
+        selected = traces[-args.limit:]
+
+    for trace in selected:
+        print(render_waterfall(trace, args.width))
+        print()
+    print(render_summary(traces))
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-request latency waterfall from a trace JSONL file")
+    parser.add_argument('path')
+    parser.add_argument('--session', help='Only this session_id')
+    parser.add_argument('--sort', choices=('slowest', 'recent'), default='slowest')
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--width', type=int, default=50)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,131 @@
+"""
+Сборка трасс запросов (utils.request_trace) в гистограммы стадий и JSONL
+
+- каждый спан записывается в LatencyHistogram своей стадии (мс): для спанов -
+  длительность, для отметок (нулевая длительность) - время от начала
+  запроса, т.е. "через сколько после запроса пришёл первый токен";
+- при TRACE_JSONL_PATH трасса целиком (спаны с началом и длительностью)
+  дописывается строкой JSON - для офлайн разбора monitoring/trace_report.py;
+- гистограммы стадий экспортируются в /metrics (nexy_stage_duration_seconds).
+"""
+
+import json
+import logging
+import os
+import random
+from typing import Any, Dict, Optional
+
+from utils.latency_histogram import LatencyHistogram
+from utils.request_trace import RequestTrace
+
+logger = logging.getLogger(__name__)
+
+# Ограничение числа стадий (метка stage в /metrics)
+MAX_STAGES = 100
+
+
+class TraceRecorder:
+    """Гистограммы стадий и необязательный JSONL файл трасс"""
+
+    def __init__(self,
+                 enabled: Optional[bool] = None,
+                 jsonl_path: Optional[str] = None,
+                 jsonl_sample: Optional[float] = None):
+        """
+        Args:
+            enabled: Трассировка запросов (TRACING_ENABLED)
+            jsonl_path: Файл трасс, пусто - не писать (TRACE_JSONL_PATH)
+            jsonl_sample: Доля запросов, попадающих в JSONL (TRACE_JSONL_SAMPLE)
+        """
+        self.enabled = enabled if enabled is not None else os.getenv("TRACING_ENABLED", "true").lower() == "true"
+        self.jsonl_path = jsonl_path if jsonl_path is not None else os.getenv("TRACE_JSONL_PATH", "")
+        self.jsonl_sample = jsonl_sample if jsonl_sample is not None else float(os.getenv("TRACE_JSONL_SAMPLE", "1.0"))
+        self.stages: Dict[str, LatencyHistogram] = {}
+        self.request_ms = LatencyHistogram()
+        self.traces = 0
+        self.statuses: Dict[str, int] = {}
+        self.dropped_stages = 0
+        self.jsonl_written = 0
+        self.jsonl_errors = 0
+        self._jsonl_file = None
+
+    def start(self, session_id: str, hardware_id: str = 'unknown') -> Optional[RequestTrace]:
+        """Новая трасса (None если трассировка выключена)"""
+        if not self.enabled:
+            return None
+        return RequestTrace(session_id, hardware_id)
+
+    def finish(self, trace: Optional[RequestTrace], status: str = 'ok'):
+        """Завершение трассы: гистограммы стадий и запись в JSONL"""
+        if trace is None or trace.finished_at is not None:
+            return
+        trace.finish(status)
+        self.traces += 1
+        self.statuses[trace.status] = self.statuses.get(trace.status, 0) + 1
+        self.request_ms.observe(trace.duration_ms)
+
+        origin = trace.started_at
+        stages = self.stages
+        for name, started_at, ended_at, _ in trace.spans:
+            histogram = stages.get(name)
+            if histogram is None:
+                if len(stages) >= MAX_STAGES:
+                    self.dropped_stages += 1
+                    continue
+                histogram = stages[name] = LatencyHistogram()
+            # Отметка - время от начала запроса, спан - длительность
+            histogram.observe((ended_at - (started_at if ended_at > started_at else origin)) * 1000)
+
+        if self.jsonl_path and (self.jsonl_sample >= 1.0 or random.random() < self.jsonl_sample):
+            self._write_jsonl(trace.to_dict())
+
+    def _write_jsonl(self, record: Dict[str, Any]):
+        try:
+            if self._jsonl_file is None:
+                # Построчная буферизация: строка трассы - один write, без отдельного flush
+                self._jsonl_file = open(self.jsonl_path, 'a', encoding='utf-8', buffering=1)
+                logger.info(f"🧭 Трассы запросов пишутся в {self.jsonl_path}")
+            self._jsonl_file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            self.jsonl_written += 1
+        except OSError as e:
+            self.jsonl_errors += 1
+            logger.warning(f"⚠️ Не удалось записать трассу в {self.jsonl_path}: {e} - запись трасс отключена")
+            self.jsonl_path = ""
+
+    def close(self):
+        if self._jsonl_file is not None:
+            self._jsonl_file.close()
+            self._jsonl_file = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Сводка по стадиям (мс)"""
+        return {
+            "enabled": self.enabled,
+            "traces": self.traces,
+            "statuses": dict(self.statuses),
+            "request_ms": self.request_ms.snapshot(),
+            "stages_ms": {name: histogram.snapshot() for name, histogram in self.stages.items()},
+            "dropped_stages": self.dropped_stages,
+            "jsonl_path": self.jsonl_path,
+            "jsonl_written": self.jsonl_written,
+            "jsonl_errors": self.jsonl_errors,
+        }
+
+
+# Глобальный экземпляр
+_recorder: Optional[TraceRecorder] = None
+
+def get_trace_recorder() -> TraceRecorder:
+    """Получить глобальный TraceRecorder"""
+    global _recorder
+    if _recorder is None:
+        _recorder = TraceRecorder()
+    return _recorder
+
+def start_trace(session_id: str, hardware_id: str = 'unknown') -> Optional[RequestTrace]:
+    """Начать трассу запроса (активировать - trace.activate())"""
+    return get_trace_recorder().start(session_id, hardware_id)
+
+def finish_trace(trace: Optional[RequestTrace], status: str = 'ok'):
+    """Завершить трассу запроса"""
+    get_trace_recorder().finish(trace, status)
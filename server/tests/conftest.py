@@ -0,0 +1,25 @@
+"""
+Тесты сервера на локальных заменах внешних сервисов
+
+PostgreSQL - modules/database/providers/fake_postgres_backend.py,
+Gemini Live - modules/text_processing/providers/fake_live_backend.py.
+Асинхронные сценарии выполняются через asyncio.run() внутри теста.
+
+Запуск (из каталога server):
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from modules.database.providers.fake_postgres_backend import FakeDatabase
+
+
+@pytest.fixture
+def fake_db() -> FakeDatabase:
+    """Фейковая БД без задержки round-trip"""
+    return FakeDatabase(latency=0.0)
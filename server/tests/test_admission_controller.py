@@ -0,0 +1,169 @@
+"""
+AdmissionController: глобальный лимит, очередь, token bucket на hardware_id
+"""
+
+import asyncio
+
+import pytest
+
+from modules.grpc_service.core.admission_controller import (
+    REJECT_DEADLINE,
+    REJECT_QUEUE_FULL,
+    REJECT_RATE_LIMITED,
+    AdmissionController,
+    AdmissionRejectedError,
+    TokenBucket,
+)
+
+
+def test_token_bucket_refill():
+    bucket = TokenBucket(capacity=2, refill_per_sec=1.0, now=0.0)
+    assert bucket.try_take(0.0) and bucket.try_take(0.0)
+    assert not bucket.try_take(0.0)
+    assert bucket.retry_after(0.0) == pytest.approx(1.0)
+    assert bucket.try_take(1.0)
+    assert not bucket.is_full(1.0)
+    assert bucket.is_full(10.0)
+
+
+def test_slot_is_handed_to_waiters_in_fifo_order():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=5, max_wait=1.0, user_requests_per_minute=0)
+        first = await controller.acquire('hw-0')
+        order = []
+
+        async def waiter(name):
+            ticket = await controller.acquire(name)
+            order.append(name)
+            controller.release(ticket)
+
+        tasks = [asyncio.create_task(waiter(f'hw-{index}')) for index in range(1, 4)]
+        await asyncio.sleep(0)
+        assert controller.queue_depth == 3
+        controller.release(first)
+        await asyncio.gather(*tasks)
+        assert order == ['hw-1', 'hw-2', 'hw-3']
+        assert controller.active == 0
+        metrics = controller.get_metrics()
+        assert metrics['admitted'] == 4 and metrics['admitted_immediately'] == 1
+
+    asyncio.run(scenario())
+
+
+def test_queue_full_is_rejected_immediately():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=1, max_wait=1.0, user_requests_per_minute=0)
+        ticket = await controller.acquire('hw-0')
+        queued = asyncio.create_task(controller.acquire('hw-1'))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejectedError) as error:
+            await controller.acquire('hw-2')
+        assert error.value.reason == REJECT_QUEUE_FULL
+        controller.release(ticket)
+        controller.release(await queued)
+        assert controller.active == 0
+
+    asyncio.run(scenario())
+
+
+def test_wait_past_deadline_is_rejected():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=5, max_wait=0.05, user_requests_per_minute=0)
+        ticket = await controller.acquire('hw-0')
+        with pytest.raises(AdmissionRejectedError) as error:
+            await controller.acquire('hw-1')
+        assert error.value.reason == REJECT_DEADLINE
+        # Дедлайн клиента уже истёк - без ожидания
+        with pytest.raises(AdmissionRejectedError):
+            await controller.acquire('hw-1', time_remaining=0.0)
+        controller.release(ticket)
+        assert controller.active == 0 and controller.queue_depth == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_does_not_leak_slot():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=5, max_wait=1.0, user_requests_per_minute=0)
+        ticket = await controller.acquire('hw-0')
+        waiter = asyncio.create_task(controller.acquire('hw-1'))
+        await asyncio.sleep(0)
+        # Слот передан и ожидающий отменён в том же шаге цикла
+        controller.release(ticket)
+        waiter.cancel()
+        # В зависимости от версии asyncio wait_for отдаёт уже полученный слот или отмену
+        try:
+            controller.release(await waiter)
+        except asyncio.CancelledError:
+            pass
+        assert controller.active == 0
+        controller.release(await controller.acquire('hw-2'))
+
+    asyncio.run(scenario())
+
+
+def test_rate_limit_per_hardware_id():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=10, user_burst=2, user_requests_per_minute=60)
+        for _ in range(2):
+            controller.release(await controller.acquire('hw-1'))
+        with pytest.raises(AdmissionRejectedError) as error:
+            await controller.acquire('hw-1')
+        assert error.value.reason == REJECT_RATE_LIMITED
+        assert 0 < error.value.retry_after <= 1.0
+        # Лимит у каждого пользователя свой
+        controller.release(await controller.acquire('hw-2'))
+        assert controller.get_metrics()['rejected'][REJECT_RATE_LIMITED] == 1
+
+    asyncio.run(scenario())
+
+
+def test_rejected_by_queue_does_not_spend_user_token():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=0, user_burst=1, user_requests_per_minute=1)
+        ticket = await controller.acquire('hw-0')
+        # Очередь полна - токен hw-1 возвращается, следующий запрос не rate_limited
+        for _ in range(3):
+            with pytest.raises(AdmissionRejectedError) as error:
+                await controller.acquire('hw-1')
+            assert error.value.reason == REJECT_QUEUE_FULL
+        controller.release(ticket)
+        controller.release(await controller.acquire('hw-1'))
+        assert controller.get_metrics()['rejected'][REJECT_RATE_LIMITED] == 0
+
+    asyncio.run(scenario())
+
+
+def test_server_wide_rate_limit():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=10, user_burst=5, user_requests_per_minute=60,
+                                         requests_per_minute=3)
+        for index in range(3):
+            controller.release(await controller.acquire(f'hw-{index}'))
+        with pytest.raises(AdmissionRejectedError) as error:
+            await controller.acquire('hw-3')
+        assert error.value.reason == REJECT_RATE_LIMITED
+        assert 0 < error.value.retry_after <= 20.0
+        # Токен пользователя возвращён: отказ сервера не расходует его лимит
+        assert controller._buckets['hw-3'].tokens == pytest.approx(5.0, abs=0.01)
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_gets_its_tokens_back():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=5, max_wait=1.0, user_burst=1,
+                                         user_requests_per_minute=1, requests_per_minute=2)
+        ticket = await controller.acquire('hw-0')
+        waiter = asyncio.create_task(controller.acquire('hw-1'))
+        await asyncio.sleep(0)
+        assert controller.queue_depth == 1
+        # Клиент отключился в очереди - токены hw-1 и сервера возвращаются
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        controller.release(ticket)
+        controller.release(await controller.acquire('hw-1'))
+        assert controller.get_metrics()['rejected'][REJECT_RATE_LIMITED] == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,32 @@
+"""
+ContextAssembler: блок [MEMORY] урезается по бюджету, ранг фактов - из fact_store
+"""
+
+from modules.memory_management.core.fact_store import MemoryFact, render_facts, select_facts
+from modules.text_processing.core.context_assembler import ContextAssembler, estimate_tokens
+
+
+def _fact(text: str, at: float) -> MemoryFact:
+    return MemoryFact(text=text, created_at=at, seen_at=at)
+
+
+def test_select_facts_returns_rank_order():
+    facts = [_fact("has a dog named Rex", 1), _fact("likes green tea", 2), _fact("lives in Berlin", 3)]
+    ranked = select_facts(facts, limit=3, query="what tea do I like?")
+    # Релевантный запросу первым, дальше самые свежие
+    assert [fact.text for fact in ranked] == ["likes green tea", "lives in Berlin", "has a dog named Rex"]
+
+
+def test_assembler_cuts_ranked_list_without_reranking():
+    facts = [_fact(f"fact number {index} about the user", index) for index in range(6)]
+    ranked = select_facts(facts, limit=6, query="number 2")
+    long_text = render_facts(ranked)
+    line_tokens = estimate_tokens(ranked[0].text) + 1
+    budget = estimate_tokens("[MEMORY]\n[/MEMORY]") + estimate_tokens("User:\n") + 2 * line_tokens
+    assembler = ContextAssembler(max_context_tokens=budget)
+
+    prompt = assembler.assemble("number 2", {'short': '', 'long': long_text})
+    # Первые две строки ранжированного списка, в том же порядке
+    assert "- " + ranked[0].text + "\n- " + ranked[1].text + "\n[/MEMORY]" in prompt
+    assert ranked[2].text not in prompt
+    assert assembler.get_metrics()['lines_dropped'] == 4
@@ -0,0 +1,96 @@
+"""
+PostgreSQL провайдеры на FakeDatabase: CRUD, память, сессии
+"""
+
+import asyncio
+
+import pytest
+
+from modules.database.providers.asyncpg_provider import AsyncPostgreSQLProvider
+from modules.database.providers.fake_postgres_backend import FakeAsyncpgPool, FakePsycopgPool
+
+
+def _asyncpg_provider(db) -> AsyncPostgreSQLProvider:
+    return AsyncPostgreSQLProvider({'pool': FakeAsyncpgPool(db, max_size=4, init=AsyncPostgreSQLProvider._init_connection)})
+
+
+async def _operation(provider, operation: str, table: str, data=None, filters=None) -> dict:
+    results = [item async for item in provider.process(
+        {'operation': operation, 'table': table, 'data': data or {}, 'filters': filters or {}}
+    )]
+    return results[0]
+
+
+def test_asyncpg_provider_crud(fake_db):
+    async def scenario():
+        provider = _asyncpg_provider(fake_db)
+        assert await provider.initialize()
+
+        created = await _operation(provider, 'create', 'screenshots', {'session_id': 's1', 'file_path': '/a.png'})
+        assert created['success']
+        record_id = created['data']['id']
+
+        read = await _operation(provider, 'read', 'screenshots', filters={'session_id': 's1'})
+        assert read['count'] == 1 and read['data'][0]['file_path'] == '/a.png'
+
+        updated = await _operation(provider, 'update', 'screenshots', {'file_path': '/b.png'}, {'id': record_id})
+        assert updated['success'] and updated['data']['file_path'] == '/b.png'
+
+        deleted = await _operation(provider, 'delete', 'screenshots', filters={'id': record_id})
+        assert deleted['success']
+        read = await _operation(provider, 'read', 'screenshots', filters={'session_id': 's1'})
+        assert read['count'] == 0
+
+        await provider.cleanup()
+
+    asyncio.run(scenario())
+
+
+def test_asyncpg_provider_rejects_unsafe_identifiers(fake_db):
+    async def scenario():
+        provider = _asyncpg_provider(fake_db)
+        assert await provider.initialize()
+        result = await _operation(provider, 'read', 'users; DROP TABLE users', filters={})
+        assert not result['success']
+        result = await _operation(provider, 'create', 'users', {'name) VALUES (1); --': 'x'})
+        assert not result['success']
+
+    asyncio.run(scenario())
+
+
+def test_asyncpg_provider_memory_and_sessions(fake_db):
+    async def scenario():
+        provider = _asyncpg_provider(fake_db)
+        assert await provider.initialize()
+
+        user_id = await provider.create_user('hw-1')
+        assert user_id
+        assert await provider.get_user_memory('hw-1') == {'short': '', 'long': ''}
+        assert await provider.update_user_memory('hw-1', 'short text', 'long text')
+        assert await provider.get_user_memory('hw-1') == {'short': 'short text', 'long': 'long text'}
+        assert not await provider.update_user_memory('hw-unknown', 's', 'l')
+
+        session_id = await provider.create_session(user_id, {'client': 'test'})
+        assert session_id
+        assert await provider.end_session(session_id)
+        session = fake_db.tables['sessions'][0]
+        assert session['status'] == 'ended' and session['end_time'] is not None
+
+    asyncio.run(scenario())
+
+
+def test_psycopg2_provider_crud(fake_db):
+    pytest.importorskip('psycopg2')
+    from modules.database.providers.postgresql_provider import PostgreSQLProvider
+
+    async def scenario():
+        provider = PostgreSQLProvider({'pool': FakePsycopgPool(fake_db)})
+        assert await provider.initialize()
+        user_id = await provider.create_user('hw-1')
+        assert user_id
+        assert await provider.update_user_memory('hw-1', 'short', 'long')
+        assert await provider.get_user_memory('hw-1') == {'short': 'short', 'long': 'long'}
+        session_id = await provider.create_session(user_id)
+        assert await provider.end_session(session_id)
+
+    asyncio.run(scenario())
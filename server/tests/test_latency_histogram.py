@@ -0,0 +1,66 @@
+"""
+LatencyHistogram: оценка перцентилей по логарифмическим корзинам, ключи
+snapshot и экспорт snapshot модулей в /metrics как histogram
+"""
+
+from modules.text_processing.core.context_assembler import ContextAssembler
+from monitoring.openmetrics import OpenMetricsExporter
+from monitoring.tracing import TraceRecorder
+from utils.latency_histogram import LatencyHistogram
+
+
+def test_percentile_error_is_bounded_and_capped_by_max():
+    histogram = LatencyHistogram()
+    for value in (1.0, 2.0, 3.0, 42.0):
+        histogram.observe(value)
+    assert histogram.percentile(0.95) == 42.0
+    # Верхняя граница корзины - не дальше 1/sub_buckets от значения
+    assert 2.0 <= histogram.percentile(0.50) <= 2.0 * (1 + 1 / histogram.sub_buckets)
+    snapshot = histogram.snapshot()
+    assert snapshot['p99_ms'] <= snapshot['max_ms'] == 42.0
+    assert snapshot['sum_ms'] == 48.0 and snapshot['unit'] == 'ms'
+
+
+def test_overflow_bucket_and_empty():
+    histogram = LatencyHistogram(lowest=1.0, powers=4)
+    assert histogram.percentile(0.5) == 0.0
+    histogram.observe(5.0)
+    histogram.observe(500.0)
+    assert histogram.percentile(0.99) == 500.0
+    # Корзина переполнения (inf) в snapshot не попадает - её покрывает count
+    [(bound, seen)] = histogram.snapshot()['buckets']
+    assert 5.0 <= bound <= 5.0 * (1 + 1 / histogram.sub_buckets) and seen == 1
+
+
+def test_unit_neutral_keys_for_token_histograms():
+    histogram = LatencyHistogram(lowest=1.0, powers=16, unit="")
+    histogram.observe(100)
+    snapshot = histogram.snapshot()
+    assert snapshot['p95'] == 100 and snapshot['avg'] == 100
+    assert not any(key.endswith('_ms') for key in snapshot)
+
+    assembler = ContextAssembler(max_context_tokens=64)
+    assembler.assemble("hello", {'short': 'likes tea', 'long': ''})
+    metrics = assembler.get_metrics()
+    assert metrics['prompt_tokens']['count'] == 1
+    assert not any(key.endswith('_ms') for key in metrics['prompt_tokens'])
+
+
+def test_collector_snapshots_are_exported_as_histograms():
+    latency = LatencyHistogram()
+    for value in (2.0, 20.0, 200.0):
+        latency.observe(value)
+    tokens = LatencyHistogram(lowest=1.0, powers=16, unit="")
+    tokens.observe(300)
+    exporter = OpenMetricsExporter(cache_ttl=0, trace_recorder=TraceRecorder(enabled=False))
+    exporter.register('admission_controller', lambda: {
+        'wait_time_ms': latency.snapshot(),
+        'context': {'prompt_tokens': tokens.snapshot()},
+    })
+    text = exporter.render().decode()
+    assert "# TYPE nexy_admission_controller_wait_time_seconds histogram" in text
+    assert 'nexy_admission_controller_wait_time_seconds_bucket{le="+Inf"} 3' in text
+    assert "nexy_admission_controller_wait_time_seconds_sum 0.222" in text
+    assert "# TYPE nexy_admission_controller_context_prompt_tokens histogram" in text
+    # Перцентили не размазываются в отдельные gauge
+    assert "wait_time_ms_p95" not in text and "prompt_tokens_p95" not in text
@@ -0,0 +1,153 @@
+"""
+LiveSessionPool на FakeLiveClient: прогрев, аренда, вывод сессий из оборота
+"""
+
+import asyncio
+
+import pytest
+
+from modules.text_processing.providers.fake_live_backend import FakeLiveClient
+from modules.text_processing.providers.live_session_pool import (
+    LiveSessionPool,
+    LiveSessionPoolExhaustedError,
+    make_session_key,
+)
+
+KEY = make_session_key('fake-live', 'system prompt', ['tool_b', 'tool_a'])
+
+
+def _pool(client: FakeLiveClient, **options) -> LiveSessionPool:
+    options.setdefault('health_interval', 0)
+    return LiveSessionPool(lambda key: client.aio.live.connect(model=key[0], config={}), **options)
+
+
+def test_session_key_ignores_tool_order():
+    assert KEY == make_session_key('fake-live', 'system prompt', ['tool_a', 'tool_b'])
+    assert KEY != make_session_key('fake-live', 'other prompt', ['tool_a', 'tool_b'])
+
+
+def test_warm_lease_and_refill():
+    async def scenario():
+        client = FakeLiveClient(connect_delay=0.001)
+        pool = _pool(client, min_size=2, max_size=4, max_turns=1)
+        assert await pool.start([KEY]) == 2
+        async with pool.lease(KEY) as entry:
+            assert entry.session in client.open_sessions
+        await asyncio.sleep(0.02)
+        metrics = pool.get_metrics()
+        # Сессия после хода выведена (max_turns=1), пул пополнен до min_size
+        assert metrics['hits'] == 1 and metrics['retired'] == 1
+        assert metrics['idle'] == pool.min_size and metrics['total'] == pool.min_size
+        assert len(client.open_sessions) == metrics['idle']
+        await pool.close()
+        assert client.open_sessions == []
+
+    asyncio.run(scenario())
+
+
+def test_session_reused_until_max_turns():
+    async def scenario():
+        client = FakeLiveClient(connect_delay=0.001)
+        pool = _pool(client, min_size=0, max_size=1, max_turns=3)
+        sessions = []
+        for _ in range(4):
+            async with pool.lease(KEY) as entry:
+                sessions.append(entry.session)
+        await asyncio.sleep(0)
+        assert sessions[0] is sessions[1] is sessions[2]
+        assert sessions[3] is not sessions[0]
+        await pool.close()
+
+    asyncio.run(scenario())
+
+
+def test_error_inside_lease_discards_session():
+    async def scenario():
+        client = FakeLiveClient(connect_delay=0.001)
+        pool = _pool(client, min_size=0, max_size=2, max_turns=10)
+        with pytest.raises(RuntimeError):
+            async with pool.lease(KEY) as entry:
+                broken = entry.session
+                raise RuntimeError("mid-turn failure")
+        await asyncio.sleep(0)
+        assert pool.discarded == 1
+        async with pool.lease(KEY) as entry:
+            assert entry.session is not broken
+        await pool.close()
+
+    asyncio.run(scenario())
+
+
+def test_acquire_waits_for_released_session_then_times_out():
+    async def scenario():
+        client = FakeLiveClient(connect_delay=0.001)
+        pool = _pool(client, min_size=0, max_size=1, max_turns=10, acquire_timeout=0.05)
+        entry = await pool.acquire(KEY)
+        waiting = asyncio.create_task(pool.acquire(KEY))
+        await asyncio.sleep(0.01)
+        pool.release(entry)
+        assert (await waiting) is entry
+
+        with pytest.raises(LiveSessionPoolExhaustedError):
+            await pool.acquire(KEY)
+        assert pool.exhausted == 1
+        pool.release(entry)
+        await pool.close()
+
+    asyncio.run(scenario())
+
+
+def test_failed_connect_frees_capacity():
+    async def scenario():
+        client = FakeLiveClient(connect_delay=0.001)
+        client.fail_next_connects = 1
+        pool = _pool(client, min_size=0, max_size=1)
+        with pytest.raises(ConnectionError):
+            await pool.acquire(KEY)
+        entry = await pool.acquire(KEY)
+        assert pool.connect_failures == 1
+        pool.release(entry)
+        await pool.close()
+
+    asyncio.run(scenario())
+
+
+def test_health_probe_replaces_dropped_sessions():
+    async def scenario():
+        client = FakeLiveClient(connect_delay=0.001)
+
+        async def probe(session) -> bool:
+            return not session._ws.closed
+
+        pool = _pool(client, min_size=2, max_size=4, health_interval=0.01, health_probe=probe)
+        await pool.start([KEY])
+        dropped = list(client.open_sessions)
+        client.drop_open_sessions()
+        await asyncio.sleep(0.1)
+        assert pool.probe_failures == 2
+        idle = [entry.session for entry in pool._states[KEY].idle]
+        assert len(idle) == 2 and not set(map(id, idle)) & set(map(id, dropped))
+        await pool.close()
+
+    asyncio.run(scenario())
+
+
+def test_close_during_health_probe_and_refill_leaves_nothing_open():
+    async def scenario():
+        client = FakeLiveClient(connect_delay=0.02)
+
+        async def slow_probe(session) -> bool:
+            await asyncio.sleep(0.05)
+            return True
+
+        pool = _pool(client, min_size=2, max_size=4, max_turns=1, health_interval=0.01, health_probe=slow_probe)
+        await pool.start([KEY])
+        await asyncio.sleep(0.015)
+        # Проверка идёт, сессии вне idle; возврат запускает пополнение
+        async with pool.lease(KEY):
+            pass
+        await pool.close()
+        assert client.open_sessions == []
+        assert pool.opened == pool.closed
+
+    asyncio.run(scenario())
@@ -0,0 +1,32 @@
+"""
+Пачки фоновой очистки: устаревшая краткосрочная память и зависшие сессии
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from modules.database.providers.asyncpg_provider import AsyncPostgreSQLProvider
+from modules.database.providers.fake_postgres_backend import FakeAsyncpgPool
+
+
+def test_asyncpg_provider_expire_batches(fake_db):
+    async def scenario():
+        provider = AsyncPostgreSQLProvider({'pool': FakeAsyncpgPool(fake_db, max_size=4)})
+        assert await provider.initialize()
+        old = datetime.now(timezone.utc) - timedelta(hours=48)
+        for index in range(5):
+            fake_db.insert('users', {'hardware_id_hash': f'hw-{index}', 'short_term_memory': 'm',
+                                     'memory_updated_at': old})
+            fake_db.insert('sessions', {'status': 'active', 'start_time': old})
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=24)
+
+        expired = await provider.expire_short_term_memory_batch(cutoff, limit=3)
+        assert len(expired) == 3
+        expired += await provider.expire_short_term_memory_batch(cutoff, limit=3)
+        assert sorted(expired) == [f'hw-{index}' for index in range(5)]
+        assert all(row['short_term_memory'] is None for row in fake_db.tables['users'])
+
+        assert await provider.expire_stale_sessions_batch(cutoff, limit=10) == 5
+        assert await provider.expire_stale_sessions_batch(cutoff, limit=10) == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,92 @@
+"""
+MemoryContextCache: общий кэш памяти пользователей с single-flight загрузкой
+"""
+
+import asyncio
+
+import pytest
+
+from modules.memory_management.core.memory_context_cache import MemoryContextCache, memory_size
+
+
+def test_memory_cache_single_flight():
+    async def scenario():
+        cache = MemoryContextCache()
+        loads = []
+
+        async def loader(hardware_id):
+            loads.append(hardware_id)
+            await asyncio.sleep(0.01)
+            return {'short': 's', 'long': 'l'}
+
+        results = await asyncio.gather(*(cache.get('hw', loader) for _ in range(10)))
+        assert loads == ['hw']
+        assert all(result == {'short': 's', 'long': 'l'} for result in results)
+        assert await cache.get('hw', loader) == {'short': 's', 'long': 'l'}
+        stats = cache.get_stats()
+        assert stats['loads'] == 1 and stats['coalesced'] == 9 and stats['hits'] == 1
+
+    asyncio.run(scenario())
+
+
+def test_memory_cache_load_error_reaches_waiters():
+    async def scenario():
+        cache = MemoryContextCache()
+
+        async def loader(hardware_id):
+            await asyncio.sleep(0.01)
+            raise ConnectionError("db down")
+
+        results = await asyncio.gather(*(cache.get('hw', loader) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(result, ConnectionError) for result in results)
+        assert cache.peek('hw') is None and cache.get_stats()['inflight'] == 0
+
+    asyncio.run(scenario())
+
+
+def test_memory_cache_write_during_load_wins():
+    async def scenario():
+        cache = MemoryContextCache()
+        started = asyncio.Event()
+
+        async def loader(hardware_id):
+            started.set()
+            await asyncio.sleep(0.01)
+            return {'short': 'old', 'long': ''}
+
+        loading = asyncio.create_task(cache.get('hw', loader))
+        await started.wait()
+        cache.put('hw', {'short': 'new', 'long': ''})
+        await loading
+        assert cache.peek('hw') == {'short': 'new', 'long': ''}
+        assert cache.get_stats()['stale_loads'] == 1
+
+    asyncio.run(scenario())
+
+
+def test_memory_cache_limits_and_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("modules.memory_management.core.memory_context_cache.time.monotonic", lambda: now[0])
+    entry = {'short': 'x' * 100, 'long': ''}
+    cache = MemoryContextCache(ttl=60.0, max_entries=3, max_bytes=memory_size(entry) * 2)
+    for index in range(3):
+        cache.put(f'hw-{index}', dict(entry))
+    # Бюджет байт - две записи, вытесняется самая старая
+    assert cache.peek('hw-0') is None
+    assert cache.peek('hw-2') == entry
+    now[0] += 61.0
+    assert cache.peek('hw-2') is None
+    cache.invalidate('hw-1')
+    assert cache.get_stats()['entries'] == 0
+
+    # Запись больше бюджета не кэшируется
+    cache.put('hw-big', {'short': 'x' * 10000, 'long': ''})
+    assert cache.peek('hw-big') is None
+
+
+@pytest.mark.parametrize('memory, expected', [
+    ({'short': '', 'long': ''}, 256),
+    ({'short': 'ab', 'long': 'cde'}, 256 + 10),
+])
+def test_memory_size(memory, expected):
+    assert memory_size(memory) == expected
@@ -0,0 +1,40 @@
+"""
+MemoryWorkflowIntegration: текст запроса доходит до ранжирования фактов памяти
+"""
+
+import asyncio
+
+from integrations.workflow_integrations.memory_workflow_integration import MemoryWorkflowIntegration
+from modules.memory_management.core.memory_context_cache import MemoryContextCache
+
+
+class RecordingMemoryManager:
+    """get_user_context записывает (hardware_id, query); context_cache - общий кэш"""
+
+    def __init__(self):
+        self.calls = []
+        self.context_cache = MemoryContextCache()
+
+    async def get_user_context(self, hardware_id, query=None):
+        self.calls.append((hardware_id, query))
+        return {'short': 's', 'long': 'l', 'recent_context': 's'}
+
+
+def test_query_is_passed_on_cache_hit_and_background_fetch():
+    async def scenario():
+        manager = RecordingMemoryManager()
+        workflow = MemoryWorkflowIntegration(manager)
+        assert await workflow.initialize()
+        manager.calls.clear()
+
+        # Промах кэша - фоновая загрузка, контекст будет в следующем запросе
+        assert await workflow.get_memory_context_parallel('hw-1', 'what is my dog called?') is None
+        await asyncio.sleep(0.01)
+        assert manager.calls == [('hw-1', 'what is my dog called?')]
+
+        manager.context_cache.put('hw-1', {'short': 's', 'long': 'l'})
+        context = await workflow.get_memory_context_parallel('hw-1', 'and my cat?')
+        assert context['short'] == 's'
+        assert manager.calls[-1] == ('hw-1', 'and my cat?')
+
+    asyncio.run(scenario())
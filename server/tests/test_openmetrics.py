@@ -0,0 +1,73 @@
+"""
+OpenMetricsExporter: вывод /metrics разбирается парсером prometheus_client,
+счётчики модулей - counter, гистограммы - histogram, остальное - gauge
+"""
+
+import pytest
+
+from modules.grpc_service.core.admission_controller import AdmissionController
+from modules.text_filtering.core.text_filter_cache import TextFilterCache
+from monitoring import GrpcMonitor, OpenMetricsExporter
+from monitoring.tracing import TraceRecorder
+
+parser = pytest.importorskip("prometheus_client.openmetrics.parser")
+
+
+def _families(exporter: OpenMetricsExporter) -> dict:
+    text = exporter.render().decode("utf-8")
+    return {family.name: family for family in parser.text_string_to_metric_families(text)}
+
+
+def _exporter() -> OpenMetricsExporter:
+    monitor = GrpcMonitor(sample_interval=3600)
+    for index in range(10):
+        monitor.record_request(0.01 * (index + 1), is_error=index == 0)
+    monitor.record_admission(0.002, 1)
+    return OpenMetricsExporter(monitor, cache_ttl=0, trace_recorder=TraceRecorder(enabled=False))
+
+
+def test_exposition_parses_and_monitor_families_are_typed():
+    families = _families(_exporter())
+    assert families['nexy_grpc_requests'].type == 'counter'
+    assert families['nexy_grpc_requests'].samples[0].value == 10
+    assert families['nexy_grpc_response_time_seconds'].type == 'histogram'
+    assert families['nexy_grpc_active_connections'].type == 'gauge'
+
+
+def test_module_counters_are_exported_as_counters():
+    cache = TextFilterCache()
+    cache.put("clean", "text", None, {"success": True})
+    cache.get("clean", "text")
+    cache.get("clean", "other")
+    exporter = _exporter()
+    exporter.register('text_filter_cache', cache.get_stats)
+    exporter.register('write_behind', lambda: {'written': 120, 'rejected': 2, 'pending': 7, 'last_flush_ms': 4.5,
+                                               'spill_pending': False})
+    families = _families(exporter)
+
+    hits = families['nexy_text_filter_cache_hits']
+    assert hits.type == 'counter'
+    assert [(sample.name, sample.value) for sample in hits.samples] == [('nexy_text_filter_cache_hits_total', 1)]
+    assert families['nexy_text_filter_cache_misses'].type == 'counter'
+    assert families['nexy_text_filter_cache_entries'].type == 'gauge'
+    assert families['nexy_write_behind_written'].type == 'counter'
+    assert families['nexy_write_behind_rejected'].type == 'counter'
+    assert families['nexy_write_behind_pending'].type == 'gauge'
+    assert families['nexy_write_behind_spill_pending'].type == 'gauge'
+
+
+def test_admission_collector_counters_and_histogram():
+    controller = AdmissionController(max_concurrent=2, user_requests_per_minute=0)
+    controller.rejected['queue_full'] += 3
+    exporter = _exporter()
+    exporter.register('admission_controller', controller.get_metrics)
+    families = _families(exporter)
+
+    # Вложенный словарь под счётчиком (rejected: {reason: n}) - тоже counter
+    queue_full = families['nexy_admission_controller_rejected_queue_full']
+    assert queue_full.type == 'counter' and queue_full.samples[0].value == 3
+    # rejected_total -> семейство без _total
+    assert families['nexy_admission_controller_rejected'].type == 'counter'
+    assert families['nexy_admission_controller_admitted'].type == 'counter'
+    assert families['nexy_admission_controller_active'].type == 'gauge'
+    assert families['nexy_admission_controller_wait_time_seconds'].type == 'histogram'
@@ -0,0 +1,111 @@
+"""
+Реестр горячих запросов и статистика по запросам
+"""
+
+import asyncio
+import json
+import re
+
+import pytest
+
+from modules.database.core.query_registry import (
+    QUERY_REGISTRY,
+    SESSION_CREATE,
+    USER_MEMORY_UPDATE,
+    QueryMetrics,
+    QuerySpec,
+    get_query,
+    row_size,
+)
+from modules.database.providers.asyncpg_provider import AsyncPostgreSQLProvider
+from modules.database.providers.fake_postgres_backend import FakeAsyncpgPool, FakePsycopgPool
+
+
+@pytest.mark.parametrize('name', sorted(QUERY_REGISTRY))
+def test_registered_queries_project_columns(name):
+    spec = QUERY_REGISTRY[name]
+    assert not re.search(r'SELECT \*|RETURNING \*', spec.sql, re.I)
+    assert spec.statement_name == f"nexy_{name}"
+    assert set(spec.json_params) <= set(spec.params)
+
+
+def test_placeholders_must_match_params():
+    with pytest.raises(ValueError):
+        QuerySpec(name="broken", sql="SELECT a FROM t WHERE a = $1 AND b = $3", params=("a", "b"), columns=("a",))
+
+
+def test_bind_orders_params_and_encodes_json():
+    values = {'status': 'active', 'metadata': {'k': 'v'}, 'user_id': 'u1', 'id': 'i1'}
+    assert SESSION_CREATE.bind(values) == ('i1', 'u1', {'k': 'v'}, 'active')
+    assert SESSION_CREATE.bind(values, encode_json=True) == ('i1', 'u1', json.dumps({'k': 'v'}), 'active')
+    with pytest.raises(KeyError):
+        USER_MEMORY_UPDATE.bind({'short_term_memory': 's'})
+
+
+def test_get_query_unknown_name():
+    assert get_query('user_memory_read').name == 'user_memory_read'
+    with pytest.raises(KeyError):
+        get_query('no_such_query')
+
+
+def test_query_metrics_snapshot():
+    metrics = QueryMetrics()
+    metrics.observe('user_memory_read', 2.0, [{'short_term_memory': 'abcd', 'long_term_memory': None}])
+    metrics.observe('user_memory_read', 4.0, [])
+    metrics.observe_error('user_memory_update', 1.0)
+
+    snapshot = metrics.snapshot()
+    assert set(snapshot) == {'user_memory_read', 'user_memory_update'}
+    read = snapshot['user_memory_read']
+    assert read['calls'] == 2 and read['rows'] == 1 and read['max_row_bytes'] == 4
+    assert read['avg_ms'] == pytest.approx(3.0)
+    assert snapshot['user_memory_update']['errors'] == 1
+
+    metrics.reset()
+    assert metrics.snapshot() == {}
+
+
+def test_row_size():
+    assert row_size(None) == 0
+    assert row_size({'a': 'xyz', 'b': b'12', 'c': {'k': 1}, 'd': 5, 'e': None}) == 3 + 2 + len('{"k": 1}') + 8
+
+
+def test_asyncpg_provider_prepares_hot_query_once(fake_db):
+    async def scenario():
+        provider = AsyncPostgreSQLProvider({'pool': FakeAsyncpgPool(fake_db, max_size=1)})
+        assert await provider.initialize()
+        await provider.create_user('hw-1')
+        parses = fake_db.parses
+        for _ in range(20):
+            await provider.get_user_memory('hw-1')
+        # Один Parse на соединение, дальше statement из кэша
+        assert fake_db.parses == parses + 1
+        stats = provider.get_metrics()['queries']['user_memory_read']
+        assert stats['calls'] == 20 and stats['errors'] == 0
+
+    asyncio.run(scenario())
+
+
+def test_psycopg2_prepared_statement_survives_execute_error(fake_db):
+    pytest.importorskip('psycopg2')
+    from modules.database.providers.postgresql_provider import PostgreSQLProvider
+
+    async def scenario():
+        provider = PostgreSQLProvider({'pool': FakePsycopgPool(fake_db)})
+        assert await provider.initialize()
+        await provider.create_user('hw-1')
+        assert await provider.get_user_memory('hw-1') == {'short': '', 'long': ''}
+        parses = fake_db.parses
+
+        # EXECUTE падает, statement на сервере остаётся - повторный PREPARE дал бы "already exists"
+        fake_db.available = False
+        await provider.get_user_memory('hw-1')
+        fake_db.available = True
+        assert await provider.update_user_memory('hw-1', 'short', 'long')
+        assert await provider.get_user_memory('hw-1') == {'short': 'short', 'long': 'long'}
+        stats = provider.get_metrics()['queries']['user_memory_read']
+        assert stats['calls'] == 3 and stats['errors'] == 1
+        # update подготовлен впервые, read - нет
+        assert fake_db.parses == parses + 1
+
+    asyncio.run(scenario())
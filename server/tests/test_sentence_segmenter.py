@@ -0,0 +1,86 @@
+"""
+SentenceSegmenter: потоковое разбиение ответа LLM на предложения
+"""
+
+import random
+
+import pytest
+
+from modules.text_filtering.config import TextFilteringConfig
+from modules.text_filtering.core.sentence_segmenter import SentenceSegmenter, split_complete_sentences
+from modules.text_filtering.providers.sentence_processing_provider import SentenceProcessingProvider
+
+
+def _stream(fragments, joiner=" "):
+    segmenter = SentenceSegmenter(joiner)
+    sentences = []
+    for fragment in fragments:
+        sentences.extend(segmenter.feed(fragment))
+    tail, remainder = segmenter.flush()
+    return sentences + tail, remainder
+
+
+@pytest.mark.parametrize('text, sentences, remainder', [
+    ("Hello world. How are you? Fine", ["Hello world.", "How are you?"], "Fine"),
+    ("Open main.py and run v1.2.3 now. Done", ["Open main.py and run v1.2.3 now."], "Done"),
+    ("Server 192.168.1.1:8080 is up! Next", ["Server 192.168.1.1:8080 is up!"], "Next"),
+    ("Price is 12.10 today.", ["Price is 12.10 today."], ""),
+    # Серии '...' и '?!' завершают предложение только в конце текста
+    ("Wait... what?! Really? Yes", ["Wait... what?! Really?"], "Yes"),
+    ("", [], ""),
+])
+def test_split_complete_sentences(text, sentences, remainder):
+    assert split_complete_sentences(text) == (sentences, remainder)
+
+
+def test_stream_matches_whole_text_split():
+    rng = random.Random(7)
+    words = ["alpha", "beta.", "main.py", "v2.0", "ok!", "why?", "12.5", "end.", "word", "x"]
+    for _ in range(200):
+        fragments = [" ".join(rng.choice(words) for _ in range(rng.randint(1, 6))) for _ in range(rng.randint(1, 8))]
+        assert _stream(fragments) == split_complete_sentences(" ".join(fragments))
+
+
+def test_sentence_is_emitted_once_it_completes():
+    segmenter = SentenceSegmenter()
+    assert segmenter.feed("The file") == []
+    assert segmenter.feed("is main.py") == []
+    assert segmenter.feed("and it works. And") == ["The file is main.py and it works."]
+    assert segmenter.remainder == "And"
+    assert segmenter.flush() == ([], "And")
+    assert segmenter.remainder == ""
+
+
+def test_empty_joiner_holds_partial_word():
+    # Фрагменты продолжают друг друга посреди слова: "ma" + "in.py" - одно слово
+    assert _stream(["Run ma", "in.py now. Th", "en stop."], joiner="") == (
+        ["Run main.py now.", "Then stop."], ""
+    )
+
+
+def test_counters():
+    segmenter = SentenceSegmenter()
+    segmenter.feed("One. Two.")
+    segmenter.feed("   ")
+    assert segmenter.fragments == 1 and segmenter.sentences == 2
+    assert segmenter.scanned_chars == len("One. Two.")
+
+
+@pytest.mark.parametrize('text, sentences, remainder', [
+    # Прежнее разбиение по исходному тексту: пробелы и хвост не нормализуются
+    (" v2.0!.. ", [], "v2.0!.."),
+    ("Hi  there. x", ["Hi  there."], "x"),
+    ("One.\nTwo. three", ["One.", "Two."], "three"),
+])
+def test_provider_split_keeps_raw_text(text, sentences, remainder):
+    provider = SentenceProcessingProvider(TextFilteringConfig())
+    assert provider._split_complete_sentences(text) == (sentences, remainder)
+
+
+def test_segmenter_matches_provider_on_normalized_text():
+    provider = SentenceProcessingProvider(TextFilteringConfig())
+    rng = random.Random(11)
+    words = ["alpha", "beta.", "main.py", "v2.0", "ok!", "why?", "12.5", "!..", "?!", "...", "x"]
+    for _ in range(500):
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(1, 8)))
+        assert split_complete_sentences(text) == provider._split_complete_sentences(text)
@@ -0,0 +1,94 @@
+"""
+StreamingWorkflowIntegration: задержки стадий конвейера в трассе запроса
+"""
+
+import asyncio
+
+from integrations.workflow_integrations.streaming_workflow_integration import StreamingWorkflowIntegration
+from monitoring.tracing import TraceRecorder
+
+
+class FakeTextProcessor:
+    is_initialized = True
+
+    def __init__(self, sentences: int = 3):
+        self.sentences = sentences
+
+    async def process_text_streaming(self, text, image_data=None, hardware_id=None, memory_context=None):
+        for index in range(self.sentences):
+            await asyncio.sleep(0)
+            yield f"This is generated sentence number {index} of the answer."
+
+
+class FakeAudioProcessor:
+    is_initialized = True
+
+    def __init__(self, chunks: int = 2):
+        self.chunks = chunks
+
+    async def generate_speech_streaming(self, text):
+        for index in range(self.chunks):
+            await asyncio.sleep(0)
+            yield f"{text}|{index}".encode()
+
+
+async def _consume(workflow, request):
+    return [item async for item in workflow.process_request_streaming(request)]
+
+
+def test_stage_latencies_go_to_request_trace():
+    async def scenario():
+        workflow = StreamingWorkflowIntegration(text_processor=FakeTextProcessor(), audio_processor=FakeAudioProcessor())
+        await workflow.initialize()
+        recorder = TraceRecorder(enabled=True, jsonl_path="")
+        trace = recorder.start('s1', 'hw')
+        token = trace.activate()
+        try:
+            items = await _consume(workflow, {'session_id': 's1', 'hardware_id': 'hw', 'text': 'q'})
+        finally:
+            trace.deactivate(token)
+        recorder.finish(trace)
+
+        assert items[-1]['is_final'] and items[-1]['sentences_processed'] == 3
+        stages = recorder.get_stats()['stages_ms']
+        assert stages['llm.first_fragment']['count'] == 1
+        for name in ('segment.ready', 'tts.first_byte', 'segment.sent'):
+            assert stages[name]['count'] == 3, name
+        # Гистограммы стадий только в трассе - у интеграции остаются настройки
+        assert 'stage_latency_ms' not in workflow.get_metrics()
+
+    asyncio.run(scenario())
+
+
+class SlowAudioProcessor:
+    """TTS, отмена которого занимает время (как закрытие Live сессии)"""
+
+    is_initialized = True
+
+    def __init__(self):
+        self.active = 0
+
+    async def generate_speech_streaming(self, text):
+        self.active += 1
+        try:
+            yield b"chunk"
+            await asyncio.sleep(10)
+        finally:
+            await asyncio.sleep(0.01)
+            self.active -= 1
+
+
+def test_closing_stream_waits_for_tts_workers():
+    async def scenario():
+        audio = SlowAudioProcessor()
+        workflow = StreamingWorkflowIntegration(text_processor=FakeTextProcessor(), audio_processor=audio)
+        await workflow.initialize()
+        stream = workflow.process_request_streaming({'session_id': 's1', 'hardware_id': 'hw', 'text': 'q'})
+        async for item in stream:
+            if item.get('audio_chunk'):
+                break
+        # Клиент ушёл: aclose() возвращается, когда TTS задачи уже завершились
+        await stream.aclose()
+        assert audio.active == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,106 @@
+"""
+TextFilterCache и кэш результатов TextFilterManager
+"""
+
+import asyncio
+
+from modules.text_filtering import TextFilterManager
+from modules.text_filtering.config import TextFilteringConfig
+from modules.text_filtering.core.text_filter_cache import TextFilterCache
+
+
+def test_text_cache_hit_miss_and_options_key():
+    cache = TextFilterCache(admission="lru")
+    assert cache.get("clean", "Hello") is None
+    assert cache.put("clean", "Hello", {"a": True}, {"cleaned_text": "Hello"})
+    assert cache.get("clean", "Hello", {"a": True}) == {"cleaned_text": "Hello"}
+    # Другие опции и другое пространство имён - другой ключ
+    assert cache.get("clean", "Hello", {"a": False}) is None
+    assert cache.get("split", "Hello", {"a": True}) is None
+    stats = cache.get_stats()
+    assert stats["hits"] == 1 and stats["misses"] == 3
+    assert stats["namespaces"]["clean"]["hits"] == 1
+
+
+def test_text_cache_lru_eviction_by_entries():
+    cache = TextFilterCache(max_entries=2, admission="lru")
+    cache.put("clean", "a", None, "A")
+    cache.put("clean", "b", None, "B")
+    cache.get("clean", "a")
+    cache.put("clean", "c", None, "C")
+    assert cache.get("clean", "b") is None
+    assert cache.get("clean", "a") == "A" and cache.get("clean", "c") == "C"
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_text_cache_byte_budget():
+    cache = TextFilterCache(max_bytes=2000, admission="lru")
+    for index in range(50):
+        cache.put("clean", f"text {index}", None, "x" * 100)
+    stats = cache.get_stats()
+    assert 0 < stats["bytes"] <= 2000
+    assert stats["entries"] < 50
+    # Значение больше всего бюджета не кэшируется
+    assert not cache.put("clean", "huge", None, "x" * 5000)
+
+
+def test_text_cache_ttl_and_long_text(monkeypatch):
+    cache = TextFilterCache(ttl=10.0, admission="lru", max_text_length=10)
+    now = [100.0]
+    monkeypatch.setattr("modules.text_filtering.core.text_filter_cache.time.monotonic", lambda: now[0])
+    cache.put("clean", "short", None, "S")
+    now[0] += 11.0
+    assert cache.get("clean", "short") is None
+    assert cache.get_stats()["expirations"] == 1
+    assert not cache.put("clean", "a much longer text", None, "L")
+
+
+def test_tinylfu_keeps_frequent_entries():
+    cache = TextFilterCache(max_entries=10, admission="tinylfu")
+    frequent = [f"frequent {index}" for index in range(10)]
+    for _ in range(5):
+        for text in frequent:
+            if cache.get("clean", text) is None:
+                cache.put("clean", text, None, text.upper())
+    # Поток разовых фрагментов не вытесняет частые
+    for index in range(200):
+        text = f"one-off {index}"
+        if cache.get("clean", text) is None:
+            cache.put("clean", text, None, text)
+    assert all(cache.get("clean", text) == text.upper() for text in frequent)
+    assert cache.get_stats()["rejected"] >= 200
+
+
+def _manager(namespaces=None) -> TextFilterManager:
+    config = TextFilteringConfig()
+    if namespaces is not None:
+        config.config["performance"]["cache_namespaces"] = namespaces
+    return TextFilterManager(config)
+
+
+def test_manager_caches_only_filter_by_default():
+    async def scenario():
+        manager = _manager()
+        for _ in range(2):
+            await manager.clean_text("Hello world.")
+            await manager.split_sentences("Hello world. Bye")
+        namespaces = manager.cache.get_stats()["namespaces"]
+        assert all(stats["hits"] + stats["misses"] == 0 for stats in namespaces.values())
+        await manager.filter_text("Hello world.")
+        assert (await manager.filter_text("Hello world."))["cached"]
+
+    asyncio.run(scenario())
+
+
+def test_manager_cached_split_does_not_share_lists():
+    async def scenario():
+        manager = _manager(["split"])
+        await manager.initialize()
+        first = await manager.split_sentences("One. Two. Three")
+        first["sentences"].append("mutated")
+        second = await manager.split_sentences("One. Two. Three")
+        assert second["sentences"] == ["One.", "Two."]
+        second["sentences"].clear()
+        assert (await manager.split_sentences("One. Two. Three"))["sentences"] == ["One.", "Two."]
+
+    asyncio.run(scenario())
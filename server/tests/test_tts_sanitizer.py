@@ -0,0 +1,93 @@
+"""
+TextSanitizer: однопроходная очистка совпадает байт в байт с прежней
+цепочкой TextCleaningProvider.clean_text (legacy_clean - эталон) на золотом
+корпусе и случайных текстах, для всех комбинаций флагов очистки
+"""
+
+import itertools
+import random
+import re
+import unicodedata
+
+import pytest
+
+from modules.text_filtering import TextSanitizer
+from modules.text_filtering.config import TextFilteringConfig
+
+# markdown, серии '-__-', Unicode формы, управляющие символы, эмодзи
+GOLDEN = (
+    "",
+    "   ",
+    "Hello, world!",
+    "  Привет,\n\tмир!  ",
+    "**Bold** and *italic* with `code` and ```blocks```",
+    "### Header\n## Sub-header",
+    "snake__case and a -- dash and == equals",
+    "-__- =--= _*_ =_=_= ---___=== a_b-c=d",
+    "Use `pip install -r requirements.txt` --upgrade",
+    "Version v1.2.3 at 192.168.1.1:8080, file main.py.",
+    "Price: $5 & 10% off (today) [only] {now} <b>x</b> a/b\\c|d~e",
+    "Emoji 😀 check ✓ bullet • arrow → done…",
+    "Fullwidth ＡＢＣ１２３ and ligature ﬁle, ½ cup, x²",
+    "Half-width ｶﾀｶﾅ and Hangul jamo 가",
+    "Control\x00chars\x07here\x1bok\x1f end",
+    "Non-breaking\xa0space and zero​width and line",
+    "Combining é vs é, Å vs Å",
+    "Quotes “smart” ‘single’ «french» \"plain\" 'plain'",
+    "Ellipsis... and ?! and !? and !!!",
+    "^caret^ and @mention and #hashtag",
+)
+
+FLAGS = ("remove_extra_whitespace", "remove_special_chars", "remove_markdown",
+         "normalize_unicode", "remove_control_chars")
+
+CONFIGS = (
+    [TextFilteringConfig().get_text_cleaning_config()]
+    + [dict(zip(FLAGS, values)) for values in itertools.product((True, False), repeat=len(FLAGS))]
+    + [{"allowed_chars": r'[^\w\s\.\,]'}]
+)
+
+
+def legacy_clean(text: str, config: dict) -> str:
+    """Прежний TextCleaningProvider.clean_text (эталон)"""
+    if not text:
+        return ""
+    cleaned_text = text
+    if config.get("remove_extra_whitespace", True):
+        cleaned_text = ' '.join(cleaned_text.split())
+    if config.get("remove_special_chars", True):
+        allowed_chars = config.get("allowed_chars", r'[^\w\s\.\,\!\?\-\:\;\(\)\[\]\{\}\"\'@#$%&*+=<>/\\|~`]')
+        cleaned_text = re.sub(allowed_chars, '', cleaned_text)
+    if config.get("remove_markdown", True):
+        cleaned_text = re.sub(r'\*\*?', '', cleaned_text)
+        cleaned_text = re.sub(r'`+', '', cleaned_text)
+        cleaned_text = re.sub(r'#+', '', cleaned_text)
+        cleaned_text = re.sub(r'_{2,}', '', cleaned_text)
+        cleaned_text = re.sub(r'-{2,}', '', cleaned_text)
+        cleaned_text = re.sub(r'={2,}', '', cleaned_text)
+    if config.get("normalize_unicode", True):
+        cleaned_text = unicodedata.normalize('NFKC', cleaned_text)
+    if config.get("remove_control_chars", True):
+        cleaned_text = ''.join(char for char in cleaned_text if ord(char) >= 32 or char in '\n\r\t')
+    return cleaned_text.strip()
+
+
+def random_text(rng: random.Random) -> str:
+    alphabet = list("ab Z9_-=*`#.,!?\t\n\x00\x07\x1f\xa0^~") + list("éﬁ²…＊Ａ①ｶﾞ😀™ǆÅ¼") + ["Привет", "́", "​"]
+    return "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+
+
+@pytest.mark.parametrize("config", CONFIGS)
+def test_golden_corpus_matches_legacy_chain(config):
+    sanitizer = TextSanitizer(config)
+    for text in GOLDEN:
+        assert sanitizer.clean(text) == legacy_clean(text, config), text
+
+
+@pytest.mark.parametrize("config", CONFIGS[:1] + CONFIGS[-1:])
+def test_random_texts_match_legacy_chain(config):
+    rng = random.Random(11)
+    sanitizer = TextSanitizer(config)
+    for _ in range(500):
+        text = random_text(rng)
+        assert sanitizer.clean(text) == legacy_clean(text, config), text
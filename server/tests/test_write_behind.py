@@ -0,0 +1,334 @@
+"""
+WriteBehindQueue: пакетный сброс, spill на диск при недоступной БД и replay;
+COPY asyncpg провайдера и буферизация записей в DatabaseManager
+"""
+
+import asyncio
+import os
+
+import pytest
+
+from modules.database import DatabaseManager
+from modules.database.core.write_behind import WriteBehindQueue
+from modules.database.providers.asyncpg_provider import AsyncPostgreSQLProvider
+from modules.database.providers.fake_postgres_backend import FakeAsyncpgPool
+
+
+class RecordingWriter:
+    """Пакетная запись в список; available = False - БД недоступна"""
+
+    def __init__(self):
+        self.batches = []
+        self.available = True
+        self.reject_tables = set()
+        self.reject_ids = set()
+        self.calls = 0
+
+    async def __call__(self, table, columns, records):
+        self.calls += 1
+        if not self.available:
+            raise ConnectionError("connection refused")
+        if table in self.reject_tables or any(record[0] in self.reject_ids for record in records):
+            raise ValueError("violates check constraint")
+        self.batches.append((table, list(records)))
+        return len(records)
+
+    def ids(self, table=None):
+        return [record[0] for name, records in self.batches if table in (None, name) for record in records]
+
+
+def _command(index: int) -> dict:
+    return {'id': f"c{index}", 'session_id': 's', 'prompt': f"p{index}", 'language': 'en', 'metadata': {'i': index}}
+
+
+def test_flush_writes_one_batch_per_table_in_dependency_order():
+    async def scenario():
+        writer = RecordingWriter()
+        queue = WriteBehindQueue(writer, batch_size=100)
+        queue.enqueue('llm_answers', {'id': 'a1', 'command_id': 'c1'})
+        for index in range(3):
+            queue.enqueue('commands', _command(index))
+        assert await queue.flush() == 4
+        # commands раньше llm_answers (внешний ключ), колонки в порядке WRITE_BEHIND_TABLES
+        assert [table for table, _ in writer.batches] == ['commands', 'llm_answers']
+        assert writer.batches[0][1][0] == ('c0', 's', 'p0', 'en', {'i': 0})
+        assert queue.pending == 0
+
+    asyncio.run(scenario())
+
+
+def test_flush_splits_by_batch_size():
+    async def scenario():
+        writer = RecordingWriter()
+        queue = WriteBehindQueue(writer, batch_size=4)
+        for index in range(10):
+            queue.enqueue('commands', _command(index))
+        await queue.flush()
+        assert [len(records) for _, records in writer.batches] == [4, 4, 2]
+
+    asyncio.run(scenario())
+
+
+def test_outage_spills_and_replays_in_order_exactly_once(tmp_path):
+    async def scenario():
+        writer = RecordingWriter()
+        spill_path = str(tmp_path / 'spill.jsonl')
+        queue = WriteBehindQueue(writer, batch_size=3, spill_path=spill_path)
+
+        writer.available = False
+        for index in range(5):
+            queue.enqueue('commands', _command(index))
+        assert await queue.flush() == 0
+        assert os.path.exists(spill_path)
+        assert queue.get_stats()['spilled'] == 5
+
+        # Пока БД недоступна, новые строки тоже уходят на диск - после старых
+        queue.enqueue('commands', _command(5))
+        assert await queue.flush() == 0
+
+        writer.available = True
+        queue.enqueue('commands', _command(6))
+        assert await queue.flush() == 7
+        assert writer.ids() == [f"c{index}" for index in range(7)]
+        assert not os.path.exists(spill_path)
+        assert queue.get_stats()['replayed'] == 6
+
+    asyncio.run(scenario())
+
+
+def test_spill_from_previous_run_is_replayed(tmp_path):
+    async def scenario():
+        spill_path = str(tmp_path / 'spill.jsonl')
+        first = WriteBehindQueue(RecordingWriter(), spill_path=spill_path)
+        first.writer.available = False
+        first.enqueue('commands', _command(1))
+        await first.stop()
+        assert os.path.exists(spill_path)
+
+        writer = RecordingWriter()
+        second = WriteBehindQueue(writer, spill_path=spill_path)
+        assert second.get_stats()['spill_pending']
+        assert await second.flush() == 1
+        assert writer.ids() == ['c1']
+        # metadata пережил JSON
+        assert writer.batches[0][1][0][4] == {'i': 1}
+
+    asyncio.run(scenario())
+
+
+def test_data_errors_are_rejected_not_retried(tmp_path):
+    async def scenario():
+        writer = RecordingWriter()
+        writer.reject_tables.add('screenshots')
+        spill_path = str(tmp_path / 'spill.jsonl')
+        queue = WriteBehindQueue(writer, spill_path=spill_path)
+        queue.enqueue('commands', _command(1))
+        queue.enqueue('screenshots', {'id': 'x1', 'session_id': 's'})
+        await queue.flush()
+        stats = queue.get_stats()
+        assert stats['rejected'] == 1 and stats['spilled'] == 0
+        assert writer.ids() == ['c1']
+        assert not os.path.exists(spill_path)
+
+    asyncio.run(scenario())
+
+
+def test_bad_rows_are_rejected_alone():
+    async def scenario():
+        writer = RecordingWriter()
+        writer.reject_ids.update({'c3', 'c6'})
+        queue = WriteBehindQueue(writer, batch_size=100)
+        for index in range(10):
+            queue.enqueue('commands', _command(index))
+        queue.enqueue('llm_answers', {'id': 'a1', 'command_id': 'c1'})
+        assert await queue.flush() == 9
+        # Отклонены только c3 и c6, остальная пачка и llm_answers записаны
+        assert writer.ids('commands') == [f"c{index}" for index in range(10) if index not in (3, 6)]
+        assert writer.ids('llm_answers') == ['a1']
+        assert queue.get_stats()['rejected'] == 2
+
+    asyncio.run(scenario())
+
+
+def test_outage_during_split_spills_the_rest(tmp_path):
+    async def scenario():
+        writer = RecordingWriter()
+        writer.reject_ids.add('c1')
+        spill_path = str(tmp_path / 'spill.jsonl')
+        queue = WriteBehindQueue(writer, batch_size=100, spill_path=spill_path)
+        for index in range(4):
+            queue.enqueue('commands', _command(index))
+        original = writer.__call__
+
+        async def flaky(table, columns, records):
+            # Первая половина разобрана, дальше БД пропала
+            if writer.calls >= 4:
+                writer.available = False
+            return await original(table, columns, records)
+
+        queue.writer = flaky
+        await queue.flush()
+        assert writer.ids() == ['c0']
+        assert queue.get_stats()['rejected'] == 1 and queue.get_stats()['spilled'] == 2
+
+    asyncio.run(scenario())
+
+
+def test_memory_limit_overflow_goes_to_next_flush_without_io(tmp_path):
+    async def scenario():
+        writer = RecordingWriter()
+        spill_path = str(tmp_path / 'spill.jsonl')
+        queue = WriteBehindQueue(writer, batch_size=100, max_pending=2, spill_path=spill_path)
+        for index in range(5):
+            queue.enqueue('commands', _command(index))
+        # enqueue не пишет на диск: переполнение ждёт сброса
+        assert queue.pending == 2 and queue.get_stats()['overflow'] == 3
+        assert not os.path.exists(spill_path)
+        assert await queue.flush() == 5
+        assert writer.ids() == [f"c{index}" for index in range(5)]
+        assert queue.get_stats()['spilled'] == 0
+
+    asyncio.run(scenario())
+
+
+def test_replay_resumes_from_saved_offset(tmp_path):
+    async def scenario():
+        writer = RecordingWriter()
+        spill_path = str(tmp_path / 'spill.jsonl')
+        queue = WriteBehindQueue(writer, batch_size=3, spill_path=spill_path)
+        writer.available = False
+        for index in range(8):
+            queue.enqueue('commands', _command(index))
+        await queue.flush()
+        assert queue.get_stats()['spilled'] == 8
+
+        # БД пропадает после первой пачки replay
+        writer.calls = 0
+        original = writer.__call__
+
+        async def flaky(table, columns, records):
+            writer.available = writer.calls < 1
+            return await original(table, columns, records)
+
+        queue.writer = flaky
+        assert await queue.flush() == 3
+        assert os.path.exists(spill_path + ".offset")
+
+        # Новый процесс продолжает с сохранённого смещения - без повторов
+        writer2 = RecordingWriter()
+        second = WriteBehindQueue(writer2, batch_size=3, spill_path=spill_path)
+        assert await second.flush() == 5
+        assert writer.ids() + writer2.ids() == [f"c{index}" for index in range(8)]
+        # Пачки replay не больше batch_size
+        assert [len(records) for _, records in writer2.batches] == [3, 2]
+        assert not any(os.path.exists(spill_path + suffix) for suffix in ('', '.replay', '.offset'))
+
+    asyncio.run(scenario())
+
+
+def test_background_flush_backs_off_while_unavailable(tmp_path):
+    async def scenario():
+        writer = RecordingWriter()
+        writer.available = False
+        spill_path = str(tmp_path / 'spill.jsonl')
+        queue = WriteBehindQueue(writer, batch_size=100, flush_interval=0.01, max_pending=100,
+                                 spill_path=spill_path)
+        queue.start()
+        queue.enqueue('commands', _command(0))
+        await asyncio.sleep(0.3)
+        # Без паузы было бы ~30 попыток: 0.01, 0.02, 0.04, 0.08, 0.16
+        assert writer.calls <= 6
+
+        # Переполнение памяти уходит на диск и во время паузы
+        for index in range(1, 201):
+            queue.enqueue('commands', _command(index))
+        await asyncio.sleep(0.05)
+        assert queue.get_stats()['overflow'] == 0
+
+        writer.available = True
+        await queue.stop()
+        assert writer.ids() == [f"c{index}" for index in range(201)]
+
+    asyncio.run(scenario())
+
+
+def test_without_spill_path_rows_are_dropped():
+    async def scenario():
+        writer = RecordingWriter()
+        writer.available = False
+        queue = WriteBehindQueue(writer, spill_path=None)
+        queue.enqueue('commands', _command(1))
+        await queue.flush()
+        assert queue.get_stats()['dropped'] == 1
+
+    asyncio.run(scenario())
+
+
+def test_background_flush_and_stop_drain():
+    async def scenario():
+        writer = RecordingWriter()
+        queue = WriteBehindQueue(writer, batch_size=1000, flush_interval=0.01)
+        queue.start()
+        queue.enqueue('commands', _command(1))
+        await asyncio.sleep(0.05)
+        assert writer.ids() == ['c1']
+        queue.enqueue('commands', _command(2))
+        await queue.stop()
+        assert writer.ids() == ['c1', 'c2']
+
+    asyncio.run(scenario())
+
+
+def test_asyncpg_insert_many_copies_jsonb(fake_db):
+    async def scenario():
+        provider = AsyncPostgreSQLProvider({'pool': FakeAsyncpgPool(fake_db, init=AsyncPostgreSQLProvider._init_connection)})
+        assert await provider.initialize()
+        records = [(f'c{index}', 's', 'p', 'en', {'i': index}) for index in range(3)]
+        columns = ('id', 'session_id', 'prompt', 'language', 'metadata')
+        total_before = provider.total_query_time
+        assert await provider.insert_many('commands', columns, records) == 3
+        assert [row['metadata'] for row in fake_db.tables['commands']] == [{'i': index} for index in range(3)]
+        copy_stats = provider.get_metrics()['queries']['commands_copy']
+        assert copy_stats['calls'] == 1 and copy_stats['errors'] == 0
+        # total_query_time в миллисекундах, как у остальных запросов
+        assert provider.total_query_time - total_before == pytest.approx(copy_stats['avg_ms'])
+
+    asyncio.run(scenario())
+
+
+def test_copy_without_binary_codec_is_spilled_not_rejected(fake_db, tmp_path):
+    async def scenario():
+        # Пул без init - text кодеки по умолчанию, COPY падает в драйвере
+        provider = AsyncPostgreSQLProvider({'pool': FakeAsyncpgPool(fake_db)})
+        assert await provider.initialize()
+        queue = WriteBehindQueue(provider.insert_many, spill_path=str(tmp_path / 'spill.jsonl'))
+        queue.enqueue('commands', {'id': 'c1', 'session_id': 's', 'prompt': 'p', 'language': 'en',
+                                   'metadata': {'k': 'v'}})
+        assert await queue.flush() == 0
+        stats = queue.get_stats()
+        assert stats['rejected'] == 0 and stats['spilled'] == 1
+
+    asyncio.run(scenario())
+
+
+def test_manager_buffers_log_writes(fake_db, tmp_path):
+    async def scenario():
+        manager = DatabaseManager({
+            'driver': 'asyncpg',
+            'pool': FakeAsyncpgPool(fake_db, init=AsyncPostgreSQLProvider._init_connection),
+            'write_behind_enabled': True,
+            'write_behind_flush_interval': 60.0,
+            'write_behind_spill_path': str(tmp_path / 'spill.jsonl'),
+        })
+        assert await manager.initialize()
+        command_id = await manager.create_command('session-1', 'prompt', {'k': 'v'})
+        answer_id = await manager.create_llm_answer(command_id, 'prompt', 'answer', {'model': 'm'}, {'ms': 1})
+        assert command_id and answer_id
+        # id выдан сразу, строки ещё в очереди
+        assert 'commands' not in fake_db.tables
+        assert await manager.flush_pending_writes() == 2
+        assert [row['id'] for row in fake_db.tables['commands']] == [command_id]
+        assert fake_db.tables['llm_answers'][0]['command_id'] == command_id
+        await manager.cleanup()
+
+    asyncio.run(scenario())
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Cancel scope одного запроса StreamAudio
+
+Область видимости хранится в ContextVar: задачи, созданные внутри запроса
+(сегментация, TTS воркеры), наследуют её, поэтому провайдеры глубоко в стеке
+регистрируют свои ресурсы (Live websocket, синтезатор) через
+register_cancel_handle(), не зная hardware_id.
+
+InterruptManager держит открытые scope по hardware_id и при прерывании
+отменяет задачи и вызывает обработчики отмены напрямую.
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+from contextvars import ContextVar, Token
+from typing import Awaitable, Callable, Dict, Optional, Set, Union
+
+logger = logging.getLogger(__name__)
+
+CancelHandle = Callable[[], Union[None, Awaitable[None]]]
+
+_current_scope: ContextVar[Optional["CancelScope"]] = ContextVar('cancel_scope', default=None)
+_handle_ids = itertools.count(1)
+
+
+def _noop():
+    pass
+
+
+class CancelScope:
+    """Задачи и обработчики отмены одного запроса"""
+
+    __slots__ = ('hardware_id', 'session_id', 'tasks', 'handles', 'cancelled', 'cancelled_at', 'created_at')
+
+    def __init__(self, hardware_id: str, session_id: Optional[str] = None):
+        self.hardware_id = hardware_id
+        self.session_id = session_id
+        self.tasks: Set[asyncio.Task] = set()
+        self.handles: Dict[int, CancelHandle] = {}
+        self.cancelled = False
+        self.cancelled_at: Optional[float] = None
+        self.created_at = time.monotonic()
+
+    def activate(self) -> Token:
+        """Сделать scope текущим для этого контекста (и создаваемых из него задач)"""
+        return _current_scope.set(self)
+
+    def deactivate(self, token: Token):
+        try:
+            _current_scope.reset(token)
+        except ValueError:
+            # Генератор закрывается из другого контекста - он уже не наш
+            pass
+
+    def add_task(self, task: Optional[asyncio.Task] = None):
+        """Регистрация задачи (по умолчанию текущей); завершённые удаляются сами"""
+        task = task or asyncio.current_task()
+        if task is None or task.done():
+            return
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    def add_handle(self, handle: CancelHandle) -> Callable[[], None]:
+        """
+        Регистрация обработчика отмены
+
+        Returns:
+            Функция снятия регистрации (вызывать, когда ресурс освобождён штатно)
+        """
+        handle_id = next(_handle_ids)
+        self.handles[handle_id] = handle
+        return lambda: self.handles.pop(handle_id, None)
+
+    async def cancel(self, timeout: float = 1.0) -> Dict[str, int]:
+        """
+        Отмена: обработчики (закрыть сокеты, остановить синтез) и задачи запроса
+
+        Returns:
+            Сколько задач и обработчиков отменено
+        """
+        self.cancelled = True
+        self.cancelled_at = time.monotonic()
+        handles = list(self.handles.values())
+        self.handles.clear()
+
+        pending = []
+        for handle in handles:
+            try:
+                result = handle()
+                if asyncio.iscoroutine(result):
+                    pending.append(result)
+            except Exception as e:
+                logger.debug(f"CancelScope[{self.hardware_id}]: cancel handle failed: {e}")
+
+        # Задачи отменяем до ожидания асинхронных обработчиков - они не должны задерживать остановку
+        current = asyncio.current_task()
+        tasks = [task for task in self.tasks if task is not current and not task.done()]
+        for task in tasks:
+            task.cancel()
+
+        if pending:
+            try:
+                results = await asyncio.wait_for(asyncio.gather(*pending, return_exceptions=True), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"CancelScope[{self.hardware_id}]: cancel handles timed out after {timeout}s")
+            else:
+                for result in results:
+                    if isinstance(result, Exception):
+                        logger.debug(f"CancelScope[{self.hardware_id}]: cancel handle failed: {result}")
+        return {"tasks": len(tasks), "handles": len(handles)}
+
+
+def current_cancel_scope() -> Optional[CancelScope]:
+    """Scope текущего запроса (None вне StreamAudio)"""
+    return _current_scope.get()
+
+
+def register_cancel_handle(handle: CancelHandle) -> Callable[[], None]:
+    """
+    Регистрация обработчика отмены в scope текущего запроса
+
+    Вне запроса ничего не делает. Если запрос уже прерван - обработчик
+    вызывается сразу (синхронный) или планируется (корутина).
+
+    Returns:
+        Функция снятия регистрации
+    """
+    scope = _current_scope.get()
+    if scope is None:
+        return _noop
+    if scope.cancelled:
+        try:
+            result = handle()
+            if asyncio.iscoroutine(result):
+                asyncio.ensure_future(result)
+        except Exception as e:
+            logger.debug(f"CancelScope[{scope.hardware_id}]: late cancel handle failed: {e}")
+        return _noop
+    return scope.add_handle(handle)
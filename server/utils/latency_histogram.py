@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Latency histogram with logarithmic (HDR-style) buckets (ms by default, unit= for other values)
+Cheap to record, percentiles are estimated from bucket bounds with bounded relative error
+"""
+
+import math
+from typing import Any, Dict, Iterator, Tuple
+
+
+class LatencyHistogram:
+    """
+    Гистограмма с логарифмическими корзинами (HDR-style)
+
+    Каждая степень двойки от lowest делится на sub_buckets равных корзин:
+    при sub_buckets=16 верхняя граница корзины не больше значения на 6.25%.
+    Значения ниже lowest попадают в нулевую корзину, выше диапазона - в последнюю.
+    observe() - O(1) (индекс корзины через math.frexp), без хранения значений.
+    unit - суффикс ключей snapshot() ("ms" -> p95_ms; "" -> p95 для токенов, байт и т.п.)
+    и единица для экспорта в /metrics.
+    """
+
+    __slots__ = ('lowest', 'sub_buckets', 'powers', 'unit', 'counts', 'count', 'sum', 'max', '_last_index')
+
+    def __init__(self, lowest: float = 0.01, powers: int = 24, sub_buckets: int = 16, unit: str = "ms"):
+        """
+        Args:
+            lowest: Нижняя граница диапазона (0.01 мс - 10 мкс)
+            powers: Число степеней двойки над lowest (24 - до ~168 с при 0.01 мс)
+            sub_buckets: Корзин на степень двойки
+            unit: Единица значений ("ms" или "" для безразмерных)
+        """
+        self.lowest = lowest
+        self.sub_buckets = sub_buckets
+        self.powers = powers
+        self.unit = unit
+        # [0] - ниже lowest, [1 .. powers * sub_buckets] - диапазон, [-1] - выше диапазона
+        self.counts = [0] * (powers * sub_buckets + 2)
+        self._last_index = len(self.counts) - 1
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        """Записать значение - O(1)"""
+        if value > self.lowest:
+            mantissa, exponent = math.frexp(value / self.lowest)
+            index = (exponent - 1) * self.sub_buckets + int((mantissa * 2.0 - 1.0) * self.sub_buckets) + 1
+            if index > self._last_index:
+                index = self._last_index
+        else:
+            index = 0
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def upper_bound(self, index: int) -> float:
+        """Верхняя граница корзины (inf для корзины переполнения)"""
+        if index <= 0:
+            return self.lowest
+        if index >= self._last_index:
+            return math.inf
+        power, sub = divmod(index - 1, self.sub_buckets)
+        return self.lowest * (2 ** power) * (1.0 + (sub + 1) / self.sub_buckets)
+
+    def percentile(self, q: float) -> float:
+        """Оценка перцентиля по верхней границе корзины (не больше максимума)"""
+        return self.percentiles((q,))[0]
+
+    def percentiles(self, quantiles: Tuple[float, ...] = (0.50, 0.95, 0.99)) -> Tuple[float, ...]:
+        """Несколько перцентилей за один проход по корзинам"""
+        if not self.count:
+            return tuple(0.0 for _ in quantiles)
+        ranks = [q * self.count for q in quantiles]
+        result = [self.max] * len(quantiles)
+        position = 0
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if not bucket_count:
+                continue
+            seen += bucket_count
+            while position < len(ranks) and seen >= ranks[position]:
+                result[position] = min(self.upper_bound(index), self.max)
+                position += 1
+            if position == len(ranks):
+                break
+        return tuple(result)
+
+    def buckets(self) -> Iterator[Tuple[float, int]]:
+        """Непустые корзины: (верхняя граница, накопленное число значений)"""
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count:
+                seen += bucket_count
+                yield self.upper_bound(index), seen
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Сводка для get_metrics(): число, сумма, среднее, p50/p95/p99, максимум
+        и непустые корзины [[верхняя граница, накопленное число], ...] -
+        по ним /metrics экспортирует полноценную histogram
+        """
+        p50, p95, p99 = self.percentiles()
+        suffix = f"_{self.unit}" if self.unit else ""
+        return {
+            "count": self.count,
+            f"sum{suffix}": self.sum,
+            f"avg{suffix}": (self.sum / self.count) if self.count else 0.0,
+            f"p50{suffix}": p50,
+            f"p95{suffix}": p95,
+            f"p99{suffix}": p99,
+            f"max{suffix}": self.max,
+            "unit": self.unit,
+            "buckets": [[bound, seen] for bound, seen in self.buckets() if not math.isinf(bound)],
+        }
+
+    def reset(self):
+        self.counts = [0] * len(self.counts)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Трассировка одного запроса StreamAudio по стадиям
+
+Трасса хранится в ContextVar, как и CancelScope: задачи запроса
+(сегментация, TTS воркеры) наследуют её, поэтому провайдеры глубоко в
+стеке записывают свои стадии (аренда Live сессии, первый токен Gemini,
+синтез Azure) через trace_span()/record_span(), не зная session_id.
+Вне запроса все функции ничего не делают.
+
+Спан - (имя, начало от старта запроса, длительность, атрибуты); отметка
+(trace_mark) - спан нулевой длительности. Сборку гистограмм по стадиям и
+JSONL выполняет monitoring.tracing.finish_trace().
+"""
+
+import time
+from contextvars import ContextVar, Token
+from typing import Any, Dict, List, Optional, Tuple
+
+_current_trace: ContextVar[Optional["RequestTrace"]] = ContextVar('request_trace', default=None)
+
+# Защита от разрастания трассы на очень длинных ответах
+MAX_SPANS = 2000
+
+
+class RequestTrace:
+    """Стадии одного запроса (время - time.perf_counter)"""
+
+    __slots__ = ('session_id', 'hardware_id', 'started_at', 'started_wall', 'finished_at',
+                 'status', 'spans', 'dropped_spans')
+
+    def __init__(self, session_id: str, hardware_id: str = 'unknown'):
+        self.session_id = session_id
+        self.hardware_id = hardware_id
+        self.started_at = time.perf_counter()
+        self.started_wall = time.time()
+        self.finished_at: Optional[float] = None
+        self.status = 'running'
+        # (имя, начало, конец, атрибуты)
+        self.spans: List[Tuple[str, float, float, Optional[Dict[str, Any]]]] = []
+        self.dropped_spans = 0
+
+    def activate(self) -> Token:
+        """Сделать трассу текущей для этого контекста (и создаваемых из него задач)"""
+        return _current_trace.set(self)
+
+    def deactivate(self, token: Token):
+        try:
+            _current_trace.reset(token)
+        except ValueError:
+            # Генератор закрывается из другого контекста - он уже не наш
+            pass
+
+    def add_span(self, name: str, started_at: float, ended_at: Optional[float] = None,
+                 attrs: Optional[Dict[str, Any]] = None):
+        """Спан стадии (ended_at по умолчанию - сейчас)"""
+        if len(self.spans) >= MAX_SPANS:
+            self.dropped_spans += 1
+            return
+        self.spans.append((name, started_at, ended_at if ended_at is not None else time.perf_counter(), attrs))
+
+    def finish(self, status: str = 'ok'):
+        if self.finished_at is None:
+            self.finished_at = time.perf_counter()
+            self.status = status
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return (end - self.started_at) * 1000
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Запись JSONL: спаны с началом и длительностью в мс от старта запроса"""
+        origin = self.started_at
+        spans = []
+        for name, started_at, ended_at, attrs in sorted(self.spans, key=lambda span: span[1]):
+            span = {
+                'name': name,
+                'start_ms': round((started_at - origin) * 1000, 3),
+                'duration_ms': round((ended_at - started_at) * 1000, 3),
+            }
+            if attrs:
+                span['attrs'] = attrs
+            spans.append(span)
+        record = {
+            'session_id': self.session_id,
+            'hardware_id': self.hardware_id,
+            'started_at': self.started_wall,
+            'duration_ms': round(self.duration_ms, 3),
+            'status': self.status,
+            'spans': spans,
+        }
+        if self.dropped_spans:
+            record['dropped_spans'] = self.dropped_spans
+        return record
+
+
+class _Span:
+    """Контекстный менеджер спана; без активной трассы не создаётся (см. trace_span)"""
+
+    __slots__ = ('trace', 'name', 'attrs', 'started_at')
+
+    def __init__(self, trace: RequestTrace, name: str, attrs: Optional[Dict[str, Any]]):
+        self.trace = trace
+        self.name = name
+        self.attrs = attrs
+        self.started_at = 0.0
+
+    def __enter__(self) -> "_Span":
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.attrs = {**(self.attrs or {}), 'error': exc_type.__name__}
+        self.trace.add_span(self.name, self.started_at, None, self.attrs)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def current_trace() -> Optional[RequestTrace]:
+    """Трасса текущего запроса (None вне StreamAudio)"""
+    return _current_trace.get()
+
+
+def trace_span(name: str, **attrs):
+    """
+    Спан вокруг блока: with trace_span("gemini.lease"): ...
+
+    Исключение в блоке записывается в атрибут error и пробрасывается.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return _NULL_SPAN
+    return _Span(trace, name, attrs or None)
+
+
+def record_span(name: str, started_at: float, **attrs):
+    """Спан от started_at (time.perf_counter) до текущего момента"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_span(name, started_at, None, attrs or None)
+
+
+def trace_mark(name: str, **attrs):
+    """Отметка момента (спан нулевой длительности): первый токен, первый аудио чанк"""
+    trace = _current_trace.get()
+    if trace is not None:
+        now = time.perf_counter()
+        trace.add_span(name, now, now, attrs or None)